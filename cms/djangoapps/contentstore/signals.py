@@ -0,0 +1,21 @@
+""" receivers of course_published signals for content updates """
+from django.conf import settings
+from django.dispatch import receiver
+
+from xmodule.modulestore.django import SignalHandler
+
+
+@receiver(SignalHandler.course_published)
+def listen_for_course_publish(sender, course_key, **kwargs):  # pylint: disable=unused-argument
+    """
+    Update the courseware search index in the background, once content of the course is published.
+    """
+    if not getattr(settings, 'SEARCH_ENGINE', None):
+        return
+
+    # Import tasks here to avoid a circular import.
+    from .tasks import update_search_index
+
+    # The countdown=0 kwarg ensures the task does not access the course before the
+    # signal emitter has finished all operations.
+    update_search_index.apply_async([unicode(course_key)], countdown=0)
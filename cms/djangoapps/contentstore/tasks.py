@@ -7,6 +7,7 @@ from django.contrib.auth.models import User
 import json
 import logging
 from xmodule.modulestore.django import modulestore
+from xmodule.modulestore.courseware_index import CoursewareSearchIndexer
 from xmodule.course_module import CourseFields
 
 from xmodule.modulestore.exceptions import DuplicateCourseError, ItemNotFoundError
@@ -67,6 +68,18 @@ def rerun_course(source_course_key_string, destination_course_key_string, user_i
         return "exception: " + unicode(exc)
 
 
+@task()
+def update_search_index(course_id):
+    """
+    Updates the courseware search index with the content published in the course.
+    """
+    course_key = CourseKey.from_string(course_id)
+    try:
+        CoursewareSearchIndexer.do_publish_index(modulestore(), course_key)
+    except Exception:  # pylint: disable=broad-except
+        logging.exception(u'Search indexing error for course %s', course_id)
+
+
 def deserialize_fields(json_fields):
     fields = json.loads(json_fields)
     for field_name, value in fields.iteritems():
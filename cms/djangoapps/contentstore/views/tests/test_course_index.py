@@ -15,7 +15,7 @@ from contentstore.views.item import create_xblock_info, VisibilityState
 from course_action_state.models import CourseRerunState
 from util.date_utils import get_default_time_display
 from xmodule.modulestore import ModuleStoreEnum
-from xmodule.modulestore.courseware_index import CoursewareSearchIndexer
+from xmodule.modulestore.courseware_index import CoursewareSearchIndexer, INDEX_NAME, DOCUMENT_TYPE
 from xmodule.modulestore.exceptions import ItemNotFoundError
 from xmodule.modulestore.django import modulestore
 from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory, LibraryFactory
@@ -27,6 +27,8 @@ from django.conf import settings
 from django.core.exceptions import PermissionDenied
 from django.utils.translation import ugettext as _
 from search.api import perform_search
+from search.search_engine_base import SearchEngine
+from search.tests.mock_search_engine import MockSearchEngine
 import pytz
 
 
@@ -666,3 +668,64 @@ class TestCourseReIndex(CourseTestCase):
         # Start manual reindex and check error in response
         with self.assertRaises(SearchIndexingError):
             CoursewareSearchIndexer.do_course_reindex(modulestore(), self.course.id)
+
+    def test_incremental_indexing(self):
+        """
+        Test that publishing only indexes the documents which changed since the course was indexed
+        """
+        CoursewareSearchIndexer.do_course_reindex(modulestore(), self.course.id)
+
+        with mock.patch.object(MockSearchEngine, 'index') as mock_index:
+            self.assertEqual(CoursewareSearchIndexer.do_publish_index(modulestore(), self.course.id), 0)
+
+            self.html.data = "<div>This is my updated HTML content</div>"
+            modulestore().update_item(self.html, self.user.id)
+            modulestore().publish(self.html.location, self.user.id)
+
+        indexed_ids = [args[1]['id'] for args, __ in mock_index.call_args_list if args[0] == DOCUMENT_TYPE]
+        self.assertEqual(indexed_ids, [unicode(self.html.location)])
+
+    def test_unchanged_items_not_built(self):
+        """
+        Test that publishing doesn't build the documents of the items which were not edited since they were indexed
+        """
+        CoursewareSearchIndexer.do_course_reindex(modulestore(), self.course.id)
+
+        with mock.patch('xmodule.video_module.VideoDescriptor.index_dictionary') as mock_index_dictionary:
+            self.html.data = "<div>This is my updated HTML content</div>"
+            modulestore().update_item(self.html, self.user.id)
+            modulestore().publish(self.html.location, self.user.id)
+        self.assertFalse(mock_index_dictionary.called)
+
+        response = perform_search("updated", user=self.user, size=10, from_=0, course_id=unicode(self.course.id))
+        self.assertEqual(response['total'], 1)
+
+    def test_deleted_items_removed(self):
+        """
+        Test that the documents of deleted items are removed from the index on publish
+        """
+        CoursewareSearchIndexer.do_course_reindex(modulestore(), self.course.id)
+        response = perform_search("unique", user=self.user, size=10, from_=0, course_id=unicode(self.course.id))
+        self.assertEqual(response['total'], 1)
+
+        modulestore().delete_item(self.html.location, self.user.id, revision=ModuleStoreEnum.RevisionOption.all)
+
+        response = perform_search("unique", user=self.user, size=10, from_=0, course_id=unicode(self.course.id))
+        self.assertEqual(response['total'], 0)
+
+    def test_stale_documents_removed(self):
+        """
+        Test that the documents of the course which are in the index, but not in the course, are removed on publish
+        """
+        searcher = SearchEngine.get_search_engine(INDEX_NAME)
+        searcher.index(DOCUMENT_TYPE, {
+            "id": "stale-id",
+            "course": unicode(self.course.id),
+            "content": {"display_name": "Stale unique content"},
+        })
+
+        CoursewareSearchIndexer.do_publish_index(modulestore(), self.course.id)
+        response = searcher.search(field_dictionary={"course": unicode(self.course.id)}, doc_type=DOCUMENT_TYPE)
+        indexed_ids = [result["data"]["id"] for result in response["results"]]
+        self.assertIn(unicode(self.html.location), indexed_ids)
+        self.assertNotIn("stale-id", indexed_ids)
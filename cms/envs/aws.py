@@ -256,6 +256,15 @@ DATABASES = AUTH_TOKENS['DATABASES']
 MODULESTORE = convert_module_store_setting_if_needed(AUTH_TOKENS.get('MODULESTORE', MODULESTORE))
 CONTENTSTORE = AUTH_TOKENS['CONTENTSTORE']
 DOC_STORE_CONFIG = AUTH_TOKENS['DOC_STORE_CONFIG']
+CONTENTSERVER_CACHE_MAX_ASSET_SIZE = ENV_TOKENS.get(
+    'CONTENTSERVER_CACHE_MAX_ASSET_SIZE', CONTENTSERVER_CACHE_MAX_ASSET_SIZE
+)
+CONTENTSERVER_DISK_CACHE_DIR = ENV_TOKENS.get('CONTENTSERVER_DISK_CACHE_DIR', CONTENTSERVER_DISK_CACHE_DIR)
+CONTENTSERVER_DISK_CACHE_MAX_SIZE = ENV_TOKENS.get(
+    'CONTENTSERVER_DISK_CACHE_MAX_SIZE', CONTENTSERVER_DISK_CACHE_MAX_SIZE
+)
+COURSE_ACCESS_ROLES_CACHE_TIMEOUT = ENV_TOKENS.get('COURSE_ACCESS_ROLES_CACHE_TIMEOUT', COURSE_ACCESS_ROLES_CACHE_TIMEOUT)
+
 # Datadog for events!
 DATADOG = AUTH_TOKENS.get("DATADOG", {})
 DATADOG.update(ENV_TOKENS.get("DATADOG", {}))
@@ -146,6 +146,11 @@ FEATURES = {
 
 ENABLE_JASMINE = False
 
+# Number of seconds the course access roles of a user are shared between
+# requests in the cache.  They are removed from it whenever they change.
+# With 0, they are looked up in the database in each request.
+COURSE_ACCESS_ROLES_CACHE_TIMEOUT = 0
+
 
 ############################# SET PATH INFORMATION #############################
 PROJECT_ROOT = path(__file__).abspath().dirname().dirname()  # /edx-platform/cms
@@ -285,6 +290,19 @@ MIDDLEWARE_CLASSES = (
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 )
 
+############################ Course asset serving ##############################
+
+# Assets smaller than this many bytes are cached in memcached by the
+# StaticContentServer middleware.
+CONTENTSERVER_CACHE_MAX_ASSET_SIZE = 1024 * 1024
+
+# Directory of the local disk cache of larger assets (whose metadata then goes to
+# memcached), shared by the processes of a server. None disables the disk cache.
+CONTENTSERVER_DISK_CACHE_DIR = None
+
+# Maximum total size, in bytes, of the disk cache of assets.
+CONTENTSERVER_DISK_CACHE_MAX_SIZE = 10 * 1024 * 1024 * 1024
+
 # Clickjacking protection can be enabled by setting this to 'DENY'
 X_FRAME_OPTIONS = 'ALLOW'
 
@@ -730,6 +748,7 @@ INSTALLED_APPS = (
     'edx_jsme',    # Molecular Structure
 
     'openedx.core.djangoapps.content.course_structures',
+    'openedx.core.djangoapps.content.course_overviews',
 )
 
 
@@ -0,0 +1,147 @@
+"""
+An on-disk cache of course assets which are too large to be cached in memcached.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+
+from django.conf import settings
+
+from xmodule.contentstore.content import StaticContent, StaticContentStream
+
+log = logging.getLogger(__name__)
+
+# Size of the chunks in which assets are copied to and streamed from the disk cache.
+DISK_CACHE_CHUNK_SIZE = 64 * 1024
+
+
+def asset_version(content):
+    """
+    Return a string identifying this version of the asset `content` (which
+    changes whenever the asset is uploaded again), suitable for use as an ETag.
+    """
+    version = u'{}|{}|{}'.format(content.location, content.last_modified_at, content.length)
+    return hashlib.md5(version.encode('utf-8')).hexdigest()
+
+
+def metadata_only(content):
+    """
+    Return a copy of `content` without its data, to be cached in memcached in
+    place of assets which are too large for it.
+    """
+    return StaticContent(
+        content.location, content.name, content.content_type, None,
+        last_modified_at=content.last_modified_at, thumbnail_location=content.thumbnail_location,
+        import_path=content.import_path, length=content.length, locked=content.locked
+    )
+
+
+def get_disk_cache():
+    """
+    Return the AssetDiskCache configured in the settings, or None if there isn't one.
+    """
+    directory = getattr(settings, 'CONTENTSERVER_DISK_CACHE_DIR', None)
+    if not directory:
+        return None
+    return AssetDiskCache(directory, settings.CONTENTSERVER_DISK_CACHE_MAX_SIZE)
+
+
+class AssetDiskCache(object):
+    """
+    A directory holding one file per cached asset version, shared by all the
+    processes of a server.
+
+    Files are named after the version of the asset they hold (see
+    `asset_version`), so an asset which is uploaded again never gets served
+    from an old file: the old file just stops being used, and gets evicted.
+    Eviction removes the least recently used files (by modification time,
+    which is updated when a file is used) whenever the total size of the
+    cache exceeds `max_size` bytes.
+    """
+    def __init__(self, directory, max_size):
+        self.directory = directory
+        self.max_size = max_size
+
+    def path(self, content):
+        """
+        Return the path of the file caching `content`.
+        """
+        return os.path.join(self.directory, asset_version(content))
+
+    def open(self, content):
+        """
+        Return a StaticContentStream of the cached copy of `content`, or None
+        if it isn't cached.
+        """
+        path = self.path(content)
+        try:
+            cached_file = open(path, 'rb')
+            os.utime(path, None)
+        except (IOError, OSError):
+            return None
+        return self._stream(content, cached_file)
+
+    def add(self, content):
+        """
+        Copy the asset `content` (a StaticContentStream) to the cache, and
+        return a StaticContentStream of the cached copy. Return None if it
+        couldn't be cached.
+        """
+        path = self.path(content)
+        try:
+            if not os.path.isdir(self.directory):
+                os.makedirs(self.directory)
+            # Copy to a temporary file first, so that no other process reads a partial copy
+            with tempfile.NamedTemporaryFile(dir=self.directory, prefix='.', suffix='.tmp', delete=False) as temp:
+                for chunk in content.stream_data():
+                    temp.write(chunk)
+            if os.path.getsize(temp.name) != content.length:
+                log.warning(u'Asset %s changed while being cached on disk', content.location)
+                os.remove(temp.name)
+                return None
+            os.rename(temp.name, path)
+        except (IOError, OSError):
+            log.exception(u'Cannot cache asset %s on disk', content.location)
+            return None
+
+        self.evict()
+        return self.open(content)
+
+    def evict(self):
+        """
+        Remove the least recently used files until the cache fits in `max_size`.
+        """
+        entries = []
+        total_size = 0
+        for name in os.listdir(self.directory):
+            if name.startswith('.'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+            total_size += stat.st_size
+
+        for __, size, name in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                # Another process got there first
+                pass
+            total_size -= size
+
+    def _stream(self, content, cached_file):
+        """
+        Return a StaticContentStream of `content`, reading from `cached_file`.
+        """
+        stream = StaticContentStream(
+            content.location, content.name, content.content_type, cached_file,
+            last_modified_at=content.last_modified_at, thumbnail_location=content.thumbnail_location,
+            import_path=content.import_path, length=content.length, locked=content.locked
+        )
+        stream.chunk_size = DISK_CACHE_CHUNK_SIZE
+        return stream
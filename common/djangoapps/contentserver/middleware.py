@@ -4,13 +4,14 @@ Middleware to serve assets.
 
 import logging
 
+from django.conf import settings
 from django.http import (
     HttpResponse, HttpResponseNotModified, HttpResponseForbidden
 )
 from student.models import CourseEnrollment
 
 from xmodule.assetstore.assetmgr import AssetManager
-from xmodule.contentstore.content import StaticContent, XASSET_LOCATION_TAG
+from xmodule.contentstore.content import StaticContent, StaticContentStream, XASSET_LOCATION_TAG
 from xmodule.modulestore import InvalidLocationError
 from opaque_keys import InvalidKeyError
 from opaque_keys.edx.locator import AssetLocator
@@ -18,6 +19,8 @@ from cache_toolbox.core import get_cached_content, set_cached_content
 from xmodule.modulestore.exceptions import ItemNotFoundError
 from xmodule.exceptions import NotFoundError
 
+from .caching import asset_version, get_disk_cache, metadata_only
+
 # TODO: Soon as we have a reasonable way to serialize/deserialize AssetKeys, we need
 # to change this file so instead of using course_id_partial, we're just using asset keys
 
@@ -50,13 +53,22 @@ class StaticContentServer(object):
                     response.status_code = 404
                     return response
 
-                # since we fetched it from DB, let's cache it going forward, but only if it's < 1MB
-                # this is because I haven't been able to find a means to stream data out of memcached
+                # since we fetched it from DB, let's cache it going forward, but only if it's small enough,
+                # because there is no means to stream data out of memcached. Larger assets are cached
+                # on disk, if there is a disk cache, and only their metadata goes to memcached.
                 if content.length is not None:
-                    if content.length < 1048576:
+                    if content.length < settings.CONTENTSERVER_CACHE_MAX_ASSET_SIZE:
                         # since we've queried as a stream, let's read in the stream into memory to set in cache
-                        content = content.copy_to_in_mem()
+                        stream, content = content, content.copy_to_in_mem()
+                        stream.close()
+                        set_cached_content(content)
+                    elif get_disk_cache() is not None:
+                        # add the stream we already have to the disk cache, rather than querying it again
+                        stream, content = content, metadata_only(content)
                         set_cached_content(content)
+                        content = self._get_content_stream(loc, content, stream)
+                        if content is None:
+                            return HttpResponse(status=404)
             else:
                 # NOP here, but we may wish to add a "cache-hit" counter in the future
                 pass
@@ -79,13 +91,29 @@ class StaticContentServer(object):
             # timestamp, so we can simply compare the strings
             last_modified_at_str = content.last_modified_at.strftime("%a, %d-%b-%Y %H:%M:%S GMT")
 
-            # see if the client has cached this content, if so then compare the
-            # timestamps, if they are the same then just return a 304 (Not Modified)
-            if 'HTTP_IF_MODIFIED_SINCE' in request.META:
+            etag = '"{}"'.format(asset_version(content))
+
+            # see if the client has cached this content, if so then compare the ETags (or, if the
+            # client didn't send one, the timestamps), if they are the same then just return a 304
+            # (Not Modified)
+            if 'HTTP_IF_NONE_MATCH' in request.META:
+                if_none_match = request.META['HTTP_IF_NONE_MATCH']
+                if if_none_match.strip() == '*' or etag in [tag.strip() for tag in if_none_match.split(',')]:
+                    response = HttpResponseNotModified()
+                    response['ETag'] = etag
+                    return response
+            elif 'HTTP_IF_MODIFIED_SINCE' in request.META:
                 if_modified_since = request.META['HTTP_IF_MODIFIED_SINCE']
                 if if_modified_since == last_modified_at_str:
                     return HttpResponseNotModified()
 
+            if content.data is None and not isinstance(content, StaticContentStream):
+                # Only the metadata of this asset was cached in memcached: get the data from the
+                # disk cache, or from the DB (and then add it to the disk cache)
+                content = self._get_content_stream(loc, content)
+                if content is None:
+                    return HttpResponse(status=404)
+
             # *** File streaming within a byte range ***
             # If a Range is provided, parse Range attribute of the request
             # Add Content-Range in the response if Range is structurally correct
@@ -93,11 +121,10 @@ class StaticContentServer(object):
             # Response -> Content-Range attribute structure: "Content-Range: bytes first-last/totalLength"
             # http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.35
             response = None
-            if request.META.get('HTTP_RANGE'):
-                # Data from cache (StaticContent) has no easy byte management, so we use the DB instead (StaticContentStream)
-                if type(content) == StaticContent:
-                    content = AssetManager.find(loc, as_stream=True)
-
+            # A Range request conditional on If-Range gets the full content if the asset changed.
+            # http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.27
+            if_range = request.META.get('HTTP_IF_RANGE')
+            if request.META.get('HTTP_RANGE') and if_range in (None, etag, last_modified_at_str):
                 header_value = request.META['HTTP_RANGE']
                 try:
                     unit, ranges = parse_range_header(header_value, content.length)
@@ -143,9 +170,42 @@ class StaticContentServer(object):
             response['Accept-Ranges'] = 'bytes'
             response['Content-Type'] = content.content_type
             response['Last-Modified'] = last_modified_at_str
+            response['ETag'] = etag
 
             return response
 
+    def _get_content_stream(self, loc, content, stream=None):
+        """
+        Return a StaticContentStream of the asset at `loc`, whose metadata is `content`: from the
+        disk cache if it's there, otherwise from `stream` (the asset just found in the DB, if any)
+        or from the DB. Return None if the asset no longer exists.
+        """
+        disk_cache = get_disk_cache()
+        if disk_cache is not None:
+            cached_content = disk_cache.open(content)
+            if cached_content is not None:
+                if stream is not None:
+                    stream.close()
+                return cached_content
+
+        if stream is None:
+            try:
+                stream = AssetManager.find(loc, as_stream=True)
+            except (ItemNotFoundError, NotFoundError):
+                return None
+
+        if disk_cache is not None:
+            cached_content = disk_cache.add(stream)
+            # The stream was read while being cached, so it can't be served anymore
+            stream.close()
+            if cached_content is not None:
+                return cached_content
+            try:
+                stream = AssetManager.find(loc, as_stream=True)
+            except (ItemNotFoundError, NotFoundError):
+                return None
+        return stream
+
 
 def parse_range_header(header_value, content_length):
     """
@@ -4,19 +4,31 @@ Tests for StaticContentServer
 import copy
 import ddt
 import logging
+import os
+import shutil
+import tempfile
 import unittest
+from datetime import datetime
+from mock import patch
+from pytz import UTC
+from StringIO import StringIO
 from uuid import uuid4
 
 from django.conf import settings
 from django.test.client import Client
 from django.test.utils import override_settings
 
+from opaque_keys.edx.locations import SlashSeparatedCourseKey
+from xmodule.assetstore.assetmgr import AssetManager
+from xmodule.contentstore.content import StaticContentStream
 from xmodule.contentstore.django import contentstore
 from xmodule.modulestore.django import modulestore
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 from xmodule.modulestore import ModuleStoreEnum
 from xmodule.modulestore.xml_importer import import_course_from_xml
 
+from cache_toolbox.core import del_cached_content
+from contentserver.caching import AssetDiskCache
 from contentserver.middleware import parse_range_header
 from student.models import CourseEnrollment
 
@@ -192,6 +204,69 @@ class ContentStoreToyCourseTest(ModuleStoreTestCase):
         )
         self.assertEqual(resp.status_code, 416)
 
+    def test_etag(self):
+        """
+        Test that assets have an ETag, and that a request with a matching If-None-Match outputs
+        304 Not Modified.
+        """
+        resp = self.client.get(self.url_unlocked)
+        etag = resp['ETag']
+
+        resp = self.client.get(self.url_unlocked, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp['ETag'], etag)
+
+        resp = self.client.get(self.url_unlocked, HTTP_IF_NONE_MATCH='"other"')
+        self.assertEqual(resp.status_code, 200)
+
+    def test_if_range(self):
+        """
+        Test that a range request conditional on an outdated If-Range outputs the full content.
+        """
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=0-', HTTP_IF_RANGE='"other"')
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotIn('Content-Range', resp)
+
+        etag = resp['ETag']
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=0-', HTTP_IF_RANGE=etag)
+        self.assertEqual(resp.status_code, 206)
+
+    def test_range_request_from_cache(self):
+        """
+        Test that range requests for assets cached in memcached are served from the cache.
+        """
+        content = self.client.get(self.url_unlocked).content
+        with patch('contentserver.middleware.AssetManager.find') as mock_find:
+            resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=1-5')
+            self.assertFalse(mock_find.called)
+        self.assertEqual(resp.status_code, 206)
+        self.assertEqual(resp.content, content[1:6])
+
+    def test_disk_cache(self):
+        """
+        Test that assets too large for memcached are served from the disk cache, if there is one.
+        """
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        del_cached_content(self.unlocked_asset)
+        self.addCleanup(del_cached_content, self.unlocked_asset)
+
+        with override_settings(CONTENTSERVER_CACHE_MAX_ASSET_SIZE=0, CONTENTSERVER_DISK_CACHE_DIR=cache_dir):
+            # The asset found in the DB is added to the disk cache without being found again
+            with patch('contentserver.middleware.AssetManager.find', side_effect=AssetManager.find) as mock_find:
+                content = self.client.get(self.url_unlocked).content
+                self.assertEqual(mock_find.call_count, 1)
+            self.assertEqual(len(content), self.length_unlocked)
+
+            with patch('contentserver.middleware.AssetManager.find') as mock_find:
+                resp = self.client.get(self.url_unlocked)
+                self.assertEqual(resp.content, content)
+                resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=2-6')
+                self.assertEqual(resp.status_code, 206)
+                self.assertEqual(resp.content, content[2:7])
+                self.assertFalse(mock_find.called)
+
+
 
 @ddt.ddt
 class ParseRangeHeaderTestCase(unittest.TestCase):
@@ -236,3 +311,45 @@ class ParseRangeHeaderTestCase(unittest.TestCase):
         self.assertRaisesRegexp(
             exception_class, exception_message_regex, parse_range_header, header_value, self.content_length
         )
+
+
+class AssetDiskCacheTestCase(unittest.TestCase):
+    """
+    Tests for the AssetDiskCache class.
+    """
+    def setUp(self):
+        super(AssetDiskCacheTestCase, self).setUp()
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        self.course_key = SlashSeparatedCourseKey('edX', 'toy', '2012_Fall')
+
+    def content(self, name, data):
+        """
+        Return a StaticContentStream of `data`.
+        """
+        return StaticContentStream(
+            self.course_key.make_asset_key('asset', name), name, 'text/plain', StringIO(data),
+            last_modified_at=datetime(2015, 1, 1, tzinfo=UTC), length=len(data)
+        )
+
+    def test_add_and_open(self):
+        cache = AssetDiskCache(self.cache_dir, 1000)
+        content = self.content('a.txt', 'a' * 100)
+        self.assertIsNone(cache.open(content))
+
+        cached = cache.add(content)
+        self.assertEqual(''.join(cached.stream_data()), 'a' * 100)
+        self.assertEqual(''.join(cache.open(content).stream_data_in_range(10, 19)), 'a' * 10)
+
+    def test_eviction(self):
+        cache = AssetDiskCache(self.cache_dir, 250)
+        first = self.content('a.txt', 'a' * 100)
+        second = self.content('b.txt', 'b' * 100)
+        cache.add(first)
+        cache.add(second)
+        # make the first asset the least recently used one
+        os.utime(cache.path(first), (0, 0))
+
+        cache.add(self.content('c.txt', 'c' * 100))
+        self.assertIsNone(cache.open(first))
+        self.assertIsNotNone(cache.open(second))
@@ -1,5 +1,7 @@
 import logging
 import re
+import threading
+from collections import OrderedDict
 
 from staticfiles.storage import staticfiles_storage
 from staticfiles import finders
@@ -28,6 +30,84 @@ def _url_replace_regex(prefix):
         """.format(prefix=prefix)
 
 
+_url_replace_patterns = {}
+
+
+def _url_replace_pattern(prefix):
+    """
+    Return the compiled `_url_replace_regex(prefix)`.
+
+    Compiled patterns are kept for the life of the process, since there are
+    only as many prefixes as there are course data directories.
+    """
+    pattern = _url_replace_patterns.get(prefix)
+    if pattern is None:
+        pattern = _url_replace_patterns[prefix] = re.compile(_url_replace_regex(prefix))
+    return pattern
+
+
+def _static_url_prefix(data_dir):
+    """
+    Return the regex prefix matching the static urls not already pointing to `data_dir`.
+    """
+    return u'(?:{static_url}|/static/)(?!{data_dir})'.format(
+        static_url=settings.STATIC_URL,
+        data_dir=data_dir
+    )
+
+
+class _BoundedCache(object):
+    """
+    A least recently used cache of at most STATIC_REPLACE_CACHE_SIZE entries,
+    shared by the threads of a process. Nothing is cached if that setting is 0,
+    or in DEBUG mode (where static files can change at any time).
+    """
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def max_size():
+        """
+        Return the number of entries the cache can hold.
+        """
+        if settings.DEBUG:
+            return 0
+        return getattr(settings, 'STATIC_REPLACE_CACHE_SIZE', 0)
+
+    def get(self, key):
+        """
+        Return the value cached under `key`, or None.
+        """
+        with self._lock:
+            value = self._entries.pop(key, None)
+            if value is not None:
+                # Re-insert it to mark it as the most recently used one
+                self._entries[key] = value
+            return value
+
+    def set(self, key, value):
+        """
+        Cache `value` under `key`, evicting the least recently used entries if needed.
+        """
+        max_size = self.max_size()
+        with self._lock:
+            self._entries[key] = value
+            while len(self._entries) > max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """
+        Remove all the entries.
+        """
+        with self._lock:
+            self._entries.clear()
+
+
+# (prefix, rest, data_directory, course_id, static_asset_path) -> url replacing the static url
+_static_url_cache = _BoundedCache()
+
+
 def try_staticfiles_lookup(path):
     """
     Try to lookup a path in staticfiles_storage.  If it fails, return
@@ -69,7 +149,7 @@ def replace_jump_to_id_urls(text, course_id, jump_to_id_base_url):
         rest = match.group('rest')
         return "".join([quote, jump_to_id_base_url + rest, quote])
 
-    return re.sub(_url_replace_regex('/jump_to_id/'), replace_jump_to_id_url, text)
+    return _url_replace_pattern('/jump_to_id/').sub(replace_jump_to_id_url, text)
 
 
 def replace_course_urls(text, course_key):
@@ -89,7 +169,7 @@ def replace_course_urls(text, course_key):
         rest = match.group('rest')
         return "".join([quote, '/courses/' + course_id + '/', rest, quote])
 
-    return re.sub(_url_replace_regex('/course/'), replace_course_url, text)
+    return _url_replace_pattern('/course/').sub(replace_course_url, text)
 
 
 def process_static_urls(text, replacement_function, data_dir=None):
@@ -108,14 +188,7 @@ def process_static_urls(text, replacement_function, data_dir=None):
         rest = match.group('rest')
         return replacement_function(original, prefix, quote, rest)
 
-    return re.sub(
-        _url_replace_regex(u'(?:{static_url}|/static/)(?!{data_dir})'.format(
-            static_url=settings.STATIC_URL,
-            data_dir=data_dir
-        )),
-        wrap_part_extraction,
-        text
-    )
+    return _url_replace_pattern(_static_url_prefix(data_dir)).sub(wrap_part_extraction, text)
 
 
 def make_static_urls_absolute(request, html):
@@ -135,6 +208,76 @@ def make_static_urls_absolute(request, html):
     )
 
 
+def _resolve_static_url(prefix, rest, data_directory, course_id, static_asset_path):
+    """
+    Return the url which the static url `prefix + rest` should be replaced
+    with (or None if it should be left alone), and whether that url can be
+    cached (it can't if looking it up failed). See `replace_static_urls`.
+    """
+    # Don't mess with things that end in '?raw'
+    if rest.endswith('?raw'):
+        return None, True
+
+    # In debug mode, if we can find the url as is,
+    if settings.DEBUG and finders.find(rest, True):
+        return None, False
+    # if we're running with a MongoBacked store course_namespace is not None, then use studio style urls
+    elif (not static_asset_path) \
+            and course_id \
+            and modulestore().get_modulestore_type(course_id) != ModuleStoreEnum.Type.xml:
+        # first look in the static file pipeline and see if we are trying to reference
+        # a piece of static content which is in the edx-platform repo (e.g. JS associated with an xmodule)
+
+        exists_in_staticfiles_storage = False
+        cacheable = True
+        try:
+            exists_in_staticfiles_storage = staticfiles_storage.exists(rest)
+        except Exception as err:
+            log.warning("staticfiles_storage couldn't find path {0}: {1}".format(
+                rest, str(err)))
+            cacheable = False
+
+        if exists_in_staticfiles_storage:
+            url = staticfiles_storage.url(rest)
+        else:
+            # if not, then assume it's courseware specific content and then look in the
+            # Mongo-backed database
+            url = StaticContent.convert_legacy_static_url_with_course_id(rest, course_id)
+        return url, cacheable
+    # Otherwise, look the file up in staticfiles_storage, and append the data directory if needed
+    else:
+        course_path = "/".join((static_asset_path or data_directory, rest))
+
+        try:
+            if staticfiles_storage.exists(rest):
+                url = staticfiles_storage.url(rest)
+            else:
+                url = staticfiles_storage.url(course_path)
+        # And if that fails, assume that it's course content, and add manually data directory
+        except Exception as err:
+            log.warning("staticfiles_storage couldn't find path {0}: {1}".format(
+                rest, str(err)))
+            return "".join([prefix, course_path]), False
+        return url, True
+
+
+def _replace_static_url(original, prefix, quote, rest, data_directory, course_id, static_asset_path):
+    """
+    Replace a single matched static url, looking up its replacement in the
+    url cache first.
+    """
+    key = (prefix, rest, data_directory, unicode(course_id), static_asset_path)
+    url = _static_url_cache.get(key)
+    if url is None:
+        url, cacheable = _resolve_static_url(prefix, rest, data_directory, course_id, static_asset_path)
+        if url is None:
+            return original
+        if cacheable:
+            _static_url_cache.set(key, url)
+
+    return "".join([quote, url, quote])
+
+
 def replace_static_urls(text, data_directory=None, course_id=None, static_asset_path=''):
     """
     Replace /static/$stuff urls either with their correct url as generated by collectstatic,
@@ -152,49 +295,36 @@ def replace_static_urls(text, data_directory=None, course_id=None, static_asset_
         """
         Replace a single matched url.
         """
+        return _replace_static_url(original, prefix, quote, rest, data_directory, course_id, static_asset_path)
 
-        # Don't mess with things that end in '?raw'
-        if rest.endswith('?raw'):
-            return original
+    return process_static_urls(text, replace_static_url, data_dir=static_asset_path or data_directory)
 
-        # In debug mode, if we can find the url as is,
-        if settings.DEBUG and finders.find(rest, True):
-            return original
-        # if we're running with a MongoBacked store course_namespace is not None, then use studio style urls
-        elif (not static_asset_path) \
-                and course_id \
-                and modulestore().get_modulestore_type(course_id) != ModuleStoreEnum.Type.xml:
-            # first look in the static file pipeline and see if we are trying to reference
-            # a piece of static content which is in the edx-platform repo (e.g. JS associated with an xmodule)
-
-            exists_in_staticfiles_storage = False
-            try:
-                exists_in_staticfiles_storage = staticfiles_storage.exists(rest)
-            except Exception as err:
-                log.warning("staticfiles_storage couldn't find path {0}: {1}".format(
-                    rest, str(err)))
-
-            if exists_in_staticfiles_storage:
-                url = staticfiles_storage.url(rest)
-            else:
-                # if not, then assume it's courseware specific content and then look in the
-                # Mongo-backed database
-                url = StaticContent.convert_legacy_static_url_with_course_id(rest, course_id)
-        # Otherwise, look the file up in staticfiles_storage, and append the data directory if needed
-        else:
-            course_path = "/".join((static_asset_path or data_directory, rest))
 
-            try:
-                if staticfiles_storage.exists(rest):
-                    url = staticfiles_storage.url(rest)
-                else:
-                    url = staticfiles_storage.url(course_path)
-            # And if that fails, assume that it's course content, and add manually data directory
-            except Exception as err:
-                log.warning("staticfiles_storage couldn't find path {0}: {1}".format(
-                    rest, str(err)))
-                url = "".join([prefix, course_path])
+def replace_urls(text, course_id, jump_to_id_base_url, data_directory=None, static_asset_path=''):
+    """
+    Do all of what `replace_static_urls`, `replace_course_urls` and
+    `replace_jump_to_id_urls` do, in a single pass over `text`.
 
-        return "".join([quote, url, quote])
+    The static urls are resolved through the same cache as `replace_static_urls`;
+    the rewritten text itself isn't cached, as html fragments can be large.
+    """
+    course_url_base = '/courses/' + course_id.to_deprecated_string() + '/'
+    static_prefix = _static_url_prefix(static_asset_path or data_directory)
 
-    return process_static_urls(text, replace_static_url, data_dir=static_asset_path or data_directory)
+    def replace_url(match):
+        """
+        Replace a single matched url of any of the three kinds.
+        """
+        prefix = match.group('prefix')
+        quote = match.group('quote')
+        rest = match.group('rest')
+        if prefix == '/course/':
+            return "".join([quote, course_url_base, rest, quote])
+        elif prefix == '/jump_to_id/':
+            return "".join([quote, jump_to_id_base_url + rest, quote])
+        return _replace_static_url(
+            match.group(0), prefix, quote, rest, data_directory, course_id, static_asset_path
+        )
+
+    pattern = _url_replace_pattern(u'{}|/course/|/jump_to_id/'.format(static_prefix))
+    return pattern.sub(replace_url, text)
@@ -1,10 +1,14 @@
 import re
 
 from nose.tools import assert_equals, assert_true, assert_false  # pylint: disable=no-name-in-module
+from django.test.utils import override_settings
 from static_replace import (
     replace_static_urls,
     replace_course_urls,
+    replace_jump_to_id_urls,
+    replace_urls,
     _url_replace_regex,
+    _static_url_cache,
     process_static_urls,
     make_static_urls_absolute
 )
@@ -161,3 +165,45 @@ def test_regex():
     for s in no:
         print 'Should not match: {0!r}'.format(s)
         assert_false(re.match(regex, s))
+
+
+@patch('static_replace.staticfiles_storage')
+@patch('static_replace.modulestore')
+def test_replace_urls(mock_modulestore, mock_storage):
+    """
+    Make sure that replace_urls does what the three separate replacements do.
+    """
+    mock_storage.exists.return_value = False
+    mock_modulestore.return_value = Mock(MongoModuleStore)
+    jump_to_id_base_url = '/courses/org/course/run/jump_to_id/'
+
+    text = '<a href="/static/file.png"/><a href="/course/info"/><a href=\'/jump_to_id/id\'/>"/static/a.png?raw"'
+    expected = replace_jump_to_id_urls(
+        replace_course_urls(replace_static_urls(text, DATA_DIRECTORY, COURSE_KEY), COURSE_KEY),
+        COURSE_KEY,
+        jump_to_id_base_url
+    )
+    assert_equals(expected, replace_urls(text, COURSE_KEY, jump_to_id_base_url, DATA_DIRECTORY))
+
+
+@override_settings(STATIC_REPLACE_CACHE_SIZE=10, DEBUG=False)
+@patch('static_replace.staticfiles_storage')
+@patch('static_replace.modulestore')
+def test_replace_urls_cache(mock_modulestore, mock_storage):
+    """
+    Make sure that url lookups are cached.
+    """
+    mock_storage.exists.return_value = False
+    mock_modulestore.return_value = Mock(MongoModuleStore)
+    jump_to_id_base_url = '/courses/org/course/run/jump_to_id/'
+    _static_url_cache.clear()
+
+    rewritten = replace_urls(STATIC_SOURCE, COURSE_KEY, jump_to_id_base_url, DATA_DIRECTORY)
+    assert_equals(mock_storage.exists.call_count, 1)
+    # Different text with the same url doesn't look the url up again
+    assert_equals(
+        '<img src=' + rewritten + '/>',
+        replace_urls('<img src=' + STATIC_SOURCE + '/>', COURSE_KEY, jump_to_id_base_url, DATA_DIRECTORY)
+    )
+    assert_equals(mock_storage.exists.call_count, 1)
+    _static_url_cache.clear()
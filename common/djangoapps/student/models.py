@@ -26,8 +26,10 @@ from django.utils import timezone
 from django.contrib.auth.models import User
 from django.contrib.auth.hashers import make_password
 from django.contrib.auth.signals import user_logged_in, user_logged_out
+from django.core.cache import cache
 from django.db import models, IntegrityError
 from django.db.models import Count
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver, Signal
 from django.core.exceptions import ObjectDoesNotExist
 from django.utils.translation import ugettext_noop
@@ -1240,6 +1242,19 @@ class CourseAccessRole(models.Model):
         return "[CourseAccessRole] user: {}   role: {}   org: {}   course: {}".format(self.user.username, self.role, self.org, self.course_id)
 
 
+# Key of the CourseAccessRoles of a user shared between requests in the django cache, by student.roles.RoleCache
+COURSE_ACCESS_ROLES_CACHE_KEY = u"student.course_access_roles.{}"
+
+
+@receiver(post_save, sender=CourseAccessRole)
+@receiver(post_delete, sender=CourseAccessRole)
+def invalidate_cached_course_access_roles(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Remove the user's roles from the django cache when one of them changes.
+    """
+    cache.delete(COURSE_ACCESS_ROLES_CACHE_KEY.format(instance.user_id))
+
+
 #### Helper methods for use from python manage.py shell and other classes.
 
 
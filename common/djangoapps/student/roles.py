@@ -5,10 +5,12 @@ adding users, removing users, and listing members
 
 from abc import ABCMeta, abstractmethod
 
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.cache import cache
 import logging
 
-from student.models import CourseAccessRole
+from student.models import COURSE_ACCESS_ROLES_CACHE_KEY, CourseAccessRole
 from xmodule_django.models import CourseKeyField
 
 
@@ -37,11 +39,22 @@ def register_access_role(cls):
 class RoleCache(object):
     """
     A cache of the CourseAccessRoles held by a particular user
+
+    When settings.COURSE_ACCESS_ROLES_CACHE_TIMEOUT is set, the roles are also
+    shared between requests in the django cache for that many seconds. They
+    are removed from it whenever one of the user's roles changes.
     """
     def __init__(self, user):
-        self._roles = set(
-            CourseAccessRole.objects.filter(user=user).all()
-        )
+        timeout = settings.COURSE_ACCESS_ROLES_CACHE_TIMEOUT
+        cache_key = COURSE_ACCESS_ROLES_CACHE_KEY.format(user.id)
+        roles = cache.get(cache_key) if timeout else None
+        if roles is None:
+            roles = set(
+                CourseAccessRole.objects.filter(user=user).all()
+            )
+            if timeout:
+                cache.set(cache_key, roles, timeout)
+        self._roles = roles
 
     def has_role(self, role, course_id, org):
         """
@@ -2,7 +2,9 @@
 Tests of student.roles
 """
 import ddt
+from django.core.cache import cache as django_cache
 from django.test import TestCase
+from django.test.utils import override_settings
 
 from courseware.tests.factories import UserFactory, StaffFactory, InstructorFactory
 from student.tests.factories import AnonymousUserFactory
@@ -191,3 +193,17 @@ class RoleCacheTestCase(TestCase):
     def test_empty_cache(self, role, target):
         cache = RoleCache(self.user)
         self.assertFalse(cache.has_role(*target))
+
+    @override_settings(COURSE_ACCESS_ROLES_CACHE_TIMEOUT=60)
+    def test_shared_cache(self):
+        django_cache.clear()
+        with self.assertNumQueries(1):
+            self.assertFalse(RoleCache(self.user).has_role('staff', self.IN_KEY, 'edX'))
+        with self.assertNumQueries(0):
+            self.assertFalse(RoleCache(self.user).has_role('staff', self.IN_KEY, 'edX'))
+
+        # Changing a role of the user removes their roles from the cache
+        CourseStaffRole(self.IN_KEY).add_users(self.user)
+        self.assertTrue(RoleCache(self.user).has_role('staff', self.IN_KEY, 'edX'))
+        CourseStaffRole(self.IN_KEY).remove_users(self.user)
+        self.assertFalse(RoleCache(self.user).has_role('staff', self.IN_KEY, 'edX'))
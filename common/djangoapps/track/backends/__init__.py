@@ -26,3 +26,16 @@ class BaseBackend(object):
     def send(self, event):
         """Send event to tracker."""
         pass
+
+    def send_batch(self, events):
+        """
+        Send a list of events to tracker.
+
+        By default, each event is sent with `send`, so only the errors which
+        `send` raises are raised; most backends log them and drop the event
+        instead. Backends which override this should store the events at
+        once, and raise an error if they could not be stored, so that the
+        caller can keep them and try again (see `track.backends.buffered`).
+        """
+        for event in events:
+            self.send(event)
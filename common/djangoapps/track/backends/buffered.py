@@ -0,0 +1,274 @@
+"""
+Event tracker backend that delivers events to another backend in batches,
+from a background thread, so that sending an event doesn't block the request.
+
+It wraps the backend that actually stores the events, e.g.::
+
+  TRACKING_BACKENDS = {
+      'mongo': {
+          'ENGINE': 'track.backends.buffered.BufferedBackend',
+          'OPTIONS': {
+              'backend': {
+                  'ENGINE': 'track.backends.mongodb.MongoBackend',
+                  'OPTIONS': {...}
+              },
+              'spool_dir': '/var/spool/edx/tracking/mongo',
+          }
+      }
+  }
+
+"""
+
+from __future__ import absolute_import
+
+import atexit
+import cPickle as pickle
+import logging
+import os
+import Queue
+import tempfile
+import threading
+import time
+
+from dogapi import dog_stats_api
+
+from track.backends import BaseBackend
+
+
+log = logging.getLogger(__name__)
+
+
+class BufferedBackend(BaseBackend):
+    """
+    Event tracker backend that queues events in memory, and has a background
+    thread deliver them to the wrapped backend with `send_batch`.
+
+    A batch is delivered when it has `batch_size` events, or when its oldest
+    event has waited for `flush_interval` seconds. The queue holds at most
+    `max_queue_size` events: when it is full, `send` waits for at most
+    `enqueue_timeout` seconds for room.
+
+    Batches which can't be delivered (the `send_batch` of the wrapped backend
+    raises an error), and events which can't be queued, are written to files
+    in `spool_dir`, and delivered again once the wrapped backend works again.
+    Without a `spool_dir`, they are logged and dropped. Wrapped backends which
+    don't override `BaseBackend.send_batch` drop the events they fail to
+    store themselves, so only the events which can't be queued are spooled.
+    """
+
+    def __init__(self, backend, max_queue_size=10000, batch_size=100, flush_interval=1.0,
+                 enqueue_timeout=0.01, spool_dir=None, retry_interval=30, **kwargs):
+        """
+        :Parameters:
+
+          - `backend`: the configuration of the wrapped backend, a dict
+            with 'ENGINE' and 'OPTIONS', as in TRACKING_BACKENDS
+          - `max_queue_size`, `batch_size`, `flush_interval`,
+            `enqueue_timeout`, `spool_dir`: see the class docstring
+          - `retry_interval`: seconds between attempts to deliver spooled
+            events
+
+        """
+        super(BufferedBackend, self).__init__(**kwargs)
+
+        # Imported here because the tracker instantiates its backends when it is imported
+        from track.tracker import _instantiate_backend_from_name
+
+        self.backend = _instantiate_backend_from_name(backend['ENGINE'], backend.get('OPTIONS', {}))
+        if spool_dir and type(self.backend).send_batch.__func__ is BaseBackend.send_batch.__func__:
+            log.warning(
+                'Tracking backend %s sends batches one event at a time, its delivery errors will not be spooled',
+                backend['ENGINE']
+            )
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self.spool_dir = spool_dir
+        self.retry_interval = retry_interval
+
+        self._lock = threading.Lock()
+        self._delivery_lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self._thread = None
+        self._last_retry = 0
+        self._stats = {
+            'delivered': 0,
+            'spooled': 0,
+            'dropped': 0,
+            'failed_batches': 0,
+        }
+
+        atexit.register(self.flush)
+
+    def send(self, event):
+        """Queue the event, starting the delivery thread if needed."""
+        queue = self._get_queue()
+        try:
+            queue.put((time.time(), event), timeout=self.enqueue_timeout)
+        except Queue.Full:
+            dog_stats_api.increment('track.buffered.queue_full')
+            self._spool([event])
+
+    def _get_queue(self):
+        """
+        Return the queue of this process, creating it and starting its
+        delivery thread if needed (the first time, and after a fork, since
+        threads don't survive it).
+        """
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._queue = Queue.Queue(self.max_queue_size)
+                    self._thread = threading.Thread(target=self._run, name='track-buffered-delivery')
+                    self._thread.daemon = True
+                    self._thread.start()
+                    self._pid = os.getpid()
+        return self._queue
+
+    def _run(self):
+        """Deliver the queued events, until the process exits."""
+        queue = self._queue
+        while True:
+            try:
+                self._deliver(self._next_batch(queue))
+            except Exception:  # pylint: disable=broad-except
+                # Never let the delivery thread die
+                log.exception('Error delivering tracking events')
+
+    def _next_batch(self, queue):
+        """
+        Wait for, and return, the next batch of (queued time, event) from `queue`.
+        """
+        batch = [queue.get()]
+        deadline = time.time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(queue.get(timeout=remaining))
+            except Queue.Empty:
+                break
+        return batch
+
+    def _deliver(self, batch):
+        """
+        Send a batch of (queued time, event) to the wrapped backend, spooling
+        it if that fails, and retry the spooled events if it's time to.
+        """
+        if not batch:
+            return
+
+        dog_stats_api.gauge('track.buffered.queue_depth', self._queue.qsize() if self._queue else 0)
+        events = [event for __, event in batch]
+        with self._delivery_lock:
+            try:
+                self.backend.send_batch(events)
+            except Exception:  # pylint: disable=broad-except
+                log.exception('Error delivering %d tracking events', len(events))
+                self._stats['failed_batches'] += 1
+                self._spool(events)
+                return
+
+            now = time.time()
+            self._stats['delivered'] += len(events)
+            dog_stats_api.increment('track.buffered.delivered', len(events))
+            dog_stats_api.histogram('track.buffered.latency', now - batch[0][0])
+            if self.spool_dir and now - self._last_retry >= self.retry_interval:
+                self._last_retry = now
+                self._deliver_spooled()
+
+    def _spool(self, events):
+        """
+        Write events which couldn't be delivered to a new file in the spool
+        directory (or drop them if there is none).
+        """
+        if not self.spool_dir:
+            self._stats['dropped'] += len(events)
+            dog_stats_api.increment('track.buffered.dropped', len(events))
+            log.error('Dropping %d tracking events which could not be delivered', len(events))
+            return
+
+        try:
+            if not os.path.isdir(self.spool_dir):
+                os.makedirs(self.spool_dir)
+            # Write to a temporary file first, so that no other process reads a partial one
+            with tempfile.NamedTemporaryFile(dir=self.spool_dir, prefix='.', suffix='.tmp', delete=False) as spool_file:
+                pickle.dump(events, spool_file, pickle.HIGHEST_PROTOCOL)
+            os.rename(spool_file.name, os.path.join(
+                self.spool_dir, '{:.6f}-{}-{}.events'.format(time.time(), os.getpid(), threading.current_thread().ident)
+            ))
+        except Exception:  # pylint: disable=broad-except
+            self._stats['dropped'] += len(events)
+            dog_stats_api.increment('track.buffered.dropped', len(events))
+            log.exception('Cannot spool %d tracking events, dropping them', len(events))
+            return
+
+        self._stats['spooled'] += len(events)
+        dog_stats_api.increment('track.buffered.spooled', len(events))
+
+    def _deliver_spooled(self):
+        """
+        Deliver the spooled events, oldest first, stopping at the first failure.
+        """
+        try:
+            names = sorted(name for name in os.listdir(self.spool_dir) if name.endswith('.events'))
+        except OSError:
+            return
+
+        for name in names:
+            path = os.path.join(self.spool_dir, name)
+            try:
+                # Rename the file first, so that no other process delivers it too
+                claimed_path = os.path.join(self.spool_dir, '.{}.{}.claimed'.format(name, os.getpid()))
+                os.rename(path, claimed_path)
+            except OSError:
+                continue
+
+            try:
+                with open(claimed_path, 'rb') as spool_file:
+                    events = pickle.load(spool_file)
+            except Exception:  # pylint: disable=broad-except
+                # Leave the (claimed) file alone, so that it can be looked at
+                log.exception('Cannot read spooled tracking events from %s', claimed_path)
+                continue
+
+            try:
+                self.backend.send_batch(events)
+            except Exception:  # pylint: disable=broad-except
+                log.exception('Error delivering %d spooled tracking events', len(events))
+                os.rename(claimed_path, path)
+                return
+            os.remove(claimed_path)
+            self._stats['delivered'] += len(events)
+            self._stats['spooled'] -= len(events)
+            dog_stats_api.increment('track.buffered.delivered', len(events))
+
+    def flush(self):
+        """
+        Deliver all the events queued in this process now, in the calling thread.
+        """
+        if self._pid != os.getpid():
+            return
+
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except Queue.Empty:
+                break
+            if len(batch) == self.batch_size:
+                self._deliver(batch)
+                batch = []
+        self._deliver(batch)
+
+    def stats(self):
+        """
+        Return a dict of the number of events queued, delivered, spooled
+        (and not delivered yet) and dropped, and of failed deliveries.
+        """
+        stats = dict(self._stats)
+        stats['queued'] = self._queue.qsize() if self._pid == os.getpid() else 0
+        return stats
@@ -81,3 +81,13 @@ class DjangoBackend(BaseBackend):
             tldat.save(using=self.name)
         except Exception as e:  # pylint: disable=broad-except
             log.exception(e)
+
+    def send_batch(self, events):
+        """
+        Save the events with a single insert. Database errors are raised,
+        so that the events can be kept.
+        """
+        TrackingLog.objects.using(self.name).bulk_create([
+            TrackingLog(**{x: event.get(x, '') for x in LOGFIELDS})
+            for event in events
+        ])
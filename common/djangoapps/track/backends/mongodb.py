@@ -95,3 +95,12 @@ class MongoBackend(BaseBackend):
             # during the next event.
             msg = 'Error inserting to MongoDB event tracker backend'
             log.exception(msg)
+
+    def send_batch(self, events):
+        """
+        Insert the events in to the Mongo collection, with a single request.
+
+        Connection errors are raised, so that the events can be kept.
+        """
+        if events:
+            self.collection.insert(events, manipulate=False)
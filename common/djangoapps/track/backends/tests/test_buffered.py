@@ -0,0 +1,80 @@
+from __future__ import absolute_import
+
+import os
+import shutil
+import tempfile
+
+from mock import patch
+
+from django.test import TestCase
+
+from track.backends import BaseBackend
+from track.backends.buffered import BufferedBackend
+
+
+class RecordingBackend(BaseBackend):
+    """Backend keeping the batches it is sent, which fails if asked to."""
+    def __init__(self, **options):
+        super(RecordingBackend, self).__init__(**options)
+        self.batches = []
+        self.fail = False
+
+    def send(self, event):
+        self.send_batch([event])
+
+    def send_batch(self, events):
+        if self.fail:
+            raise IOError('The backend is down')
+        self.batches.append(list(events))
+
+
+@patch('track.backends.buffered.threading.Thread')
+class TestBufferedBackend(TestCase):
+    def setUp(self):
+        self.spool_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.spool_dir)
+
+    def make_backend(self, **options):
+        options.setdefault('spool_dir', self.spool_dir)
+        return BufferedBackend({'ENGINE': 'track.backends.tests.test_buffered.RecordingBackend'}, **options)
+
+    def test_batches(self, mock_thread):
+        backend = self.make_backend(batch_size=2)
+        for index in range(5):
+            backend.send({'index': index})
+        self.assertTrue(mock_thread.return_value.start.called)
+        self.assertEqual(backend.stats()['queued'], 5)
+
+        backend.flush()
+
+        self.assertEqual(
+            backend.backend.batches,
+            [[{'index': 0}, {'index': 1}], [{'index': 2}, {'index': 3}], [{'index': 4}]]
+        )
+        self.assertEqual(backend.stats()['delivered'], 5)
+
+    def test_spool_and_retry(self, __):
+        backend = self.make_backend(retry_interval=0)
+        backend.backend.fail = True
+        backend.send({'index': 0})
+        backend.flush()
+
+        self.assertEqual(backend.stats()['spooled'], 1)
+        self.assertEqual(len(os.listdir(self.spool_dir)), 1)
+
+        backend.backend.fail = False
+        backend.send({'index': 1})
+        backend.flush()
+
+        self.assertEqual(backend.backend.batches, [[{'index': 1}], [{'index': 0}]])
+        self.assertEqual(backend.stats()['spooled'], 0)
+        self.assertEqual(os.listdir(self.spool_dir), [])
+
+    def test_queue_full(self, __):
+        backend = self.make_backend(max_queue_size=1, enqueue_timeout=0, spool_dir=None)
+        backend.send({'index': 0})
+        backend.send({'index': 1})
+        backend.flush()
+
+        self.assertEqual(backend.backend.batches, [[{'index': 0}]])
+        self.assertEqual(backend.stats()['dropped'], 1)
@@ -65,6 +65,28 @@ def substitute_keywords(string, user=None, course=None):
     return string
 
 
+def find_keywords(string):
+    """
+    Returns the keywords of KEYWORD_FUNCTION_MAP found in the given string
+    """
+    return [key for key in KEYWORD_FUNCTION_MAP if key in string]
+
+
+def get_keyword_values(keywords, user=None, course=None):
+    """
+    Returns a dict of what substitute_keywords replaces each of the given
+    keywords with, for the given user and course
+
+    This lets callers which substitute the same keywords in many strings
+    (e.g. one bulk email per recipient) call the keyword functions only once.
+    """
+    if user is None or course is None:
+        # Keywords are left as they are without course and user information
+        return {key: key for key in keywords}
+
+    return {key: KEYWORD_FUNCTION_MAP[key](user, course) for key in keywords}
+
+
 def substitute_keywords_with_data(string, user_id=None, course_id=None):
     """
     Given user and course ids, replaces all %%-encoded words in the given string
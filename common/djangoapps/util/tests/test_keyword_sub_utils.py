@@ -151,3 +151,20 @@ class KeywordSubTest(ModuleStoreTestCase):
 
         result = Ks.substitute_keywords(test_string, self.user, None)
         self.assertEqual(test_string, result)
+
+    def test_keyword_values(self):
+        """
+        Tests that get_keyword_values gives what substitute_keywords replaces the keywords with
+        """
+        test_string = 'Hello %%USER_FULLNAME%%, welcome to %%COURSE_DISPLAY_NAME%%'
+        keywords = Ks.find_keywords(test_string)
+        self.assertEqual(sorted(keywords), ['%%COURSE_DISPLAY_NAME%%', '%%USER_FULLNAME%%'])
+
+        values = Ks.get_keyword_values(keywords, self.user, self.course)
+        result = test_string
+        for keyword, value in values.iteritems():
+            result = result.replace(keyword, value)
+        self.assertEqual(result, Ks.substitute_keywords(test_string, self.user, self.course))
+
+        # Without a user, the keywords are left as they are
+        self.assertEqual(Ks.get_keyword_values(keywords, None, self.course), {key: key for key in keywords})
@@ -7,6 +7,9 @@ Uses pyparsing to parse. Main function as of now is evaluator().
 import math
 import operator
 import numbers
+import threading
+from collections import OrderedDict
+
 import numpy
 import scipy.constants
 import functions
@@ -61,6 +64,15 @@ DEFAULT_VARIABLES = {
     'q': scipy.constants.e  # Fund. Charge: 1.602176565e-19 (Coulombs)
 }
 
+# The default functions which can be applied to a whole NumPy array of
+# samples at once (see `CompiledExpression.evaluate_samples`).
+VECTORIZED_FUNCTIONS = set(
+    func for func in DEFAULT_FUNCTIONS.values() if func is not math.factorial
+)
+
+# How many parsed expressions `compile_expression` keeps.
+COMPILED_EXPRESSION_CACHE_SIZE = 512
+
 # We eliminated the following extreme suffixes:
 #   P (1e15), E (1e18), Z (1e21), Y (1e24),
 #   f (1e-15), a (1e-18), z (1e-21), y (1e-24)
@@ -200,6 +212,82 @@ def eval_product(parse_result):
     return prod
 
 
+def eval_array_atom(parse_result):
+    """
+    Like `eval_atom`, but the numbers may be NumPy arrays.
+    """
+    return next(k for k in parse_result if not isinstance(k, basestring))
+
+
+def eval_array_power(parse_result):
+    """
+    Like `eval_power`, but the numbers may be NumPy arrays.
+    """
+    parse_result = reversed(
+        [k for k in parse_result if not isinstance(k, basestring)]
+    )
+    return reduce(lambda a, b: b ** a, parse_result)
+
+
+def eval_array_parallel(parse_result):
+    """
+    Like `eval_parallel`, but the numbers may be NumPy arrays.
+
+    Zero inputs aren't special-cased: the division by zero has to be caught
+    by the caller (see `CompiledExpression.evaluate_samples`).
+    """
+    if len(parse_result) == 1:
+        return parse_result[0]
+    reciprocals = [1. / e for e in parse_result
+                   if not isinstance(e, basestring)]
+    return 1. / sum(reciprocals)
+
+
+def eval_array_sum(parse_result):
+    """
+    Like `eval_sum`, but the numbers may be NumPy arrays.
+    """
+    total = 0.0
+    current_op = operator.add
+    for token in parse_result:
+        if isinstance(token, basestring):
+            current_op = operator.sub if token == '-' else operator.add
+        else:
+            total = current_op(total, token)
+    return total
+
+
+def eval_array_product(parse_result):
+    """
+    Like `eval_product`, but the numbers may be NumPy arrays.
+    """
+    prod = 1.0
+    current_op = operator.mul
+    for token in parse_result:
+        if isinstance(token, basestring):
+            current_op = operator.truediv if token == '/' else operator.mul
+        else:
+            prod = current_op(prod, token)
+    return prod
+
+
+EVAL_ACTIONS = {
+    'atom': eval_atom,
+    'power': eval_power,
+    'parallel': eval_parallel,
+    'product': eval_product,
+    'sum': eval_sum,
+}
+
+EVAL_ARRAY_ACTIONS = {
+    'atom': eval_array_atom,
+    'power': eval_array_power,
+    'parallel': eval_array_parallel,
+    'product': eval_array_product,
+    'sum': eval_array_sum,
+}
+
+
 def add_defaults(variables, functions, case_sensitive):
     """
     Create dictionaries with both the default and user-defined variables.
@@ -228,34 +316,178 @@ def evaluator(variables, functions, math_expr, case_sensitive=False):
     if math_expr.strip() == "":
         return float('nan')
 
-    # Parse the tree.
-    math_interpreter = ParseAugmenter(math_expr, case_sensitive)
-    math_interpreter.parse_algebra()
+    return compile_expression(math_expr, case_sensitive).evaluate(variables, functions)
 
-    # Get our variables together.
-    all_variables, all_functions = add_defaults(variables, functions, case_sensitive)
 
-    # ...and check them
-    math_interpreter.check_variables(all_variables, all_functions)
+def evaluate_samples(variables_list, functions, math_expr, case_sensitive=False):
+    """
+    Evaluate an expression for each of the dictionaries of variables in
+    `variables_list`, and return the list of results.
 
-    # Create a recursion to evaluate the tree.
-    if case_sensitive:
-        casify = lambda x: x
-    else:
-        casify = lambda x: x.lower()  # Lowercase for case insens.
-
-    evaluate_actions = {
-        'number': eval_number,
-        'variable': lambda x: all_variables[casify(x[0])],
-        'function': lambda x: all_functions[casify(x[0])](x[1]),
-        'atom': eval_atom,
-        'power': eval_power,
-        'parallel': eval_parallel,
-        'product': eval_product,
-        'sum': eval_sum
-    }
-
-    return math_interpreter.reduce_tree(evaluate_actions)
+    This gives the same results (and raises the same errors) as calling
+    `evaluator` once per dictionary, but only parses the expression once, and
+    evaluates it for all the samples at once when possible.
+    """
+    if math_expr.strip() == "":
+        return [float('nan')] * len(variables_list)
+
+    return compile_expression(math_expr, case_sensitive).evaluate_samples(variables_list, functions)
+
+
+_compiled_expressions = OrderedDict()
+_compiled_expressions_lock = threading.Lock()
+
+
+def compile_expression(math_expr, case_sensitive=False):
+    """
+    Return the `CompiledExpression` for `math_expr`.
+
+    The most recently used ones are cached, so that expressions which are
+    evaluated over and over (e.g. the answer of a problem, or a common student
+    answer) are only parsed once. Raise a `ParseException` if the expression
+    can't be parsed.
+    """
+    key = (math_expr, case_sensitive)
+    with _compiled_expressions_lock:
+        compiled = _compiled_expressions.pop(key, None)
+        if compiled is not None:
+            # Re-insert it to mark it as the most recently used one
+            _compiled_expressions[key] = compiled
+            return compiled
+
+    compiled = CompiledExpression(math_expr, case_sensitive)
+    with _compiled_expressions_lock:
+        _compiled_expressions[key] = compiled
+        while len(_compiled_expressions) > COMPILED_EXPRESSION_CACHE_SIZE:
+            _compiled_expressions.popitem(last=False)
+    return compiled
+
+
+class CompiledExpression(object):
+    """
+    A parsed expression, which can be evaluated for any values of its
+    variables without being parsed again.
+
+    The parse tree is turned into nested closures once, so that evaluating it
+    doesn't need to walk the `pyparsing` tree either. Instances are never
+    modified after they are created, so they can be shared between threads.
+    """
+    def __init__(self, math_expr, case_sensitive=False):
+        self.math_expr = math_expr
+        self.case_sensitive = case_sensitive
+
+        self.parser = ParseAugmenter(math_expr, case_sensitive)
+        self.parser.parse_algebra()
+
+        self._evaluate = self._compile(EVAL_ACTIONS)
+        self._evaluate_array = self._compile(EVAL_ARRAY_ACTIONS)
+
+    def _casify(self, name):
+        """
+        Return the name under which a variable or function is looked up.
+        """
+        return name if self.case_sensitive else name.lower()
+
+    def _compile(self, actions):
+        """
+        Return a function of (all_variables, all_functions) evaluating the
+        parse tree, using `actions` (see `EVAL_ACTIONS`) for its inner nodes.
+        """
+        def compile_node(node):
+            """
+            Return the function evaluating `node`.
+            """
+            if not isinstance(node, ParseResults):
+                # Then it is a terminal node (an operator or parenthesis).
+                return lambda all_variables, all_functions: node
+
+            node_name = node.getName()
+            if node_name == 'number':
+                value = eval_number(node)
+                return lambda all_variables, all_functions: value
+            if node_name == 'variable':
+                variable = self._casify(node[0])
+                return lambda all_variables, all_functions: all_variables[variable]
+            if node_name == 'function':
+                function = self._casify(node[0])
+                argument = compile_node(node[1])
+                return lambda all_variables, all_functions: all_functions[function](
+                    argument(all_variables, all_functions)
+                )
+            if node_name not in actions:  # pragma: no cover
+                raise Exception(u"Unknown branch name '{}'".format(node_name))
+
+            action = actions[node_name]
+            kids = [compile_node(k) for k in node]
+            return lambda all_variables, all_functions: action([
+                kid(all_variables, all_functions) for kid in kids
+            ])
+
+        return compile_node(self.parser.tree)
+
+    def evaluate(self, variables, functions):
+        """
+        Evaluate the expression for the given variables and functions (see
+        `evaluator`).
+        """
+        all_variables, all_functions = add_defaults(variables, functions, self.case_sensitive)
+        self.parser.check_variables(all_variables, all_functions)
+        return self._evaluate(all_variables, all_functions)
+
+    def evaluate_samples(self, variables_list, functions):
+        """
+        Evaluate the expression for each of the dictionaries of variables in
+        `variables_list`, and return the list of results.
+
+        When all the samples have the same real-valued variables, and the
+        expression only uses functions which work on NumPy arrays, it is
+        evaluated once, with each variable bound to the array of its values.
+        If that fails, or hits a floating point error (e.g. a division by
+        zero, which `evaluate` treats differently), the samples are evaluated
+        one by one, so that the results and errors are exactly those of
+        `evaluate`.
+        """
+        if len(variables_list) > 1:
+            results = self._evaluate_array_samples(variables_list, functions)
+            if results is not None:
+                return results
+
+        return [self.evaluate(variables, functions) for variables in variables_list]
+
+    def _evaluate_array_samples(self, variables_list, functions):
+        """
+        Evaluate the expression for all the samples at once, as described in
+        `evaluate_samples`. Return None if that can't be done.
+        """
+        names = set(variables_list[0])
+        for variables in variables_list:
+            if set(variables) != names:
+                return None
+            if not all(isinstance(value, numbers.Real) for value in variables.itervalues()):
+                return None
+
+        arrays = {
+            name: numpy.array([variables[name] for variables in variables_list], dtype=float)
+            for name in names
+        }
+        all_variables, all_functions = add_defaults(arrays, functions, self.case_sensitive)
+        self.parser.check_variables(all_variables, all_functions)
+        if any(all_functions[self._casify(function)] not in VECTORIZED_FUNCTIONS
+               for function in self.parser.functions_used):
+            return None
+
+        try:
+            with numpy.errstate(divide='raise', over='raise', invalid='raise'):
+                result = self._evaluate_array(all_variables, all_functions)
+        except Exception:  # pylint: disable=broad-except
+            return None
+
+        if isinstance(result, numpy.ndarray):
+            if result.shape != (len(variables_list),):
+                return None
+            return result.tolist()
+        # The expression doesn't depend on any of the sample variables.
+        return [result] * len(variables_list)
 
 
 class ParseAugmenter(object):
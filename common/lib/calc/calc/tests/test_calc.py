@@ -559,3 +559,64 @@ class EvaluatorTest(unittest.TestCase):
             calc.evaluator({'r1': 5}, {}, "r1+r2")
         with self.assertRaisesRegexp(calc.UndefinedVariable, 'r1 r3'):
             calc.evaluator(variables, {}, "r1*r3", case_sensitive=True)
+
+
+class CompiledExpressionTest(unittest.TestCase):
+    """
+    Test the cache of parsed expressions, and evaluating an expression for
+    many samples at once.
+    """
+    def samples(self, count=20):
+        """
+        Return `count` dictionaries of values for the variables x and y.
+        """
+        return [{'x': 0.5 + index, 'y': -2.0 + 0.25 * index} for index in range(count)]
+
+    def assert_same_results(self, math_expr, variables_list, functions=None):
+        """
+        Check that `evaluate_samples` gives the same results as calling
+        `evaluator` for each sample.
+        """
+        functions = functions or {}
+        expected = [calc.evaluator(variables, functions, math_expr) for variables in variables_list]
+        results = calc.evaluate_samples(variables_list, functions, math_expr)
+        self.assertEqual(len(results), len(expected))
+        for result, value in zip(results, expected):
+            if numpy.isnan(value):
+                self.assertTrue(numpy.isnan(result))
+            else:
+                self.assertAlmostEqual(result, value)
+
+    def test_compiled_expressions_are_cached(self):
+        compiled = calc.compile_expression('x^2 + sin(y)')
+        self.assertIs(calc.compile_expression('x^2 + sin(y)'), compiled)
+        self.assertIsNot(calc.compile_expression('x^2 + sin(y)', case_sensitive=True), compiled)
+        self.assertEqual(compiled.evaluate({'x': 3.0, 'y': 0.0}, {}), 9.0)
+
+    def test_cache_size_is_bounded(self):
+        for index in range(calc.COMPILED_EXPRESSION_CACHE_SIZE + 10):
+            calc.compile_expression('x + {}'.format(index))
+        self.assertEqual(len(calc.calc._compiled_expressions), calc.COMPILED_EXPRESSION_CACHE_SIZE)  # pylint: disable=protected-access
+
+    def test_evaluate_samples(self):
+        for math_expr in ('x^2 + 3*y', '-x/y', 'x || 2 + y', 'sqrt(x) * sec(y)', '2^x^0.5', 'x*i + pi', '5'):
+            self.assert_same_results(math_expr, self.samples())
+
+    def test_evaluate_samples_fallback(self):
+        """
+        Expressions which can't be evaluated on arrays, or hit floating point
+        errors for some samples, give the same results as one by one.
+        """
+        self.assert_same_results('fact(x + 0.5)', self.samples())
+        self.assert_same_results('f(x)', self.samples(), functions={'f': lambda value: float(value) + 1})
+        # y is 0 for one of the samples
+        self.assert_same_results('x || y', self.samples())
+        with self.assertRaises(ZeroDivisionError):
+            calc.evaluate_samples(self.samples(), {}, '1/(y + 1)')
+
+    def test_evaluate_samples_errors(self):
+        with self.assertRaisesRegexp(calc.UndefinedVariable, 'z'):
+            calc.evaluate_samples(self.samples(), {}, 'x + z')
+        with self.assertRaises(ParseException):
+            calc.evaluate_samples(self.samples(), {}, 'x +')
+        self.assertTrue(all(numpy.isnan(result) for result in calc.evaluate_samples(self.samples(), {}, ' ')))
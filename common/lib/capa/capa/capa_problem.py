@@ -13,11 +13,15 @@ Main module which shows problems (of "capa" type).
 This is used by capa_module.
 """
 
+from collections import OrderedDict
 from copy import deepcopy
 from datetime import datetime
+import hashlib
+from itertools import izip
 import logging
 import os.path
 import re
+import threading
 
 from lxml import etree
 from pytz import UTC
@@ -58,6 +62,87 @@ html_problem_semantics = [
 
 log = logging.getLogger(__name__)
 
+# Number of preprocessed problems kept in memory by each process (see PreprocessedProblem)
+PREPROCESSED_PROBLEM_CACHE_SIZE = 500
+
+
+class PreprocessedProblem(object):
+    """
+    The part of the construction of a LoncapaProblem which only depends on
+    its text and id, so that it is done once for all the instances of the
+    problem (e.g. when rescoring it for every student): the parsed tree,
+    with ids assigned to its responses, inputs and solutions.
+
+    Everything which depends on the seed (running the scripts, building the
+    responders, late transforms) is still done for each instance, on its own
+    copy of the tree.
+    """
+    _cache = OrderedDict()
+    _cache_lock = threading.Lock()
+
+    def __init__(self, problem_text, tree, responses):
+        # The text of the problem, with startouttext and endouttext converted
+        self.problem_text = problem_text
+        # Never modified: each problem gets a copy
+        self.tree = tree
+        # The response elements of the tree, in order, with their input and solution elements
+        self.responses = responses
+
+    @classmethod
+    def get(cls, problem_text, problem_id):
+        """
+        Returns the cached PreprocessedProblem of the problem with
+        `problem_text` and `problem_id`, or None.
+        """
+        key = cls._cache_key(problem_text, problem_id)
+        with cls._cache_lock:
+            preprocessed = cls._cache.pop(key, None)
+            if preprocessed is not None:
+                # Keep the most recently used problems
+                cls._cache[key] = preprocessed
+        return preprocessed
+
+    @classmethod
+    def set(cls, problem_text, problem_id, preprocessed):
+        """
+        Caches `preprocessed` as the PreprocessedProblem of the problem with
+        `problem_text` and `problem_id`.
+        """
+        with cls._cache_lock:
+            cls._cache[cls._cache_key(problem_text, problem_id)] = preprocessed
+            while len(cls._cache) > PREPROCESSED_PROBLEM_CACHE_SIZE:
+                cls._cache.popitem(last=False)
+
+    @classmethod
+    def clear(cls):
+        """
+        Empties the cache of preprocessed problems.
+        """
+        with cls._cache_lock:
+            cls._cache.clear()
+
+    @staticmethod
+    def _cache_key(problem_text, problem_id):
+        """
+        Returns the cache key of the problem with `problem_text` and `problem_id`.
+        """
+        if isinstance(problem_text, unicode):
+            problem_text = problem_text.encode('utf-8')
+        return hashlib.sha1(problem_text).hexdigest(), problem_id
+
+    def copy(self):
+        """
+        Returns a copy of the tree, and of the list of responses referring to
+        the elements of the copy.
+        """
+        tree = deepcopy(self.tree)
+        copies = dict(izip(self.tree.iter(), tree.iter()))
+        responses = [
+            (copies[response], [copies[inputfield] for inputfield in inputfields])
+            for response, inputfields in self.responses
+        ]
+        return tree, responses
+
 #-----------------------------------------------------------------------------
 # main class for this module
 
@@ -154,25 +239,20 @@ class LoncapaProblem(object):
         self.done = state.get('done', False)
         self.input_state = state.get('input_state', {})
 
-        # Convert startouttext and endouttext to proper <text></text>
-        problem_text = re.sub(r"startouttext\s*/", "text", problem_text)
-        problem_text = re.sub(r"endouttext\s*/", "/text", problem_text)
-        self.problem_text = problem_text
-
-        # parse problem XML file into an element tree
-        self.tree = etree.XML(problem_text)
-
-        # handle any <include file="foo"> tags
-        self._process_includes()
+        preprocessed = PreprocessedProblem.get(problem_text, self.problem_id)
+        if preprocessed is None:
+            preprocessed = self._preprocess_problem_text(problem_text)
+        self.problem_text = preprocessed.problem_text
+        self.tree, responses = preprocessed.copy()
 
         # construct script processor context (eg for customresponse problems)
         self.context = self._extract_context(self.tree)
 
-        # Pre-parse the XML tree: modifies it to add ID's and perform some in-place
-        # transformations.  This also creates the dict (self.responders) of Response
-        # instances for each question in the problem. The dict has keys = xml subtree of
+        # Pre-parse the XML tree: performs some in-place transformations.  This
+        # creates the dict (self.responders) of Response instances for each
+        # question in the problem. The dict has keys = xml subtree of
         # Response, values = Response instance
-        self._preprocess_problem(self.tree)
+        self._preprocess_problem(responses)
 
         if not self.student_answers:  # True when student_answers is an empty dict
             self.set_initial_display()
@@ -529,12 +609,36 @@ class LoncapaProblem(object):
 
     # ======= Private Methods Below ========
 
-    def _process_includes(self):
+    def _preprocess_problem_text(self, problem_text):
+        """
+        Parses `problem_text` and assigns the ids of its elements, caching
+        the resulting PreprocessedProblem unless the problem includes files
+        (which may change without the text changing).
+        """
+        original_text = problem_text
+
+        # Convert startouttext and endouttext to proper <text></text>
+        problem_text = re.sub(r"startouttext\s*/", "text", problem_text)
+        problem_text = re.sub(r"endouttext\s*/", "/text", problem_text)
+
+        # parse problem XML file into an element tree
+        tree = etree.XML(problem_text)
+        has_includes = tree.find('.//include') is not None
+
+        # handle any <include file="foo"> tags
+        self._process_includes(tree)
+
+        preprocessed = PreprocessedProblem(problem_text, tree, self._assign_ids(tree))
+        if not has_includes:
+            PreprocessedProblem.set(original_text, self.problem_id, preprocessed)
+        return preprocessed
+
+    def _process_includes(self, tree):
         """
         Handle any <include file="foo"> tags by reading in the specified file and inserting it
-        into our XML tree.  Fail gracefully if debugging.
+        into the XML tree.  Fail gracefully if debugging.
         """
-        includes = self.tree.findall('.//include')
+        includes = tree.findall('.//include')
         for inc in includes:
             filename = inc.get('file')
             if filename is not None:
@@ -777,19 +881,17 @@ class LoncapaProblem(object):
 
         return tree
 
-    def _preprocess_problem(self, tree):  # private
+    def _assign_ids(self, tree):
         """
         Assign IDs to all the responses
         Assign sub-IDs to all entries (textline, schematic, etc.)
-        Annoted correctness and value
         In-place transformation
 
-        Also create capa Response instances for each responsetype and save as self.responders
-
-        Obtain all responder answers and save as self.responder_answers dict (key = response)
+        Returns the list of the response elements, with their input and
+        solution elements.
         """
         response_id = 1
-        self.responders = {}
+        responses = []
         for response in tree.xpath('//' + "|//".join(responsetypes.registry.registered_tags())):
             response_id_str = self.problem_id + "_" + str(response_id)
             # create and save ID for this response
@@ -810,6 +912,30 @@ class LoncapaProblem(object):
                 entry.attrib['id'] = "%s_%i_%i" % (self.problem_id, response_id, answer_id)
                 answer_id = answer_id + 1
 
+            responses.append((response, inputfields))
+
+        # <solution>...</solution> may not be associated with any specific response; give
+        # IDs for those separately
+        # TODO: We should make the namespaces consistent and unique (e.g. %s_problem_%i).
+        solution_id = 1
+        for solution in tree.findall('.//solution'):
+            solution.attrib['id'] = "%s_solution_%i" % (self.problem_id, solution_id)
+            solution_id += 1
+
+        return responses
+
+    def _preprocess_problem(self, responses):  # private
+        """
+        Annoted correctness and value
+        In-place transformation
+
+        Create capa Response instances for each of `responses` (response
+        elements, with their input elements, see _assign_ids) and save as self.responders
+
+        Obtain all responder answers and save as self.responder_answers dict (key = response)
+        """
+        self.responders = {}
+        for response, inputfields in responses:
             # instantiate capa Response
             responsetype_cls = responsetypes.registry.get_class_for_tag(response.tag)
             responder = responsetype_cls(response, inputfields, self.context, self.capa_system)
@@ -826,11 +952,3 @@ class LoncapaProblem(object):
                 log.debug('responder %s failed to properly return get_answers()',
                           self.responders[response])  # FIXME
                 raise
-
-        # <solution>...</solution> may not be associated with any specific response; give
-        # IDs for those separately
-        # TODO: We should make the namespaces consistent and unique (e.g. %s_problem_%i).
-        solution_id = 1
-        for solution in tree.findall('.//solution'):
-            solution.attrib['id'] = "%s_solution_%i" % (self.problem_id, solution_id)
-            solution_id += 1
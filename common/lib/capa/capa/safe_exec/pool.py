@@ -0,0 +1,213 @@
+"""
+A pool of long-lived sandbox processes, which run the jailed code of
+safe_exec without starting a new sandboxed Python (and importing numpy,
+calc, etc.) for each execution.
+
+The processes are started with CodeJail's configuration for "python" (the
+sandboxed Python, run as the sandbox user), and run sandbox_worker.py.  They
+import the modules the jailed code commonly uses once, and run each
+execution in a forked child, with CodeJail's limits, so executions can't see
+each other.  Each process is replaced after a number of executions.
+"""
+import json
+import logging
+import os
+import os.path
+import Queue
+import select
+import shutil
+import subprocess
+import tempfile
+import threading
+
+from codejail import jail_code
+from codejail.safe_exec import SafeExecException, json_safe
+
+log = logging.getLogger(__name__)
+
+# Seconds given to a sandbox process to answer, beyond CodeJail's real time limit
+ANSWER_MARGIN = 5
+
+# We'll need the code from sandbox_worker.py to run in the sandbox, so read it now.
+sandbox_worker_py_file = os.path.join(os.path.dirname(__file__), 'sandbox_worker.py')
+with open(sandbox_worker_py_file) as sandbox_worker_py:
+    SANDBOX_WORKER_CODE = sandbox_worker_py.read()
+
+
+def make_sandbox_directory():
+    """
+    Returns a new temporary directory the sandbox user can read, with a
+    "tmp" subdirectory it can write to, as CodeJail makes them.
+    """
+    directory = tempfile.mkdtemp(prefix="codejail-")
+    os.chmod(directory, 0775)
+    tmptmp = os.path.join(directory, "tmp")
+    os.mkdir(tmptmp)
+    os.chmod(tmptmp, 0777)
+    return directory
+
+
+class SandboxProcess(object):
+    """
+    A sandbox process, running jobs sent by the pool one after the other.
+    """
+    def __init__(self, preimports):
+        self.jobs = 0
+        self.directory = make_sandbox_directory()
+        with open(os.path.join(self.directory, 'sandbox_worker.py'), 'w') as worker_file:
+            worker_file.write(SANDBOX_WORKER_CODE)
+
+        with open(os.devnull, 'w') as devnull:
+            self.process = subprocess.Popen(
+                jail_code.COMMANDS['python']['cmdline_start'] + ['sandbox_worker.py'] + list(preimports),
+                cwd=self.directory,
+                env={},
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=devnull,
+            )
+
+    def run(self, job):
+        """
+        Sends `job` to the process, and returns its result.
+
+        Raises IOError if the process doesn't answer in time.
+        """
+        self.process.stdin.write(json.dumps(job) + '\n')
+        self.process.stdin.flush()
+        timeout = (job['limits'].get('REALTIME') or 60) + ANSWER_MARGIN
+        if not select.select([self.process.stdout], [], [], timeout)[0]:
+            raise IOError("The sandbox process didn't answer in {} seconds".format(timeout))
+        answer = self.process.stdout.readline()
+        if not answer:
+            raise IOError("The sandbox process exited")
+        self.jobs += 1
+        return json.loads(answer)
+
+    def close(self):
+        """
+        Stops the process, and removes its directory.
+        """
+        try:
+            # The process exits at the end of its input
+            self.process.stdin.close()
+            if self.process.poll() is None:
+                self.process.kill()
+        except OSError:
+            pass
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class SandboxPool(object):
+    """
+    Up to `size` sandbox processes, each of which is replaced after
+    `max_jobs` executions.  Each process imports the modules named in
+    `preimports` when it starts.
+    """
+    def __init__(self, size, max_jobs, preimports):
+        self.size = size
+        self.max_jobs = max_jobs
+        self.preimports = preimports
+        self._idle = Queue.Queue()
+        self._started = 0
+        self._lock = threading.Lock()
+
+    def _new_process(self):
+        """
+        Returns a new sandbox process, which has already been counted in the
+        processes started by the pool.
+        """
+        try:
+            return SandboxProcess(self.preimports)
+        except OSError as error:
+            with self._lock:
+                self._started -= 1
+            raise SafeExecException("Couldn't start a sandbox process: {}".format(error))
+
+    def _acquire(self):
+        """
+        Returns an idle sandbox process, starting one if there are less than
+        `size`, and otherwise waiting for one to be released.
+        """
+        try:
+            return self._idle.get_nowait()
+        except Queue.Empty:
+            pass
+        with self._lock:
+            full = self._started >= self.size
+            if not full:
+                self._started += 1
+        if full:
+            return self._idle.get()
+        return self._new_process()
+
+    def _release(self, process, failed=False):
+        """
+        Makes `process` available again, or replaces it if it failed or ran
+        its last job.
+        """
+        if not failed and process.jobs < self.max_jobs:
+            self._idle.put(process)
+            return
+
+        process.close()
+        # Start the replacement right away, so that it has imported its modules when it is needed
+        try:
+            self._idle.put(self._new_process())
+        except SafeExecException:
+            log.exception("Couldn't replace a sandbox process")
+
+    def safe_exec(self, code, globals_dict, python_path=None, extra_files=None, slug=None):
+        """
+        Runs `code` in a sandbox process, as codejail.safe_exec.safe_exec does.
+        """
+        extra_files = extra_files or []
+        extra_names = set(name for name, __ in extra_files)
+        directory = make_sandbox_directory()
+        try:
+            # All the supporting files are copied into the directory of the job.
+            for path in python_path or ():
+                if path in extra_names:
+                    continue
+                destination = os.path.join(directory, os.path.basename(path))
+                if os.path.isdir(path):
+                    shutil.copytree(path, destination, symlinks=True)
+                else:
+                    shutil.copy(path, destination)
+            for name, content in extra_files:
+                with open(os.path.join(directory, name), 'wb') as extra_file:
+                    extra_file.write(content)
+
+            job = {
+                'code': code,
+                'globals': json_safe(globals_dict),
+                'directory': directory,
+                'python_path': [os.path.basename(path) for path in python_path or ()],
+                'limits': dict(jail_code.LIMITS),
+            }
+            process = self._acquire()
+            try:
+                result = process.run(job)
+            except (IOError, ValueError) as error:
+                log.warning("Sandbox process failed running %s: %s", slug, error)
+                self._release(process, failed=True)
+                raise SafeExecException("Couldn't execute jailed code: {}".format(error))
+            self._release(process)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+        if 'error' in result:
+            raise SafeExecException("Couldn't execute jailed code: {}".format(result['error']))
+        globals_dict.update(result['globals'])
+
+    def close(self):
+        """
+        Stops the idle sandbox processes.
+        """
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except Queue.Empty:
+                break
+        with self._lock:
+            self._started = 0
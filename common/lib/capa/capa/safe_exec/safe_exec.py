@@ -1,12 +1,17 @@
 """Capa's specialized use of codejail.safe_exec."""
 
+from codejail.jail_code import is_configured
 from codejail.safe_exec import safe_exec as codejail_safe_exec
 from codejail.safe_exec import not_safe_exec as codejail_not_safe_exec
 from codejail.safe_exec import json_safe, SafeExecException
 from . import lazymod
+from .pool import SandboxPool
 from dogapi import dog_stats_api
 
+from collections import OrderedDict
 import hashlib
+import json
+import threading
 
 # Establish the Python environment for Capa.
 # Capa assumes float-friendly division always.
@@ -46,6 +51,71 @@ for name, modname in ASSUMED_IMPORTS:
 
 LAZY_IMPORTS = "".join(LAZY_IMPORTS)
 
+# The pool of sandbox processes running the jailed code, if any (see configure)
+SANDBOX_POOL = None
+
+# The results of the latest executions, by cache key, as JSON (see configure)
+RESULT_CACHE = OrderedDict()
+RESULT_CACHE_SIZE = 0
+RESULT_CACHE_LOCK = threading.Lock()
+
+
+def configure(pool_size=0, pool_max_jobs=100, result_cache_size=0):
+    """
+    Configures how this process runs the code given to safe_exec.
+
+    With a `pool_size`, the jailed code is run by a pool of up to that many
+    long-lived sandbox processes, each of which has imported the assumed
+    imports, and is replaced after `pool_max_jobs` executions.  Without,
+    each execution starts a new sandbox.
+
+    `result_cache_size` is the number of results kept in memory, in front
+    of the cache given to safe_exec.
+    """
+    global SANDBOX_POOL, RESULT_CACHE_SIZE  # pylint: disable=global-statement
+    if SANDBOX_POOL is not None:
+        SANDBOX_POOL.close()
+    SANDBOX_POOL = None
+    if pool_size:
+        SANDBOX_POOL = SandboxPool(pool_size, pool_max_jobs, [modname for __, modname in ASSUMED_IMPORTS])
+
+    with RESULT_CACHE_LOCK:
+        RESULT_CACHE_SIZE = result_cache_size
+        RESULT_CACHE.clear()
+
+
+def get_cached_result(cache, key):
+    """
+    Returns the result of an execution cached under `key`, from memory or
+    from `cache`, or None.
+    """
+    with RESULT_CACHE_LOCK:
+        cached = RESULT_CACHE.pop(key, None)
+        if cached is not None:
+            # Keep the most recently used results
+            RESULT_CACHE[key] = cached
+    if cached is not None:
+        # Each caller gets its own copy of the globals, as they may change them
+        return json.loads(cached)
+
+    cached = cache.get(key)
+    if cached is not None:
+        remember_result(key, cached)
+    return cached
+
+
+def remember_result(key, result):
+    """
+    Keeps the `result` of an execution, cached under `key`, in memory.
+    """
+    if not RESULT_CACHE_SIZE:
+        return
+    encoded = json.dumps(result)
+    with RESULT_CACHE_LOCK:
+        RESULT_CACHE[key] = encoded
+        while len(RESULT_CACHE) > RESULT_CACHE_SIZE:
+            RESULT_CACHE.popitem(last=False)
+
 
 def update_hash(hasher, obj):
     """
@@ -114,7 +184,7 @@ def safe_exec(
         md5er.update(repr(code))
         update_hash(md5er, safe_globals)
         key = "safe_exec.%r.%s" % (random_seed, md5er.hexdigest())
-        cached = cache.get(key)
+        cached = get_cached_result(cache, key)
         if cached is not None:
             # We have a cached result.  The result is a pair: the exception
             # message, if any, else None; and the resulting globals dictionary.
@@ -130,6 +200,8 @@ def safe_exec(
     # Decide which code executor to use.
     if unsafely:
         exec_fn = codejail_not_safe_exec
+    elif SANDBOX_POOL is not None and is_configured("python"):
+        exec_fn = SANDBOX_POOL.safe_exec
     else:
         exec_fn = codejail_safe_exec
 
@@ -149,6 +221,7 @@ def safe_exec(
     if cache:
         cleaned_results = json_safe(globals_dict)
         cache.set(key, (emsg, cleaned_results))
+        remember_result(key, (emsg, cleaned_results))
 
     # If an exception happened, raise it now.
     if emsg:
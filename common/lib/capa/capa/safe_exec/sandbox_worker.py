@@ -0,0 +1,148 @@
+"""
+A long-lived sandbox process, which runs jailed code sent by capa.safe_exec.pool.
+
+This file is copied into the sandbox and run by the sandboxed Python, so it
+must only use the standard library.  The names of the modules to import
+ahead of time (e.g. numpy) are its arguments.
+
+Each job is a line of JSON on stdin: {"code", "globals", "directory",
+"python_path", "limits"}.  It is run in a forked child, so that nothing it
+does outlives it, and the result is written as a line of JSON on stdout:
+{"globals": {...}} with the JSON-safe globals after the execution, or
+{"error": "..."}.
+"""
+import json
+import os
+import resource
+import select
+import signal
+import sys
+import time
+import traceback
+
+
+def jsonable_globals(g_dict):
+    """
+    Returns the globals of `g_dict` which can be sent back as JSON, as codejail does.
+    """
+    ok_types = (type(None), int, long, float, str, unicode, list, tuple, dict)
+    bad_keys = ("__builtins__",)
+
+    def jsonable(value):
+        """Returns whether `value` can be sent as JSON."""
+        if not isinstance(value, ok_types):
+            return False
+        try:
+            json.dumps(value)
+        except Exception:  # pylint: disable=broad-except
+            return False
+        return True
+
+    return dict((key, value) for key, value in g_dict.iteritems() if jsonable(value) and key not in bad_keys)
+
+
+def current_vmem():
+    """
+    Returns the size in bytes of the virtual memory of this process.
+    """
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith('VmSize:'):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def set_limits(limits):
+    """
+    Applies the CPU and memory `limits` (codejail's) to this process.  The
+    memory limit applies to what the jailed code allocates, beyond the
+    modules imported ahead of time.
+    """
+    if limits.get('CPU'):
+        resource.setrlimit(resource.RLIMIT_CPU, (limits['CPU'], limits['CPU']))
+    if limits.get('VMEM'):
+        vmem = current_vmem() + limits['VMEM']
+        resource.setrlimit(resource.RLIMIT_AS, (vmem, vmem))
+    # No subprocesses, and no files bigger than the ones given
+    resource.setrlimit(resource.RLIMIT_NPROC, (0, 0))
+    resource.setrlimit(resource.RLIMIT_FSIZE, (0, 0))
+
+
+def execute(job):
+    """
+    Runs `job` in this process, and returns the JSON of its result.
+    """
+    try:
+        os.chdir(job['directory'])
+        for path in job['python_path']:
+            sys.path.append(path)
+        set_limits(job['limits'])
+        g_dict = job['globals']
+        exec job['code'] in g_dict  # pylint: disable=exec-used
+        return json.dumps({'globals': jsonable_globals(g_dict)})
+    except BaseException:  # pylint: disable=broad-except
+        return json.dumps({'error': traceback.format_exc()})
+
+
+def run_job(job, protocol_fds):
+    """
+    Runs `job` in a forked child, and returns its result.
+    """
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        for protocol_fd in protocol_fds:
+            os.close(protocol_fd)
+        result = execute(job)
+        while result:
+            result = result[os.write(write_fd, result):]
+        os._exit(0)  # pylint: disable=protected-access
+
+    os.close(write_fd)
+    realtime = job['limits'].get('REALTIME')
+    deadline = time.time() + realtime if realtime else None
+    chunks = []
+    while True:
+        timeout = max(deadline - time.time(), 0) if deadline else None
+        if not select.select([read_fd], [], [], timeout)[0]:
+            os.kill(pid, signal.SIGKILL)
+            break
+        chunk = os.read(read_fd, 65536)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    os.close(read_fd)
+    __, status = os.waitpid(pid, 0)
+
+    if chunks and status == 0:
+        return ''.join(chunks)
+    if os.WIFSIGNALED(status):
+        return json.dumps({'error': 'Killed by signal %d' % os.WTERMSIG(status)})
+    return json.dumps({'error': 'Exited with status %d' % os.WEXITSTATUS(status)})
+
+
+def main():
+    """
+    Imports the modules named in the arguments, and runs the jobs read from stdin.
+    """
+    # Only the jobs use stdin and stdout, never the imported modules or the jailed code
+    protocol_in = os.fdopen(os.dup(0), 'r')
+    protocol_out = os.fdopen(os.dup(1), 'w')
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+
+    for module_name in sys.argv[1:]:
+        try:
+            __import__(module_name)
+        except Exception:  # pylint: disable=broad-except
+            pass
+
+    for line in iter(protocol_in.readline, ''):
+        protocol_out.write(run_job(json.loads(line), [protocol_in.fileno(), protocol_out.fileno()]) + '\n')
+        protocol_out.flush()
+
+
+if __name__ == '__main__':
+    main()
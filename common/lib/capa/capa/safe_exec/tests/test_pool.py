@@ -0,0 +1,74 @@
+"""Test pool.py"""
+
+import os.path
+import sys
+import unittest
+
+from codejail import jail_code
+from codejail.safe_exec import SafeExecException
+from mock import patch
+
+from capa.safe_exec.pool import SandboxPool
+
+
+class TestSandboxPool(unittest.TestCase):
+    """
+    Tests of SandboxPool, with sandbox processes running the current Python.
+    """
+    def setUp(self):
+        super(TestSandboxPool, self).setUp()
+        for patcher in (
+                patch.dict(jail_code.COMMANDS, {'python': {'cmdline_start': [sys.executable, '-E', '-B'], 'user': None}}),
+                patch.dict(jail_code.LIMITS, {'CPU': 1, 'REALTIME': 2, 'VMEM': 0}),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.pool = SandboxPool(1, 3, ['math'])
+        self.addCleanup(self.pool.close)
+
+    def test_set_values(self):
+        g = {'b': 2}
+        self.pool.safe_exec("import math\na = int(math.pi) + b", g)
+        self.assertEqual(g, {'a': 5, 'b': 2})
+
+    def test_processes_reused_and_replaced(self):
+        pids = []
+        for __ in range(4):
+            g = {}
+            self.pool.safe_exec("import os\npid = os.getppid()", g)
+            pids.append(g['pid'])
+        # The process ran 3 jobs before it was replaced
+        self.assertEqual(len(set(pids[:3])), 1)
+        self.assertNotEqual(pids[3], pids[0])
+
+    def test_executions_isolated(self):
+        self.pool.safe_exec("import sys\nsys.leaked = 1", {})
+        g = {}
+        self.pool.safe_exec("import sys\nleaked = hasattr(sys, 'leaked')", g)
+        self.assertFalse(g['leaked'])
+
+    def test_raising_exceptions(self):
+        with self.assertRaises(SafeExecException) as cm:
+            self.pool.safe_exec("1/0", {})
+        self.assertIn("ZeroDivisionError", cm.exception.message)
+
+    def test_limits(self):
+        with self.assertRaises(SafeExecException) as cm:
+            self.pool.safe_exec("while True: pass", {})
+        self.assertIn("Killed by signal", cm.exception.message)
+        # The process is still usable
+        g = {}
+        self.pool.safe_exec("a = 1", g)
+        self.assertEqual(g['a'], 1)
+
+    def test_python_path(self):
+        pylib = os.path.dirname(__file__) + "/test_files/pylib"
+        g = {}
+        self.pool.safe_exec(
+            "import constant\na = constant.THE_CONST\nb = open('extra.txt').read()",
+            g,
+            python_path=[pylib],
+            extra_files=[("extra.txt", "extra")],
+        )
+        self.assertEqual(g['a'], 23)
+        self.assertEqual(g['b'], "extra")
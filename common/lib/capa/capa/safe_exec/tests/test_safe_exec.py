@@ -9,7 +9,7 @@ import unittest
 
 from nose.plugins.skip import SkipTest
 
-from capa.safe_exec import safe_exec, update_hash
+from capa.safe_exec import configure, safe_exec, update_hash
 from codejail.safe_exec import SafeExecException
 from codejail.jail_code import is_configured
 
@@ -166,6 +166,18 @@ class TestSafeExecCaching(unittest.TestCase):
         safe_exec(code, g, cache=DictCache(cache))
         self.assertEqual(g['a'], 17)
 
+    def test_results_kept_in_memory(self):
+        configure(result_cache_size=10)
+        self.addCleanup(configure)
+        cache = {}
+        safe_exec("a = int(math.pi)", {}, cache=DictCache(cache))
+
+        # The result is read from memory, not from the cache
+        cache[cache.keys()[0]] = (None, {'a': 17})
+        g = {}
+        safe_exec("a = int(math.pi)", g, cache=DictCache(cache))
+        self.assertEqual(g['a'], 3)
+
     def test_unicode_submission(self):
         # Check that using non-ASCII unicode does not raise an encoding error.
         # Try several non-ASCII unicode characters.
@@ -0,0 +1,63 @@
+"""Tests the cache of the preprocessing shared by the instances of a capa problem."""
+
+import textwrap
+import unittest
+
+from mock import patch
+
+from . import new_loncapa_problem
+from capa.capa_problem import LoncapaProblem, PreprocessedProblem
+
+
+class PreprocessedProblemTest(unittest.TestCase):
+    """Tests of PreprocessedProblem."""
+
+    xml_str = textwrap.dedent("""
+        <problem>
+        <script type="loncapa/python">
+        number = random.randint(0, 1000)
+        </script>
+        <multiplechoiceresponse>
+          <choicegroup type="MultipleChoice" shuffle="true">
+            <choice correct="false">Apple</choice>
+            <choice correct="false">Banana</choice>
+            <choice correct="true">$number</choice>
+          </choicegroup>
+        </multiplechoiceresponse>
+        <solution><p>Solution</p></solution>
+        </problem>
+    """)
+
+    def setUp(self):
+        super(PreprocessedProblemTest, self).setUp()
+        PreprocessedProblem.clear()
+        self.addCleanup(PreprocessedProblem.clear)
+
+    def test_parsed_once(self):
+        preprocess = LoncapaProblem._preprocess_problem_text  # pylint: disable=protected-access
+        with patch.object(LoncapaProblem, '_preprocess_problem_text', autospec=True, side_effect=preprocess) as mock:
+            problems = [new_loncapa_problem(self.xml_str, seed=seed) for seed in (0, 1, 0)]
+        self.assertEqual(mock.call_count, 1)
+
+        # Each problem has its own tree and responders, and runs its script with its seed
+        self.assertIsNot(problems[0].tree, problems[2].tree)
+        self.assertNotEqual(problems[0].context['number'], problems[1].context['number'])
+        self.assertEqual(problems[0].get_html(), problems[2].get_html())
+        for problem in problems:
+            response = problem.responders.keys()[0]
+            self.assertIs(response.getroottree(), problem.tree.getroottree())
+            self.assertEqual(response.get('id'), '1_1')
+            self.assertEqual(problem.tree.find('.//solution').get('id'), '1_solution_1')
+
+    def test_same_html_as_uncached(self):
+        cached_html = new_loncapa_problem(self.xml_str, seed=1).get_html()
+        self.assertEqual(new_loncapa_problem(self.xml_str, seed=1).get_html(), cached_html)
+        PreprocessedProblem.clear()
+        self.assertEqual(new_loncapa_problem(self.xml_str, seed=1).get_html(), cached_html)
+
+    def test_cache_size(self):
+        with patch('capa.capa_problem.PREPROCESSED_PROBLEM_CACHE_SIZE', 1):
+            new_loncapa_problem(self.xml_str)
+            new_loncapa_problem(self.xml_str.replace('Apple', 'Cherry'))
+        self.assertIsNone(PreprocessedProblem.get(self.xml_str, '1'))
+        self.assertIsNotNone(PreprocessedProblem.get(self.xml_str.replace('Apple', 'Cherry'), '1'))
@@ -157,6 +157,12 @@ class StaticContent(object):
     def stream_data(self):
         yield self._data
 
+    def stream_data_in_range(self, first_byte, last_byte):
+        """
+        Stream the data between first_byte and last_byte (included)
+        """
+        yield self._data[first_byte:last_byte + 1]
+
     @staticmethod
     def serialize_asset_key_with_slash(asset_key):
         """
@@ -176,10 +182,11 @@ class StaticContentStream(StaticContent):
                                                   thumbnail_location=thumbnail_location, import_path=import_path,
                                                   length=length, locked=locked)
         self._stream = stream
+        self.chunk_size = STREAM_DATA_CHUNK_SIZE
 
     def stream_data(self):
         while True:
-            chunk = self._stream.read(STREAM_DATA_CHUNK_SIZE)
+            chunk = self._stream.read(self.chunk_size)
             if len(chunk) == 0:
                 break
             yield chunk
@@ -191,12 +198,12 @@ class StaticContentStream(StaticContent):
         self._stream.seek(first_byte)
         position = first_byte
         while True:
-            if last_byte < position + STREAM_DATA_CHUNK_SIZE - 1:
+            if last_byte < position + self.chunk_size - 1:
                 chunk = self._stream.read(last_byte - position + 1)
                 yield chunk
                 break
-            chunk = self._stream.read(STREAM_DATA_CHUNK_SIZE)
-            position += STREAM_DATA_CHUNK_SIZE
+            chunk = self._stream.read(self.chunk_size)
+            position += self.chunk_size
             yield chunk
 
     def close(self):
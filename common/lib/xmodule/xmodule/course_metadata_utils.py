@@ -0,0 +1,157 @@
+"""
+Functions computing the course metadata which is derived from the fields of
+a course (start and end date texts, "newness" and sorting), shared by
+CourseDescriptor and the course overviews stored in the database, which
+don't have a runtime.
+"""
+from datetime import datetime
+from math import exp
+
+import dateutil.parser
+from django.utils.timezone import UTC
+
+from .fields import Date
+
+DEFAULT_START_DATE = datetime(2030, 1, 1, tzinfo=UTC())
+
+
+def has_course_started(start):
+    """
+    Returns whether a course with the given start date has started.
+    """
+    return datetime.now(UTC()) > start
+
+
+def has_course_ended(end):
+    """
+    Returns True if the current time is after the given course end date.
+    Returns False if there is no end date.
+    """
+    if end is None:
+        return False
+    return datetime.now(UTC()) > end
+
+
+def may_certify_for_course(certificates_display_behavior, certificates_show_before_end, has_ended):
+    """
+    Returns whether it is acceptable to show the student a certificate download link for a course.
+    """
+    show_early = certificates_display_behavior in ('early_with_info', 'early_no_info') or certificates_show_before_end
+    return show_early or has_ended
+
+
+def course_start_date_is_default(start, advertised_start):
+    """
+    Returns whether the start date of a course is still the default one, i.e.
+    start has not been modified, and advertised_start has not been set.
+    """
+    return advertised_start is None and start == DEFAULT_START_DATE
+
+
+def course_sorting_dates(start, advertised_start, announcement):
+    """
+    Returns the announcement, (advertised) start and current dates of a
+    course, which are used to compute how "new" it is.
+    """
+    try:
+        start = dateutil.parser.parse(advertised_start)
+        if start.tzinfo is None:
+            start = start.replace(tzinfo=UTC())
+    except (ValueError, AttributeError):
+        pass
+
+    return announcement, start, datetime.now(UTC())
+
+
+def course_is_newish(is_new, start, advertised_start, announcement):
+    """
+    Returns whether a course has been flagged as new. If there is no flag,
+    returns a heuristic value considering the announcement and start dates.
+    """
+    if is_new is None:
+        # Use a heuristic if the course has not been flagged
+        announcement, start, now = course_sorting_dates(start, advertised_start, announcement)
+        if announcement and (now - announcement).days < 30:
+            # The course has been announced for less that month
+            return True
+        elif (now - start).days < 1:
+            # The course has not started yet
+            return True
+        else:
+            return False
+    elif isinstance(is_new, basestring):
+        return is_new.lower() in ['true', 'yes', 'y']
+    else:
+        return bool(is_new)
+
+
+def course_sorting_score(start, advertised_start, announcement):
+    """
+    Returns a number that can be used to sort courses according to how "new"
+    they are. The "newness" score is computed using a heuristic that takes
+    into account the announcement and (advertised) start dates of the course
+    if available.
+
+    The lower the number the "newer" the course.
+    """
+    # Make courses that have an announcement date have a lower
+    # score than courses than don't, older courses should have a
+    # higher score.
+    announcement, start, now = course_sorting_dates(start, advertised_start, announcement)
+    scale = 300.0  # about a year
+    if announcement:
+        days = (now - announcement).days
+        score = -exp(-days / scale)
+    else:
+        days = (now - start).days
+        score = exp(days / scale)
+    return score
+
+
+def _add_timezone_string(date_time):
+    """
+    Adds 'UTC' string to the end of start/end date and time texts.
+    """
+    return date_time + u" UTC"
+
+
+def course_start_datetime_text(start, advertised_start, format_string, ugettext, strftime):
+    """
+    Returns the text of the start date and time of a course in UTC. Prefers
+    advertised_start, then falls back to start.
+
+    `ugettext` and `strftime` translate the texts and format the dates.
+    """
+    if isinstance(advertised_start, basestring):
+        try:
+            result = Date().from_json(advertised_start)
+            if result is None:
+                return advertised_start.title()
+            result = strftime(result, format_string)
+            if format_string == "DATE_TIME":
+                result = _add_timezone_string(result)
+            return result
+        except ValueError:
+            return advertised_start.title()
+    elif course_start_date_is_default(start, advertised_start):
+        # Translators: TBD stands for 'To Be Determined' and is used when a course
+        # does not yet have an announced start date.
+        return ugettext('TBD')
+    else:
+        when = advertised_start or start
+
+        if format_string == "DATE_TIME":
+            return _add_timezone_string(strftime(when, format_string))
+
+        return strftime(when, format_string)
+
+
+def course_end_datetime_text(end, format_string, strftime):
+    """
+    Returns the end date or date and time of a course, formatted as a string,
+    or an empty string if the course has no end date.
+    """
+    if end is None:
+        return ''
+    date_time = strftime(end, format_string)
+    return date_time if format_string == "SHORT_DATE" else _add_timezone_string(date_time)
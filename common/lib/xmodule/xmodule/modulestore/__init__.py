@@ -296,6 +296,12 @@ class EditInfo(object):
     """
     Encapsulates the editing info of a block.
     """
+    # A structure holds one EditInfo per block, so keep them small.
+    __slots__ = (
+        'previous_version', 'update_version', 'source_version', 'edited_on', 'edited_by',
+        'original_usage', 'original_usage_version', '_subtree_edited_on', '_subtree_edited_by',
+    )
+
     def __init__(self, **kwargs):
         self.from_storable(kwargs)
 
@@ -359,12 +365,37 @@ class BlockData(object):
     Wrap the block data in an object instead of using a straight Python dictionary.
     Allows the storing of meta-information about a structure that doesn't persist along with
     the structure itself.
+
+    A structure holds one BlockData per block, so they are kept small, and
+    their EditInfo is only built the first time it's used: loading a large
+    structure doesn't pay for the edit info of blocks that are never looked at.
     """
+    __slots__ = ('fields', 'block_type', 'definition', 'defaults', 'definition_loaded', '_edit_info')
+
+    # The attributes get_items qualifiers can match (see ModuleStoreRead._block_matches)
+    MATCHED_ATTRIBUTES = frozenset(('fields', 'block_type', 'definition', 'defaults', 'definition_loaded', 'edit_info'))
+
     def __init__(self, **kwargs):
         # Has the definition been loaded?
         self.definition_loaded = False
         self.from_storable(kwargs)
 
+    @property
+    def edit_info(self):
+        """
+        EditInfo object containing all versioning/editing data.
+        """
+        if not isinstance(self._edit_info, EditInfo):
+            self._edit_info = EditInfo(**self._edit_info)
+        return self._edit_info
+
+    @edit_info.setter
+    def edit_info(self, edit_info):
+        """
+        Replace this block's EditInfo.
+        """
+        self._edit_info = edit_info
+
     def to_storable(self):
         """
         Serialize to a Mongo-storable format.
@@ -395,8 +426,9 @@ class BlockData(object):
         # blocks are copied from a library to a course)
         self.defaults = block_data.get('defaults', {})
 
-        # EditInfo object containing all versioning/editing data.
-        self.edit_info = EditInfo(**block_data.get('edit_info', {}))
+        # Storable form of the EditInfo object containing all versioning/editing
+        # data; it's converted when first accessed (see `edit_info`).
+        self._edit_info = block_data.get('edit_info', {})
 
     def __str__(self):
         return ("BlockData(fields={0.fields}, "
@@ -771,8 +803,11 @@ class ModuleStoreRead(ModuleStoreAssetBase):
             # If an XBlock is passed-in, just match its fields.
             xblock, fields = (block, block.fields)
         elif isinstance(block, BlockData):
-            # BlockData is an object - compare its attributes in dict form.
-            xblock, fields = (None, block.__dict__)
+            # BlockData is an object - compare its attributes in dict form (only
+            # the qualified ones, so that the edit info isn't built needlessly).
+            xblock, fields = (None, {
+                key: getattr(block, key) for key in qualifiers if key in BlockData.MATCHED_ATTRIBUTES
+            })
         else:
             xblock, fields = (None, block)
 
@@ -845,6 +880,14 @@ class ModuleStoreRead(ModuleStoreAssetBase):
         '''
         pass
 
+    def get_course_keys(self, **kwargs):
+        '''
+        Returns a list of the keys of the courses in this modulestore, accepting
+        the same 'org' filter as get_courses. Modulestores which can list their
+        courses without loading them should override this.
+        '''
+        return [course.location.course_key for course in self.get_courses(**kwargs)]
+
     @abstractmethod
     def get_course(self, course_id, depth=0, **kwargs):
         '''
@@ -1326,6 +1369,14 @@ class ModuleStoreWriteBase(ModuleStoreReadBase, ModuleStoreWrite):
             else:
                 signal_handler.send("course_published", course_key=course_key)
 
+    def _emit_course_deleted_signal(self, course_key):
+        """
+        Helper method used to emit the course_deleted signal.
+        """
+        signal_handler = getattr(self, 'signal_handler', None)
+        if signal_handler:
+            signal_handler.send("course_deleted", course_key=course_key)
+
 
 def only_xmodules(identifier, entry_points):
     """Only use entry_points that are supplied by the xmodule package"""
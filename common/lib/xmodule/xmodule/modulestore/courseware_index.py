@@ -1,10 +1,11 @@
 """ Code to allow module store to interface with courseware index """
 from __future__ import absolute_import
 
+import hashlib
+import json
 import logging
 
 from django.utils.translation import ugettext as _
-from opaque_keys.edx.locator import CourseLocator
 from search.search_engine_base import SearchEngine
 from eventtracking import tracker
 
@@ -16,6 +17,17 @@ from .exceptions import ItemNotFoundError
 INDEX_NAME = "courseware_index"
 DOCUMENT_TYPE = "courseware_content"
 
+# The index holding the versions of the blocks of each course that were indexed, kept out of
+# INDEX_NAME so that courseware searches never return them
+VERSIONS_INDEX_NAME = "courseware_index_versions"
+VERSIONS_DOCUMENT_TYPE = "courseware_versions"
+
+# Number of indexed documents fetched by each search request
+SEARCH_PAGE_SIZE = 100
+
+# The field of each document holding the hash of the rest of its content
+CONTENT_HASH_FIELD = "content_hash"
+
 log = logging.getLogger('edx.modulestore')
 
 
@@ -27,51 +39,196 @@ class SearchIndexingError(Exception):
         self.error_list = error_list
 
 
+def _document_hash(document):
+    """ Return a hash of the content of the search `document` """
+    return hashlib.md5(json.dumps(document, sort_keys=True, default=unicode)).hexdigest()
+
+
+def _block_version(item, start_date):
+    """
+    Return a string which changes whenever the search document of `item` may
+    change, or None if the modulestore doesn't know when `item` was edited
+    """
+    edited_on = getattr(item, "edited_on", None)
+    if edited_on is None:
+        return None
+    return u"{}|{}".format(edited_on.isoformat(), start_date.isoformat() if start_date else None)
+
+
+def _indexed_document_hashes(searcher, course_key):
+    """
+    Return the content hashes of the documents of the course in the search
+    index, by usage id
+    """
+    hashes = {}
+    from_ = 0
+    while True:
+        response = searcher.search(
+            field_dictionary={"course": unicode(course_key)},
+            doc_type=DOCUMENT_TYPE,
+            size=SEARCH_PAGE_SIZE,
+            from_=from_,
+        )
+        for result in response["results"]:
+            hashes[result["data"]["id"]] = result["data"].get(CONTENT_HASH_FIELD)
+        from_ += SEARCH_PAGE_SIZE
+        if not response["results"] or from_ >= response["total"]:
+            return hashes
+
+
+def _indexed_versions(course_key):
+    """
+    Return the [block version, content hash] of the documents of the course
+    which were indexed, by usage id, or None if they were not recorded
+    """
+    versions_searcher = SearchEngine.get_search_engine(VERSIONS_INDEX_NAME)
+    response = versions_searcher.search(
+        field_dictionary={"course": unicode(course_key)},
+        doc_type=VERSIONS_DOCUMENT_TYPE,
+        size=1,
+    )
+    if not response["results"]:
+        return None
+    return json.loads(response["results"][0]["data"]["versions"])
+
+
+def _record_indexed_versions(course_key, versions):
+    """
+    Record the [block version, content hash] of the documents of the course
+    which are indexed, by usage id
+    """
+    versions_searcher = SearchEngine.get_search_engine(VERSIONS_INDEX_NAME)
+    versions_searcher.index(VERSIONS_DOCUMENT_TYPE, {
+        "id": unicode(course_key),
+        "course": unicode(course_key),
+        "versions": json.dumps(versions),
+    })
+
+
+def _index_documents(searcher, documents, error_list):
+    """
+    Submit `documents` to the search engine, one request per document, adding
+    the ones which could not be indexed to `error_list`. Return the usage ids
+    of these documents.
+    """
+    failed_ids = set()
+    for document in documents:
+        try:
+            searcher.index(DOCUMENT_TYPE, document)
+        except Exception as err:  # pylint: disable=broad-except
+            log.warning('Could not index item: %s - %s', document["id"], unicode(err))
+            error_list.append(_('Could not index item: {}').format(document["id"]))
+            failed_ids.add(document["id"])
+    return failed_ids
+
+
+def _remove_documents(searcher, usage_ids):
+    """
+    Remove the documents with `usage_ids` from the search index, and return
+    the usage ids of the documents which could not be removed.
+    """
+    failed_ids = set()
+    for usage_id in usage_ids:
+        try:
+            searcher.remove(DOCUMENT_TYPE, usage_id)
+        except Exception as err:  # pylint: disable=broad-except
+            # Documents which are already gone don't need removing again
+            if getattr(err, "status_code", None) != 404:
+                log.warning('Could not remove item from index: %s - %s', usage_id, unicode(err))
+                failed_ids.add(usage_id)
+    return failed_ids
+
+
 class CoursewareSearchIndexer(object):
     """
     Class to perform indexing for courseware search from different modulestores
+
+    Indexing is incremental: the version (edited_on) and content hash of every
+    document indexed is recorded per course, so that only the documents of the
+    blocks edited since the course was last indexed are built, only the ones
+    whose content changed are submitted to the search engine, and the documents
+    of the blocks which were removed from the course are deleted. When nothing
+    is recorded for a course, its documents are looked up in the index instead.
     """
 
-    @staticmethod
-    def add_to_search_index(modulestore, location, delete=False, raise_on_error=False):
+    @classmethod
+    def index_course(cls, modulestore, course_key, incremental=True, raise_on_error=False):
         """
-        Add to courseware search index from given location and its children
+        Update the courseware search index with the published content of the course,
+        and return the number of documents indexed.
+
+        If `incremental` is False, all the documents of the course are built and
+        indexed again, not just the ones which changed.
         """
         error_list = []
         indexed_count = 0
-        # TODO - inline for now, need to move this out to a celery task
         searcher = SearchEngine.get_search_engine(INDEX_NAME)
         if not searcher:
-            return
+            return indexed_count
 
-        if isinstance(location, CourseLocator):
-            course_key = location
+        try:
+            indexed_versions = _indexed_versions(course_key) if incremental else None
+            if indexed_versions is None:
+                indexed_versions = dict(
+                    (usage_id, [None, content_hash])
+                    for usage_id, content_hash in _indexed_document_hashes(searcher, course_key).iteritems()
+                )
+            versions, changed = cls._course_documents(
+                modulestore, course_key, indexed_versions, incremental, error_list
+            )
+        except Exception as err:  # pylint: disable=broad-except
+            # broad exception so that index operation does not prevent the rest of the application from working
+            log.exception(
+                "Indexing error encountered, courseware index may be out of date %s - %s",
+                course_key,
+                unicode(err)
+            )
+            error_list.append(_('General indexing error occurred'))
         else:
-            course_key = location.course_key
+            removed = [usage_id for usage_id in indexed_versions if usage_id not in versions]
 
+            # The documents which could not be indexed or removed are retried the next time
+            for usage_id in _index_documents(searcher, changed, error_list):
+                versions[usage_id] = [None, None]
+            for usage_id in _remove_documents(searcher, removed):
+                versions[usage_id] = [None, None]
+            try:
+                _record_indexed_versions(course_key, versions)
+            except Exception as err:  # pylint: disable=broad-except
+                log.warning('Could not record the indexed versions of course %s - %s', course_key, unicode(err))
+
+            indexed_count = len(changed)
+            log.info(
+                "Indexed %d of %d documents and removed %d documents of course %s",
+                indexed_count, len(versions), len(removed), course_key
+            )
+
+        if raise_on_error and error_list:
+            raise SearchIndexingError(_('Error(s) present during indexing'), error_list)
+
+        return indexed_count
+
+    @staticmethod
+    def _course_documents(modulestore, course_key, indexed_versions, incremental, error_list):
+        """
+        Return the [block version, content hash] of the search documents of the
+        published blocks of the course by usage id, and the list of the documents
+        to index.
+
+        If `incremental` is True, the documents of the blocks whose version is the
+        one in `indexed_versions` aren't built, and only the documents whose hash
+        differs from the one in `indexed_versions` are returned. The blocks whose
+        documents can't be built are added to `error_list`, and keep the content
+        hash of `indexed_versions`.
+        """
+        versions = {}
+        changed = []
         location_info = {
             "course": unicode(course_key),
         }
 
-        def _fetch_item(item_location):
-            """ Fetch the item from the modulestore location, log if not found, but continue """
-            try:
-                if isinstance(item_location, CourseLocator):
-                    item = modulestore.get_course(item_location)
-                else:
-                    item = modulestore.get_item(item_location, revision=ModuleStoreEnum.RevisionOption.published_only)
-            except ItemNotFoundError:
-                log.warning('Cannot find: %s', item_location)
-                return None
-
-            return item
-
-        def index_item_location(item_location, current_start_date):
-            """ add this item to the search index """
-            item = _fetch_item(item_location)
-            if not item:
-                return
-
+        def index_item(item, current_start_date):
+            """ add the document of this item and of its children """
             is_indexable = hasattr(item, "index_dictionary")
             # if it's not indexable and it does not have children, then ignore
             if not is_indexable and not item.has_children:
@@ -82,64 +239,57 @@ class CoursewareSearchIndexer(object):
                 current_start_date = item.start
 
             if item.has_children:
-                for child_loc in item.children:
-                    index_item_location(child_loc, current_start_date)
+                for child in item.get_children():
+                    index_item(child, current_start_date)
 
-            item_index = {}
-            item_index_dictionary = item.index_dictionary() if is_indexable else None
+            if not is_indexable:
+                return
+
+            usage_id = unicode(item.scope_ids.usage_id)
+            version = _block_version(item, current_start_date)
+            indexed_version, indexed_hash = indexed_versions.get(usage_id, [None, None])
+            if incremental and version is not None and version == indexed_version and indexed_hash is not None:
+                versions[usage_id] = [version, indexed_hash]
+                return
 
-            # if it has something to add to the index, then add it
-            if item_index_dictionary:
-                try:
+            item_index = {}
+            try:
+                item_index_dictionary = item.index_dictionary()
+                # if it has something to add to the index, then add it
+                if item_index_dictionary:
                     item_index.update(location_info)
                     item_index.update(item_index_dictionary)
-                    item_index['id'] = unicode(item.scope_ids.usage_id)
+                    item_index['id'] = usage_id
                     if current_start_date:
                         item_index['start_date'] = current_start_date
-
-                    searcher.index(DOCUMENT_TYPE, item_index)
-                except Exception as err:  # pylint: disable=broad-except
-                    # broad exception so that index operation does not fail on one item of many
-                    log.warning('Could not index item: %s - %s', item_location, unicode(err))
-                    error_list.append(_('Could not index item: {}').format(item_location))
-
-        def remove_index_item_location(item_location):
-            """ remove this item from the search index """
-            item = _fetch_item(item_location)
-            if item:
-                if item.has_children:
-                    for child_loc in item.children:
-                        remove_index_item_location(child_loc)
-
-                searcher.remove(DOCUMENT_TYPE, unicode(item.scope_ids.usage_id))
-
-        try:
-            if delete:
-                remove_index_item_location(location)
-            else:
-                index_item_location(location, None)
-            indexed_count += 1
-        except Exception as err:  # pylint: disable=broad-except
-            # broad exception so that index operation does not prevent the rest of the application from working
-            log.exception(
-                "Indexing error encountered, courseware index may be out of date %s - %s",
-                course_key,
-                unicode(err)
-            )
-            error_list.append(_('General indexing error occurred'))
-
-        if raise_on_error and error_list:
-            raise SearchIndexingError(_('Error(s) present during indexing'), error_list)
-
-        return indexed_count
+                    item_index[CONTENT_HASH_FIELD] = _document_hash(item_index)
+                    versions[usage_id] = [version, item_index[CONTENT_HASH_FIELD]]
+                    if not incremental or item_index[CONTENT_HASH_FIELD] != indexed_hash:
+                        changed.append(item_index)
+            except Exception as err:  # pylint: disable=broad-except
+                # broad exception so that index operation does not fail on one item of many
+                log.warning('Could not index item: %s - %s', item.location, unicode(err))
+                error_list.append(_('Could not index item: {}').format(item.location))
+                # The document is left as it was indexed, and built again the next time
+                if usage_id in indexed_versions:
+                    versions[usage_id] = [None, indexed_hash]
+
+        # Load the whole published course at once, rather than fetching its blocks one by one
+        with modulestore.branch_setting(ModuleStoreEnum.Branch.published_only, course_key):
+            course = modulestore.get_course(course_key, depth=None)
+            if course is None:
+                raise ItemNotFoundError(course_key)
+            index_item(course, None)
+
+        return versions, changed
 
     @classmethod
-    def do_publish_index(cls, modulestore, location, delete=False, raise_on_error=False):
+    def do_publish_index(cls, modulestore, course_key, raise_on_error=False):
         """
-        Add to courseware search index published section and children
+        Update the courseware search index with the changes published in the course
         """
-        indexed_count = cls.add_to_search_index(modulestore, location, delete, raise_on_error)
-        cls._track_index_request('edx.course.index.published', indexed_count, str(location))
+        indexed_count = cls.index_course(modulestore, course_key, raise_on_error=raise_on_error)
+        cls._track_index_request('edx.course.index.published', indexed_count, unicode(course_key))
         return indexed_count
 
     @classmethod
@@ -147,7 +297,7 @@ class CoursewareSearchIndexer(object):
         """
         (Re)index all content within the given course
         """
-        indexed_count = cls.add_to_search_index(modulestore, course_key, delete=False, raise_on_error=True)
+        indexed_count = cls.index_course(modulestore, course_key, incremental=False, raise_on_error=True)
         cls._track_index_request('edx.course.index.reindexed', indexed_count)
         return indexed_count
 
@@ -23,6 +23,8 @@ import django.utils
 from xmodule.contentstore.django import contentstore
 from xmodule.modulestore.draft_and_published import BranchSettingMixin
 from xmodule.modulestore.mixed import MixedModuleStore
+from xmodule.modulestore.split_mongo.document_cache import DocumentCache
+from xmodule.modulestore.split_mongo.split import SplitMongoModuleStore
 from xmodule.util.django import get_current_request_hostname
 import xblock.reference.plugins
 
@@ -80,9 +82,11 @@ class SignalHandler(object):
 
     """
     course_published = django.dispatch.Signal(providing_args=["course_key"])
+    course_deleted = django.dispatch.Signal(providing_args=["course_key"])
 
     _mapping = {
-        "course_published": course_published
+        "course_published": course_published,
+        "course_deleted": course_deleted,
     }
 
     def __init__(self, modulestore_class):
@@ -149,6 +153,9 @@ def create_modulestore_instance(
     if issubclass(class_, BranchSettingMixin):
         _options['branch_setting_func'] = _get_modulestore_branch_setting
 
+    if issubclass(class_, SplitMongoModuleStore):
+        _options['document_cache'] = split_document_cache()
+
     if HAS_USER_SERVICE and not user_service:
         xb_user_service = DjangoXBlockUserService(get_current_user())
     else:
@@ -169,6 +176,33 @@ def create_modulestore_instance(
     )
 
 
+# The process-wide cache of split modulestore documents
+_SPLIT_DOCUMENT_CACHE = None
+
+
+def split_document_cache():
+    """
+    Returns the process-wide cache of split modulestore structures and
+    definitions, or None if it is disabled (SPLIT_DOCUMENT_CACHE_MAX_SIZE is 0).
+
+    If a 'split_documents' cache is configured, it is used as a tier shared
+    between processes.
+    """
+    global _SPLIT_DOCUMENT_CACHE  # pylint: disable=global-statement
+    max_size = getattr(settings, 'SPLIT_DOCUMENT_CACHE_MAX_SIZE', 0)
+    if not max_size:
+        return None
+
+    if _SPLIT_DOCUMENT_CACHE is None:
+        try:
+            shared_cache = get_cache('split_documents')
+        except InvalidCacheBackendError:
+            shared_cache = None
+        _SPLIT_DOCUMENT_CACHE = DocumentCache(max_size, shared_cache=shared_cache)
+
+    return _SPLIT_DOCUMENT_CACHE
+
+
 # A singleton instance of the Mixed Modulestore
 _MIXED_MODULESTORE = None
 
@@ -280,6 +280,18 @@ class MixedModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase):
                     courses[course_id] = course
         return courses.values()
 
+    @strip_key
+    def get_course_keys(self, **kwargs):
+        '''
+        Returns a list of the keys of the courses in this modulestore, without loading the courses
+        wherever the underlying modulestores allow it.
+        '''
+        course_keys = {}
+        for store in self.modulestores:
+            for course_key in store.get_course_keys(**kwargs):
+                course_keys.setdefault(self._clean_locator_for_mapping(course_key), course_key)
+        return course_keys.values()
+
     @strip_key
     def get_libraries(self, **kwargs):
         """
@@ -660,14 +660,34 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
         '''
         Find all inheritable fields from all xblocks in the course which may define inheritable data
         '''
-        # get all collections in the course, this query should not return any leaf nodes
         course_id = self.fill_in_run(course_id)
+        results_by_url, root = self._find_inheritance_records(course_id)
+
+        # now traverse the tree and compute down the inherited metadata
+        metadata_to_inherit = {}
+        if root is not None:
+            self._compute_inherited_metadata(root, results_by_url, metadata_to_inherit)
+
+        return metadata_to_inherit
+
+    def _find_inheritance_records(self, course_id, block_ids=None):
+        '''
+        Find the location, children, and inheritable metadata of the xblocks in the course which may
+        define inheritable data (i.e. which can have children). If `block_ids` is given, only the
+        xblocks with those block ids are returned.
+
+        Returns a dict of location url -> record, and the location url of the course (or None if the
+        course isn't among the records).
+        '''
+        # get all collections in the course, this query should not return any leaf nodes
         query = SON([
             ('_id.tag', 'i4x'),
             ('_id.org', course_id.org),
             ('_id.course', course_id.course),
             ('_id.category', {'$in': BLOCK_TYPES_WITH_CHILDREN})
         ])
+        if block_ids is not None:
+            query['_id.name'] = {'$in': list(block_ids)}
         # if we're only dealing in the published branch, then only get published containers
         if self.get_branch_setting() == ModuleStoreEnum.Branch.published_only:
             query['_id.revision'] = None
@@ -707,38 +727,158 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
             if location.category == 'course':
                 root = location_url
 
-        # now traverse the tree and compute down the inherited metadata
-        metadata_to_inherit = {}
+        return results_by_url, root
 
-        def _compute_inherited_metadata(url):
-            """
-            Helper method for computing inherited metadata for a specific location url
-            """
-            my_metadata = results_by_url[url].get('metadata', {})
-
-            # go through all the children and recurse, but only if we have
-            # in the result set. Remember results will not contain leaf nodes
-            for child in results_by_url[url].get('definition', {}).get('children', []):
-                if child in results_by_url:
-                    new_child_metadata = copy.deepcopy(my_metadata)
-                    new_child_metadata.update(results_by_url[child].get('metadata', {}))
-                    results_by_url[child]['metadata'] = new_child_metadata
-                    metadata_to_inherit[child] = new_child_metadata
-                    _compute_inherited_metadata(child)
-                else:
-                    # this is likely a leaf node, so let's record what metadata we need to inherit
-                    metadata_to_inherit[child] = my_metadata.copy()
-                # WARNING: 'parent' is not part of inherited metadata, but
-                # we're piggybacking on this recursive traversal to grab
-                # and cache the child's parent, as a performance optimization.
-                # The 'parent' key will be popped out of the dictionary during
-                # CachingDescriptorSystem.load_item
-                metadata_to_inherit[child].setdefault('parent', {})[self.get_branch_setting()] = url
+    def _compute_inherited_metadata(self, url, results_by_url, metadata_to_inherit):
+        """
+        Helper method for computing inherited metadata for a specific location url, and recording
+        it in `metadata_to_inherit` for all of its descendants
+        """
+        my_metadata = results_by_url[url].get('metadata', {})
 
-        if root is not None:
-            _compute_inherited_metadata(root)
+        # go through all the children and recurse, but only if we have
+        # in the result set. Remember results will not contain leaf nodes
+        for child in results_by_url[url].get('definition', {}).get('children', []):
+            if child in results_by_url:
+                new_child_metadata = copy.deepcopy(my_metadata)
+                new_child_metadata.update(results_by_url[child].get('metadata', {}))
+                results_by_url[child]['metadata'] = new_child_metadata
+                metadata_to_inherit[child] = new_child_metadata
+                self._compute_inherited_metadata(child, results_by_url, metadata_to_inherit)
+            else:
+                # this is likely a leaf node, so let's record what metadata we need to inherit
+                metadata_to_inherit[child] = my_metadata.copy()
+            # WARNING: 'parent' is not part of inherited metadata, but
+            # we're piggybacking on this recursive traversal to grab
+            # and cache the child's parent, as a performance optimization.
+            # The 'parent' key will be popped out of the dictionary during
+            # CachingDescriptorSystem.load_item
+            metadata_to_inherit[child].setdefault('parent', {})[self.get_branch_setting()] = url
+
+    def _patch_metadata_inheritance_tree(self, tree, location):
+        """
+        Given the metadata inheritance `tree` of a course, and the `location` of a block of that
+        course whose inheritable metadata or children changed, return the updated tree.
+
+        Only the subtree rooted at that block is recomputed, and the containers in it are queried
+        one level at a time; if the block was deleted, its subtree is removed from the tree. The
+        tree is returned as is if the change doesn't affect it, and None is returned if the tree
+        can't be patched (and has to be recomputed).
+        """
+        location = as_published(location)
+        if location.category not in BLOCK_TYPES_WITH_CHILDREN:
+            # The tree only holds what blocks inherit from their ancestors, so a change to a
+            # block which can't have children doesn't affect it
+            return tree
+
+        course_id = self.fill_in_run(location.course_key)
+        branch = self.get_branch_setting()
+        url = unicode(location)
+
+        parent_url = None
+        parent_metadata = {}
+        if location.category != 'course':
+            parent_url = tree.get(url, {}).get('parent', {}).get(branch)
+            if parent_url is None:
+                # the block isn't (yet) part of the course, so nothing inherits through it
+                return tree
+            parent_location = course_id.make_usage_key_from_deprecated_string(parent_url)
+            if parent_location.category == 'course':
+                # the course itself isn't in the tree, so get its metadata from the db
+                parent_records, __ = self._find_inheritance_records(course_id, [parent_location.name])
+                if parent_url not in parent_records:
+                    return None
+                parent_metadata = parent_records[parent_url].get('metadata', {})
+            elif parent_url in tree:
+                parent_metadata = {
+                    key: value for key, value in tree[parent_url].iteritems() if key != 'parent'
+                }
+            else:
+                return None
 
-        return metadata_to_inherit
+        # find the containers in the block's subtree, one level at a time
+        results_by_url = {}
+        block_ids = set([location.name])
+        while block_ids:
+            records, __ = self._find_inheritance_records(course_id, block_ids)
+            block_ids = set()
+            for record_url, record in records.iteritems():
+                if record_url in results_by_url:
+                    continue
+                results_by_url[record_url] = record
+                for child in record.get('definition', {}).get('children', []):
+                    child_location = course_id.make_usage_key_from_deprecated_string(child)
+                    if child_location.category in BLOCK_TYPES_WITH_CHILDREN and child not in results_by_url:
+                        block_ids.add(child_location.name)
+
+        # forget everything that was inherited through this block before the change
+        patched_tree = {
+            child_url: metadata for child_url, metadata in tree.iteritems()
+            if not self._is_descendant_in_tree(tree, child_url, url, branch)
+        }
+
+        if url not in results_by_url:
+            # the block was deleted, so nothing inherits through it anymore
+            patched_tree.pop(url, None)
+            return patched_tree
+
+        if parent_url is not None:
+            metadata = copy.deepcopy(parent_metadata)
+            metadata.update(results_by_url[url].get('metadata', {}))
+            results_by_url[url]['metadata'] = metadata
+            patched_tree[url] = metadata
+
+        self._compute_inherited_metadata(url, results_by_url, patched_tree)
+
+        if parent_url is not None:
+            patched_tree[url].setdefault('parent', {})[branch] = parent_url
+        return patched_tree
+
+    @staticmethod
+    def _is_descendant_in_tree(tree, url, ancestor_url, branch):
+        """
+        Return whether the metadata inheritance `tree` records the block at `url` as a descendant of
+        the block at `ancestor_url`.
+        """
+        seen = set()
+        url = tree.get(url, {}).get('parent', {}).get(branch)
+        while url is not None and url not in seen:
+            if url == ancestor_url:
+                return True
+            seen.add(url)
+            url = tree.get(url, {}).get('parent', {}).get(branch)
+        return False
+
+    def _metadata_inheritance_generation(self, course_id, new_generation=False):
+        '''
+        Return the generation of the containers of the course: a counter in the cache, which is
+        incremented (atomically) after each change to them (`new_generation`).
+
+        The cached tree is stored along with the generation it is up to date with. A tree computed
+        from the db is stored with the generation read before computing it, and a tree patched for
+        a change is stored with the generation of that change, only if the tree it was patched
+        from had the previous generation: so a tree is only read back if no change was made since
+        (or while) it was computed. Returns None if the cache doesn't keep the counter.
+        '''
+        cache = self.metadata_inheritance_cache_subsystem
+        generation_key = u'{}.generation'.format(course_id)
+        if new_generation:
+            try:
+                return cache.incr(generation_key)
+            except ValueError:
+                pass
+        else:
+            generation = cache.get(generation_key)
+            if generation is not None:
+                return generation
+
+        # the counter was evicted (or never set): start it from a random value, so that no tree
+        # cached along with a generation of the evicted counter is mistaken for an up to date one
+        cache.add(generation_key, uuid4().int >> 80)
+        try:
+            return cache.incr(generation_key) if new_generation else cache.get(generation_key)
+        except ValueError:
+            return None
 
     def _get_cached_metadata_inheritance_tree(self, course_id, force_refresh=False):
         '''
@@ -752,22 +892,26 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
             if self.request_cache is not None and unicode(course_id) in self.request_cache.data.get('metadata_inheritance', {}):
                 return self.request_cache.data['metadata_inheritance'][unicode(course_id)]
 
-            # then look in any caching subsystem (e.g. memcached)
-            if self.metadata_inheritance_cache_subsystem is not None:
-                tree = self.metadata_inheritance_cache_subsystem.get(unicode(course_id), {})
-            else:
-                logging.warning(
-                    'Running MongoModuleStore without a metadata_inheritance_cache_subsystem. This is \
-                    OK in localdev and testing environment. Not OK in production.'
-                )
+        generation = None
+        if self.metadata_inheritance_cache_subsystem is not None:
+            # on force refresh, the containers of the course changed (see _metadata_inheritance_generation)
+            generation = self._metadata_inheritance_generation(course_id, new_generation=force_refresh)
+            if not force_refresh:
+                # then look in any caching subsystem (e.g. memcached)
+                tree = self._cached_metadata_inheritance_tree(course_id, generation) or {}
+        elif not force_refresh:
+            logging.warning(
+                'Running MongoModuleStore without a metadata_inheritance_cache_subsystem. This is \
+                OK in localdev and testing environment. Not OK in production.'
+            )
 
         if not tree:
             # if not in subsystem, or we are on force refresh, then we have to compute
             tree = self._compute_metadata_inheritance_tree(course_id)
 
             # now write out computed tree to caching subsystem (e.g. memcached), if available
-            if self.metadata_inheritance_cache_subsystem is not None:
-                self.metadata_inheritance_cache_subsystem.set(unicode(course_id), tree)
+            if generation is not None:
+                self.metadata_inheritance_cache_subsystem.set(unicode(course_id), (generation, tree))
 
         # now populate a request_cache, if available. NOTE, we are outside of the
         # scope of the above if: statement so that after a memcache hit, it'll get
@@ -781,21 +925,71 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
 
         return tree
 
-    def refresh_cached_metadata_inheritance_tree(self, course_id, runtime=None):
+    def _cached_metadata_inheritance_tree(self, course_id, generation):
+        '''
+        Return the metadata inheritance tree of the course from the cache, if it is up to date
+        with `generation`, otherwise None.
+        '''
+        cached = self.metadata_inheritance_cache_subsystem.get(unicode(course_id))
+        if generation is None or not isinstance(cached, tuple) or cached[0] != generation:
+            return None
+        return cached[1]
+
+    def refresh_cached_metadata_inheritance_tree(self, course_id, runtime=None, location=None):
         """
         Refresh the cached metadata inheritance tree for the org/course combination
         for location
 
         If given a runtime, it replaces the cached_metadata in that runtime. NOTE: failure to provide
         a runtime may mean that some objects report old values for inherited data.
+
+        If given the `location` of the only block that changed, and the tree is cached and up to date,
+        only the part of the tree which depends on that block is recomputed (see
+        `_patch_metadata_inheritance_tree`). The whole tree is only recomputed on cache misses,
+        and at the end of bulk operations.
         """
         course_id = course_id.for_branch(None)
         if not self._is_in_bulk_operation(course_id):
-            # below is done for side effects when runtime is None
-            cached_metadata = self._get_cached_metadata_inheritance_tree(course_id, force_refresh=True)
+            if location is not None and location.category not in BLOCK_TYPES_WITH_CHILDREN:
+                # The tree only holds what blocks inherit from their ancestors, so a change
+                # to a block which can't pass anything on doesn't affect it
+                return
+            cached_metadata = None
+            if location is not None:
+                cached_metadata = self._get_patched_metadata_inheritance_tree(course_id, location)
+            if cached_metadata is None:
+                # below is done for side effects when runtime is None
+                cached_metadata = self._get_cached_metadata_inheritance_tree(course_id, force_refresh=True)
             if runtime:
                 runtime.cached_metadata = cached_metadata
 
+    def _get_patched_metadata_inheritance_tree(self, course_id, location):
+        """
+        Update the cached metadata inheritance tree of the course for a change to the block at
+        `location`, and return it. Returns None if the tree isn't cached, isn't up to date with
+        the changes made before this one, or can't be patched.
+        """
+        if self.metadata_inheritance_cache_subsystem is None:
+            return None
+
+        course_id = self.fill_in_run(course_id)
+        generation = self._metadata_inheritance_generation(course_id, new_generation=True)
+        if generation is None:
+            return None
+        tree = self._cached_metadata_inheritance_tree(course_id, generation - 1)
+        if not tree:
+            return None
+
+        patched_tree = self._patch_metadata_inheritance_tree(tree, location)
+        if patched_tree is None:
+            return None
+
+        self.metadata_inheritance_cache_subsystem.set(unicode(course_id), (generation, patched_tree))
+        if self.request_cache is not None:
+            self.request_cache.data.setdefault('metadata_inheritance', {})[unicode(course_id)] = patched_tree
+
+        return patched_tree
+
     def _clean_item_data(self, item):
         """
         Renames the '_id' field in item to 'location'
@@ -984,6 +1178,21 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
         )
         return [course for course in base_list if not isinstance(course, ErrorDescriptor)]
 
+    def get_course_keys(self, **kwargs):
+        '''
+        Returns the keys of the courses in this modulestore, without loading the courses. This
+        accepts the same optional 'org' parameter as get_courses.
+        '''
+        query = {'_id.category': 'course'}
+        if kwargs.get('org'):
+            query['_id.org'] = kwargs['org']
+
+        return [
+            SlashSeparatedCourseKey(course['_id']['org'], course['_id']['course'], course['_id']['name'])
+            for course in self.collection.find(query, {'_id': True})
+            if not (course['_id']['org'] == 'edx' and course['_id']['course'] == 'templates')
+        ]
+
     def _find_one(self, location):
         '''Look for a given location in the collection. If the item is not present, raise
         ItemNotFoundError.
@@ -1439,7 +1648,9 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
             xblock._edit_info = payload['edit_info']
 
             # recompute (and update) the metadata inheritance tree which is cached
-            self.refresh_cached_metadata_inheritance_tree(xblock.scope_ids.usage_id.course_key, xblock.runtime)
+            self.refresh_cached_metadata_inheritance_tree(
+                xblock.scope_ids.usage_id.course_key, xblock.runtime, location=xblock.scope_ids.usage_id
+            )
             # fire signal that we've written to DB
         except ItemNotFoundError:
             if not allow_not_found:
@@ -0,0 +1,129 @@
+"""
+Performance test for converting split modulestore structures to and from
+their mongo representation.
+"""
+import copy
+import datetime
+import unittest
+
+import contracts
+import ddt
+from bson.objectid import ObjectId
+from nose.plugins.skip import SkipTest
+from pytz import UTC
+
+from xmodule.modulestore.split_mongo.mongo_connection import structure_from_mongo, structure_to_mongo
+
+# The dependency below needs to be installed manually from the development.txt file, which doesn't
+# get installed during unit tests!
+try:
+    from code_block_timer import CodeBlockTimer
+except ImportError:
+    CodeBlockTimer = None
+
+# Number of blocks in the structures converted per test run.
+BLOCK_AMOUNT_PER_TEST = (10, 100, 1000, 10000, 50000)
+
+# Number of children of each non-leaf block.
+CHILDREN_PER_BLOCK = 10
+
+# How many times each structure is converted.
+ITERATIONS = 5
+
+
+def make_mongo_structure(num_blocks):
+    """
+    Return a structure of `num_blocks` blocks, as it is stored in mongo: a
+    tree in which every non-leaf block has CHILDREN_PER_BLOCK children.
+    """
+    version = ObjectId()
+    edited_on = datetime.datetime.now(UTC)
+    blocks = []
+    for index in xrange(num_blocks):
+        children = [
+            ['vertical', 'block{}'.format(child)]
+            for child in xrange(index * CHILDREN_PER_BLOCK + 1, min((index + 1) * CHILDREN_PER_BLOCK + 1, num_blocks))
+        ]
+        fields = {'display_name': u'Block {}'.format(index)}
+        if children:
+            fields['children'] = children
+        blocks.append({
+            'block_type': 'course' if index == 0 else 'vertical',
+            'block_id': 'block{}'.format(index),
+            'definition': ObjectId(),
+            'defaults': {},
+            'fields': fields,
+            'edit_info': {
+                'edited_on': edited_on,
+                'edited_by': 'test_user',
+                'previous_version': None,
+                'update_version': version,
+                'source_version': None,
+                'original_usage': None,
+                'original_usage_version': None,
+            },
+        })
+    return {
+        '_id': version,
+        'root': ['course', 'block0'],
+        'previous_version': None,
+        'original_version': version,
+        'edited_by': 'test_user',
+        'edited_on': edited_on,
+        'blocks': blocks,
+        'schema_version': 1,
+    }
+
+
+@ddt.ddt
+# Eventually, exclude this attribute from regular unittests while running *only* tests
+# with this attribute during regular performance tests.
+# @attr("perf_test")
+@unittest.skip
+class StructureConversionTest(unittest.TestCase):
+    """
+    This class exists to time loading (and writing) split structures of
+    different sizes, with contract checks enabled (as in tests) and disabled
+    (as in production).
+    """
+
+    # Use this attribute to skip this test on regular unittest CI runs.
+    perf_test = True
+
+    def setUp(self):
+        super(StructureConversionTest, self).setUp()
+        self.addCleanup(contracts.enable_all)
+
+    @ddt.data(*[
+        (num_blocks, contracts_enabled)
+        for num_blocks in BLOCK_AMOUNT_PER_TEST
+        for contracts_enabled in (True, False)
+    ])
+    @ddt.unpack
+    def test_generate_conversion_timings(self, num_blocks, contracts_enabled):
+        """
+        Generate timings for converting structures of different sizes.
+        """
+        if CodeBlockTimer is None:
+            raise SkipTest("CodeBlockTimer undefined.")
+
+        if contracts_enabled:
+            contracts.enable_all()
+        else:
+            contracts.disable_all()
+
+        mongo_structure = make_mongo_structure(num_blocks)
+        desc = "StructureConversion:{}:{}".format(num_blocks, 'contracts' if contracts_enabled else 'no_contracts')
+
+        with CodeBlockTimer(desc):
+            for __ in xrange(ITERATIONS):
+                to_load = copy.deepcopy(mongo_structure)
+                with CodeBlockTimer("structure_from_mongo"):
+                    structure = structure_from_mongo(to_load)
+
+                with CodeBlockTimer("access_edit_info"):
+                    for block in structure['blocks'].itervalues():
+                        block.edit_info.update_version  # pylint: disable=pointless-statement
+
+                with CodeBlockTimer("structure_to_mongo"):
+                    structure_to_mongo(structure)
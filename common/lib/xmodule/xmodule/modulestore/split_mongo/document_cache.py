@@ -0,0 +1,146 @@
+"""
+A process-wide cache of split modulestore structures and definitions.
+
+Structure and definition documents are never modified once they have been
+written (changes always produce a new document with a new id), so a document
+cached under its id can never go stale, and the cache never needs to be
+invalidated.
+"""
+import cPickle as pickle
+import logging
+import threading
+from collections import OrderedDict
+
+
+log = logging.getLogger(__name__)
+
+
+class DocumentCache(object):
+    """
+    A bounded LRU cache of split modulestore documents, keyed by kind
+    ('structures' or 'definitions') and ObjectId.
+
+    Documents are stored pickled: this bounds the cache by the actual size of
+    what it holds, and gives every reader its own copy of the document (loaded
+    structures are modified in place, e.g. when definitions are loaded into
+    their blocks).
+
+    If `shared_cache` (anything with the django cache `get`/`set`/`get_many`
+    interface, e.g. memcached) is given, documents missing from this process's
+    cache are looked up there before going to the database, and documents
+    loaded from the database are added to it.
+    """
+    def __init__(self, max_size, shared_cache=None, key_prefix='split_document'):
+        self.max_size = max_size
+        self.shared_cache = shared_cache
+        self.key_prefix = key_prefix
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'shared_hits': 0,
+            'misses': 0,
+            'evictions': 0,
+        }
+
+    def _shared_key(self, kind, document_id):
+        """
+        Return the key of a document in the shared cache.
+        """
+        return u'{}.{}.{}'.format(self.key_prefix, kind, document_id)
+
+    def get(self, kind, document_id):
+        """
+        Return a copy of the `kind` document with id `document_id`, or None if
+        it isn't cached.
+        """
+        return self.get_many(kind, [document_id]).get(document_id)
+
+    def get_many(self, kind, document_ids):
+        """
+        Return a dict of id -> copy of the document for those of the `kind`
+        documents with ids in `document_ids` that are cached.
+        """
+        found = {}
+        missing = []
+        with self._lock:
+            for document_id in document_ids:
+                pickled = self._entries.pop((kind, document_id), None)
+                if pickled is None:
+                    missing.append(document_id)
+                else:
+                    # Re-insert the entry to mark it as the most recently used one
+                    self._entries[(kind, document_id)] = pickled
+                    self._stats['hits'] += 1
+                    found[document_id] = pickled
+
+        if missing and self.shared_cache is not None:
+            shared_keys = {self._shared_key(kind, document_id): document_id for document_id in missing}
+            try:
+                shared_found = self.shared_cache.get_many(shared_keys.keys())
+            except Exception:  # pylint: disable=broad-except
+                log.exception(u'Cannot read split modulestore documents from the shared cache')
+                shared_found = {}
+            for shared_key, pickled in shared_found.iteritems():
+                document_id = shared_keys[shared_key]
+                self._store(kind, document_id, pickled)
+                found[document_id] = pickled
+            with self._lock:
+                self._stats['shared_hits'] += len(shared_found)
+
+        with self._lock:
+            self._stats['misses'] += len(document_ids) - len(found)
+
+        return {document_id: pickle.loads(pickled) for document_id, pickled in found.iteritems()}
+
+    def set(self, kind, document):
+        """
+        Cache a copy of the `kind` document `document`, under its '_id'.
+        """
+        pickled = pickle.dumps(document, pickle.HIGHEST_PROTOCOL)
+        self._store(kind, document['_id'], pickled)
+        if self.shared_cache is not None:
+            try:
+                self.shared_cache.set(self._shared_key(kind, document['_id']), pickled)
+            except Exception:  # pylint: disable=broad-except
+                log.exception(u'Cannot write split modulestore document %s to the shared cache', document['_id'])
+
+    def _store(self, kind, document_id, pickled):
+        """
+        Add a pickled document to this process's cache, evicting the least
+        recently used documents to make room for it.
+        """
+        size = len(pickled)
+        if size > self.max_size:
+            return
+
+        with self._lock:
+            previous = self._entries.pop((kind, document_id), None)
+            if previous is not None:
+                self._size -= len(previous)
+            while self._entries and self._size + size > self.max_size:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+                self._stats['evictions'] += 1
+            self._entries[(kind, document_id)] = pickled
+            self._size += size
+
+    def clear(self):
+        """
+        Empty this process's cache (the shared cache isn't affected).
+        """
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        """
+        Return a dict of the cache's hit/miss counters, and of its current
+        size (in bytes) and number of entries.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = self._size
+            stats['entries'] = len(self._entries)
+        return stats
@@ -8,7 +8,7 @@ import pymongo
 # Import this just to export it
 from pymongo.errors import DuplicateKeyError  # pylint: disable=unused-import
 
-from contracts import check, new_contract
+from contracts import check, new_contract, all_disabled
 from xmodule.exceptions import HeartbeatFailure
 from xmodule.modulestore import BlockData
 from xmodule.modulestore.split_mongo import BlockKey
@@ -26,12 +26,17 @@ def structure_from_mongo(structure):
     Converts 'root' from [block_type, block_id] to BlockKey.
     Converts 'blocks.*.fields.children' from [[block_type, block_id]] to [BlockKey].
     N.B. Does not convert any other ReferenceFields (because we don't know which fields they are at this level).
+
+    This runs on every structure load, for every block of the structure, so
+    the (expensive) contract checks are skipped when contracts are disabled,
+    as they are in production.
     """
-    check('seq[2]', structure['root'])
-    check('list(dict)', structure['blocks'])
-    for block in structure['blocks']:
-        if 'children' in block['fields']:
-            check('list(list[2])', block['fields']['children'])
+    if not all_disabled():
+        check('seq[2]', structure['root'])
+        check('list(dict)', structure['blocks'])
+        for block in structure['blocks']:
+            if 'children' in block['fields']:
+                check('list(list[2])', block['fields']['children'])
 
     structure['root'] = BlockKey(*structure['root'])
     new_blocks = {}
@@ -52,11 +57,12 @@ def structure_to_mongo(structure):
     Doesn't convert 'root', since namedtuple's can be inserted
         directly into mongo.
     """
-    check('BlockKey', structure['root'])
-    check('dict(BlockKey: BlockData)', structure['blocks'])
-    for block in structure['blocks'].itervalues():
-        if 'children' in block.fields:
-            check('list(BlockKey)', block.fields['children'])
+    if not all_disabled():
+        check('BlockKey', structure['root'])
+        check('dict(BlockKey: BlockData)', structure['blocks'])
+        for block in structure['blocks'].itervalues():
+            if 'children' in block.fields:
+                check('list(BlockKey)', block.fields['children'])
 
     new_structure = dict(structure)
     new_structure['blocks'] = []
@@ -76,11 +82,16 @@ class MongoConnection(object):
     """
     def __init__(
         self, db, collection, host, port=27017, tz_aware=True, user=None, password=None,
-        asset_collection=None, retry_wait_time=0.1, **kwargs
+        asset_collection=None, retry_wait_time=0.1, document_cache=None, **kwargs
     ):
         """
         Create & open the connection, authenticate, and provide pointers to the collections
+
+        If `document_cache` (a :class:`.DocumentCache`) is given, structures and
+        definitions are read through it.
         """
+        self.document_cache = document_cache
+
         self.database = MongoProxy(
             pymongo.database.Database(
                 pymongo.MongoClient(
@@ -122,7 +133,15 @@ class MongoConnection(object):
         """
         Get the structure from the persistence mechanism whose id is the given key
         """
-        return structure_from_mongo(self.structures.find_one({'_id': key}))
+        if self.document_cache is not None:
+            structure = self.document_cache.get('structures', key)
+            if structure is None:
+                structure = self.structures.find_one({'_id': key})
+                if structure is not None:
+                    self.document_cache.set('structures', structure)
+        else:
+            structure = self.structures.find_one({'_id': key})
+        return structure_from_mongo(structure)
 
     @autoretry_read()
     def find_structures_by_id(self, ids):
@@ -132,7 +151,16 @@ class MongoConnection(object):
         Arguments:
             ids (list): A list of structure ids
         """
-        return [structure_from_mongo(structure) for structure in self.structures.find({'_id': {'$in': ids}})]
+        if self.document_cache is None:
+            return [structure_from_mongo(structure) for structure in self.structures.find({'_id': {'$in': ids}})]
+
+        found = self.document_cache.get_many('structures', ids)
+        missing_ids = [_id for _id in ids if _id not in found]
+        if missing_ids:
+            for structure in self.structures.find({'_id': {'$in': missing_ids}}):
+                self.document_cache.set('structures', structure)
+                found[structure['_id']] = structure
+        return [structure_from_mongo(structure) for structure in found.itervalues()]
 
     @autoretry_read()
     def find_structures_derived_from(self, ids):
@@ -258,13 +286,30 @@ class MongoConnection(object):
         """
         Get the definition from the persistence mechanism whose id is the given key
         """
-        return self.definitions.find_one({'_id': key})
+        if self.document_cache is None:
+            return self.definitions.find_one({'_id': key})
+
+        definition = self.document_cache.get('definitions', key)
+        if definition is None:
+            definition = self.definitions.find_one({'_id': key})
+            if definition is not None:
+                self.document_cache.set('definitions', definition)
+        return definition
 
     def get_definitions(self, definitions):
         """
         Retrieve all definitions listed in `definitions`.
         """
-        return self.definitions.find({'_id': {'$in': definitions}})
+        if self.document_cache is None:
+            return self.definitions.find({'_id': {'$in': definitions}})
+
+        found = self.document_cache.get_many('definitions', definitions)
+        missing_ids = [_id for _id in definitions if _id not in found]
+        if missing_ids:
+            for definition in self.definitions.find({'_id': {'$in': missing_ids}}):
+                self.document_cache.set('definitions', definition)
+                found[definition['_id']] = definition
+        return found.values()
 
     def insert_definition(self, definition):
         """
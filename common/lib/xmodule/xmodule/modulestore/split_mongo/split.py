@@ -635,14 +635,15 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
                  default_class=None,
                  error_tracker=null_error_tracker,
                  i18n_service=None, fs_service=None, user_service=None,
-                 services=None, signal_handler=None, **kwargs):
+                 services=None, signal_handler=None, document_cache=None, **kwargs):
         """
         :param doc_store_config: must have a host, db, and collection entries. Other common entries: port, tz_aware.
+        :param document_cache: an optional :class:`.DocumentCache` through which structures and definitions are read.
         """
 
         super(SplitMongoModuleStore, self).__init__(contentstore, **kwargs)
 
-        self.db_connection = MongoConnection(**doc_store_config)
+        self.db_connection = MongoConnection(document_cache=document_cache, **doc_store_config)
         self.db = self.db_connection.database
 
         if default_class is not None:
@@ -923,6 +924,16 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
         # get the blocks for each course index (s/b the root)
         return self._get_structures_for_branch_and_locator(branch, self._create_course_locator, **kwargs)
 
+    def get_course_keys(self, branch, **kwargs):
+        """
+        Returns the keys of the courses which have the given branch, from their indexes alone (without
+        loading their structures). Accepts the same 'org' qualifier as get_courses.
+        """
+        return [
+            self._create_course_locator(course_index, branch)
+            for course_index in self.find_matching_course_indexes(branch, org_target=kwargs.get('org'))
+        ]
+
     def get_libraries(self, branch="library", **kwargs):
         """
         Returns a list of "library" root blocks matching any given qualifiers.
@@ -2414,6 +2425,7 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
         # this is the only real delete in the system. should it do something else?
         log.info(u"deleting course from split-mongo: %s", course_key)
         self.delete_course_index(course_key)
+        self._emit_course_deleted_signal(course_key)
 
         # We do NOT call the super class here since we need to keep the assets
         # in case the course is later restored.
@@ -76,6 +76,21 @@ class MemoryCache(object):
         """
         self._data[key] = value
 
+    def add(self, key, value):
+        """
+        Set a key in the cache, unless it is already set.
+        """
+        self._data.setdefault(key, value)
+
+    def incr(self, key):
+        """
+        Increment the value of a key, raising ValueError if it isn't set.
+        """
+        if key not in self._data:
+            raise ValueError(key)
+        self._data[key] += 1
+        return self._data[key]
+
 
 class MongoContentstoreBuilder(object):
     """
@@ -17,6 +17,7 @@ from uuid import uuid4
 from datetime import datetime
 from pytz import UTC
 import unittest
+from mock import patch
 from xblock.core import XBlock
 
 from xblock.fields import Scope, Reference, ReferenceList, ReferenceValueDict
@@ -35,11 +36,11 @@ from xmodule.modulestore.xml_exporter import export_course_to_xml
 from xmodule.modulestore.xml_importer import import_course_from_xml, perform_xlint
 from xmodule.contentstore.mongo import MongoContentStore
 
-from nose.tools import assert_in
+from nose.tools import assert_in, assert_not_in
 from xmodule.exceptions import NotFoundError
 from git.test.lib.asserts import assert_not_none
 from xmodule.x_module import XModuleMixin
-from xmodule.modulestore.mongo.base import as_draft
+from xmodule.modulestore.mongo.base import as_draft, as_published
 from xmodule.modulestore.tests.mongo_connection import MONGO_PORT_NUM, MONGO_HOST
 from xmodule.modulestore.tests.utils import LocationMixin
 from xmodule.modulestore.edit_info import EditInfoMixin
@@ -59,6 +60,23 @@ DEFAULT_CLASS = 'xmodule.raw_module.RawDescriptor'
 RENDER_TEMPLATE = lambda t_n, d, ctx=None, nsp='main': ''
 
 
+class DictCache(dict):
+    """
+    The parts of the django cache interface used by the metadata inheritance cache, backed by a dict.
+    """
+    def set(self, key, value):
+        self[key] = value
+
+    def add(self, key, value):
+        self.setdefault(key, value)
+
+    def incr(self, key):
+        if key not in self:
+            raise ValueError(key)
+        self[key] += 1
+        return self[key]
+
+
 class ReferenceTestXBlock(XBlock, XModuleMixin):
     """
     Test xblock type to test the reference field types
@@ -778,6 +796,54 @@ class TestMongoModuleStore(TestMongoModuleStoreBase):
         # Clean up the data so we don't break other tests which apparently expect a particular state
         self.draft_store.delete_course(course.id, self.dummy_user)
 
+    def test_metadata_inheritance_tree_patched(self):
+        """
+        Test that updating a container patches the cached metadata inheritance tree instead of
+        recomputing it, that leaf updates leave it alone, and that a tree which isn't up to date
+        with the changes made since it was cached is never read.
+        """
+        course = self.draft_store.create_course("TestX", "InheritanceTest", "2015_T1", self.dummy_user)
+        self.addCleanup(self.draft_store.delete_course, course.id, self.dummy_user)
+        chapter = self.draft_store.create_child(self.dummy_user, course.location, 'chapter')
+        sequential = self.draft_store.create_child(self.dummy_user, chapter.location, 'sequential')
+        vertical = self.draft_store.create_child(self.dummy_user, sequential.location, 'vertical')
+        html = self.draft_store.create_child(self.dummy_user, vertical.location, 'html')
+
+        with patch.object(self.draft_store, 'metadata_inheritance_cache_subsystem', DictCache()):
+            with patch.object(self.draft_store, 'request_cache', None):
+                self.draft_store._get_cached_metadata_inheritance_tree(course.id)
+                generation = self.draft_store._metadata_inheritance_generation(course.id)
+                stale_tree = self.draft_store._compute_metadata_inheritance_tree(course.id)
+
+                with patch.object(
+                    self.draft_store, '_compute_metadata_inheritance_tree',
+                    wraps=self.draft_store._compute_metadata_inheritance_tree
+                ) as mock_compute:
+                    # leaf blocks don't pass on their metadata, so the tree stays as it is
+                    html.display_name = 'Changed'
+                    self.draft_store.update_item(html, self.dummy_user)
+                    assert_equals(self.draft_store._metadata_inheritance_generation(course.id), generation)
+
+                    sequential.graded = True
+                    self.draft_store.update_item(sequential, self.dummy_user)
+                    assert_equals(self.draft_store._metadata_inheritance_generation(course.id), generation + 1)
+                    patched_tree = self.draft_store._get_cached_metadata_inheritance_tree(course.id)
+
+                    self.draft_store.delete_item(vertical.location, self.dummy_user)
+                    pruned_tree = self.draft_store._get_cached_metadata_inheritance_tree(course.id)
+                    assert_false(mock_compute.called)
+
+                assert_true(patched_tree[unicode(as_published(html.location))]['graded'])
+                assert_not_in(unicode(as_published(html.location)), pruned_tree)
+                assert_equals(pruned_tree, self.draft_store._compute_metadata_inheritance_tree(course.id))
+
+                # a tree cached along with an older generation is not read
+                self.draft_store.metadata_inheritance_cache_subsystem.set(unicode(course.id), (generation, stale_tree))
+                assert_equals(
+                    self.draft_store._get_cached_metadata_inheritance_tree(course.id),
+                    self.draft_store._compute_metadata_inheritance_tree(course.id)
+                )
+
 
 class TestMongoModuleStoreWithNoAssetCollection(TestMongoModuleStore):
     '''
@@ -0,0 +1,143 @@
+"""
+Tests of the process-wide cache of split modulestore documents.
+"""
+import cPickle as pickle
+import unittest
+
+from bson.objectid import ObjectId
+from mock import Mock
+
+from xmodule.modulestore.split_mongo import BlockKey
+from xmodule.modulestore.split_mongo.document_cache import DocumentCache
+from xmodule.modulestore.split_mongo.mongo_connection import MongoConnection
+
+
+class DictCache(dict):
+    """
+    The parts of the django cache interface used by DocumentCache, backed by a dict.
+    """
+    def get_many(self, keys):
+        return {key: self[key] for key in keys if key in self}
+
+    def set(self, key, value):
+        self[key] = value
+
+
+class TestDocumentCache(unittest.TestCase):
+    """
+    Tests of DocumentCache.
+    """
+    def document(self, **fields):
+        """
+        Return a new document with a new id.
+        """
+        fields['_id'] = ObjectId()
+        return fields
+
+    def test_miss(self):
+        cache = DocumentCache(1024)
+        self.assertIsNone(cache.get('structures', ObjectId()))
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_hit_returns_copy(self):
+        cache = DocumentCache(1024)
+        document = self.document(blocks=[{'fields': {}}])
+        cache.set('structures', document)
+
+        cached = cache.get('structures', document['_id'])
+        self.assertEqual(cached, document)
+        cached['blocks'][0]['fields']['changed'] = True
+        self.assertEqual(cache.get('structures', document['_id']), document)
+        self.assertEqual(cache.stats()['hits'], 2)
+
+    def test_kinds_are_separate(self):
+        cache = DocumentCache(1024)
+        document = self.document()
+        cache.set('structures', document)
+        self.assertIsNone(cache.get('definitions', document['_id']))
+
+    def test_lru_eviction_by_size(self):
+        documents = [self.document(payload='x' * 100) for __ in range(3)]
+        size = len(pickle.dumps(documents[0], pickle.HIGHEST_PROTOCOL))
+        cache = DocumentCache(2 * size)
+
+        cache.set('definitions', documents[0])
+        cache.set('definitions', documents[1])
+        # Use the first document, so that the second one is the least recently used
+        cache.get('definitions', documents[0]['_id'])
+        cache.set('definitions', documents[2])
+
+        found = cache.get_many('definitions', [document['_id'] for document in documents])
+        self.assertEqual(sorted(found), sorted([documents[0]['_id'], documents[2]['_id']]))
+        stats = cache.stats()
+        self.assertEqual(stats['evictions'], 1)
+        self.assertEqual(stats['entries'], 2)
+        self.assertEqual(stats['size'], 2 * size)
+
+    def test_too_large_documents_are_not_cached(self):
+        cache = DocumentCache(10)
+        document = self.document(payload='x' * 100)
+        cache.set('structures', document)
+        self.assertIsNone(cache.get('structures', document['_id']))
+
+    def test_shared_cache(self):
+        shared_cache = DictCache()
+        document = self.document()
+        DocumentCache(1024, shared_cache=shared_cache).set('structures', document)
+
+        # Another process finds the document in the shared cache...
+        cache = DocumentCache(1024, shared_cache=shared_cache)
+        self.assertEqual(cache.get('structures', document['_id']), document)
+        self.assertEqual(cache.stats()['shared_hits'], 1)
+
+        # ... and keeps it in its own cache from then on.
+        shared_cache.clear()
+        self.assertEqual(cache.get('structures', document['_id']), document)
+        self.assertEqual(cache.stats()['hits'], 1)
+
+    def test_broken_shared_cache(self):
+        shared_cache = Mock()
+        shared_cache.get_many.side_effect = Exception('memcached is down')
+        cache = DocumentCache(1024, shared_cache=shared_cache)
+        self.assertIsNone(cache.get('structures', ObjectId()))
+
+
+class TestMongoConnectionDocumentCache(unittest.TestCase):
+    """
+    Tests of reading structures and definitions through a DocumentCache.
+    """
+    def setUp(self):
+        super(TestMongoConnectionDocumentCache, self).setUp()
+        # Don't connect to a real database
+        self.connection = MongoConnection.__new__(MongoConnection)
+        self.connection.document_cache = DocumentCache(1024 * 1024)
+        self.connection.structures = Mock()
+        self.connection.definitions = Mock()
+
+        self.structure_id = ObjectId()
+        self.connection.structures.find_one.side_effect = lambda query: {
+            '_id': self.structure_id,
+            'root': ['course', 'course'],
+            'blocks': [{'block_type': 'course', 'block_id': 'course', 'fields': {}}],
+        }
+
+    def test_structure_read_through(self):
+        first = self.connection.get_structure(self.structure_id)
+        second = self.connection.get_structure(self.structure_id)
+
+        self.assertEqual(self.connection.structures.find_one.call_count, 1)
+        self.assertEqual(second['root'], BlockKey('course', 'course'))
+        self.assertIsNot(first['blocks'], second['blocks'])
+
+    def test_definitions_only_query_missing(self):
+        cached = {'_id': ObjectId(), 'fields': {'data': 'cached'}}
+        missing = {'_id': ObjectId(), 'fields': {'data': 'missing'}}
+        self.connection.document_cache.set('definitions', cached)
+        self.connection.definitions.find.return_value = [missing]
+
+        definitions = self.connection.get_definitions([cached['_id'], missing['_id']])
+
+        self.connection.definitions.find.assert_called_once_with({'_id': {'$in': [missing['_id']]}})
+        self.assertEqual(sorted(definitions), sorted([cached, missing]))
+        self.assertEqual(self.connection.get_definition(missing['_id']), missing)
+        self.assertFalse(self.connection.definitions.find_one.called)
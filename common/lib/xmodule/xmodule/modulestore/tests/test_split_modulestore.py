@@ -15,7 +15,7 @@ from nose.plugins.attrib import attr
 from openedx.core.lib import tempdir
 from xblock.fields import Reference, ReferenceList, ReferenceValueDict
 from xmodule.course_module import CourseDescriptor
-from xmodule.modulestore import ModuleStoreEnum
+from xmodule.modulestore import BlockData, EditInfo, ModuleStoreEnum
 from xmodule.modulestore.exceptions import (
     ItemNotFoundError, VersionConflictError,
     DuplicateItemError, DuplicateCourseError,
@@ -968,6 +968,25 @@ class SplitModuleItemTests(SplitModuleTest):
         matches = modulestore().get_items(locator, settings={'group_access': {'$exists': False}})
         self.assertEqual(len(matches), 6)
 
+    def test_get_items_by_block_data(self):
+        '''
+        get_items matches the BlockData of the structure (which have no __dict__)
+        '''
+        locator = CourseLocator(org='testx', course='GreekHero', run="run", branch=BRANCH_NAME_DRAFT)
+        matches = modulestore().get_items(locator, qualifiers={'category': 'chapter', 'name': 'chapter1'})
+        self.assertEqual([match.location.block_id for match in matches], ['chapter1'])
+        matches = modulestore().get_items(
+            locator,
+            qualifiers={'category': 'chapter', 'edit_info': lambda edit_info: isinstance(edit_info, EditInfo)},
+        )
+        self.assertEqual(len(matches), 3)
+
+        block = BlockData(block_type='problem', fields={}, edit_info={'edited_by': 'test_user'})
+        self.assertTrue(modulestore()._block_matches(block, {'block_type': 'problem'}))
+        self.assertFalse(modulestore()._block_matches(block, {'definition_loaded': True}))
+        # The edit info is only built when it's matched
+        self.assertNotIsInstance(block._edit_info, EditInfo)
+
     def test_get_parents(self):
         '''
         get_parent_location(locator): BlockUsageLocator
@@ -0,0 +1,52 @@
+"""
+Tests of the conversion of split modulestore structures to and from mongo.
+"""
+import copy
+import pickle
+import unittest
+
+from xmodule.modulestore import BlockData, EditInfo
+from xmodule.modulestore.perf_tests.test_split_structure_load import make_mongo_structure
+from xmodule.modulestore.split_mongo import BlockKey
+from xmodule.modulestore.split_mongo.mongo_connection import structure_from_mongo, structure_to_mongo
+
+
+class TestStructureConversion(unittest.TestCase):
+    """
+    Tests of structure_from_mongo and structure_to_mongo.
+    """
+    def test_round_trip(self):
+        mongo_structure = make_mongo_structure(25)
+        structure = structure_from_mongo(copy.deepcopy(mongo_structure))
+
+        self.assertEqual(structure['root'], BlockKey('course', 'block0'))
+        self.assertEqual(len(structure['blocks']), 25)
+        self.assertEqual(
+            structure['blocks'][BlockKey('course', 'block0')].fields['children'][0],
+            BlockKey('vertical', 'block1')
+        )
+
+        stored = structure_to_mongo(structure)
+        for block in stored['blocks']:
+            if 'children' in block['fields']:
+                block['fields']['children'] = [list(child) for child in block['fields']['children']]
+        self.assertEqual(
+            sorted(stored['blocks'], key=lambda block: block['block_id']),
+            sorted(mongo_structure['blocks'], key=lambda block: block['block_id'])
+        )
+
+    def test_edit_info_is_lazy(self):
+        block = BlockData(fields={}, edit_info={'edited_by': 'test_user'})
+        self.assertNotIsInstance(block._edit_info, EditInfo)  # pylint: disable=protected-access
+
+        self.assertEqual(block.edit_info.edited_by, 'test_user')
+        block.edit_info.edited_by = 'other_user'
+        self.assertEqual(block.to_storable()['edit_info']['edited_by'], 'other_user')
+
+    def test_copy_and_pickle(self):
+        block = BlockData(fields={'display_name': 'Block'}, edit_info={'edited_by': 'test_user'})
+        block.definition_loaded = True
+
+        for copied in (copy.deepcopy(block), pickle.loads(pickle.dumps(block, pickle.HIGHEST_PROTOCOL))):
+            self.assertEqual(copied.to_storable(), block.to_storable())
+            self.assertTrue(copied.definition_loaded)
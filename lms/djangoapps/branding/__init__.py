@@ -1,24 +1,17 @@
-from xmodule.modulestore.django import modulestore
-from xmodule.course_module import CourseDescriptor
 from django.conf import settings
 
 from opaque_keys.edx.locations import SlashSeparatedCourseKey
 from microsite_configuration import microsite
+from openedx.core.djangoapps.content.course_overviews.models import CourseOverview
 
 
 def get_visible_courses():
     """
-    Return the set of CourseDescriptors that should be visible in this branded instance
+    Return the set of CourseOverviews that should be visible in this branded instance
     """
 
     filtered_by_org = microsite.get_value('course_org_filter')
 
-    _courses = modulestore().get_courses(org=filtered_by_org)
-
-    courses = [c for c in _courses
-               if isinstance(c, CourseDescriptor)]
-    courses = sorted(courses, key=lambda course: course.number)
-
     subdomain = microsite.get_value('subdomain', 'default')
 
     # See if we have filtered course listings in this domain
@@ -28,15 +21,20 @@ def get_visible_courses():
     if hasattr(settings, 'COURSE_LISTINGS') and subdomain in settings.COURSE_LISTINGS and not settings.DEBUG:
         filtered_visible_ids = frozenset([SlashSeparatedCourseKey.from_deprecated_string(c) for c in settings.COURSE_LISTINGS[subdomain]])
 
+    # The filtering is done by the database, on the overviews of the courses
+    courses = CourseOverview.objects.all()
     if filtered_by_org:
-        return [course for course in courses if course.location.org == filtered_by_org]
-    if filtered_visible_ids:
-        return [course for course in courses if course.id in filtered_visible_ids]
+        courses = courses.filter(org=filtered_by_org)
+    elif filtered_visible_ids:
+        courses = courses.filter(id__in=filtered_visible_ids)
     else:
         # Let's filter out any courses in an "org" that has been declared to be
         # in a Microsite
         org_filter_out_set = microsite.get_all_orgs()
-        return [course for course in courses if course.location.org not in org_filter_out_set]
+        if org_filter_out_set:
+            courses = courses.exclude(org__in=org_filter_out_set)
+
+    return sorted(courses, key=lambda course: course.number)
 
 
 def get_university_for_request():
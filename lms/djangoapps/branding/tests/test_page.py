@@ -242,3 +242,29 @@ class IndexPageCourseCardsSortingTests(ModuleStoreTestCase):
         self.assertEqual(context['courses'][0].id, self.starting_earlier.id)
         self.assertEqual(context['courses'][1].id, self.starting_later.id)
         self.assertEqual(context['courses'][2].id, self.course_with_default_start_date.id)
+
+    @patch('student.views.render_to_response', RENDER_MOCK)
+    @patch('courseware.views.render_to_response', RENDER_MOCK)
+    @override_settings(COURSE_CATALOG_PAGE_SIZE=2)
+    def test_course_cards_paginated(self):
+        response = self.client.get('/')
+        self.assertEqual(response.status_code, 200)
+        ((template, context), _) = RENDER_MOCK.call_args  # pylint: disable=unpacking-non-sequence
+        self.assertEqual(template, 'index.html')
+        self.assertEqual(
+            [course.id for course in context['courses']],
+            [self.starting_later.id, self.starting_earlier.id]
+        )
+        self.assertTrue(context['courses_page'].has_next())
+
+        response = self.client.get(reverse('branding.views.courses'), {'page': 2})
+        self.assertEqual(response.status_code, 200)
+        ((template, context), _) = RENDER_MOCK.call_args  # pylint: disable=unpacking-non-sequence
+        self.assertEqual(template, 'courseware/courses.html')
+        self.assertEqual([course.id for course in context['courses']], [self.course_with_default_start_date.id])
+        self.assertEqual(context['courses_page'].paginator.num_pages, 2)
+
+        # Out of range pages give the last page
+        self.client.get(reverse('branding.views.courses'), {'page': 5})
+        ((template, context), _) = RENDER_MOCK.call_args  # pylint: disable=unpacking-non-sequence
+        self.assertEqual(context['courses_page'].number, 2)
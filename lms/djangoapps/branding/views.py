@@ -81,7 +81,7 @@ def index(request):
 
 
 @ensure_csrf_cookie
-@cache_if_anonymous()
+@cache_if_anonymous('page')
 def courses(request):
     """
     Render the "find courses" page. If the marketing site is enabled, redirect
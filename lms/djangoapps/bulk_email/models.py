@@ -12,6 +12,9 @@ file and check it in at the same time as your model changes. To do that,
 
 """
 import logging
+import re
+from string import Formatter
+
 from django.conf import settings
 from django.contrib.auth.models import User
 from django.db import models, transaction
@@ -20,7 +23,7 @@ from openedx.core.lib.html_to_text import html_to_text
 from openedx.core.lib.mail_utils import wrap_message
 
 from xmodule_django.models import CourseKeyField
-from util.keyword_substitution import substitute_keywords_with_data
+from util.keyword_substitution import find_keywords, substitute_keywords_with_data
 
 log = logging.getLogger(__name__)
 
@@ -150,6 +153,9 @@ class Optout(models.Model):
 # the location where the email message body is to be inserted.
 COURSE_EMAIL_MESSAGE_BODY_TAG = '{{message_body}}'
 
+# Keys of the context of a course email whose values differ between its recipients.
+RECIPIENT_CONTEXT_KEYS = ('name', 'email', 'user_id')
+
 
 class CourseEmailTemplate(models.Model):
     """
@@ -228,6 +234,115 @@ class CourseEmailTemplate(models.Model):
         """
         return CourseEmailTemplate._render(self.html_template, htmltext, context)
 
+    def prerender_plaintext(self, plaintext, context):
+        """
+        Create plain text message, to be rendered for many recipients.
+
+        Returns a PrerenderedMessage of the plain text body (`plaintext`) in
+        the stored plain template, with the provided `context` dict.
+        """
+        return PrerenderedMessage(self.plain_template, plaintext, context)
+
+    def prerender_htmltext(self, htmltext, context):
+        """
+        Create HTML text message, to be rendered for many recipients.
+
+        Returns a PrerenderedMessage of the HTML text body (`htmltext`) in
+        the stored HTML template, with the provided `context` dict.
+        """
+        return PrerenderedMessage(self.html_template, htmltext, context)
+
+
+class PrerenderedMessage(object):
+    """
+    A course email message, rendered once for all of its recipients.
+
+    The values which differ between recipients (the RECIPIENT_CONTEXT_KEYS of
+    the context, and the %%KEYWORD%% values in the message body) are left as
+    placeholders, so that rendering the message for each recipient only takes
+    substituting them, and wrapping the lines they are on.  The result is the
+    same as that of CourseEmailTemplate._render.
+
+    Templates which format recipient values in other ways than inserting them
+    as they are (e.g. '{name:>20}') can't be rendered ahead: those messages
+    are rendered in full for each recipient.
+    """
+    def __init__(self, format_string, message_body, context):
+        self._format_string = format_string
+        self._message_body = message_body
+        self._context = context
+        self._lines = None
+        self._placeholders = {}
+        self._placeholder_re = None
+        self.keywords = []
+
+        if self._can_prerender(format_string):
+            self.keywords = find_keywords(message_body)
+            self._prerender()
+
+    @staticmethod
+    def _can_prerender(format_string):
+        """
+        Returns whether the template `format_string` inserts the recipient
+        values as they are.
+        """
+        for __, field_name, format_spec, conversion in Formatter().parse(format_string):
+            if field_name is None:
+                continue
+            name = re.split(r'[.\[]', field_name, 1)[0]
+            if name in RECIPIENT_CONTEXT_KEYS and (name != field_name or format_spec or conversion):
+                return False
+            if format_spec and '{' in format_spec:
+                return False
+        return True
+
+    def _prerender(self):
+        """
+        Render the message, with placeholders for the recipient values.
+        """
+        # Control characters can't be part of templates, bodies or context values
+        self._placeholders = {u'\x00{}\x00'.format(key): key for key in RECIPIENT_CONTEXT_KEYS + tuple(self.keywords)}
+        self._placeholder_re = re.compile(u'|'.join(re.escape(placeholder) for placeholder in self._placeholders))
+
+        context = dict(self._context)
+        message_body = self._message_body
+        for placeholder, key in self._placeholders.iteritems():
+            if key in self.keywords:
+                message_body = message_body.replace(key, placeholder)
+            else:
+                context[key] = placeholder
+
+        result = self._format_string.format(**context)
+        result = result.replace(COURSE_EMAIL_MESSAGE_BODY_TAG.format(), message_body, 1)
+
+        # Lines without placeholders are the same for all recipients, so they are wrapped once and for all.
+        self._lines = [
+            (line, True) if self._placeholder_re.search(line) else (wrap_message(line), False)
+            for line in result.split('\n')
+        ]
+
+    def render(self, values):
+        """
+        Return the message for one recipient.
+
+        `values` is a dict of the recipient's values of RECIPIENT_CONTEXT_KEYS,
+        and of `keywords` (see util.keyword_substitution.get_keyword_values).
+        """
+        if self._lines is None:
+            context = dict(self._context)
+            context.update(values)
+            return CourseEmailTemplate._render(self._format_string, self._message_body, context)  # pylint: disable=protected-access
+
+        placeholder_values = {
+            placeholder: u'{}'.format(values[key]) for placeholder, key in self._placeholders.iteritems()
+        }
+        lines = []
+        for line, has_placeholders in self._lines:
+            if has_placeholders:
+                line = wrap_message(self._placeholder_re.sub(lambda match: placeholder_values[match.group(0)], line))
+            lines.append(line)
+        return u'\n'.join(lines)
+
 
 class CourseAuthorization(models.Model):
     """
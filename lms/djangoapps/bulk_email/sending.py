@@ -0,0 +1,187 @@
+"""
+Sending of bulk email messages over a pool of persistent connections, with
+adaptive throttling of the messages sent to each recipient domain.
+"""
+import Queue
+import sys
+import threading
+import time
+
+import dogstats_wrapper as dog_stats_api
+
+
+def recipient_domain(address):
+    """
+    Return the domain of the email `address`, in lower case.
+    """
+    return address.rpartition('@')[2].lower()
+
+
+class DomainThrottle(object):
+    """
+    Paces the messages sent to each recipient domain, by how quickly the
+    domain accepts them.
+
+    Messages are not delayed at first.  Each time a domain refuses a message
+    because messages are being sent too quickly, the delay between messages
+    sent to that domain is doubled, starting at `min_delay`, up to `max_delay`
+    seconds.  Each message the domain accepts multiplies the delay by `decay`,
+    until it is short enough to be dropped.
+
+    A throttle is shared by all the threads sending messages in a process.
+    """
+    def __init__(self, min_delay, max_delay, decay=0.95):
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.decay = decay
+        self._lock = threading.Lock()
+        self._delays = {}
+        self._next_send_times = {}
+
+    def delay(self, domain):
+        """
+        Return the current delay between messages sent to `domain`, in seconds.
+        """
+        return self._delays.get(domain, 0)
+
+    def wait(self, domain):
+        """
+        Wait until a message can be sent to `domain`, and take its turn.
+        """
+        with self._lock:
+            delay = self._delays.get(domain)
+            if not delay:
+                return
+            now = time.time()
+            send_time = max(now, self._next_send_times.get(domain, 0))
+            self._next_send_times[domain] = send_time + delay
+        if send_time > now:
+            time.sleep(send_time - now)
+
+    def throttled(self, domain):
+        """
+        Slow down sending to `domain`, which refused a message because of the sending rate.
+        """
+        with self._lock:
+            delay = min(self.max_delay, max(self.min_delay, 2 * self._delays.get(domain, 0)))
+            if delay > 0:
+                self._delays[domain] = delay
+            else:
+                self._drop(domain)
+
+    def accepted(self, domain):
+        """
+        Speed up sending to `domain`, which accepted a message.
+        """
+        with self._lock:
+            delay = self._delays.get(domain)
+            if delay is None:
+                return
+            delay *= self.decay
+            if delay < self.min_delay / 2.0:
+                self._drop(domain)
+            else:
+                self._delays[domain] = delay
+
+    def _drop(self, domain):
+        """
+        Stop delaying the messages sent to `domain`.
+        """
+        self._delays.pop(domain, None)
+        self._next_send_times.pop(domain, None)
+
+
+class SendPool(object):
+    """
+    Sends email messages over `size` connections from `get_connection`,
+    which are opened once, and kept open until the pool is closed.
+
+    Each connection sends messages from its own thread, unless there is only
+    one connection: then messages are sent from the calling thread, as they
+    are submitted.  Every message submitted gives one result, which is a
+    (key, exc_info) tuple, where `key` identifies the message and `exc_info`
+    is the sys.exc_info() of the error raised sending it, or None.
+    """
+    def __init__(self, get_connection, size=1, throttle=None, tags=None):
+        self.size = max(1, size)
+        self.throttle = throttle
+        self.tags = tags
+        self._get_connection = get_connection
+        self._connections = []
+        self._threads = []
+        self._messages = Queue.Queue()
+        self._results = Queue.Queue()
+
+    def open(self):
+        """
+        Open the connections, and start their threads.
+        """
+        for __ in xrange(self.size):
+            connection = self._get_connection()
+            self._connections.append(connection)
+            connection.open()
+
+        if self.size > 1:
+            for connection in self._connections:
+                thread = threading.Thread(target=self._run, args=(connection,), name='bulk-email-send')
+                thread.daemon = True
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, key, message, domain):
+        """
+        Send `message` to a recipient in `domain`.
+        """
+        if self._threads:
+            self._messages.put((key, message, domain))
+        else:
+            self._results.put(self._send(self._connections[0], key, message, domain))
+
+    def next_result(self):
+        """
+        Wait for, and return, the result of the next message sent.
+        """
+        while True:
+            # Wait in short steps, so that the calling thread can still be interrupted
+            # (e.g. by the task's time limit), which it can't while waiting without a timeout.
+            try:
+                return self._results.get(timeout=1)
+            except Queue.Empty:
+                pass
+
+    def close(self):
+        """
+        Stop the threads, once they have sent the messages submitted, and close the connections.
+        """
+        for __ in self._threads:
+            self._messages.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+        connections, self._connections = self._connections, []
+        for connection in connections:
+            connection.close()
+
+    def _run(self, connection):
+        """
+        Send the submitted messages over `connection`, until the pool is closed.
+        """
+        while True:
+            submitted = self._messages.get()
+            if submitted is None:
+                return
+            self._results.put(self._send(connection, *submitted))
+
+    def _send(self, connection, key, message, domain):
+        """
+        Send `message` over `connection`, and return its result.
+        """
+        if self.throttle is not None:
+            self.throttle.wait(domain)
+        try:
+            with dog_stats_api.timer('course_email.single_send.time.overall', tags=self.tags):
+                connection.send_messages([message])
+        except Exception:  # pylint: disable=broad-except
+            return key, sys.exc_info()
+        return key, None
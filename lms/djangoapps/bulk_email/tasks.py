@@ -5,6 +5,7 @@ to a course.
 import re
 import random
 import json
+import sys
 from time import sleep
 from collections import Counter
 import logging
@@ -38,7 +39,8 @@ from bulk_email.models import (
     SEND_TO_MYSELF, SEND_TO_ALL, TO_OPTIONS,
     SEND_TO_STAFF,
 )
-from courseware.courses import get_course, course_image_url
+from bulk_email.sending import DomainThrottle, SendPool, recipient_domain
+from courseware.courses import get_course
 from student.roles import CourseStaffRole, CourseInstructorRole
 from instructor_task.models import InstructorTask
 from instructor_task.subtasks import (
@@ -47,7 +49,10 @@ from instructor_task.subtasks import (
     check_subtask_is_valid,
     update_subtask_status,
 )
+from util.keyword_substitution import get_keyword_values
 from util.query import use_read_replica_if_available
+from xmodule.modulestore.django import modulestore
+from openedx.core.lib.courses import course_image_url
 
 log = logging.getLogger('edx.celery.task')
 
@@ -92,6 +97,23 @@ BULK_EMAIL_FAILURE_ERRORS = (
     SMTPException,
 )
 
+# Throttle of the messages sent to each recipient domain, shared by all the
+# subtasks run by this process.  See _get_domain_throttle.
+_DOMAIN_THROTTLE = None
+
+
+def _get_domain_throttle():
+    """
+    Return the DomainThrottle of this process, creating it if needed.
+    """
+    global _DOMAIN_THROTTLE  # pylint: disable=global-statement
+    if _DOMAIN_THROTTLE is None:
+        _DOMAIN_THROTTLE = DomainThrottle(
+            settings.BULK_EMAIL_DOMAIN_THROTTLE_MIN_DELAY,
+            settings.BULK_EMAIL_DOMAIN_THROTTLE_MAX_DELAY,
+        )
+    return _DOMAIN_THROTTLE
+
 
 def _get_recipient_querysets(user_id, to_option, course_id):
     """
@@ -470,138 +492,200 @@ def _send_course_email(entry_id, email_id, to_list, global_email_context, subtas
 
     # use the CourseEmailTemplate that was associated with the CourseEmail
     course_email_template = course_email.get_template()
+
+    # Messages are sent in parallel over a pool of connections, which stay open for the
+    # whole subtask, pacing the messages sent to each domain by how quickly it accepts them.
+    pool = SendPool(
+        get_connection,
+        size=settings.BULK_EMAIL_SEND_CONCURRENCY,
+        throttle=_get_domain_throttle(),
+        tags=[_statsd_tag(course_title)],
+    )
     try:
-        connection = get_connection()
-        connection.open()
+        pool.open()
 
         # Define context values to use in all course emails:
         email_context = {'name': '', 'email': ''}
         email_context.update(global_email_context)
-
-        while to_list:
-            # Update context with user-specific values from the user at the end of the list.
-            # At the end of processing this user, they will be popped off of the to_list.
-            # That way, the to_list will always contain the recipients remaining to be emailed.
-            # This is convenient for retries, which will need to send to those who haven't
-            # yet been emailed, but not send to those who have already been sent to.
-            recipient_num += 1
-            current_recipient = to_list[-1]
-            email = current_recipient['email']
-            email_context['email'] = email
-            email_context['name'] = current_recipient['profile__name']
-            email_context['user_id'] = current_recipient['pk']
-            email_context['course_id'] = course_email.course_id
-
-            # Construct message content using templates and context:
-            plaintext_msg = course_email_template.render_plaintext(course_email.text_message, email_context)
-            html_msg = course_email_template.render_htmltext(course_email.html_message, email_context)
-
-            # Create email:
-            email_msg = EmailMultiAlternatives(
-                subject,
-                plaintext_msg,
-                from_addr,
-                [email],
-                connection=connection
-            )
-            email_msg.attach_alternative(html_msg, 'text/html')
-
-            # Throttle if we have gotten the rate limiter.  This is not very high-tech,
-            # but if a task has been retried for rate-limiting reasons, then we sleep
-            # for a period of time between all emails within this task.  Choice of
-            # the value depends on the number of workers that might be sending email in
-            # parallel, and what the SES throttle rate is.
-            if subtask_status.retried_nomax > 0:
-                sleep(settings.BULK_EMAIL_RETRY_DELAY_BETWEEN_SENDS)
-
-            try:
-                log.info(
-                    "BulkEmail ==> Task: %s, SubTask: %s, EmailId: %s, Recipient num: %s/%s, \
-                    Recipient name: %s, Email address: %s",
-                    parent_task_id,
-                    task_id,
-                    email_id,
-                    recipient_num,
-                    total_recipients,
-                    current_recipient['profile__name'],
-                    email
-                )
-                with dog_stats_api.timer('course_email.single_send.time.overall', tags=[_statsd_tag(course_title)]):
-                    connection.send_messages([email_msg])
-
-            except SMTPDataError as exc:
-                # According to SMTP spec, we'll retry error codes in the 4xx range.  5xx range indicates hard failure.
-                total_recipients_failed += 1
-                log.error(
-                    "BulkEmail ==> Status: Failed(SMTPDataError), Task: %s, SubTask: %s, EmailId: %s, \
-                    Recipient num: %s/%s, Email address: %s",
-                    parent_task_id,
-                    task_id,
-                    email_id,
-                    recipient_num,
-                    total_recipients,
-                    email
-                )
-                if exc.smtp_code >= 400 and exc.smtp_code < 500:
-                    # This will cause the outer handler to catch the exception and retry the entire task.
-                    raise exc
-                else:
-                    # This will fall through and not retry the message.
-                    log.warning(
-                        'BulkEmail ==> Task: %s, SubTask: %s, EmailId: %s, Recipient num: %s/%s, \
-                        Email not delivered to %s due to error %s',
+        email_context['course_id'] = course_email.course_id
+
+        # Render the messages once for all recipients, so that rendering them for each
+        # recipient only takes substituting the recipient's own values.  The users and
+        # course that %%KEYWORD%% values are computed from are fetched once too.
+        plaintext_template = course_email_template.prerender_plaintext(course_email.text_message, email_context)
+        html_template = course_email_template.prerender_htmltext(course_email.html_message, email_context)
+        keywords = set(plaintext_template.keywords + html_template.keywords)
+        if keywords:
+            users = User.objects.select_related('profile').in_bulk([recipient['pk'] for recipient in to_list])
+            course = modulestore().get_course(course_email.course_id, depth=0)
+
+        # Recipients are emailed starting from the end of the to_list, and are removed
+        # from it once they have been processed.  That way, the to_list will always contain
+        # the recipients remaining to be emailed.  This is convenient for retries, which will
+        # need to send to those who haven't yet been emailed, but not send to those who have
+        # already been sent to.
+        to_send = reversed(list(enumerate(to_list)))
+        in_flight = {}
+        processed = set()
+        # The sys.exc_info() of the first error which stops sending.  Messages already
+        # submitted are still accounted for before it is raised.
+        stop_exc_info = None
+        try:
+            while True:
+                while stop_exc_info is None and len(in_flight) < pool.size:
+                    try:
+                        index, current_recipient = next(to_send)
+                    except StopIteration:
+                        break
+
+                    recipient_num += 1
+                    recipient_email = current_recipient['email']
+                    try:
+                        # Construct message content using templates and the recipient's values:
+                        recipient_values = {
+                            'name': current_recipient['profile__name'],
+                            'email': recipient_email,
+                            'user_id': current_recipient['pk'],
+                        }
+                        if keywords:
+                            recipient_values.update(
+                                get_keyword_values(keywords, users.get(current_recipient['pk']), course)
+                            )
+                        plaintext_msg = plaintext_template.render(recipient_values)
+                        html_msg = html_template.render(recipient_values)
+
+                        # Create email:
+                        email_msg = EmailMultiAlternatives(
+                            subject,
+                            plaintext_msg,
+                            from_addr,
+                            [recipient_email],
+                        )
+                        email_msg.attach_alternative(html_msg, 'text/html')
+                    except Exception:  # pylint: disable=broad-except
+                        stop_exc_info = sys.exc_info()
+                        break
+
+                    # Throttle if we have gotten the rate limiter.  This is not very high-tech,
+                    # but if a task has been retried for rate-limiting reasons, then we sleep
+                    # for a period of time between all emails within this task.  Choice of
+                    # the value depends on the number of workers that might be sending email in
+                    # parallel, and what the SES throttle rate is.
+                    if subtask_status.retried_nomax > 0:
+                        sleep(settings.BULK_EMAIL_RETRY_DELAY_BETWEEN_SENDS)
+
+                    log.info(
+                        "BulkEmail ==> Task: %s, SubTask: %s, EmailId: %s, Recipient num: %s/%s, \
+                        Recipient name: %s, Email address: %s",
                         parent_task_id,
                         task_id,
                         email_id,
                         recipient_num,
                         total_recipients,
-                        email,
-                        exc.smtp_error
+                        current_recipient['profile__name'],
+                        recipient_email
+                    )
+                    in_flight[index] = recipient_num
+                    pool.submit(index, email_msg, recipient_domain(recipient_email))
+
+                if not in_flight:
+                    break
+
+                index, exc_info = pool.next_result()
+                current_recipient_num = in_flight.pop(index)
+                recipient_email = to_list[index]['email']
+                exc = exc_info[1] if exc_info else None
+
+                if isinstance(exc, SMTPDataError):
+                    # According to SMTP spec, we'll retry error codes in the 4xx range.  5xx range indicates
+                    # hard failure.
+                    total_recipients_failed += 1
+                    log.error(
+                        "BulkEmail ==> Status: Failed(SMTPDataError), Task: %s, SubTask: %s, EmailId: %s, \
+                        Recipient num: %s/%s, Email address: %s",
+                        parent_task_id,
+                        task_id,
+                        email_id,
+                        current_recipient_num,
+                        total_recipients,
+                        recipient_email
+                    )
+                    if exc.smtp_code >= 400 and exc.smtp_code < 500:
+                        # This will cause the outer handler to catch the exception and retry the entire task,
+                        # once the messages already submitted have been accounted for.
+                        _get_domain_throttle().throttled(recipient_domain(recipient_email))
+                        stop_exc_info = stop_exc_info or exc_info
+                        continue
+                    else:
+                        # This will fall through and not retry the message.
+                        log.warning(
+                            'BulkEmail ==> Task: %s, SubTask: %s, EmailId: %s, Recipient num: %s/%s, \
+                            Email not delivered to %s due to error %s',
+                            parent_task_id,
+                            task_id,
+                            email_id,
+                            current_recipient_num,
+                            total_recipients,
+                            recipient_email,
+                            exc.smtp_error
+                        )
+                        dog_stats_api.increment('course_email.error', tags=[_statsd_tag(course_title)])
+                        subtask_status.increment(failed=1)
+
+                elif isinstance(exc, SINGLE_EMAIL_FAILURE_ERRORS):
+                    # This will fall through and not retry the message.
+                    total_recipients_failed += 1
+                    log.error(
+                        "BulkEmail ==> Status: Failed(SINGLE_EMAIL_FAILURE_ERRORS), Task: %s, SubTask: %s, \
+                        EmailId: %s, Recipient num: %s/%s, Email address: %s, Exception: %s",
+                        parent_task_id,
+                        task_id,
+                        email_id,
+                        current_recipient_num,
+                        total_recipients,
+                        recipient_email,
+                        exc
                     )
                     dog_stats_api.increment('course_email.error', tags=[_statsd_tag(course_title)])
                     subtask_status.increment(failed=1)
 
-            except SINGLE_EMAIL_FAILURE_ERRORS as exc:
-                # This will fall through and not retry the message.
-                total_recipients_failed += 1
-                log.error(
-                    "BulkEmail ==> Status: Failed(SINGLE_EMAIL_FAILURE_ERRORS), Task: %s, SubTask: %s, \
-                    EmailId: %s, Recipient num: %s/%s, Email address: %s, Exception: %s",
-                    parent_task_id,
-                    task_id,
-                    email_id,
-                    recipient_num,
-                    total_recipients,
-                    email,
-                    exc
-                )
-                dog_stats_api.increment('course_email.error', tags=[_statsd_tag(course_title)])
-                subtask_status.increment(failed=1)
-
-            else:
-                total_recipients_successful += 1
-                log.info(
-                    "BulkEmail ==> Status: Success, Task: %s, SubTask: %s, EmailId: %s, \
-                    Recipient num: %s/%s, Email address: %s,",
-                    parent_task_id,
-                    task_id,
-                    email_id,
-                    recipient_num,
-                    total_recipients,
-                    email
-                )
-                dog_stats_api.increment('course_email.sent', tags=[_statsd_tag(course_title)])
-                if settings.BULK_EMAIL_LOG_SENT_EMAILS:
-                    log.info('Email with id %s sent to %s', email_id, email)
-                else:
-                    log.debug('Email with id %s sent to %s', email_id, email)
-                subtask_status.increment(succeeded=1)
+                elif exc is not None:
+                    # Errors like these stop the sending, and are handled by the outer handlers.
+                    if isinstance(exc, SESMaxSendingRateExceededError):
+                        _get_domain_throttle().throttled(recipient_domain(recipient_email))
+                    stop_exc_info = stop_exc_info or exc_info
+                    continue
 
-            # Pop the user that was emailed off the end of the list only once they have
-            # successfully been processed.  (That way, if there were a failure that
-            # needed to be retried, the user is still on the list.)
-            recipients_info[email] += 1
-            to_list.pop()
+                else:
+                    total_recipients_successful += 1
+                    _get_domain_throttle().accepted(recipient_domain(recipient_email))
+                    log.info(
+                        "BulkEmail ==> Status: Success, Task: %s, SubTask: %s, EmailId: %s, \
+                        Recipient num: %s/%s, Email address: %s,",
+                        parent_task_id,
+                        task_id,
+                        email_id,
+                        current_recipient_num,
+                        total_recipients,
+                        recipient_email
+                    )
+                    dog_stats_api.increment('course_email.sent', tags=[_statsd_tag(course_title)])
+                    if settings.BULK_EMAIL_LOG_SENT_EMAILS:
+                        log.info('Email with id %s sent to %s', email_id, recipient_email)
+                    else:
+                        log.debug('Email with id %s sent to %s', email_id, recipient_email)
+                    subtask_status.increment(succeeded=1)
+
+                # The recipient has been processed.  (If there were a failure that needed
+                # to be retried, the recipient is still on the list.)
+                recipients_info[recipient_email] += 1
+                processed.add(index)
+        finally:
+            # Remove the recipients who have been processed from the to_list.
+            to_list[:] = [recipient for index, recipient in enumerate(to_list) if index not in processed]
+
+        if stop_exc_info is not None:
+            raise stop_exc_info[0], stop_exc_info[1], stop_exc_info[2]
 
         log.info(
             "BulkEmail ==> Task: %s, SubTask: %s, EmailId: %s, Total Successful Recipients: %s/%s, \
@@ -680,7 +764,7 @@ def _send_course_email(entry_id, email_id, to_list, global_email_context, subtas
         return subtask_status, None
     finally:
         # Clean up at the end.
-        connection.close()
+        pool.close()
 
 
 def _get_current_task():
@@ -133,6 +133,43 @@ class CourseEmailTemplateTest(TestCase):
         context = self._get_sample_plain_context()
         template.render_plaintext("My new plain text.", context)
 
+    def test_prerender(self):
+        template = CourseEmailTemplate.get_template()
+        context = self._get_sample_html_context()
+        context['name'] = ''
+        prerendered_html = template.prerender_htmltext(u"My new html text, {name}.", context)
+        prerendered_plain = template.prerender_plaintext(u"My new plain text, {name}.", context)
+
+        for values in ({'name': u'Ann', 'email': 'ann@test.com', 'user_id': 1},
+                       {'name': u'B\xf6b\n' + 'b' * 1000, 'email': 'bob@test.com', 'user_id': 2}):
+            context.update(values)
+            self.assertEquals(
+                prerendered_html.render(values), template.render_htmltext(u"My new html text, {name}.", context)
+            )
+            self.assertEquals(
+                prerendered_plain.render(values), template.render_plaintext(u"My new plain text, {name}.", context)
+            )
+
+    def test_prerender_formatted_recipient_value(self):
+        template = CourseEmailTemplate(plain_template=u"Dear {name:>10},\n{{message_body}}")
+        prerendered = template.prerender_plaintext(u"My new plain text.", {'name': ''})
+        self.assertEquals(
+            prerendered.render({'name': u'Ann', 'email': 'ann@test.com', 'user_id': 1}),
+            u"Dear        Ann,\nMy new plain text."
+        )
+
+    @patch.dict('util.keyword_substitution.KEYWORD_FUNCTION_MAP', {'%%COURSE_DISPLAY_NAME%%': lambda user, course: ''})
+    def test_prerender_keywords(self):
+        template = CourseEmailTemplate(plain_template=u"Dear {name},\n{{message_body}}")
+        prerendered = template.prerender_plaintext(u"Welcome to %%COURSE_DISPLAY_NAME%%!", {'name': ''})
+        self.assertEquals(prerendered.keywords, ['%%COURSE_DISPLAY_NAME%%'])
+        self.assertEquals(
+            prerendered.render({
+                'name': u'Ann', 'email': 'ann@test.com', 'user_id': 1, '%%COURSE_DISPLAY_NAME%%': u'Bogus Course',
+            }),
+            u"Dear Ann,\nWelcome to Bogus Course!"
+        )
+
 
 class CourseAuthorizationTest(TestCase):
     """Test the CourseAuthorization model."""
@@ -0,0 +1,118 @@
+"""
+Unit tests for sending bulk email messages over a pool of connections.
+"""
+import threading
+import unittest
+
+from mock import Mock, patch
+
+from bulk_email.sending import DomainThrottle, SendPool, recipient_domain
+
+
+class DomainThrottleTest(unittest.TestCase):
+    """Test the adaptive throttling of the messages sent to a domain."""
+
+    def test_recipient_domain(self):
+        self.assertEquals(recipient_domain('Student@Example.COM'), 'example.com')
+
+    def test_throttling(self):
+        throttle = DomainThrottle(0.1, 0.3)
+        self.assertEquals(throttle.delay('example.com'), 0)
+
+        throttle.throttled('example.com')
+        self.assertEquals(throttle.delay('example.com'), 0.1)
+        throttle.throttled('example.com')
+        throttle.throttled('example.com')
+        self.assertEquals(throttle.delay('example.com'), 0.3)
+        # Other domains are not slowed down
+        self.assertEquals(throttle.delay('test.com'), 0)
+
+        # Each message accepted speeds sending up again, until it's no longer delayed
+        throttle.accepted('example.com')
+        self.assertAlmostEqual(throttle.delay('example.com'), 0.3 * 0.95)
+        for __ in xrange(100):
+            throttle.accepted('example.com')
+        self.assertEquals(throttle.delay('example.com'), 0)
+
+    def test_disabled(self):
+        throttle = DomainThrottle(0.1, 0)
+        throttle.throttled('example.com')
+        self.assertEquals(throttle.delay('example.com'), 0)
+
+    @patch('bulk_email.sending.time')
+    def test_wait(self, mock_time):
+        mock_time.time.return_value = 1000.0
+        throttle = DomainThrottle(0.1, 10)
+        throttle.wait('example.com')
+        self.assertFalse(mock_time.sleep.called)
+
+        throttle.throttled('example.com')
+        throttle.throttled('example.com')
+        # Each message waits for its turn, 0.2 seconds after the previous one
+        for __ in xrange(3):
+            throttle.wait('example.com')
+        delays = [args[0] for args, __ in mock_time.sleep.call_args_list]
+        self.assertEquals(len(delays), 2)
+        self.assertAlmostEqual(delays[0], 0.2)
+        self.assertAlmostEqual(delays[1], 0.4)
+
+
+class SendPoolTest(unittest.TestCase):
+    """Test sending messages over a pool of connections."""
+
+    def _send(self, pool, messages):
+        """Send `messages` over `pool`, and return their results by key."""
+        pool.open()
+        try:
+            for key, message in enumerate(messages):
+                pool.submit(key, message, 'example.com')
+            return dict(pool.next_result() for __ in messages)
+        finally:
+            pool.close()
+
+    def test_single_connection(self):
+        connection = Mock()
+        pool = SendPool(Mock(return_value=connection), size=1)
+        results = self._send(pool, ['first', 'second'])
+
+        self.assertEquals(results, {0: None, 1: None})
+        self.assertEquals(connection.open.call_count, 1)
+        self.assertEquals(connection.close.call_count, 1)
+        connection.send_messages.assert_any_call(['first'])
+        connection.send_messages.assert_any_call(['second'])
+
+    def test_many_connections(self):
+        connections = [Mock() for __ in xrange(4)]
+        senders = set()
+
+        def send_messages(messages):
+            """Fail on 'bad' messages, and record which thread sends each message."""
+            senders.add(threading.current_thread())
+            if messages == ['bad']:
+                raise ValueError('Cannot send bad message')
+
+        for connection in connections:
+            connection.send_messages.side_effect = send_messages
+        pool = SendPool(Mock(side_effect=connections), size=4, throttle=DomainThrottle(0.1, 0))
+        results = self._send(pool, ['good', 'bad'] * 10)
+
+        self.assertEquals(sorted(results), range(20))
+        for key, exc_info in results.iteritems():
+            if key % 2:
+                self.assertIsInstance(exc_info[1], ValueError)
+            else:
+                self.assertIsNone(exc_info)
+        self.assertNotIn(threading.current_thread(), senders)
+        self.assertEquals(sum(connection.send_messages.call_count for connection in connections), 20)
+        for connection in connections:
+            self.assertEquals(connection.open.call_count, 1)
+            self.assertEquals(connection.close.call_count, 1)
+
+    def test_open_error(self):
+        connection = Mock()
+        connection.open.side_effect = ValueError('Cannot connect')
+        pool = SendPool(Mock(return_value=connection), size=2)
+        with self.assertRaises(ValueError):
+            pool.open()
+        pool.close()
+        self.assertEquals(connection.close.call_count, 1)
@@ -6,6 +6,7 @@ paths actually work.
 
 """
 import json
+import threading
 from uuid import uuid4
 from itertools import cycle, chain, repeat
 from mock import patch, Mock
@@ -27,6 +28,7 @@ from celery.states import SUCCESS, FAILURE
 
 from django.conf import settings
 from django.core.management import call_command
+from django.test.utils import override_settings
 
 from bulk_email.models import CourseEmail, Optout, SEND_TO_ALL
 
@@ -374,6 +376,41 @@ class TestBulkEmailInstructorTask(InstructorTaskCourseTestCase):
     def test_retry_after_ses_throttling_error(self):
         self._test_retry_after_unlimited_retry_error(SESMaxSendingRateExceededError(455, "Throttling: Sending rate exceeded"))
 
+    @override_settings(BULK_EMAIL_SEND_CONCURRENCY=4)
+    def test_successful_concurrently(self):
+        num_emails = settings.BULK_EMAIL_EMAILS_PER_TASK
+        # We also send email to the instructor:
+        self._create_students(num_emails - 1)
+        with patch('bulk_email.tasks.get_connection', autospec=True) as get_conn:
+            get_conn.return_value.send_messages.side_effect = cycle([None])
+            self._test_run_with_task(send_bulk_course_email, 'emailed', num_emails, num_emails)
+            # Each connection is opened once, for all the messages sent over it.
+            self.assertEquals(get_conn.return_value.open.call_count, 4)
+            self.assertEquals(get_conn.return_value.send_messages.call_count, num_emails)
+
+    @override_settings(BULK_EMAIL_SEND_CONCURRENCY=4)
+    def test_retry_after_throttling_error_concurrently(self):
+        num_emails = 8
+        # We also send email to the instructor:
+        self._create_students(num_emails - 1)
+        throttled = []
+        lock = threading.Lock()
+
+        def send_messages(messages):
+            """Throttle the first message sent."""
+            with lock:
+                if not throttled:
+                    throttled.append(messages[0])
+                    raise SMTPDataError(455, "Throttling: Sending rate exceeded")
+
+        with patch('bulk_email.tasks.get_connection', autospec=True) as get_conn:
+            get_conn.return_value.send_messages.side_effect = send_messages
+            # Messages sent alongside the throttled one are not sent again on retry.
+            self._test_run_with_task(send_bulk_course_email, 'emailed', num_emails, num_emails, retried_nomax=1)
+            sent_to = [messages[0].to[0] for (messages,), __ in get_conn.return_value.send_messages.call_args_list]
+            self.assertEquals(len(sent_to), num_emails + 1)
+            self.assertEquals(len(set(sent_to)), num_emails)
+
     def _test_immediate_failure(self, exception):
         """Test that celery can hit a maximum number of retries."""
         # Doesn't really matter how many recipients, since we expect
@@ -0,0 +1,50 @@
+"""
+Rebuilds the counters of the Metrics tab of the instructor dashboard from the
+StudentModule table, e.g. when the tab is first enabled.
+"""
+import logging
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+from opaque_keys.edx.keys import CourseKey
+from xmodule.modulestore.django import modulestore
+
+from class_dashboard.models import ProblemGradeCount, SequentialOpenCount
+
+
+log = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    args = '<course_id course_id ...>'
+    help = 'Rebuilds the grade distribution and subsection counters of one or more courses.'
+
+    option_list = BaseCommand.option_list + (
+        make_option('--all',
+                    action='store_true',
+                    default=False,
+                    help='Rebuild the counters of all courses.'),
+    )
+
+    def handle(self, *args, **options):
+
+        if options['all']:
+            course_keys = [course.id for course in modulestore().get_courses()]
+        else:
+            course_keys = [CourseKey.from_string(arg) for arg in args]
+
+        if not course_keys:
+            log.fatal('No courses specified.')
+            return
+
+        log.info('Rebuilding the class dashboard counters of %d courses.', len(course_keys))
+
+        for course_key in course_keys:
+            try:
+                ProblemGradeCount.rebuild(course_key)
+                SequentialOpenCount.rebuild(course_key)
+            except Exception as ex:  # pylint: disable=broad-except
+                log.exception('An error occurred while rebuilding the class dashboard counters of %s: %s',
+                              unicode(course_key), ex.message)
+
+        log.info('Finished rebuilding the class dashboard counters.')
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+import datetime
+from south.db import db
+from south.v2 import SchemaMigration
+from django.db import models
+
+
+class Migration(SchemaMigration):
+
+    def forwards(self, orm):
+        # Removing unique constraint on 'SequentialOpenCount', fields ['course_id', 'module_state_key']
+        db.delete_unique('class_dashboard_sequentialopencount', ['course_id', 'module_id'])
+
+        # Removing unique constraint on 'ProblemGradeCount', fields ['course_id', 'module_state_key', 'grade', 'max_grade']
+        db.delete_unique('class_dashboard_problemgradecount', ['course_id', 'module_id', 'grade', 'max_grade'])
+
+        # Adding field 'ProblemGradeCount.shard'
+        db.add_column('class_dashboard_problemgradecount', 'shard',
+                      self.gf('django.db.models.fields.PositiveSmallIntegerField')(default=0),
+                      keep_default=False)
+
+        # Adding unique constraint on 'ProblemGradeCount', fields ['course_id', 'module_state_key', 'grade', 'max_grade', 'shard']
+        db.create_unique('class_dashboard_problemgradecount', ['course_id', 'module_id', 'grade', 'max_grade', 'shard'])
+
+        # Adding field 'SequentialOpenCount.shard'
+        db.add_column('class_dashboard_sequentialopencount', 'shard',
+                      self.gf('django.db.models.fields.PositiveSmallIntegerField')(default=0),
+                      keep_default=False)
+
+        # Adding unique constraint on 'SequentialOpenCount', fields ['course_id', 'module_state_key', 'shard']
+        db.create_unique('class_dashboard_sequentialopencount', ['course_id', 'module_id', 'shard'])
+
+    def backwards(self, orm):
+        # Removing unique constraint on 'SequentialOpenCount', fields ['course_id', 'module_state_key', 'shard']
+        db.delete_unique('class_dashboard_sequentialopencount', ['course_id', 'module_id', 'shard'])
+
+        # Removing unique constraint on 'ProblemGradeCount', fields ['course_id', 'module_state_key', 'grade', 'max_grade', 'shard']
+        db.delete_unique('class_dashboard_problemgradecount', ['course_id', 'module_id', 'grade', 'max_grade', 'shard'])
+
+        # Deleting field 'SequentialOpenCount.shard'
+        db.delete_column('class_dashboard_sequentialopencount', 'shard')
+
+        # Deleting field 'ProblemGradeCount.shard'
+        db.delete_column('class_dashboard_problemgradecount', 'shard')
+
+        # The counters have to be rebuilt (with rebuild_class_dashboard_counts), as their shards are merged
+        db.execute('DELETE FROM class_dashboard_problemgradecount')
+        db.execute('DELETE FROM class_dashboard_sequentialopencount')
+
+        # Adding unique constraint on 'ProblemGradeCount', fields ['course_id', 'module_state_key', 'grade', 'max_grade']
+        db.create_unique('class_dashboard_problemgradecount', ['course_id', 'module_id', 'grade', 'max_grade'])
+
+        # Adding unique constraint on 'SequentialOpenCount', fields ['course_id', 'module_state_key']
+        db.create_unique('class_dashboard_sequentialopencount', ['course_id', 'module_id'])
+
+    models = {
+        'class_dashboard.problemgradecount': {
+            'Meta': {'unique_together': "(('course_id', 'module_state_key', 'grade', 'max_grade', 'shard'),)", 'object_name': 'ProblemGradeCount'},
+            'count': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            'course_id': ('xmodule_django.models.CourseKeyField', [], {'max_length': '255', 'db_index': 'True'}),
+            'grade': ('django.db.models.fields.FloatField', [], {}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'max_grade': ('django.db.models.fields.FloatField', [], {'null': 'True'}),
+            'module_state_key': ('xmodule_django.models.LocationKeyField', [], {'max_length': '255', 'db_column': "'module_id'"}),
+            'shard': ('django.db.models.fields.PositiveSmallIntegerField', [], {'default': '0'})
+        },
+        'class_dashboard.sequentialopencount': {
+            'Meta': {'unique_together': "(('course_id', 'module_state_key', 'shard'),)", 'object_name': 'SequentialOpenCount'},
+            'count': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            'course_id': ('xmodule_django.models.CourseKeyField', [], {'max_length': '255', 'db_index': 'True'}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'module_state_key': ('xmodule_django.models.LocationKeyField', [], {'max_length': '255', 'db_column': "'module_id'"}),
+            'shard': ('django.db.models.fields.PositiveSmallIntegerField', [], {'default': '0'})
+        }
+    }
+
+    complete_apps = ['class_dashboard']
@@ -0,0 +1,144 @@
+"""
+Counters of the StudentModules of a course which the Metrics tab of the
+instructor dashboard displays, kept up to date as the StudentModules are
+saved and deleted (see signals.py), so that the tab doesn't need to
+aggregate the StudentModule table of the course on each page load.
+
+Each counter is split into COUNTER_SHARDS rows, which are updated at random,
+so that the students submitting the same problem at the same time don't wait
+for each other's lock on a single row; the counts are the sums of the shards.
+
+The counters of a course can be rebuilt from the StudentModule table with
+the rebuild_class_dashboard_counts management command.
+"""
+import random
+
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, F, Sum
+
+from courseware.models import StudentModule
+from xmodule_django.models import CourseKeyField, LocationKeyField
+
+# The number of rows each counter is split into
+COUNTER_SHARDS = 8
+
+
+class StudentModuleCount(models.Model):
+    """
+    A shard of a number of StudentModules of a course, which is updated atomically.
+
+    The concrete counters define count_student_modules, which computes their
+    counters from the StudentModule table.
+    """
+    class Meta(object):  # pylint: disable=missing-docstring
+        abstract = True
+
+    course_id = CourseKeyField(max_length=255, db_index=True)
+    module_state_key = LocationKeyField(max_length=255, db_column='module_id')
+    count = models.IntegerField(default=0)
+    shard = models.PositiveSmallIntegerField(default=0)
+
+    @classmethod
+    def add(cls, delta, **key):
+        """
+        Adds `delta` to a random shard of the counter identified by the fields
+        in `key`, creating it if needed.
+        """
+        key['shard'] = random.randrange(COUNTER_SHARDS)
+        if cls.objects.filter(**key).update(count=F('count') + delta):
+            return
+        try:
+            cls.objects.create(count=delta, **key)
+        except IntegrityError:
+            # Another process created the counter at the same time
+            cls.objects.filter(**key).update(count=F('count') + delta)
+
+    @classmethod
+    def totals(cls, *fields, **filters):
+        """
+        Returns the values of `fields` of the counters matching `filters`, with
+        the `total` of their shards, for the counters whose total is positive.
+        """
+        return cls.objects.filter(**filters).values(*fields).annotate(total=Sum('count')).filter(total__gt=0)
+
+    @classmethod
+    @transaction.commit_on_success
+    def rebuild(cls, course_id):
+        """
+        Replaces the counters of the course with `course_id` with ones
+        computed from the StudentModule table.
+
+        count_student_modules locks the StudentModules it counts, so that
+        the requests changing them, which update the counters in the same
+        transaction, finish before they are counted, or wait until the
+        counters are replaced.
+        """
+        counters = cls.count_student_modules(course_id)  # pylint: disable=no-member
+        cls.objects.filter(course_id=course_id).delete()
+        cls.objects.bulk_create(counters)
+
+
+class ProblemGradeCount(StudentModuleCount):
+    """
+    The number of students with a given grade, out of a given max_grade, on a
+    problem.
+    """
+    class Meta(object):  # pylint: disable=missing-docstring
+        unique_together = (('course_id', 'module_state_key', 'grade', 'max_grade', 'shard'),)
+
+    grade = models.FloatField()
+    max_grade = models.FloatField(null=True)
+
+    @classmethod
+    def count_student_modules(cls, course_id):
+        """
+        Returns the counters of the course with `course_id`, computed from
+        the StudentModule table (not saved), locking the StudentModules counted.
+        """
+        rows = StudentModule.objects.select_for_update().filter(
+            course_id=course_id,
+            grade__isnull=False,
+            module_type="problem",
+        ).values('module_state_key', 'grade', 'max_grade').annotate(count_grade=Count('grade'))
+        return [
+            cls(
+                course_id=course_id,
+                module_state_key=course_id.make_usage_key_from_deprecated_string(row['module_state_key']),
+                grade=row['grade'],
+                max_grade=row['max_grade'],
+                count=row['count_grade'],
+            )
+            for row in rows
+        ]
+
+
+class SequentialOpenCount(StudentModuleCount):
+    """
+    The number of students who opened a subsection.
+    """
+    class Meta(object):  # pylint: disable=missing-docstring
+        unique_together = (('course_id', 'module_state_key', 'shard'),)
+
+    @classmethod
+    def count_student_modules(cls, course_id):
+        """
+        Returns the counters of the course with `course_id`, computed from
+        the StudentModule table (not saved), locking the StudentModules counted.
+        """
+        rows = StudentModule.objects.select_for_update().filter(
+            course_id=course_id,
+            module_type="sequential",
+        ).values('module_state_key').annotate(count_sequential=Count('module_state_key'))
+        return [
+            cls(
+                course_id=course_id,
+                module_state_key=course_id.make_usage_key_from_deprecated_string(row['module_state_key']),
+                count=row['count_sequential'],
+            )
+            for row in rows
+        ]
+
+
+# Signals must be imported in a file that is automatically loaded at app startup (e.g. models.py). We import them
+# at the end of this file to avoid circular dependencies.
+import signals  # pylint: disable=unused-import
@@ -0,0 +1,63 @@
+"""
+Signal handlers keeping the counters of the Metrics tab up to date with the
+StudentModules.
+"""
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch.dispatcher import receiver
+
+from courseware.models import StudentModule
+
+
+def _counted_grade(student_module):
+    """
+    Returns the (grade, max_grade) of `student_module` as it is counted.
+    """
+    return (student_module.grade, student_module.max_grade)
+
+
+def _add_to_counts(student_module, grade, delta):
+    """
+    Adds `delta` to the counter of `student_module`, a problem or a
+    subsection, with `grade` (a (grade, max_grade) pair) for a problem.
+    """
+    from .models import ProblemGradeCount, SequentialOpenCount
+
+    key = {
+        'course_id': student_module.course_id,
+        'module_state_key': student_module.module_state_key.map_into_course(student_module.course_id),
+    }
+    if student_module.module_type == 'sequential':
+        SequentialOpenCount.add(delta, **key)
+    elif student_module.module_type == 'problem' and grade[0] is not None:
+        ProblemGradeCount.add(delta, grade=grade[0], max_grade=grade[1], **key)
+
+
+@receiver(post_init, sender=StudentModule)
+def remember_counted_grade(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Remembers the grade of a StudentModule which is counted, to move it to
+    another counter if it changes.
+    """
+    instance._counted_grade = _counted_grade(instance)  # pylint: disable=protected-access
+
+
+@receiver(post_save, sender=StudentModule)
+def count_saved_student_module(sender, instance, created, **kwargs):  # pylint: disable=unused-argument
+    """
+    Counts a new StudentModule, or moves it to the counter of its new grade.
+    """
+    grade = _counted_grade(instance)
+    if created:
+        _add_to_counts(instance, grade, 1)
+    elif instance.module_type == 'problem' and grade != instance._counted_grade:  # pylint: disable=protected-access
+        _add_to_counts(instance, instance._counted_grade, -1)  # pylint: disable=protected-access
+        _add_to_counts(instance, grade, 1)
+    instance._counted_grade = grade  # pylint: disable=protected-access
+
+
+@receiver(post_delete, sender=StudentModule)
+def uncount_deleted_student_module(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Removes a deleted StudentModule from its counter.
+    """
+    _add_to_counts(instance, instance._counted_grade, -1)  # pylint: disable=protected-access
@@ -0,0 +1,90 @@
+"""
+Tests for the counters of the Metrics tab of the instructor dashboard
+"""
+from django.core.management import call_command
+from django.test import TestCase
+from mock import patch
+
+from courseware.models import StudentModule
+from courseware.tests.factories import StudentModuleFactory
+from opaque_keys.edx.locations import SlashSeparatedCourseKey
+
+from class_dashboard.models import ProblemGradeCount, SequentialOpenCount
+
+
+class TestStudentModuleCounts(TestCase):
+    """
+    Tests that the counters follow the StudentModules.
+    """
+    def setUp(self):
+        super(TestStudentModuleCounts, self).setUp()
+        self.course_id = SlashSeparatedCourseKey('edX', 'counts', 'run')
+        self.problem = self.course_id.make_usage_key('problem', 'problem')
+        self.sequential = self.course_id.make_usage_key('sequential', 'sequential')
+
+    def grade_counts(self):
+        """
+        Returns the non-zero grade counters of the problem, by (grade, max_grade).
+        """
+        return {
+            (row['grade'], row['max_grade']): row['total']
+            for row in ProblemGradeCount.totals('grade', 'max_grade', module_state_key=self.problem)
+        }
+
+    def create_problem_module(self, grade, max_grade=2):
+        """
+        Creates the StudentModule of a student on the problem.
+        """
+        return StudentModuleFactory.create(
+            course_id=self.course_id, module_state_key=self.problem, grade=grade, max_grade=max_grade,
+        )
+
+    def test_counted_on_creation(self):
+        for grade in (0, 1, 1, None):
+            self.create_problem_module(grade)
+        for __ in range(3):
+            StudentModuleFactory.create(
+                course_id=self.course_id, module_state_key=self.sequential, module_type='sequential',
+            )
+
+        self.assertEqual(self.grade_counts(), {(0, 2): 1, (1, 2): 2})
+        self.assertEqual(
+            [row['total'] for row in SequentialOpenCount.totals('module_state_key', module_state_key=self.sequential)],
+            [3]
+        )
+
+    def test_moved_on_grade_change(self):
+        module = self.create_problem_module(None)
+        self.assertEqual(self.grade_counts(), {})
+
+        module.grade = 1
+        module.save()
+        self.assertEqual(self.grade_counts(), {(1, 2): 1})
+
+        # Also when the module is read again
+        module = StudentModule.objects.get(id=module.id)
+        module.grade = 2
+        module.save()
+        module.save()
+        self.assertEqual(self.grade_counts(), {(2, 2): 1})
+
+    def test_uncounted_on_delete(self):
+        self.create_problem_module(1)
+        self.create_problem_module(1)
+        StudentModule.objects.filter(module_state_key=self.problem).delete()
+        self.assertEqual(self.grade_counts(), {})
+
+    def test_spread_over_shards(self):
+        with patch('class_dashboard.models.random.randrange', side_effect=[0, 1, 2, 3]):
+            for __ in range(4):
+                self.create_problem_module(1)
+        self.assertEqual(ProblemGradeCount.objects.filter(module_state_key=self.problem).count(), 4)
+        self.assertEqual(self.grade_counts(), {(1, 2): 4})
+
+    def test_rebuild(self):
+        for grade in (0, 1, 1):
+            self.create_problem_module(grade)
+        StudentModule.objects.filter(grade=0).update(grade=2)
+
+        call_command('rebuild_class_dashboard_counts', self.course_id.to_deprecated_string())
+        self.assertEqual(self.grade_counts(), {(1, 2): 2, (2, 2): 1})
@@ -5,10 +5,14 @@ like DISABLE_START_DATES
 """
 import logging
 from datetime import datetime, timedelta
+from functools import partial
 import pytz
 
+from crum import get_current_request
 from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
 from django.utils.timezone import UTC
 
 from opaque_keys.edx.keys import CourseKey, UsageKey
@@ -24,9 +28,12 @@ from xmodule.split_test_module import get_split_user_partitions
 from xmodule.partitions.partitions import NoSuchUserPartitionError, NoSuchUserPartitionGroupError
 
 from external_auth.models import ExternalAuthMap
-from courseware.masquerade import get_masquerade_role, is_masquerading_as_student
+from courseware.masquerade import get_course_masquerade, get_masquerade_role, is_masquerading_as_student
+from openedx.core.djangoapps.content.course_overviews.models import CourseOverview
+from openedx.core.djangoapps.course_groups.models import CourseUserGroup, CourseUserGroupPartitionGroup
+from request_cache.middleware import RequestCache
 from student import auth
-from student.models import CourseEnrollment, CourseEnrollmentAllowed
+from student.models import CourseAccessRole, CourseEnrollment, CourseEnrollmentAllowed
 from student.roles import (
     GlobalStaff, CourseStaffRole, CourseInstructorRole,
     OrgStaffRole, OrgInstructorRole, CourseBetaTesterRole
@@ -37,6 +44,9 @@ import dogstats_wrapper as dog_stats_api
 
 DEBUG_ACCESS = False
 
+# Key of the access decisions memoized in the request cache
+ACCESS_REQUEST_CACHE_KEY = 'courseware.access'
+
 log = logging.getLogger(__name__)
 
 
@@ -61,8 +71,8 @@ def has_access(user, action, obj, course_key=None):
     user: a Django user object. May be anonymous. If none is passed,
                     anonymous is assumed
 
-    obj: The object to check access for.  A module, descriptor, location, or
-                    certain special strings (e.g. 'global')
+    obj: The object to check access for.  A module, descriptor, course overview,
+                    location, or certain special strings (e.g. 'global')
 
     action: A string specifying the action that the client is trying to perform.
 
@@ -82,7 +92,7 @@ def has_access(user, action, obj, course_key=None):
 
     # delegate the work to type-specific functions.
     # (start with more specific types, then get more general)
-    if isinstance(obj, CourseDescriptor):
+    if isinstance(obj, (CourseDescriptor, CourseOverview)):
         return _has_access_course_desc(user, action, obj)
 
     if isinstance(obj, ErrorDescriptor):
@@ -380,10 +390,9 @@ def _has_group_access(descriptor, user, course_key):
     # look up the user's group for each partition
     user_groups = {}
     for partition, groups in partition_groups:
-        user_groups[partition.id] = partition.scheme.get_group_for_user(
-            course_key,
-            user,
-            partition,
+        user_groups[partition.id] = _memoize(
+            ('group', user.id, unicode(course_key), partition.id, _masquerade_key(user, course_key)),
+            partial(partition.scheme.get_group_for_user, course_key, user, partition),
         )
 
     # finally: check that the user has a satisfactory group assignment
@@ -453,7 +462,11 @@ def _has_access_descriptor(user, action, descriptor, course_key=None):
         'instructor': lambda: _has_instructor_access_to_descriptor(user, descriptor, course_key)
     }
 
-    return _dispatch(checkers, action, user, descriptor)
+    return _memoize(
+        ('descriptor', user.id, action, unicode(descriptor.location), unicode(course_key),
+         _masquerade_key(user, course_key)),
+        partial(_dispatch, checkers, action, user, descriptor),
+    )
 
 
 def _has_access_xmodule(user, action, xmodule, course_key):
@@ -573,7 +586,11 @@ def _adjust_start_date_for_beta_testers(user, descriptor, course_key=None):  # p
         # bail early if no beta testing is set up
         return descriptor.start
 
-    if CourseBetaTesterRole(course_key).has_user(user):
+    is_beta_tester = _memoize(
+        ('beta_tester', user.id, unicode(course_key)),
+        partial(CourseBetaTesterRole(course_key).has_user, user),
+    )
+    if is_beta_tester:
         debug("Adjust start time: user in beta role for %s", descriptor)
         delta = timedelta(descriptor.days_early_for_beta)
         effective = descriptor.start - delta
@@ -619,21 +636,16 @@ def _has_access_to_course(user, access_level, course_key):
         debug("Deny: unknown access level")
         return False
 
-    staff_access = (
-        CourseStaffRole(course_key).has_user(user) or
-        OrgStaffRole(course_key.org).has_user(user)
+    access_levels = _memoize(
+        ('course_roles', user.id, unicode(course_key)),
+        partial(_course_access_levels, user, course_key),
     )
 
-    if staff_access and access_level == 'staff':
+    if 'staff' in access_levels and access_level == 'staff':
         debug("Allow: user has course staff access")
         return True
 
-    instructor_access = (
-        CourseInstructorRole(course_key).has_user(user) or
-        OrgInstructorRole(course_key.org).has_user(user)
-    )
-
-    if instructor_access and access_level in ('staff', 'instructor'):
+    if 'instructor' in access_levels and access_level in ('staff', 'instructor'):
         debug("Allow: user has course instructor access")
         return True
 
@@ -641,6 +653,64 @@ def _has_access_to_course(user, access_level, course_key):
     return False
 
 
+def _course_access_levels(user, course_key):
+    """
+    Returns the set of the access levels ('staff' and/or 'instructor') which
+    the roles of the user give them in the course with the given course_key.
+    """
+    access_levels = set()
+    if CourseStaffRole(course_key).has_user(user) or OrgStaffRole(course_key.org).has_user(user):
+        access_levels.add('staff')
+    if CourseInstructorRole(course_key).has_user(user) or OrgInstructorRole(course_key.org).has_user(user):
+        access_levels.add('instructor')
+    return access_levels
+
+
+def _memoize(key, compute):
+    """
+    Returns the result of compute(), memoized under `key` for the rest of the
+    current request, when COURSEWARE_ACCESS_REQUEST_CACHE is enabled.
+
+    Rendering a course outline checks the access to every block, with the same
+    roles and group assignments of the user each time, so each of those is
+    only looked up once per request. Decisions are never memoized outside of
+    requests (e.g. in celery tasks), where the request cache is never cleared.
+    """
+    if not settings.COURSEWARE_ACCESS_REQUEST_CACHE or get_current_request() is None:
+        return compute()
+
+    memo = RequestCache.get_request_cache().data.setdefault(ACCESS_REQUEST_CACHE_KEY, {})
+    try:
+        return memo[key]
+    except KeyError:
+        result = memo[key] = compute()
+        return result
+
+
+def _masquerade_key(user, course_key):
+    """
+    Returns a hashable summary of the user's masquerade in the course, which
+    access decisions memoized for the user depend on.
+    """
+    course_masquerade = get_course_masquerade(user, course_key)
+    if course_masquerade is None:
+        return None
+    return (course_masquerade.role, course_masquerade.group_id, course_masquerade.user_partition_id)
+
+
+@receiver(post_save, sender=CourseAccessRole)
+@receiver(post_delete, sender=CourseAccessRole)
+@receiver(post_save, sender=CourseUserGroupPartitionGroup)
+@receiver(post_delete, sender=CourseUserGroupPartitionGroup)
+@receiver(m2m_changed, sender=CourseUserGroup.users.through)
+def clear_memoized_access(sender, **kwargs):  # pylint: disable=unused-argument
+    """
+    Forgets the access decisions memoized during the current request, once
+    roles or cohorts change (e.g. in the instructor dashboard).
+    """
+    RequestCache.get_request_cache().data.pop(ACCESS_REQUEST_CACHE_KEY, None)
+
+
 def _has_instructor_access_to_descriptor(user, descriptor, course_key):  # pylint: disable=invalid-name
     """Helper method that checks whether the user has staff access to
     the course of the location.
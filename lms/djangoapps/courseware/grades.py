@@ -1,13 +1,16 @@
 # Compute grades using real division, with no integer truncation
 from __future__ import division
 from collections import defaultdict
+import hashlib
 import json
 import random
 import logging
+import re
 
 from contextlib import contextmanager
+from itertools import islice
 from django.conf import settings
-from django.db import transaction
+from django.db import transaction, IntegrityError
 from django.test.client import RequestFactory
 
 import dogstats_wrapper as dog_stats_api
@@ -19,17 +22,25 @@ from util.module_utils import yield_dynamic_descriptor_descendents
 from xmodule import graders
 from xmodule.graders import Score
 from xmodule.modulestore.django import modulestore
-from xmodule.modulestore.exceptions import ItemNotFoundError
 from xmodule.util.duedate import get_extended_due_date
-from .models import StudentModule
+from xblock.fields import Scope
+from .models import StudentModule, StudentSubsectionScore
 from .module_render import get_module_for_descriptor
 from submissions import api as sub_api  # installed from the edx-submissions repository
 from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import UsageKey
 
 
 log = logging.getLogger("edx.courseware")
 
 
+# The number of StudentModule rows read at a time by count_submitted_answers
+ANSWER_DISTRIBUTION_CHUNK_SIZE = 2000
+
+# Where the student answers start in the JSON of the state of a problem
+STUDENT_ANSWERS_RE = re.compile(r'"student_answers"\s*:\s*')
+
+
 def answer_distributions(course_key):
     """
     Given a course_key, return answer distributions in the form of a dictionary
@@ -57,46 +68,98 @@ def answer_distributions(course_key):
     not be aware of problems that are not visible to the user being used to
     generate the report.
 
+    The answers are counted by count_submitted_answers, which can also count
+    them in parts (e.g. in separate workers, see answer_distribution_id_ranges),
+    to be merged by merge_answer_counts and named by name_answer_counts.
+
     This method will try to use a read-replica database if one is available.
     """
-    # dict: { module.module_state_key : (url_name, display_name) }
-    state_keys_to_problem_info = {}  # For caching, used by url_and_display_name
+    return name_answer_counts(course_key, count_submitted_answers(course_key))
 
-    def url_and_display_name(usage_key):
-        """
-        For a given usage_key, return the problem's url and display_name.
-        Handle modulestore access and caching. This method ignores permissions.
 
-        Raises:
-            InvalidKeyError: if the usage_key does not parse
-            ItemNotFoundError: if there is no content that corresponds
-                to this usage_key.
-        """
-        problem_store = modulestore()
-        if usage_key not in state_keys_to_problem_info:
-            problem = problem_store.get_item(usage_key)
-            problem_info = (problem.url_name, problem.display_name_with_default)
-            state_keys_to_problem_info[usage_key] = problem_info
+def answer_distribution_id_ranges(course_key, chunk_size=ANSWER_DISTRIBUTION_CHUNK_SIZE):
+    """
+    Returns a list of (first_id, last_id) ranges of StudentModule ids which
+    together cover all the problems submitted in the course with
+    `course_key`, with up to `chunk_size` submitted problems in each range.
+
+    The answers in each range can be counted separately by
+    count_submitted_answers.
+    """
+    ids = StudentModule.all_submitted_problems_read_only(course_key).order_by('id').values_list('id', flat=True)
+    ranges = []
+    first_id = 0
+    while True:
+        chunk_ids = list(ids.filter(id__gte=first_id)[:chunk_size])
+        if not chunk_ids:
+            return ranges
+        ranges.append((chunk_ids[0], chunk_ids[-1]))
+        first_id = chunk_ids[-1] + 1
+
+
+def _student_answers(state):
+    """
+    Returns the student answers in the JSON `state` of a problem, decoding
+    only them rather than the whole state.
+
+    Raises ValueError if they cannot be decoded.
+    """
+    if not state:
+        return {}
+    # Answers are only stored under answer ids, which never contain quotes,
+    # so the first match is the top-level key.
+    match = STUDENT_ANSWERS_RE.search(state)
+    if match is None:
+        return {}
+    raw_answers = json.JSONDecoder().raw_decode(state, match.end())[0]
+    return raw_answers if isinstance(raw_answers, dict) else {}
+
+
+def count_submitted_answers(course_key, first_id=None, last_id=None, chunk_size=ANSWER_DISTRIBUTION_CHUNK_SIZE):
+    """
+    Returns the number of times each answer was submitted to the problems of
+    the course with `course_key`, as a dictionary mapping:
+
+      (problem usage key, problem_id) -> {dict: answer -> count}
 
-        return state_keys_to_problem_info[usage_key]
+    Only the StudentModules with ids between `first_id` and `last_id` (both
+    included, if given) are counted. They are read `chunk_size` rows at a
+    time, so that they are never all in memory at once.
+    """
+    queryset = StudentModule.all_submitted_problems_read_only(course_key).order_by('id')
+    if last_id is not None:
+        queryset = queryset.filter(id__lte=last_id)
+    rows = queryset.values_list('id', 'student_id', 'module_state_key', 'state')
 
-    # Iterate through all problems submitted for this course in no particular
-    # order, and build up our answer_counts dict that we will eventually return
     answer_counts = defaultdict(lambda: defaultdict(int))
-    for module in StudentModule.all_submitted_problems_read_only(course_key):
-        try:
-            state_dict = json.loads(module.state) if module.state else {}
-            raw_answers = state_dict.get("student_answers", {})
-        except ValueError:
-            log.error(
-                u"Answer Distribution: Could not parse module state for StudentModule id=%s, course=%s",
-                module.id,
-                course_key,
-            )
-            continue
+    next_id = first_id or 0
+    while True:
+        chunk = list(rows.filter(id__gte=next_id)[:chunk_size])
+        if not chunk:
+            return answer_counts
+        next_id = chunk[-1][0] + 1
+
+        for module_id, student_id, module_state_key, state in chunk:
+            try:
+                raw_answers = _student_answers(state)
+            except ValueError:
+                log.error(
+                    u"Answer Distribution: Could not parse module state for StudentModule id=%s, course=%s",
+                    module_id,
+                    course_key,
+                )
+                continue
+
+            try:
+                usage_key = UsageKey.from_string(module_state_key).map_into_course(course_key)
+            except InvalidKeyError:
+                log.warning(
+                    u"Answer Distribution: Invalid key %s in StudentModule %s for user %s in course %s; "
+                    u"This answer will be omitted from the answer distribution CSV.",
+                    module_state_key, module_id, student_id, course_key
+                )
+                continue
 
-        try:
-            url, display_name = url_and_display_name(module.module_state_key.map_into_course(course_key))
             # Each problem part has an ID that is derived from the
             # module.module_state_key (with some suffix appended)
             for problem_part_id, raw_answer in raw_answers.items():
@@ -105,33 +168,67 @@ def answer_distributions(course_key):
                 # unicode and not str -- state comes from the json decoder, and that
                 # always returns unicode for strings.
                 answer = unicode(raw_answer)
-                answer_counts[(url, display_name, problem_part_id)][answer] += 1
-
-        except (ItemNotFoundError, InvalidKeyError):
-            msg = "Answer Distribution: Item {} referenced in StudentModule {} " + \
-                  "for user {} in course {} not found; " + \
-                  "This can happen if a student answered a question that " + \
-                  "was later deleted from the course. This answer will be " + \
-                  "omitted from the answer distribution CSV."
+                answer_counts[(usage_key, problem_part_id)][answer] += 1
+
+
+def merge_answer_counts(partial_answer_counts):
+    """
+    Returns the sum of the answer counts in `partial_answer_counts`, as
+    returned by count_submitted_answers.
+    """
+    answer_counts = defaultdict(lambda: defaultdict(int))
+    for partial_counts in partial_answer_counts:
+        for problem_part, counts in partial_counts.iteritems():
+            for answer, count in counts.iteritems():
+                answer_counts[problem_part][answer] += count
+    return answer_counts
+
+
+def name_answer_counts(course_key, answer_counts):
+    """
+    Returns the answer distributions of the course with `course_key` (see
+    answer_distributions), from its `answer_counts` (see
+    count_submitted_answers).
+
+    The url names and display names of all the problems of the course are
+    read at once.  Answers to problems which are no longer in the course are
+    left out.
+    """
+    if not answer_counts:
+        return {}
+    problem_names = {
+        (problem.location.block_type, problem.location.block_id): (problem.url_name, problem.display_name_with_default)
+        for problem in modulestore().get_items(course_key, qualifiers={'category': 'problem'})
+    }
+
+    distributions = {}
+    for (usage_key, problem_part_id), counts in answer_counts.iteritems():
+        names = problem_names.get((usage_key.block_type, usage_key.block_id))
+        if names is None:
             log.warning(
-                msg.format(module.module_state_key, module.id, module.student_id, course_key)
+                u"Answer Distribution: Item %s in course %s not found; "
+                u"This can happen if a student answered a question that "
+                u"was later deleted from the course. These answers will be "
+                u"omitted from the answer distribution CSV.",
+                usage_key, course_key
             )
             continue
-
-    return answer_counts
+        url, display_name = names
+        distributions[(url, display_name, problem_part_id)] = counts
+    return distributions
 
 
 @transaction.commit_manually
-def grade(student, request, course, keep_raw_scores=False):
+def grade(student, request, course, keep_raw_scores=False, prefetched_scores=None):
     """
     Wraps "_grade" with the manual_transaction context manager just in case
     there are unanticipated errors.
     """
     with manual_transaction():
-        return _grade(student, request, course, keep_raw_scores)
+        return _grade(student, request, course, keep_raw_scores, prefetched_scores)
 
 
-def _grade(student, request, course, keep_raw_scores):
+def _grade(student, request, course, keep_raw_scores, prefetched_scores=None):
     """
     Unwrapped version of "grade"
 
@@ -150,17 +247,27 @@ def _grade(student, request, course, keep_raw_scores):
     - keep_raw_scores : if True, then value for key 'raw_scores' contains scores
       for every graded module
 
+    If `prefetched_scores` (a `PrefetchedScores` including this student) is
+    given, the student's scores are read from it instead of being queried.
+
     More information on the format is in the docstring for CourseGrader.
     """
     grading_context = course.grading_context
     raw_scores = []
 
-    # Dict of item_ids -> (earned, possible) point tuples. This *only* grabs
-    # scores that were registered with the submissions API, which for the moment
-    # means only openassessment (edx-ora2)
-    submissions_scores = sub_api.get_scores(
-        course.id.to_deprecated_string(), anonymous_id_for_user(student, course.id)
-    )
+    if prefetched_scores is not None:
+        submissions_scores = prefetched_scores.submissions_scores[student.id]
+        student_module_scores = prefetched_scores.module_scores[student.id]
+    else:
+        # Dict of item_ids -> (earned, possible) point tuples. This *only* grabs
+        # scores that were registered with the submissions API, which for the moment
+        # means only openassessment (edx-ora2)
+        submissions_scores = sub_api.get_scores(
+            course.id.to_deprecated_string(), anonymous_id_for_user(student, course.id)
+        )
+        student_module_scores = None
+
+    persisted_scores = PersistedSubsectionScores.for_student(student, course.id, prefetched_scores)
 
     totaled_scores = {}
     # This next complicated loop is just to collect the totaled_scores, which is
@@ -187,7 +294,23 @@ def _grade(student, request, course, keep_raw_scores):
                     for descriptor in section['xmoduledescriptors']
                 )
 
-            if not should_grade_section:
+            # Sections whose scores depend on anything other than StudentModule
+            # state, or on the content selected for the student, can't be
+            # served from (or saved to) the persisted scores.
+            can_persist = (
+                persisted_scores is not None and not should_grade_section and
+                not selects_content_per_student(section_descriptor)
+            )
+            persisted_entries = None
+            if can_persist:
+                persisted_entries = persisted_scores.get_entries(section_descriptor, section['xmoduledescriptors'])
+                if persisted_entries is None:
+                    should_grade_section = persisted_scores.has_state(section['xmoduledescriptors'])
+            elif not should_grade_section and student_module_scores is not None:
+                should_grade_section = any(
+                    descriptor.location in student_module_scores for descriptor in section['xmoduledescriptors']
+                )
+            elif not should_grade_section:
                 with manual_transaction():
                     should_grade_section = StudentModule.objects.filter(
                         student=student,
@@ -196,10 +319,18 @@ def _grade(student, request, course, keep_raw_scores):
                         ]
                     ).exists()
 
+            if persisted_entries is not None:
+                # The scores for this section are already known, so there's no
+                # need to load any of its modules.
+                scores = [
+                    Score(entry['earned'], entry['possible'], entry['graded'], entry['display_name'])
+                    for entry in persisted_entries
+                ]
             # If we haven't seen a single problem in the section, we don't have
             # to grade it at all! We can assume 0%
-            if should_grade_section:
+            elif should_grade_section:
                 scores = []
+                entries = []
 
                 def create_module(descriptor):
                     '''creates an XModule instance given a descriptor'''
@@ -212,7 +343,8 @@ def _grade(student, request, course, keep_raw_scores):
                 for module_descriptor in yield_dynamic_descriptor_descendents(section_descriptor, create_module):
 
                     (correct, total) = get_score(
-                        course.id, student, module_descriptor, create_module, scores_cache=submissions_scores
+                        course.id, student, module_descriptor, create_module, scores_cache=submissions_scores,
+                        student_module_scores=student_module_scores
                     )
                     if correct is None and total is None:
                         continue
@@ -229,7 +361,14 @@ def _grade(student, request, course, keep_raw_scores):
                         graded = False
 
                     scores.append(Score(correct, total, graded, module_descriptor.display_name_with_default))
+                    entries.append(_score_entry(module_descriptor, correct, total, graded))
 
+                if can_persist:
+                    persisted_scores.save_entries(section_descriptor, section['xmoduledescriptors'], entries)
+            else:
+                scores = None
+
+            if scores is not None:
                 _, graded_total = graders.aggregate_scores(scores, section_name)
                 if keep_raw_scores:
                     raw_scores += scores
@@ -331,6 +470,7 @@ def _progress_summary(student, request, course):
             return None
 
     submissions_scores = sub_api.get_scores(course.id.to_deprecated_string(), anonymous_id_for_user(student, course.id))
+    persisted_scores = PersistedSubsectionScores.for_student(student, course.id)
 
     chapters = []
     # Don't include chapters that aren't displayable (e.g. due to error)
@@ -350,17 +490,41 @@ def _progress_summary(student, request, course):
                 graded = section_module.graded
                 scores = []
 
-                module_creator = section_module.xmodule_runtime.get_module
-
-                for module_descriptor in yield_dynamic_descriptor_descendents(section_module, module_creator):
-                    course_id = course.id
-                    (correct, total) = get_score(
-                        course_id, student, module_descriptor, module_creator, scores_cache=submissions_scores
-                    )
-                    if correct is None and total is None:
-                        continue
-
-                    scores.append(Score(correct, total, graded, module_descriptor.display_name_with_default))
+                persisted_entries = None
+                if persisted_scores is not None:
+                    section_descriptor = getattr(section_module, 'descriptor', section_module)
+                    scored_descriptors = scored_descriptors_for_section(section_descriptor)
+                    if not selects_content_per_student(section_descriptor) and not any(
+                            descriptor.always_recalculate_grades or
+                            descriptor.location.to_deprecated_string() in submissions_scores
+                            for descriptor in scored_descriptors
+                    ):
+                        persisted_entries = persisted_scores.get_entries(section_descriptor, scored_descriptors)
+                    else:
+                        scored_descriptors = None
+
+                if persisted_entries is not None:
+                    for entry in persisted_entries:
+                        scores.append(Score(entry['earned'], entry['possible'], graded, entry['display_name']))
+                else:
+                    entries = []
+                    module_creator = section_module.xmodule_runtime.get_module
+
+                    for module_descriptor in yield_dynamic_descriptor_descendents(section_module, module_creator):
+                        course_id = course.id
+                        (correct, total) = get_score(
+                            course_id, student, module_descriptor, module_creator, scores_cache=submissions_scores
+                        )
+                        if correct is None and total is None:
+                            continue
+
+                        scores.append(Score(correct, total, graded, module_descriptor.display_name_with_default))
+                        entries.append(
+                            _score_entry(module_descriptor, correct, total, module_descriptor.graded and total > 0)
+                        )
+
+                    if persisted_scores is not None and scored_descriptors is not None:
+                        persisted_scores.save_entries(section_descriptor, scored_descriptors, entries)
 
                 scores.reverse()
                 section_total, _ = graders.aggregate_scores(
@@ -387,7 +551,7 @@ def _progress_summary(student, request, course):
     return chapters
 
 
-def get_score(course_id, user, problem_descriptor, module_creator, scores_cache=None):
+def get_score(course_id, user, problem_descriptor, module_creator, scores_cache=None, student_module_scores=None):
     """
     Return the score for a user on a problem, as a tuple (correct, total).
     e.g. (5,7) if you got 5 out of 7 points.
@@ -401,6 +565,9 @@ def get_score(course_id, user, problem_descriptor, module_creator, scores_cache=
            Can return None if user doesn't have access, or if something else went wrong.
     scores_cache: A dict of location names to (earned, possible) point tuples.
            If an entry is found in this cache, it takes precedence.
+    student_module_scores: A dict of usage keys to (grade, max_grade) tuples for
+           all of the user's StudentModules in the course. If given, it is used
+           instead of querying the StudentModule table.
     """
     scores_cache = scores_cache or {}
 
@@ -427,18 +594,22 @@ def get_score(course_id, user, problem_descriptor, module_creator, scores_cache=
         # These are not problems, and do not have a score
         return (None, None)
 
-    try:
-        student_module = StudentModule.objects.get(
-            student=user,
-            course_id=course_id,
-            module_state_key=problem_descriptor.location
-        )
-    except StudentModule.DoesNotExist:
-        student_module = None
+    if student_module_scores is not None:
+        module_grade, module_max_grade = student_module_scores.get(problem_descriptor.location, (None, None))
+    else:
+        try:
+            student_module = StudentModule.objects.get(
+                student=user,
+                course_id=course_id,
+                module_state_key=problem_descriptor.location
+            )
+            module_grade, module_max_grade = student_module.grade, student_module.max_grade
+        except StudentModule.DoesNotExist:
+            module_grade, module_max_grade = None, None
 
-    if student_module is not None and student_module.max_grade is not None:
-        correct = student_module.grade if student_module.grade is not None else 0
-        total = student_module.max_grade
+    if module_max_grade is not None:
+        correct = module_grade if module_grade is not None else 0
+        total = module_max_grade
     else:
         # If the problem was not in the cache, or hasn't been graded yet,
         # we need to instantiate the problem.
@@ -459,7 +630,11 @@ def get_score(course_id, user, problem_descriptor, module_creator, scores_cache=
     weight = problem_descriptor.weight
     if weight is not None:
         if total == 0:
-            log.exception("Cannot reweight a problem with zero total points. Problem: " + str(student_module))
+            log.exception(
+                "Cannot reweight a problem with zero total points. Problem: %s, user: %s",
+                problem_descriptor.location,
+                user.id
+            )
             return (correct, total)
         correct = correct * weight / total
         total = weight
@@ -467,6 +642,226 @@ def get_score(course_id, user, problem_descriptor, module_creator, scores_cache=
     return (correct, total)
 
 
+def _score_entry(descriptor, earned, possible, graded):
+    """
+    Return the StudentSubsectionScore entry for a single scored descriptor.
+    """
+    return {
+        'location': unicode(descriptor.location),
+        'earned': earned,
+        'possible': possible,
+        'weight': descriptor.weight,
+        'graded': graded,
+        'display_name': descriptor.display_name_with_default,
+    }
+
+
+# The block types which show each student a selection of their children
+PER_STUDENT_CONTENT_CATEGORIES = ('split_test', 'library_content')
+
+
+def scored_descriptors_for_section(section_descriptor):
+    """
+    Return the descriptors under `section_descriptor` (including itself) that
+    have a score, in the same order as `CourseDescriptor.grading_context`
+    lists them.
+    """
+    def yield_descendents(descriptor):
+        """Yield all descendents of `descriptor`, depth first"""
+        for child in descriptor.get_children():
+            yield child
+            for descendent in yield_descendents(child):
+                yield descendent
+
+    descriptors = list(yield_descendents(section_descriptor))
+    descriptors.append(section_descriptor)
+    return [descriptor for descriptor in descriptors if descriptor.has_score]
+
+
+def selects_content_per_student(section_descriptor):
+    """
+    Return whether the content under `section_descriptor` depends on the
+    student (e.g. on their group or cohort), so that its scores can't be
+    persisted against a single version of the content.
+    """
+    if section_descriptor.location.category in PER_STUDENT_CONTENT_CATEGORIES:
+        return True
+    return any(selects_content_per_student(child) for child in section_descriptor.get_children())
+
+
+class PersistedSubsectionScores(object):
+    """
+    Read and write access to the StudentSubsectionScore rows of one student in
+    one course.
+
+    All of the student's rows for the course are loaded in a single query the
+    first time they are needed, so that grading a course that has already been
+    graded for this student costs a constant number of queries, regardless of
+    the number of subsections.
+    """
+    def __init__(self, student, course_key, rows=None, touched_locations=None):
+        self.student = student
+        self.course_key = course_key
+        self._rows = rows
+        self._touched_locations = touched_locations
+
+    @classmethod
+    def for_student(cls, student, course_key, prefetched_scores=None):
+        """
+        Return a PersistedSubsectionScores for `student`, or None if persisted
+        subsection grades are disabled or don't apply to this student.
+
+        If `prefetched_scores` is given, the student's rows are taken from it
+        instead of being queried.
+        """
+        if not settings.FEATURES.get('ENABLE_PERSISTENT_SUBSECTION_GRADES'):
+            return None
+        if settings.GENERATE_PROFILE_SCORES or not student.is_authenticated():
+            return None
+        if prefetched_scores is not None:
+            return cls(
+                student,
+                course_key,
+                rows=prefetched_scores.persisted_rows[student.id],
+                touched_locations=set(prefetched_scores.module_scores[student.id]),
+            )
+        return cls(student, course_key)
+
+    @staticmethod
+    def content_version(section_descriptor, scored_descriptors):
+        """
+        Return a string which changes whenever the content that a subsection's
+        scores depend on changes.
+
+        Old mongo courses (and XML courses) don't always know when a subtree
+        was last edited: the version of their subsections then depends on when
+        each scored block was edited, or else on the content and settings of
+        these blocks.
+        """
+        version = hashlib.sha1()
+        subtree_edited_on = getattr(section_descriptor, 'subtree_edited_on', None)
+        version.update(unicode(subtree_edited_on))
+        for descriptor in sorted(scored_descriptors, key=lambda descriptor: unicode(descriptor.location)):
+            version.update(u'{}:{}'.format(descriptor.location, descriptor.weight).encode('utf-8'))
+            if subtree_edited_on is None:
+                version.update(PersistedSubsectionScores._block_version(descriptor))
+        return version.hexdigest()
+
+    @staticmethod
+    def _block_version(descriptor):
+        """
+        Return a string which changes whenever `descriptor` is edited.
+        """
+        edited_on = getattr(descriptor, 'edited_on', None)
+        if edited_on is not None:
+            return unicode(edited_on)
+        if not hasattr(descriptor, 'get_explicitly_set_fields_by_scope'):
+            return ''
+        fields = [
+            descriptor.get_explicitly_set_fields_by_scope(scope) for scope in (Scope.content, Scope.settings)
+        ]
+        return hashlib.sha1(json.dumps(fields, sort_keys=True, default=unicode)).hexdigest()
+
+    @property
+    def rows(self):
+        """
+        Dict of subsection usage key -> StudentSubsectionScore
+        """
+        if self._rows is None:
+            self._rows = {
+                row.usage_key.map_into_course(self.course_key): row
+                for row in StudentSubsectionScore.objects.filter(student=self.student, course_id=self.course_key)
+            }
+        return self._rows
+
+    def get_entries(self, section_descriptor, scored_descriptors):
+        """
+        Return the persisted score entries for `section_descriptor`, or None
+        if there are none that are valid for its current content.
+        """
+        row = self.rows.get(section_descriptor.location)
+        if row is None or row.content_version != self.content_version(section_descriptor, scored_descriptors):
+            return None
+        return row.score_entries
+
+    def has_state(self, scored_descriptors):
+        """
+        Return whether the student has any StudentModule for any of `scored_descriptors`.
+
+        This replaces a query per subsection with one query for the whole course.
+        """
+        if self._touched_locations is None:
+            self._touched_locations = set(
+                UsageKey.from_string(key).map_into_course(self.course_key)
+                for key in StudentModule.objects.filter(
+                    student=self.student, course_id=self.course_key
+                ).values_list('module_state_key', flat=True)
+            )
+        return any(descriptor.location in self._touched_locations for descriptor in scored_descriptors)
+
+    def save_entries(self, section_descriptor, scored_descriptors, entries):
+        """
+        Persist the score `entries` computed for `section_descriptor`.
+        """
+        row = self.rows.get(section_descriptor.location)
+        if row is None:
+            row = StudentSubsectionScore(
+                student=self.student, course_id=self.course_key, usage_key=section_descriptor.location
+            )
+        row.content_version = self.content_version(section_descriptor, scored_descriptors)
+        row.scores = json.dumps(entries)
+        try:
+            with manual_transaction():
+                row.save()
+        except IntegrityError:
+            # Another process persisted this subsection first; its scores are
+            # just as good as ours.
+            log.info(
+                u"Persisted subsection scores for user %s in %s already exist",
+                self.student.id,
+                section_descriptor.location,
+            )
+            return
+        self.rows[section_descriptor.location] = row
+
+
+class PrefetchedScores(object):
+    """
+    The scores of a batch of students in one course, loaded together so that
+    grading each of them doesn't query the database for every subsection and
+    problem.
+
+    Only the columns needed for grading are loaded from StudentModule, so a
+    batch of a few hundred students fits comfortably in memory.
+    """
+    def __init__(self, course_key, students):
+        student_ids = [student.id for student in students]
+
+        # Dict of student id -> {usage key: (grade, max_grade)}
+        self.module_scores = defaultdict(dict)
+        module_rows = StudentModule.objects.filter(
+            course_id=course_key, student__in=student_ids
+        ).values_list('student', 'module_state_key', 'grade', 'max_grade')
+        for student_id, module_state_key, module_grade, module_max_grade in module_rows:
+            usage_key = UsageKey.from_string(module_state_key).map_into_course(course_key)
+            self.module_scores[student_id][usage_key] = (module_grade, module_max_grade)
+
+        # Dict of student id -> {subsection usage key: StudentSubsectionScore}
+        self.persisted_rows = defaultdict(dict)
+        if settings.FEATURES.get('ENABLE_PERSISTENT_SUBSECTION_GRADES'):
+            for row in StudentSubsectionScore.objects.filter(course_id=course_key, student__in=student_ids):
+                self.persisted_rows[row.student_id][row.usage_key.map_into_course(course_key)] = row
+
+        # Dict of student id -> {item id: (earned, possible)}. The submissions
+        # API can only be asked for the scores of one student at a time.
+        self.submissions_scores = {
+            student.id: sub_api.get_scores(
+                course_key.to_deprecated_string(), anonymous_id_for_user(student, course_key)
+            )
+            for student in students
+        }
+
+
 @contextmanager
 def manual_transaction():
     """A context manager for managing manual transactions"""
@@ -480,7 +875,7 @@ def manual_transaction():
         transaction.commit()
 
 
-def iterate_grades_for(course_id, students):
+def iterate_grades_for(course_id, students, batch_size=None):
     """Given a course_id and an iterable of students (User), yield a tuple of:
 
     (student, gradeset, err_msg) for every student enrolled in the course.
@@ -497,6 +892,10 @@ def iterate_grades_for(course_id, students):
     - grade_breakdown : A breakdown of the major components that
         make up the final grade. (For display)
     - raw_scores: contains scores for every graded module
+
+    If `batch_size` is given, students are graded `batch_size` at a time, and
+    the scores of each batch are prefetched with a handful of queries (see
+    `PrefetchedScores`) rather than queried for every student and subsection.
     """
     course = courses.get_course_by_id(course_id)
 
@@ -505,25 +904,40 @@ def iterate_grades_for(course_id, students):
     # grading that student.
     request = RequestFactory().get('/')
 
-    for student in students:
-        with dog_stats_api.timer('lms.grades.iterate_grades_for', tags=[u'action:{}'.format(course_id)]):
+    students = iter(students)
+    while True:
+        batch = list(islice(students, batch_size or 1))
+        if not batch:
+            break
+
+        prefetched_scores = None
+        if batch_size:
             try:
-                request.user = student
-                # Grading calls problem rendering, which calls masquerading,
-                # which checks session vars -- thus the empty session dict below.
-                # It's not pretty, but untangling that is currently beyond the
-                # scope of this feature.
-                request.session = {}
-                gradeset = grade(student, request, course)
-                yield student, gradeset, ""
-            except Exception as exc:  # pylint: disable=broad-except
-                # Keep marching on even if this student couldn't be graded for
-                # some reason, but log it for future reference.
-                log.exception(
-                    'Cannot grade student %s (%s) in course %s because of exception: %s',
-                    student.username,
-                    student.id,
-                    course_id,
-                    exc.message
-                )
-                yield student, {}, exc.message
+                prefetched_scores = PrefetchedScores(course.id, batch)
+            except Exception:  # pylint: disable=broad-except
+                # Fall back to querying each student's scores separately,
+                # so that each failure is reported against its own student.
+                log.exception(u'Cannot prefetch scores for a batch of students in course %s', course_id)
+
+        for student in batch:
+            with dog_stats_api.timer('lms.grades.iterate_grades_for', tags=[u'action:{}'.format(course_id)]):
+                try:
+                    request.user = student
+                    # Grading calls problem rendering, which calls masquerading,
+                    # which checks session vars -- thus the empty session dict below.
+                    # It's not pretty, but untangling that is currently beyond the
+                    # scope of this feature.
+                    request.session = {}
+                    gradeset = grade(student, request, course, prefetched_scores=prefetched_scores)
+                    yield student, gradeset, ""
+                except Exception as exc:  # pylint: disable=broad-except
+                    # Keep marching on even if this student couldn't be graded for
+                    # some reason, but log it for future reference.
+                    log.exception(
+                        'Cannot grade student %s (%s) in course %s because of exception: %s',
+                        student.username,
+                        student.id,
+                        course_id,
+                        exc.message
+                    )
+                    yield student, {}, exc.message
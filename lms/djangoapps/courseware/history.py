@@ -0,0 +1,83 @@
+"""
+Queueing of the history entries of StudentModules, which are written off the
+request path by a celery task when STUDENT_MODULE_HISTORY_ASYNC is enabled.
+
+The entries recorded during a request are sent to the task together at the
+end of the request, once its transaction is committed (see
+StudentModuleHistoryMiddleware); outside of requests, each entry is sent to
+the task right away.
+"""
+from request_cache.middleware import RequestCache
+
+from courseware.tasks import write_student_module_history
+
+# The request cache key of the list of the history records queued in the current request
+HISTORY_REQUEST_CACHE_KEY = 'courseware.history.queued_records'
+
+
+def _request_cache_data():
+    """
+    Returns the request cache of this thread, which is only set up in the
+    threads which serve requests.
+    """
+    return getattr(RequestCache.get_request_cache(), 'data', {})
+
+
+def queue_history_until_sent():
+    """
+    Makes the history entries recorded from now on in this request wait
+    until send_queued_history is called.
+    """
+    RequestCache.get_request_cache().data[HISTORY_REQUEST_CACHE_KEY] = []
+
+
+def queue_history_entry(student_module):
+    """
+    Records the current state of `student_module` in its history.
+    """
+    record = {
+        'student_module_id': student_module.id,
+        # The task arguments are serialized as JSON
+        'created': student_module.modified.isoformat(),
+        'state': student_module.state,
+        'grade': student_module.grade,
+        'max_grade': student_module.max_grade,
+    }
+    queued_records = _request_cache_data().get(HISTORY_REQUEST_CACHE_KEY)
+    if queued_records is None:
+        write_student_module_history.delay([record])
+    else:
+        queued_records.append(record)
+
+
+def send_queued_history():
+    """
+    Sends the history entries queued in this request to be written, and
+    stops queueing them.
+    """
+    queued_records = _request_cache_data().pop(HISTORY_REQUEST_CACHE_KEY, None)
+    if queued_records:
+        write_student_module_history.delay(queued_records)
+
+
+def write_queued_history(student_module):
+    """
+    Writes the history entries of `student_module` queued in this request
+    right away (e.g. to display them in the same request), rather than at
+    the end of the request.
+    """
+    queued_records = _request_cache_data().get(HISTORY_REQUEST_CACHE_KEY)
+    if not queued_records:
+        return
+    records = [record for record in queued_records if record['student_module_id'] == student_module.id]
+    queued_records[:] = [record for record in queued_records if record['student_module_id'] != student_module.id]
+    if records:
+        write_student_module_history(records)
+
+
+def discard_queued_history():
+    """
+    Drops the history entries queued in this request (e.g. because the
+    request failed, so that they were never saved), and stops queueing them.
+    """
+    _request_cache_data().pop(HISTORY_REQUEST_CACHE_KEY, None)
@@ -0,0 +1,59 @@
+"""
+A command to delete the StudentModule history entries older than the
+retention period (STUDENT_MODULE_HISTORY_RETENTION_DAYS, or --days).
+"""
+from datetime import datetime, timedelta
+from optparse import make_option
+
+from django.conf import settings
+from django.core.management.base import NoArgsCommand, CommandError
+from django.db import transaction
+from django.utils.timezone import UTC
+
+from courseware.model_data import chunks
+from courseware.models import CompressedStudentModuleHistory, StudentModuleHistory
+
+
+class Command(NoArgsCommand):
+    """
+    Deletes the StudentModule history entries older than the retention period.
+    """
+    help = "Deletes the StudentModule history entries older than the retention period."
+
+    option_list = NoArgsCommand.option_list + (
+        make_option(
+            '--days',
+            type='int',
+            default=None,
+            help="Number of days to keep the history for (STUDENT_MODULE_HISTORY_RETENTION_DAYS by default).",
+        ),
+        make_option(
+            '--batch',
+            type='int',
+            default=1000,
+            help="Number of history entries (or student modules, for the compressed history) deleted at once.",
+        ),
+    )
+
+    def handle_noargs(self, **options):
+        days = options['days'] if options['days'] is not None else settings.STUDENT_MODULE_HISTORY_RETENTION_DAYS
+        if days is None:
+            raise CommandError("No retention period: set STUDENT_MODULE_HISTORY_RETENTION_DAYS, or use --days.")
+        before = datetime.now(UTC()) - timedelta(days=days)
+        batch_size = options['batch']
+
+        while True:
+            with transaction.commit_on_success():
+                entry_ids = list(
+                    StudentModuleHistory.objects.filter(created__lt=before).values_list('id', flat=True)[:batch_size]
+                )
+                if not entry_ids:
+                    break
+                StudentModuleHistory.objects.filter(id__in=entry_ids).delete()
+
+        student_module_ids = CompressedStudentModuleHistory.objects.filter(
+            created__lt=before
+        ).values_list('student_module', flat=True).distinct()
+        for chunk in chunks(student_module_ids, batch_size):
+            with transaction.commit_on_success():
+                CompressedStudentModuleHistory.prune(before, chunk)
@@ -2,10 +2,20 @@
 Middleware for the courseware app
 """
 
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.http import HttpResponseServerError
 from django.shortcuts import redirect
 from django.core.urlresolvers import reverse
+from xblock.exceptions import KeyValueMultiSaveError
 
 from courseware.courses import UserNotEnrolled
+from courseware.history import discard_queued_history, queue_history_until_sent, send_queued_history
+from courseware.model_data import defer_writes_until_flush, discard_deferred_writes, flush_deferred_writes
+
+log = logging.getLogger(__name__)
 
 
 class RedirectUnenrolledMiddleware(object):
@@ -22,3 +32,53 @@ class RedirectUnenrolledMiddleware(object):
                     args=[course_key.to_deprecated_string()]
                 )
             )
+
+
+class FieldDataCacheFlushMiddleware(object):
+    """
+    Defers the writes of the student state changed during a request to the
+    end of the request, so that each StudentModule is written once, however
+    many times it changed, and new ones are created together.
+
+    Must come after TransactionMiddleware, so that the state is written in
+    the transaction of the request, and dropped if the request fails. If the
+    writes fail once the response is built, the transaction is rolled back and
+    the response is replaced by an error, rather than reporting a success for
+    state which wasn't saved.
+    """
+    def process_request(self, _request):
+        defer_writes_until_flush()
+
+    def process_exception(self, _request, _exception):
+        discard_deferred_writes()
+
+    def process_response(self, request, response):
+        try:
+            flush_deferred_writes()
+        except KeyValueMultiSaveError as exc:
+            log.exception('Error writing the student state of %s (saved %r)', request.path, exc.saved_field_names)
+            if transaction.is_managed():
+                transaction.rollback()
+            return HttpResponseServerError()
+        return response
+
+
+class StudentModuleHistoryMiddleware(object):
+    """
+    Sends the StudentModule history entries recorded during a request to be
+    written together at the end of the request, when STUDENT_MODULE_HISTORY_ASYNC
+    is enabled.
+
+    Must come before TransactionMiddleware, so that the entries are only sent
+    once the StudentModules they belong to are committed.
+    """
+    def process_request(self, _request):
+        if settings.STUDENT_MODULE_HISTORY_ASYNC:
+            queue_history_until_sent()
+
+    def process_exception(self, _request, _exception):
+        discard_queued_history()
+
+    def process_response(self, _request, response):
+        send_queued_history()
+        return response
@@ -2,8 +2,9 @@
 Classes to provide the LMS runtime data storage to XBlocks
 """
 
+import copy
 import json
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 from itertools import chain
 from .models import (
     StudentModule,
@@ -12,11 +13,13 @@ from .models import (
     XModuleStudentInfoField
 )
 import logging
-from opaque_keys.edx.keys import CourseKey
+from opaque_keys.edx.keys import CourseKey, UsageKey
 from opaque_keys.edx.block_types import BlockTypeKeyV1
 from opaque_keys.edx.asides import AsideUsageKeyV1
 
-from django.db import DatabaseError
+from django.db import DEFAULT_DB_ALIAS, DatabaseError
+from django.db.models.signals import post_save
+from request_cache.middleware import RequestCache
 
 from xblock.runtime import KeyValueStore
 from xblock.exceptions import KeyValueMultiSaveError, InvalidScopeError
@@ -34,6 +37,76 @@ class InvalidWriteError(Exception):
     """
 
 
+# The request cache key of the writes deferred to the end of the current request
+# (see defer_writes_until_flush): the FieldDataCaches which deferred them, and the
+# field objects and decoded values which these caches share
+DEFERRED_WRITES_REQUEST_CACHE_KEY = 'courseware.model_data.deferred_writes'
+
+
+def _request_cache_data():
+    """
+    Returns the request cache of this thread, which is only set up in the
+    threads which serve requests.
+    """
+    return getattr(RequestCache.get_request_cache(), 'data', {})
+
+
+def defer_writes_until_flush():
+    """
+    Makes the FieldDataCaches created from now on in this request keep the
+    fields they change in memory, until flush_deferred_writes is called.
+
+    These caches share their field objects by row, so that each one reads the
+    changes the others haven't written yet, instead of overwriting them.
+    """
+    RequestCache.get_request_cache().data[DEFERRED_WRITES_REQUEST_CACHE_KEY] = {
+        'field_data_caches': [],
+        'field_objects': {},
+        'decoded': {},
+    }
+
+
+def _pop_deferred_field_data_caches():
+    """
+    Stops deferring writes, and returns the FieldDataCaches which deferred them.
+    """
+    deferred_writes = _request_cache_data().pop(DEFERRED_WRITES_REQUEST_CACHE_KEY, None)
+    return deferred_writes['field_data_caches'] if deferred_writes is not None else []
+
+
+def flush_pending_writes():
+    """
+    Writes the fields changed so far through the FieldDataCaches of this
+    request, which keep deferring their writes afterwards.
+
+    Raises KeyValueMultiSaveError if a write fails.
+    """
+    deferred_writes = _request_cache_data().get(DEFERRED_WRITES_REQUEST_CACHE_KEY)
+    if deferred_writes is not None:
+        for field_data_cache in deferred_writes['field_data_caches']:
+            field_data_cache.flush()
+
+
+def flush_deferred_writes():
+    """
+    Writes the fields changed through the FieldDataCaches of this request to
+    the database, and stops deferring writes.
+
+    Raises KeyValueMultiSaveError if a write fails.
+    """
+    for field_data_cache in _pop_deferred_field_data_caches():
+        field_data_cache.flush()
+
+
+def discard_deferred_writes():
+    """
+    Drops the fields changed, but not yet written, through the FieldDataCaches
+    of this request (e.g. because the request failed), and stops deferring writes.
+    """
+    for field_data_cache in _pop_deferred_field_data_caches():
+        field_data_cache.discard()
+
+
 def chunks(items, chunk_size):
     """
     Yields the values from items in chunks of size chunk_size
@@ -64,6 +137,30 @@ class FieldDataCache(object):
         self.cache = {}
         self.select_for_update = select_for_update
 
+        # The field objects changed since the last flush, by id(), as (field object, names of the changed fields)
+        self._dirty = OrderedDict()
+        # Rows locked for update are written right away, as the lock is usually taken
+        # to prevent concurrent changes from overwriting each other
+        deferred_writes = _request_cache_data().get(DEFERRED_WRITES_REQUEST_CACHE_KEY)
+        self.defer_writes = deferred_writes is not None and not select_for_update
+        if self.defer_writes:
+            deferred_writes['field_data_caches'].append(self)
+            # The caches of the request, and the field objects they share, by row
+            self._sharing_caches = deferred_writes['field_data_caches']
+            self._shared_field_objects = deferred_writes['field_objects']
+            # The decoded JSON of the field objects, by id(), as (encoded JSON, decoded value)
+            self._decoded = deferred_writes['decoded']
+        else:
+            # The locked rows must be read with the changes not yet written
+            flush_pending_writes()
+            self._sharing_caches = [self]
+            self._shared_field_objects = None
+            self._decoded = {}
+        # The parts of the module systems of the blocks bound with this cache which
+        # don't depend on the block, by the arguments they were built with
+        # (see courseware.module_render.get_module_system_bindings)
+        self.module_system_bindings = {}
+
         if asides is None:
             self.asides = []
         else:
@@ -82,7 +179,8 @@ class FieldDataCache(object):
         if self.user.is_authenticated():
             for scope, fields in self._fields_to_cache(descriptors).items():
                 for field_object in self._retrieve_fields(scope, fields, descriptors):
-                    self.cache[self._cache_key_from_field_object(scope, field_object)] = field_object
+                    cache_key = self._cache_key_from_field_object(scope, field_object)
+                    self.cache[cache_key] = self._share(cache_key, field_object)
 
     def add_descriptor_descendents(self, descriptor, depth=None, descriptor_filter=lambda descriptor: True):
         """
@@ -318,9 +416,144 @@ class FieldDataCache(object):
             )
 
         cache_key = self._cache_key_from_kvs_key(key)
+        field_object = self._share(cache_key, field_object)
         self.cache[cache_key] = field_object
         return field_object
 
+    def _share(self, cache_key, field_object):
+        """
+        Returns the field object of the row `cache_key` which the caches of this
+        request share, which is `field_object` unless another cache got the row
+        first. The field objects of the caches which don't defer their writes
+        aren't shared.
+        """
+        if self._shared_field_objects is None:
+            return field_object
+
+        user_id = None if cache_key[0].user == UserScope.NONE else self.user.pk
+        return self._shared_field_objects.setdefault((user_id, cache_key), field_object)
+
+    def decoded_value(self, field_object):
+        """
+        Returns the decoded JSON state (of a StudentModule) or value (of the
+        other field objects) of `field_object`.
+
+        The JSON is only decoded again if it has been replaced since, so the
+        returned value is shared by the following reads: its changes must be
+        followed by `mark_dirty`, or they are only written along with the next
+        changes of `field_object`.
+        """
+        encoded = field_object.state if isinstance(field_object, StudentModule) else field_object.value
+        cached = self._decoded.get(id(field_object))
+        if cached is not None and cached[0] is encoded:
+            return cached[1]
+
+        value = json.loads(encoded)
+        self._decoded[id(field_object)] = (encoded, value)
+        return value
+
+    def mark_dirty(self, field_object, field_names):
+        """
+        Records that the fields named `field_names` of `field_object` have
+        been changed (in its decoded state, for StudentModules), so that it
+        is written by the next flush.
+        """
+        __, dirty_names = self._dirty.setdefault(id(field_object), (field_object, []))
+        dirty_names.extend(field_names)
+
+    def flush_unless_deferred(self):
+        """
+        Flushes the changed field objects, unless writes are deferred to the
+        end of the request.
+        """
+        if not self.defer_writes:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes the field objects changed since the last flush to the
+        database, creating the new StudentModules with a single query.
+
+        Raises KeyValueMultiSaveError, with the names of the fields which
+        were saved, if a write fails.
+        """
+        dirty, self._dirty = self._dirty, OrderedDict()
+        saved_fields = []
+        new_modules = []
+
+        def save(field_object, names):
+            """
+            Saves `field_object`, raising KeyValueMultiSaveError if that fails.
+            """
+            try:
+                field_object.save(force_update=field_object.pk is not None)
+                saved_fields.extend(names)
+            except DatabaseError:
+                log.exception('Error saving fields %r', names)
+                raise KeyValueMultiSaveError(saved_fields)
+            self._forget_written(field_object)
+
+        for field_object, names in dirty.itervalues():
+            if isinstance(field_object, StudentModule):
+                # The state is only encoded once, however many of its fields changed
+                state = self.decoded_value(field_object)
+                field_object.state = json.dumps(state)
+                self._decoded[id(field_object)] = (field_object.state, state)
+                if field_object.pk is None:
+                    new_modules.append((field_object, names))
+                    continue
+            save(field_object, names)
+
+        if len(new_modules) > 1:
+            try:
+                self._bulk_create_student_modules([module for module, __ in new_modules])
+                for module, names in new_modules:
+                    saved_fields.extend(names)
+                    self._forget_written(module)
+                return
+            except DatabaseError:
+                # e.g. one of the modules was created by a concurrent request: save the others one by one
+                log.exception('Error creating student modules, saving them one by one')
+
+        for module, names in new_modules:
+            save(module, names)
+
+    def _forget_written(self, field_object):
+        """
+        Records that `field_object` was written, so that the other caches of
+        the request which share it (and changed it) don't write it again.
+        """
+        for field_data_cache in self._sharing_caches:
+            if field_data_cache is not self:
+                field_data_cache._dirty.pop(id(field_object), None)  # pylint: disable=protected-access
+
+    def _bulk_create_student_modules(self, modules):
+        """
+        Inserts the (new) StudentModules `modules` with a single query, and
+        fetches their primary keys with another one.
+        """
+        StudentModule.objects.bulk_create(modules)
+
+        # bulk_create neither sets the primary keys, nor sends post_save (which records the history)
+        keys = dict(
+            ((student_id, UsageKey.from_string(module_state_key).map_into_course(self.course_id)), pk)
+            for student_id, module_state_key, pk in StudentModule.objects.filter(
+                course_id=self.course_id,
+                student__in=set(module.student_id for module in modules),
+                module_state_key__in=[module.module_state_key for module in modules],
+            ).values_list('student_id', 'module_state_key', 'id')
+        )
+        for module in modules:
+            module.pk = keys[(module.student_id, module.module_state_key.map_into_course(self.course_id))]
+            post_save.send(sender=StudentModule, instance=module, created=True, raw=False, using=DEFAULT_DB_ALIAS)
+
+    def discard(self):
+        """
+        Forgets the changes which haven't been written yet. The field objects
+        keep the changed values, but aren't written until they change again.
+        """
+        self._dirty.clear()
+
 
 class DjangoKeyValueStore(KeyValueStore):
     """
@@ -359,9 +592,13 @@ class DjangoKeyValueStore(KeyValueStore):
             raise KeyError(key.field_name)
 
         if key.scope == Scope.user_state:
-            return json.loads(field_object.state)[key.field_name]
+            value = self._field_data_cache.decoded_value(field_object)[key.field_name]
         else:
-            return json.loads(field_object.value)
+            value = self._field_data_cache.decoded_value(field_object)
+
+        # The value isn't copied: XBlock fields keep a copy of the mutable values they read,
+        # to find their changes, which are then set back
+        return value
 
     def set(self, key, value):
         """
@@ -377,11 +614,10 @@ class DjangoKeyValueStore(KeyValueStore):
           xblock.KvsFieldData._key : value
 
         """
-        saved_fields = []
-        # field_objects maps id(field_object) to a the object and a list of associated fields.
+        # dirty_field_objects maps id(field_object) to a the object and a list of associated fields.
         # We use id() because FieldDataCache might return django models with no primary key
         # set, but will return the same django model each time the same key is passed in.
-        dirty_field_objects = defaultdict(lambda: (None, []))
+        dirty_field_objects = OrderedDict()
         for key in kv_dict:
             # Check key for validity
             if key.scope not in self._allowed_scopes:
@@ -392,26 +628,22 @@ class DjangoKeyValueStore(KeyValueStore):
             _, dirty_names = dirty_field_objects.setdefault(id(field_object), (field_object, []))
             dirty_names.append(key.field_name)
 
-            # Special case when scope is for the user state, because this scope saves fields in a single row
+            # Special case when scope is for the user state, because this scope saves fields in a single row.
+            # The state is encoded when it is written.
             if key.scope == Scope.user_state:
-                state = json.loads(field_object.state)
-                state[key.field_name] = kv_dict[key]
-                field_object.state = json.dumps(state)
+                value = kv_dict[key]
+                if isinstance(value, (list, dict)):
+                    # Later changes to the value must not change the state until it is set again
+                    value = copy.deepcopy(value)
+                self._field_data_cache.decoded_value(field_object)[key.field_name] = value
             else:
                 # The remaining scopes save fields on different rows, so
                 # we don't have to worry about conflicts
                 field_object.value = json.dumps(kv_dict[key])
 
         for field_object, names in dirty_field_objects.values():
-            try:
-                # Save the field object that we made above
-                field_object.save(force_update=field_object.pk is not None)
-                # If save is successful on this scope, add the saved fields to
-                # the list of successful saves
-                saved_fields.extend(names)
-            except DatabaseError:
-                log.exception('Error saving fields %r', names)
-                raise KeyValueMultiSaveError(saved_fields)
+            self._field_data_cache.mark_dirty(field_object, names)
+        self._field_data_cache.flush_unless_deferred()
 
     def delete(self, key):
         if key.scope not in self._allowed_scopes:
@@ -422,10 +654,9 @@ class DjangoKeyValueStore(KeyValueStore):
             raise KeyError(key.field_name)
 
         if key.scope == Scope.user_state:
-            state = json.loads(field_object.state)
-            del state[key.field_name]
-            field_object.state = json.dumps(state)
-            field_object.save(force_update=field_object.pk is not None)
+            del self._field_data_cache.decoded_value(field_object)[key.field_name]
+            self._field_data_cache.mark_dirty(field_object, [key.field_name])
+            self._field_data_cache.flush_unless_deferred()
         else:
             field_object.delete()
 
@@ -438,6 +669,6 @@ class DjangoKeyValueStore(KeyValueStore):
             return False
 
         if key.scope == Scope.user_state:
-            return key.field_name in json.loads(field_object.state)
+            return key.field_name in self._field_data_cache.decoded_value(field_object)
         else:
             return True
@@ -12,13 +12,18 @@ file and check it in at the same time as your model changes. To do that,
 ASSUMPTIONS: modules have unique IDs, even across different module_types
 
 """
+import base64
+import json
+import zlib
+
 from django.contrib.auth.models import User
 from django.conf import settings
-from django.db import models
-from django.db.models.signals import post_save
+from django.db import models, transaction
+from django.db.models import Max
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
-from xmodule_django.models import CourseKeyField, LocationKeyField, BlockTypeKeyField
+from xmodule_django.models import CourseKeyField, LocationKeyField, BlockTypeKeyField, UsageKeyField
 
 
 class StudentModule(models.Model):
@@ -122,6 +127,12 @@ class StudentModuleHistory(models.Model):
         we save.
         """
         if instance.module_type in StudentModuleHistory.HISTORY_SAVING_TYPES:
+            if settings.STUDENT_MODULE_HISTORY_ASYNC:
+                # Imported here to avoid circular imports
+                from courseware.history import queue_history_entry
+                queue_history_entry(instance)
+                return
+
             history_entry = StudentModuleHistory(student_module=instance,
                                                  version=None,
                                                  created=instance.modified,
@@ -130,6 +141,214 @@ class StudentModuleHistory(models.Model):
                                                  max_grade=instance.max_grade)
             history_entry.save()
 
+    @classmethod
+    def get_history(cls, student_module):
+        """
+        Returns the history entries of `student_module`, most recent first,
+        including the ones stored as CompressedStudentModuleHistory (which
+        are returned as unsaved StudentModuleHistory objects).
+        """
+        history_entries = list(cls.objects.filter(student_module=student_module).order_by('-id'))
+        history_entries.extend(CompressedStudentModuleHistory.get_history(student_module))
+        history_entries.sort(key=lambda entry: entry.created, reverse=True)
+        return history_entries
+
+
+class CompressedStudentModuleHistory(models.Model):
+    """
+    The history of the state changes of StudentModules, as written when
+    STUDENT_MODULE_HISTORY_ASYNC is enabled (see courseware.history).
+
+    The state is stored as zlib compressed (and base64 encoded) JSON. Entries
+    which aren't keyframes only store the changes since the previous entry of
+    the StudentModule, as {"changed": {...}, "removed": [...]}, and the
+    full state is stored every STUDENT_MODULE_HISTORY_KEYFRAME_INTERVAL
+    entries, so that the state of any entry is rebuilt from a few rows.
+
+    The changes are relative to the previous entry by id, which isn't always
+    the previous one by date, as the tasks writing the entries may run out of
+    order; the writes of the entries of a StudentModule are serialized, so
+    that each one is relative to the entries written before it.
+    """
+    class Meta(object):  # pylint: disable=missing-docstring
+        get_latest_by = "created"
+
+    student_module = models.ForeignKey(StudentModule, db_index=True)
+
+    # This is populated from the modified field in StudentModule
+    created = models.DateTimeField(db_index=True)
+    encoded_state = models.TextField()
+    is_keyframe = models.BooleanField(default=True)
+    grade = models.FloatField(null=True, blank=True)
+    max_grade = models.FloatField(null=True, blank=True)
+
+    @staticmethod
+    def encode(value):
+        """
+        Returns the compressed JSON of `value`.
+        """
+        return base64.b64encode(zlib.compress(json.dumps(value, separators=(',', ':'))))
+
+    @staticmethod
+    def decode(encoded):
+        """
+        Returns the value of the compressed JSON `encoded`.
+        """
+        return json.loads(zlib.decompress(base64.b64decode(encoded)))
+
+    def apply_to(self, previous_state):
+        """
+        Returns the state of this entry, which follows an entry with
+        the state `previous_state` (None if there is none).
+        """
+        value = self.decode(self.encoded_state)
+        if self.is_keyframe:
+            return value
+        state = dict(previous_state or {})
+        state.update(value['changed'])
+        for name in value['removed']:
+            state.pop(name, None)
+        return state
+
+    def set_state(self, state, previous_state, keyframe):
+        """
+        Stores `state`, completely if `keyframe` is True, and otherwise as
+        the changes since `previous_state`.
+        """
+        self.is_keyframe = keyframe
+        if keyframe:
+            self.encoded_state = self.encode(state)
+        else:
+            self.encoded_state = self.encode({
+                'changed': {
+                    name: value for name, value in state.iteritems()
+                    if name not in previous_state or previous_state[name] != value
+                },
+                'removed': [name for name in previous_state if name not in state],
+            })
+
+    @classmethod
+    def replay(cls, entries):
+        """
+        Yields each entry of `entries`, which must be ordered by id and start
+        at a keyframe for each StudentModule, with its state.
+        """
+        states = {}
+        for entry in entries:
+            state = states[entry.student_module_id] = entry.apply_to(states.get(entry.student_module_id))
+            yield entry, state
+
+    @classmethod
+    def get_history(cls, student_module):
+        """
+        Returns the history entries of `student_module` as unsaved
+        StudentModuleHistory objects, most recent first.
+        """
+        history_entries = [
+            StudentModuleHistory(
+                student_module=student_module,
+                version=None,
+                created=entry.created,
+                state=json.dumps(state),
+                grade=entry.grade,
+                max_grade=entry.max_grade,
+            )
+            for entry, state in cls.replay(cls.objects.filter(student_module=student_module).order_by('id'))
+        ]
+        history_entries.reverse()
+        return history_entries
+
+    @classmethod
+    def _latest_states(cls, student_module_ids):
+        """
+        Returns the state of the latest entry of each of the StudentModules
+        with `student_module_ids` which have a history, and the number of
+        entries since (and including) its latest keyframe, by StudentModule id.
+        """
+        keyframe_ids = dict(
+            cls.objects.filter(
+                student_module__in=student_module_ids, is_keyframe=True
+            ).values_list('student_module').annotate(Max('id'))
+        )
+        if not keyframe_ids:
+            return {}
+
+        latest_states = {}
+        entries = cls.objects.filter(
+            student_module__in=keyframe_ids.keys(), id__gte=min(keyframe_ids.itervalues())
+        ).order_by('id')
+        for entry, state in cls.replay(
+                entry for entry in entries if entry.id >= keyframe_ids[entry.student_module_id]
+        ):
+            __, count = latest_states.get(entry.student_module_id, (None, 0))
+            latest_states[entry.student_module_id] = (state, 1 if entry.is_keyframe else count + 1)
+        return latest_states
+
+    @staticmethod
+    def _lock_student_modules(student_module_ids):
+        """
+        Locks the StudentModules with `student_module_ids` (in the order of
+        their ids, so that concurrent writers don't deadlock) until the end of
+        the transaction, and returns their ids.
+        """
+        return list(
+            StudentModule.objects.select_for_update().filter(
+                id__in=student_module_ids
+            ).order_by('id').values_list('id', flat=True)
+        )
+
+    @classmethod
+    @transaction.commit_on_success
+    def write_history(cls, history_records):
+        """
+        Inserts the history entries of `history_records` (in the order of the
+        changes) with a single query, where each record is a dict with the
+        student_module_id, created, state (as JSON), grade and max_grade
+        of the entry.
+
+        The StudentModules are locked until the entries are committed, so that
+        the entries written at the same time for a StudentModule (by another
+        task) are written before or after these ones, and not relative to the
+        same previous entry.
+        """
+        student_module_ids = cls._lock_student_modules(set(record['student_module_id'] for record in history_records))
+        latest_states = cls._latest_states(student_module_ids)
+        entries = []
+        for record in history_records:
+            state = json.loads(record['state']) if record['state'] else {}
+            previous_state, count = latest_states.get(record['student_module_id'], (None, 0))
+            keyframe = previous_state is None or count >= settings.STUDENT_MODULE_HISTORY_KEYFRAME_INTERVAL
+            entry = cls(
+                student_module_id=record['student_module_id'],
+                created=record['created'],
+                grade=record['grade'],
+                max_grade=record['max_grade'],
+            )
+            entry.set_state(state, previous_state, keyframe)
+            entries.append(entry)
+            latest_states[record['student_module_id']] = (state, 1 if keyframe else count + 1)
+        cls.objects.bulk_create(entries)
+
+    @classmethod
+    def prune(cls, before, student_module_ids):
+        """
+        Deletes the history entries of the StudentModules with
+        `student_module_ids` created before the datetime `before`, storing
+        each remaining entry which follows a deleted one (by id, as the entries
+        are not always in the order of their dates) as a keyframe.
+        """
+        student_module_ids = cls._lock_student_modules(student_module_ids)
+        follows_deleted = {}
+        for entry, state in cls.replay(cls.objects.filter(student_module__in=student_module_ids).order_by('id')):
+            if entry.created < before:
+                follows_deleted[entry.student_module_id] = True
+                continue
+            if follows_deleted.get(entry.student_module_id) and not entry.is_keyframe:
+                entry.set_state(state, None, True)
+                entry.save()
+            follows_deleted[entry.student_module_id] = False
+        cls.objects.filter(student_module__in=student_module_ids, created__lt=before).delete()
+
 
 class XBlockFieldBase(models.Model):
     """
@@ -230,3 +449,126 @@ class OfflineComputedGradeLog(models.Model):
 
     def __unicode__(self):
         return "[OCGLog] %s: %s" % (self.course_id.to_deprecated_string(), self.created)  # pylint: disable=no-member
+
+
+class StudentSubsectionScore(models.Model):
+    """
+    Persisted per-problem scores for one subsection (sequential) of a course,
+    for a given user.
+
+    Rows are written by courseware.grades whenever a subsection has to be
+    graded the slow way (by instantiating its modules), and are kept current
+    by `update_from_student_module` as StudentModule scores change, so that
+    subsequent gradings can aggregate straight from this table.
+
+    `scores` is a JSON list with one entry per scored descendant, in the order
+    in which the grader visited them:
+
+        {
+            "location": unicode(usage_key),
+            "earned": weighted points earned,
+            "possible": weighted points possible,
+            "weight": the problem weight, or null,
+            "graded": whether the problem counts towards the grade,
+            "display_name": the problem's display name,
+        }
+
+    `content_version` identifies the version of the subsection content the
+    scores were computed against; a row whose version no longer matches the
+    course content is ignored and recomputed.
+    """
+    class Meta(object):  # pylint: disable=missing-docstring
+        unique_together = (('student', 'course_id', 'usage_key'),)
+
+    student = models.ForeignKey(User, db_index=True)
+    course_id = CourseKeyField(max_length=255, db_index=True)
+
+    # The subsection these scores belong to
+    usage_key = UsageKeyField(max_length=255, db_index=True)
+
+    content_version = models.CharField(max_length=255)
+    scores = models.TextField(default='[]')
+
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+    modified = models.DateTimeField(auto_now=True, db_index=True)
+
+    @property
+    def score_entries(self):
+        """
+        The decoded list of per-problem score entries.
+        """
+        return json.loads(self.scores)
+
+    @classmethod
+    def update_from_student_module(cls, student_module):
+        """
+        Patch the persisted entry for the problem backing `student_module`
+        with its current grade. Only the row(s) that actually contain the
+        problem are touched; nothing is done if no row contains it yet (that
+        subsection will be graded in full next time).
+        """
+        location = unicode(student_module.module_state_key.map_into_course(student_module.course_id))
+        rows = cls.objects.filter(
+            student_id=student_module.student_id,
+            course_id=student_module.course_id,
+            scores__contains=json.dumps(location),
+        )
+        for row in rows:
+            entries = row.score_entries
+            changed = False
+            for entry in entries:
+                if entry['location'] != location:
+                    continue
+                earned = student_module.grade if student_module.grade is not None else 0
+                possible = student_module.max_grade
+                weight = entry.get('weight')
+                if weight is not None and possible:
+                    earned = earned * weight / possible
+                    possible = weight
+                entry['earned'] = earned
+                entry['possible'] = possible
+                changed = True
+            if changed:
+                row.scores = json.dumps(entries)
+                row.save()
+
+    @classmethod
+    def delete_for_student_module(cls, student_module):
+        """
+        Delete the persisted rows containing the problem backing the deleted
+        `student_module`, so that their subsections are graded in full again.
+        """
+        location = unicode(student_module.module_state_key.map_into_course(student_module.course_id))
+        cls.objects.filter(
+            student_id=student_module.student_id,
+            course_id=student_module.course_id,
+            scores__contains=json.dumps(location),
+        ).delete()
+
+    def __unicode__(self):
+        return u"[StudentSubsectionScore] {}: {} / {} ({})".format(
+            self.student_id, self.course_id, self.usage_key, self.content_version
+        )
+
+
+@receiver(post_save, sender=StudentModule)
+def update_persisted_subsection_scores(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Keep StudentSubsectionScore rows current when a StudentModule score changes.
+    """
+    if not settings.FEATURES.get('ENABLE_PERSISTENT_SUBSECTION_GRADES'):
+        return
+    if instance.max_grade is None:
+        return
+    StudentSubsectionScore.update_from_student_module(instance)
+
+
+@receiver(post_delete, sender=StudentModule)
+def delete_persisted_subsection_scores(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Drop the StudentSubsectionScore rows of a StudentModule which was deleted
+    (e.g. when an instructor resets a student's state).
+    """
+    if not settings.FEATURES.get('ENABLE_PERSISTENT_SUBSECTION_GRADES'):
+        return
+    StudentSubsectionScore.delete_for_student_module(instance)
@@ -29,7 +29,7 @@ from django.views.decorators.csrf import csrf_exempt
 from capa.xqueue_interface import XQueueInterface
 from courseware.access import has_access, get_user_role
 from courseware.masquerade import setup_masquerade
-from courseware.model_data import FieldDataCache, DjangoKeyValueStore
+from courseware.model_data import FieldDataCache, DjangoKeyValueStore, flush_pending_writes
 from courseware.entrance_exams import (
     get_entrance_exam_score,
     user_must_complete_entrance_exam
@@ -56,9 +56,7 @@ from xmodule.modulestore.django import modulestore, ModuleI18nService
 from xmodule.modulestore.exceptions import ItemNotFoundError
 from xmodule.util.duedate import get_extended_due_date
 from xmodule_modifiers import (
-    replace_course_urls,
-    replace_jump_to_id_urls,
-    replace_static_urls,
+    replace_urls,
     add_staff_markup,
     wrap_xblock,
     request_token
@@ -276,106 +274,174 @@ def get_module_for_descriptor(user, request, descriptor, field_data_cache, cours
     )
 
 
-def get_module_system_for_user(user, field_data_cache,
-                               # Arguments preceding this comment have user binding, those following don't
-                               descriptor, course_id, track_function, xqueue_callback_url_prefix,
-                               request_token, position=None, wrap_xmodule_display=True, grade_bucket_type=None,
-                               static_asset_path='', user_location=None):
+class ModuleSystemBindings(object):
     """
-    Helper function that returns a module system and student_data bound to a user and a descriptor.
+    The parts of the module systems of a user in a course which don't depend on
+    the block: the student data, the services, the closures and the wrappers of
+    the rendered fragments.
 
-    The purpose of this function is to factor out everywhere a user is implicitly bound when creating a module,
-    to allow an existing module to be re-bound to a user.  Most of the user bindings happen when creating the
-    closures that feed the instantiation of ModuleSystem.
+    They are built once for the blocks loaded with the same FieldDataCache and
+    arguments (a block, and the children it loads, in the same request), and
+    get_module_system_for_user only binds the parts which depend on each block.
+    """
+    def __init__(self, user, field_data_cache, course_id, track_function, xqueue_callback_url_prefix,
+                 request_token, position=None, wrap_xmodule_display=True, grade_bucket_type=None,
+                 static_asset_path='', user_location=None):
+        self.user = user
+        self.field_data_cache = field_data_cache
+        self.course_id = course_id
+        self.track_function = track_function
+        self.xqueue_callback_url_prefix = xqueue_callback_url_prefix
+        self.request_token = request_token
+        self.position = position
+        self.wrap_xmodule_display = wrap_xmodule_display
+        self.grade_bucket_type = grade_bucket_type
+        self.static_asset_path = static_asset_path
+        self.user_location = user_location
+
+        self.student_data = KvsFieldData(DjangoKeyValueStore(field_data_cache))
+
+        # NOTE: module_id is empty string here. The 'module_id' will get assigned in the replacement
+        # function, we just need to specify something to get the reverse() to work.
+        self.jump_to_id_base_url = reverse(
+            'jump_to_id', kwargs={'course_id': course_id.to_deprecated_string(), 'module_id': ''}
+        )
+        self.replace_course_urls = partial(static_replace.replace_course_urls, course_key=course_id)
+        self.replace_jump_to_id_urls = partial(
+            static_replace.replace_jump_to_id_urls,
+            course_id=course_id,
+            jump_to_id_base_url=self.jump_to_id_base_url
+        )
 
-    The arguments fall into two categories: those that have explicit or implicit user binding, which are user
-    and field_data_cache, and those don't and are just present so that ModuleSystem can be instantiated, which
-    are all the other arguments.  Ultimately, this isn't too different than how get_module_for_descriptor_internal
-    was before refactoring.
+        # Wrap the output display in a single div to allow for the XModule
+        # javascript to be bound correctly
+        if wrap_xmodule_display is True:
+            self.wrap_xblock = partial(
+                wrap_xblock,
+                'LmsRuntime',
+                extra_data={'course-id': course_id.to_deprecated_string()},
+                usage_id_serializer=lambda usage_id: quote_slashes(usage_id.to_deprecated_string()),
+                request_token=request_token,
+            )
+        else:
+            self.wrap_xblock = None
 
-    Arguments:
-        see arguments for get_module()
-        request_token (str): A token unique to the request use by xblock initialization
+        self.services = {
+            'i18n': ModuleI18nService(),
+            'fs': xblock.reference.plugins.FSService(),
+        }
+        self.can_execute_unsafe_code = lambda: can_execute_unsafe_code(course_id)
+        self.get_python_lib_zip = lambda: get_python_lib_zip(contentstore, course_id)
+        self.get_user_role = lambda: get_user_role(user, course_id)
+
+        # pass position specified in URL to module through ModuleSystem
+        if position is not None:
+            try:
+                position = int(position)
+            except (ValueError, TypeError):
+                log.exception('Non-integer %r passed as position.', position)
+                position = None
+        self.module_position = position
+
+        # The parts which are only needed by some blocks, built the first time they are
+        self._url_replacers = {}
+        self._anonymous_student_ids = {}
+        self._user_is_admin = None
+        self._user_is_beta_tester = None
+
+    def url_replacers(self, data_dir, static_asset_path):
+        """
+        Returns the replace_urls function of the ModuleSystem, and the wrapper which
+        rewrites the urls of the fragments, of the blocks with the given data
+        directory and static asset path.
+        """
+        key = (data_dir, static_asset_path)
+        if key not in self._url_replacers:
+            self._url_replacers[key] = (
+                # TODO (cpennington): This should be removed when all html from
+                # a module is coming through get_html and is therefore covered
+                # by the replace_static_urls code below
+                partial(
+                    static_replace.replace_static_urls,
+                    data_directory=data_dir,
+                    course_id=self.course_id,
+                    static_asset_path=static_asset_path,
+                ),
+                # TODO (cpennington): When modules are shared between courses, the static
+                # prefix is going to have to be specific to the module, not the directory
+                # that the xml was loaded from
+
+                # Rewrite urls beginning in /static to point to course-specific content,
+                # allow URLs of the form '/course/' refer to the root of multicourse directory
+                #   hierarchy of this course,
+                # and rewrite intra-courseware links (/jump_to_id/<id>). This format
+                # is an improvement over the /course/... format for studio authored courses,
+                # because it is agnostic to course-hierarchy.
+                # All three are done in a single pass over the html.
+                partial(
+                    replace_urls,
+                    self.course_id,
+                    self.jump_to_id_base_url,
+                    data_dir,
+                    static_asset_path=static_asset_path
+                ),
+            )
+        return self._url_replacers[key]
 
-    Returns:
-        (LmsModuleSystem, KvsFieldData):  (module system, student_data) bound to, primarily, the user and descriptor
-    """
-    student_data = KvsFieldData(DjangoKeyValueStore(field_data_cache))
+    def anonymous_student_id(self, per_course):
+        """
+        Returns the per-course, or per-student, anonymized id of the user.
+        """
+        if per_course not in self._anonymous_student_ids:
+            self._anonymous_student_ids[per_course] = anonymous_id_for_user(
+                self.user, self.course_id if per_course else None
+            )
+        return self._anonymous_student_ids[per_course]
+
+    @property
+    def user_is_admin(self):
+        """
+        Whether the user is global staff.
+        """
+        if self._user_is_admin is None:
+            self._user_is_admin = has_access(self.user, u'staff', 'global')
+        return self._user_is_admin
+
+    @property
+    def user_is_beta_tester(self):
+        """
+        Whether the user is a beta tester of the course.
+        """
+        if self._user_is_beta_tester is None:
+            self._user_is_beta_tester = CourseBetaTesterRole(self.course_id).has_user(self.user)
+        return self._user_is_beta_tester
 
-    def make_xqueue_callback(dispatch='score_update'):
-        # Fully qualified callback URL for external queueing system
+    def make_xqueue_callback(self, location, dispatch='score_update'):
+        """
+        Returns the fully qualified callback URL of the external queueing system
+        for the block at `location`.
+        """
         relative_xqueue_callback_url = reverse(
             'xqueue_callback',
             kwargs=dict(
-                course_id=course_id.to_deprecated_string(),
-                userid=str(user.id),
-                mod_id=descriptor.location.to_deprecated_string(),
+                course_id=self.course_id.to_deprecated_string(),
+                userid=str(self.user.id),
+                mod_id=location.to_deprecated_string(),
                 dispatch=dispatch
             ),
         )
-        return xqueue_callback_url_prefix + relative_xqueue_callback_url
-
-    # Default queuename is course-specific and is derived from the course that
-    #   contains the current module.
-    # TODO: Queuename should be derived from 'course_settings.json' of each course
-    xqueue_default_queuename = descriptor.location.org + '-' + descriptor.location.course
-
-    xqueue = {
-        'interface': XQUEUE_INTERFACE,
-        'construct_callback': make_xqueue_callback,
-        'default_queuename': xqueue_default_queuename.replace(' ', '_'),
-        'waittime': settings.XQUEUE_WAITTIME_BETWEEN_REQUESTS
-    }
+        return self.xqueue_callback_url_prefix + relative_xqueue_callback_url
 
-    # This is a hacky way to pass settings to the combined open ended xmodule
-    # It needs an S3 interface to upload images to S3
-    # It needs the open ended grading interface in order to get peer grading to be done
-    # this first checks to see if the descriptor is the correct one, and only sends settings if it is
-
-    # Get descriptor metadata fields indicating needs for various settings
-    needs_open_ended_interface = getattr(descriptor, "needs_open_ended_interface", False)
-    needs_s3_interface = getattr(descriptor, "needs_s3_interface", False)
-
-    # Initialize interfaces to None
-    open_ended_grading_interface = None
-    s3_interface = None
-
-    # Create interfaces if needed
-    if needs_open_ended_interface:
-        open_ended_grading_interface = settings.OPEN_ENDED_GRADING_INTERFACE
-        open_ended_grading_interface['mock_peer_grading'] = settings.MOCK_PEER_GRADING
-        open_ended_grading_interface['mock_staff_grading'] = settings.MOCK_STAFF_GRADING
-    if needs_s3_interface:
-        s3_interface = {
-            'access_key': getattr(settings, 'AWS_ACCESS_KEY_ID', ''),
-            'secret_access_key': getattr(settings, 'AWS_SECRET_ACCESS_KEY', ''),
-            'storage_bucket_name': getattr(settings, 'AWS_STORAGE_BUCKET_NAME', 'openended')
-        }
-
-    def inner_get_module(descriptor):
+    def get_module(self, descriptor):
         """
-        Delegate to get_module_for_descriptor_internal() with all values except `descriptor` set.
+        Binds `descriptor` to the user, as get_module_for_descriptor_internal()
+        does with the arguments of these bindings.
 
         Because it does an access check, it may return None.
         """
-        # TODO: fix this so that make_xqueue_callback uses the descriptor passed into
-        # inner_get_module, not the parent's callback.  Add it as an argument....
-        return get_module_for_descriptor_internal(
-            user=user,
-            descriptor=descriptor,
-            field_data_cache=field_data_cache,
-            course_id=course_id,
-            track_function=track_function,
-            xqueue_callback_url_prefix=xqueue_callback_url_prefix,
-            position=position,
-            wrap_xmodule_display=wrap_xmodule_display,
-            grade_bucket_type=grade_bucket_type,
-            static_asset_path=static_asset_path,
-            user_location=user_location,
-            request_token=request_token,
-        )
+        return _bind_module_for_user(self, descriptor)
 
-    def _fulfill_content_milestones(user, course_key, content_key):
+    def _fulfill_content_milestones(self, user, course_key, content_key):
         """
         Internal helper to handle milestone fulfillments for the specified content module
         """
@@ -405,57 +471,59 @@ def get_module_system_for_user(user, field_data_cache,
                     for milestone in content_milestones:
                         milestones_helpers.add_user_milestone(user, milestone)
 
-    def handle_grade_event(block, event_type, event):  # pylint: disable=unused-argument
+    def handle_grade_event(self, location, block, event_type, event):  # pylint: disable=unused-argument
         """
         Manages the workflow for recording and updating of student module grade state
         """
-        user_id = event.get('user_id', user.id)
+        user_id = event.get('user_id', self.user.id)
 
         # Construct the key for the module
         key = KeyValueStore.Key(
             scope=Scope.user_state,
             user_id=user_id,
-            block_scope_id=descriptor.location,
+            block_scope_id=location,
             field_name='grade'
         )
 
-        student_module = field_data_cache.find_or_create(key)
+        student_module = self.field_data_cache.find_or_create(key)
         # Update the grades
         student_module.grade = event.get('value')
         student_module.max_grade = event.get('max_value')
-        # Save all changes to the underlying KeyValueStore
-        student_module.save()
+        # Save all changes to the underlying KeyValueStore, along with the state changed
+        # (but not yet written) during this request
+        self.field_data_cache.mark_dirty(student_module, ['grade', 'max_grade'])
+        self.field_data_cache.flush()
 
         # Bin score into range and increment stats
         score_bucket = get_score_bucket(student_module.grade, student_module.max_grade)
 
         tags = [
-            u"org:{}".format(course_id.org),
-            u"course:{}".format(course_id),
+            u"org:{}".format(self.course_id.org),
+            u"course:{}".format(self.course_id),
             u"score_bucket:{0}".format(score_bucket)
         ]
 
-        if grade_bucket_type is not None:
-            tags.append('type:%s' % grade_bucket_type)
+        if self.grade_bucket_type is not None:
+            tags.append('type:%s' % self.grade_bucket_type)
 
         dog_stats_api.increment("lms.courseware.question_answered", tags=tags)
 
         # Cycle through the milestone fulfillment scenarios to see if any are now applicable
         # thanks to the updated grading information that was just submitted
-        _fulfill_content_milestones(
-            user,
-            course_id,
-            descriptor.location,
+        self._fulfill_content_milestones(
+            self.user,
+            self.course_id,
+            location,
         )
 
-    def publish(block, event_type, event):
-        """A function that allows XModules to publish events."""
+    def publish(self, location, block, event_type, event):
+        """A function that allows the block at `location` to publish events."""
         if event_type == 'grade':
-            handle_grade_event(block, event_type, event)
+            self.handle_grade_event(location, block, event_type, event)
         else:
-            track_function(event_type, event)
+            self.track_function(event_type, event)
 
-    def rebind_noauth_module_to_user(module, real_user):
+    def rebind_noauth_module_to_user(self, module, real_user):
         """
         A function that allows a module to get re-bound to a real user if it was previously bound to an AnonymousUser.
 
@@ -468,14 +536,14 @@ def get_module_system_for_user(user, field_data_cache,
         Returns:
             nothing (but the side effect is that module is re-bound to real_user)
         """
-        if user.is_authenticated():
+        if self.user.is_authenticated():
             err_msg = ("rebind_noauth_module_to_user can only be called from a module bound to "
                        "an anonymous user")
             log.error(err_msg)
             raise LmsModuleRenderError(err_msg)
 
         field_data_cache_real_user = FieldDataCache.cache_for_descriptor_descendents(
-            course_id,
+            self.course_id,
             real_user,
             module.descriptor,
             asides=XBlockAsidesConfig.possible_asides(),
@@ -485,15 +553,15 @@ def get_module_system_for_user(user, field_data_cache,
             user=real_user,
             field_data_cache=field_data_cache_real_user,  # These have implicit user bindings, rest of args considered not to
             descriptor=module.descriptor,
-            course_id=course_id,
-            track_function=track_function,
-            xqueue_callback_url_prefix=xqueue_callback_url_prefix,
-            position=position,
-            wrap_xmodule_display=wrap_xmodule_display,
-            grade_bucket_type=grade_bucket_type,
-            static_asset_path=static_asset_path,
-            user_location=user_location,
-            request_token=request_token
+            course_id=self.course_id,
+            track_function=self.track_function,
+            xqueue_callback_url_prefix=self.xqueue_callback_url_prefix,
+            position=self.position,
+            wrap_xmodule_display=self.wrap_xmodule_display,
+            grade_bucket_type=self.grade_bucket_type,
+            static_asset_path=self.static_asset_path,
+            user_location=self.user_location,
+            request_token=self.request_token
         )
         # rebinds module to a different student.  We'll change system, student_data, and scope_ids
         module.descriptor.bind_for_student(
@@ -506,47 +574,129 @@ def get_module_system_for_user(user, field_data_cache,
         module.runtime = inner_system
         inner_system.xmodule_instance = module
 
+
+def get_module_system_bindings(user, field_data_cache, course_id, track_function, xqueue_callback_url_prefix,
+                               request_token, position=None, wrap_xmodule_display=True, grade_bucket_type=None,
+                               static_asset_path='', user_location=None):
+    """
+    Returns the ModuleSystemBindings of the user with the given arguments.
+
+    The bindings are kept by field_data_cache, which is created for a user in a
+    course for the duration of a request (or of a task), so that all the blocks
+    loaded with it, and the same arguments, share them.
+    """
+    bindings_by_arguments = getattr(field_data_cache, 'module_system_bindings', None)
+    key = (
+        id(user), course_id, track_function, xqueue_callback_url_prefix, request_token, position,
+        wrap_xmodule_display, grade_bucket_type, static_asset_path, user_location,
+    )
+    # Stand-ins for a FieldDataCache (e.g. in tests) don't keep the bindings
+    bindings = bindings_by_arguments.get(key) if isinstance(bindings_by_arguments, dict) else None
+    if bindings is None:
+        bindings = ModuleSystemBindings(
+            user, field_data_cache, course_id, track_function, xqueue_callback_url_prefix, request_token,
+            position=position,
+            wrap_xmodule_display=wrap_xmodule_display,
+            grade_bucket_type=grade_bucket_type,
+            static_asset_path=static_asset_path,
+            user_location=user_location,
+        )
+        if isinstance(bindings_by_arguments, dict):
+            bindings_by_arguments[key] = bindings
+    return bindings
+
+
+def get_module_system_for_user(user, field_data_cache,
+                               # Arguments preceding this comment have user binding, those following don't
+                               descriptor, course_id, track_function, xqueue_callback_url_prefix,
+                               request_token, position=None, wrap_xmodule_display=True, grade_bucket_type=None,
+                               static_asset_path='', user_location=None):
+    """
+    Helper function that returns a module system and student_data bound to a user and a descriptor.
+
+    The purpose of this function is to factor out everywhere a user is implicitly bound when creating a module,
+    to allow an existing module to be re-bound to a user.  Most of the user bindings happen when creating the
+    closures that feed the instantiation of ModuleSystem.
+
+    The arguments fall into two categories: those that have explicit or implicit user binding, which are user
+    and field_data_cache, and those don't and are just present so that ModuleSystem can be instantiated, which
+    are all the other arguments.  Ultimately, this isn't too different than how get_module_for_descriptor_internal
+    was before refactoring.
+
+    Arguments:
+        see arguments for get_module()
+        request_token (str): A token unique to the request use by xblock initialization
+
+    Returns:
+        (LmsModuleSystem, KvsFieldData):  (module system, student_data) bound to, primarily, the user and descriptor
+    """
+    bindings = get_module_system_bindings(
+        user, field_data_cache, course_id, track_function, xqueue_callback_url_prefix, request_token,
+        position=position,
+        wrap_xmodule_display=wrap_xmodule_display,
+        grade_bucket_type=grade_bucket_type,
+        static_asset_path=static_asset_path,
+        user_location=user_location,
+    )
+    return _module_system_for_descriptor(bindings, descriptor)
+
+
+def _module_system_for_descriptor(bindings, descriptor):
+    """
+    Returns the module system and field data of `descriptor`, built from the
+    parts of `bindings` shared by all the blocks.
+    """
+    user = bindings.user
+    course_id = bindings.course_id
+
+    # Default queuename is course-specific and is derived from the course that
+    #   contains the current module.
+    # TODO: Queuename should be derived from 'course_settings.json' of each course
+    xqueue_default_queuename = descriptor.location.org + '-' + descriptor.location.course
+
+    xqueue = {
+        'interface': XQUEUE_INTERFACE,
+        'construct_callback': partial(bindings.make_xqueue_callback, descriptor.location),
+        'default_queuename': xqueue_default_queuename.replace(' ', '_'),
+        'waittime': settings.XQUEUE_WAITTIME_BETWEEN_REQUESTS
+    }
+
+    # This is a hacky way to pass settings to the combined open ended xmodule
+    # It needs an S3 interface to upload images to S3
+    # It needs the open ended grading interface in order to get peer grading to be done
+    # this first checks to see if the descriptor is the correct one, and only sends settings if it is
+
+    # Get descriptor metadata fields indicating needs for various settings
+    needs_open_ended_interface = getattr(descriptor, "needs_open_ended_interface", False)
+    needs_s3_interface = getattr(descriptor, "needs_s3_interface", False)
+
+    # Initialize interfaces to None
+    open_ended_grading_interface = None
+    s3_interface = None
+
+    # Create interfaces if needed
+    if needs_open_ended_interface:
+        open_ended_grading_interface = settings.OPEN_ENDED_GRADING_INTERFACE
+        open_ended_grading_interface['mock_peer_grading'] = settings.MOCK_PEER_GRADING
+        open_ended_grading_interface['mock_staff_grading'] = settings.MOCK_STAFF_GRADING
+    if needs_s3_interface:
+        s3_interface = {
+            'access_key': getattr(settings, 'AWS_ACCESS_KEY_ID', ''),
+            'secret_access_key': getattr(settings, 'AWS_SECRET_ACCESS_KEY', ''),
+            'storage_bucket_name': getattr(settings, 'AWS_STORAGE_BUCKET_NAME', 'openended')
+        }
+
+    replace_static_urls, replace_urls_wrapper = bindings.url_replacers(
+        getattr(descriptor, 'data_dir', None),
+        bindings.static_asset_path or descriptor.static_asset_path,
+    )
+
     # Build a list of wrapping functions that will be applied in order
     # to the Fragment content coming out of the xblocks that are about to be rendered.
     block_wrappers = []
-
-    # Wrap the output display in a single div to allow for the XModule
-    # javascript to be bound correctly
-    if wrap_xmodule_display is True:
-        block_wrappers.append(partial(
-            wrap_xblock,
-            'LmsRuntime',
-            extra_data={'course-id': course_id.to_deprecated_string()},
-            usage_id_serializer=lambda usage_id: quote_slashes(usage_id.to_deprecated_string()),
-            request_token=request_token,
-        ))
-
-    # TODO (cpennington): When modules are shared between courses, the static
-    # prefix is going to have to be specific to the module, not the directory
-    # that the xml was loaded from
-
-    # Rewrite urls beginning in /static to point to course-specific content
-    block_wrappers.append(partial(
-        replace_static_urls,
-        getattr(descriptor, 'data_dir', None),
-        course_id=course_id,
-        static_asset_path=static_asset_path or descriptor.static_asset_path
-    ))
-
-    # Allow URLs of the form '/course/' refer to the root of multicourse directory
-    #   hierarchy of this course
-    block_wrappers.append(partial(replace_course_urls, course_id))
-
-    # this will rewrite intra-courseware links (/jump_to_id/<id>). This format
-    # is an improvement over the /course/... format for studio authored courses,
-    # because it is agnostic to course-hierarchy.
-    # NOTE: module_id is empty string here. The 'module_id' will get assigned in the replacement
-    # function, we just need to specify something to get the reverse() to work.
-    block_wrappers.append(partial(
-        replace_jump_to_id_urls,
-        course_id,
-        reverse('jump_to_id', kwargs={'course_id': course_id.to_deprecated_string(), 'module_id': ''}),
-    ))
+    if bindings.wrap_xblock is not None:
+        block_wrappers.append(bindings.wrap_xblock)
+    block_wrappers.append(replace_urls_wrapper)
 
     if settings.FEATURES.get('DISPLAY_DEBUG_INFO_TO_STAFF'):
         if has_access(user, 'staff', descriptor, course_id):
@@ -562,79 +712,52 @@ def get_module_system_for_user(user, field_data_cache,
     is_pure_xblock = isinstance(descriptor, XBlock) and not isinstance(descriptor, XModuleDescriptor)
     module_class = getattr(descriptor, 'module_class', None)
     is_lti_module = not is_pure_xblock and issubclass(module_class, LTIModule)
-    if is_pure_xblock or is_lti_module:
-        anonymous_student_id = anonymous_id_for_user(user, course_id)
-    else:
-        anonymous_student_id = anonymous_id_for_user(user, None)
+    anonymous_student_id = bindings.anonymous_student_id(per_course=is_pure_xblock or is_lti_module)
 
-    field_data = LmsFieldData(descriptor._field_data, student_data)  # pylint: disable=protected-access
+    field_data = LmsFieldData(descriptor._field_data, bindings.student_data)  # pylint: disable=protected-access
 
     user_is_staff = has_access(user, u'staff', descriptor.location, course_id)
 
+    services = dict(bindings.services)
+    services['field-data'] = field_data
+    services['user'] = DjangoXBlockUserService(user, user_is_staff=user_is_staff)
+
     system = LmsModuleSystem(
-        track_function=track_function,
+        track_function=bindings.track_function,
         render_template=render_to_string,
         static_url=settings.STATIC_URL,
         xqueue=xqueue,
         # TODO (cpennington): Figure out how to share info between systems
         filestore=descriptor.runtime.resources_fs,
-        get_module=inner_get_module,
+        get_module=bindings.get_module,
         user=user,
         debug=settings.DEBUG,
         hostname=settings.SITE_NAME,
-        # TODO (cpennington): This should be removed when all html from
-        # a module is coming through get_html and is therefore covered
-        # by the replace_static_urls code below
-        replace_urls=partial(
-            static_replace.replace_static_urls,
-            data_directory=getattr(descriptor, 'data_dir', None),
-            course_id=course_id,
-            static_asset_path=static_asset_path or descriptor.static_asset_path,
-        ),
-        replace_course_urls=partial(
-            static_replace.replace_course_urls,
-            course_key=course_id
-        ),
-        replace_jump_to_id_urls=partial(
-            static_replace.replace_jump_to_id_urls,
-            course_id=course_id,
-            jump_to_id_base_url=reverse('jump_to_id', kwargs={'course_id': course_id.to_deprecated_string(), 'module_id': ''})
-        ),
+        replace_urls=replace_static_urls,
+        replace_course_urls=bindings.replace_course_urls,
+        replace_jump_to_id_urls=bindings.replace_jump_to_id_urls,
         node_path=settings.NODE_PATH,
-        publish=publish,
+        publish=partial(bindings.publish, descriptor.location),
         anonymous_student_id=anonymous_student_id,
         course_id=course_id,
         open_ended_grading_interface=open_ended_grading_interface,
         s3_interface=s3_interface,
         cache=cache,
-        can_execute_unsafe_code=(lambda: can_execute_unsafe_code(course_id)),
-        get_python_lib_zip=(lambda: get_python_lib_zip(contentstore, course_id)),
+        can_execute_unsafe_code=bindings.can_execute_unsafe_code,
+        get_python_lib_zip=bindings.get_python_lib_zip,
         # TODO: When we merge the descriptor and module systems, we can stop reaching into the mixologist (cpennington)
         mixins=descriptor.runtime.mixologist._mixins,  # pylint: disable=protected-access
         wrappers=block_wrappers,
         get_real_user=user_by_anonymous_id,
-        services={
-            'i18n': ModuleI18nService(),
-            'fs': xblock.reference.plugins.FSService(),
-            'field-data': field_data,
-            'user': DjangoXBlockUserService(user, user_is_staff=user_is_staff),
-        },
-        get_user_role=lambda: get_user_role(user, course_id),
+        services=services,
+        get_user_role=bindings.get_user_role,
         descriptor_runtime=descriptor._runtime,  # pylint: disable=protected-access
-        rebind_noauth_module_to_user=rebind_noauth_module_to_user,
-        user_location=user_location,
-        request_token=request_token,
+        rebind_noauth_module_to_user=bindings.rebind_noauth_module_to_user,
+        user_location=bindings.user_location,
+        request_token=bindings.request_token,
     )
 
-    # pass position specified in URL to module through ModuleSystem
-    if position is not None:
-        try:
-            position = int(position)
-        except (ValueError, TypeError):
-            log.exception('Non-integer %r passed as position.', position)
-            position = None
-
-    system.set('position', position)
+    system.set('position', bindings.module_position)
     if settings.FEATURES.get('ENABLE_PSYCHOMETRICS') and user.is_authenticated():
         system.set(
             'psychometrics_handler',  # set callback for updating PsychometricsData
@@ -642,12 +765,12 @@ def get_module_system_for_user(user, field_data_cache,
         )
 
     system.set(u'user_is_staff', user_is_staff)
-    system.set(u'user_is_admin', has_access(user, u'staff', 'global'))
-    system.set(u'user_is_beta_tester', CourseBetaTesterRole(course_id).has_user(user))
+    system.set(u'user_is_admin', bindings.user_is_admin)
+    system.set(u'user_is_beta_tester', bindings.user_is_beta_tester)
     system.set(u'days_early_for_beta', getattr(descriptor, 'days_early_for_beta'))
 
     # make an ErrorDescriptor -- assuming that the descriptor's system is ok
-    if has_access(user, u'staff', descriptor.location, course_id):
+    if user_is_staff:
         system.error_descriptor_class = ErrorDescriptor
     else:
         system.error_descriptor_class = NonStaffErrorDescriptor
@@ -667,27 +790,31 @@ def get_module_for_descriptor_internal(user, descriptor, field_data_cache, cours
     Arguments:
         request_token (str): A unique token for this request, used to isolate xblock rendering
     """
-
-    # Do not check access when it's a noauth request.
-    if getattr(user, 'known', True):
-        # Short circuit--if the user shouldn't have access, bail without doing any work
-        if not has_access(user, 'load', descriptor, course_id):
-            return None
-
-    (system, field_data) = get_module_system_for_user(
-        user=user,
-        field_data_cache=field_data_cache,  # These have implicit user bindings, the rest of args are considered not to
-        descriptor=descriptor,
-        course_id=course_id,
-        track_function=track_function,
-        xqueue_callback_url_prefix=xqueue_callback_url_prefix,
+    bindings = get_module_system_bindings(
+        user, field_data_cache, course_id, track_function, xqueue_callback_url_prefix, request_token,
         position=position,
         wrap_xmodule_display=wrap_xmodule_display,
         grade_bucket_type=grade_bucket_type,
         static_asset_path=static_asset_path,
         user_location=user_location,
-        request_token=request_token
     )
+    return _bind_module_for_user(bindings, descriptor)
+
+
+def _bind_module_for_user(bindings, descriptor):
+    """
+    Binds `descriptor` to the user of `bindings`, and returns it, or returns
+    None if the user doesn't have access to it.
+    """
+    user = bindings.user
+
+    # Do not check access when it's a noauth request.
+    if getattr(user, 'known', True):
+        # Short circuit--if the user shouldn't have access, bail without doing any work
+        if not has_access(user, 'load', descriptor, bindings.course_id):
+            return None
+
+    (system, field_data) = _module_system_for_descriptor(bindings, descriptor)
 
     descriptor.bind_for_student(system, field_data, user.id)  # pylint: disable=protected-access
     return descriptor
@@ -880,6 +1007,9 @@ def _invoke_xblock_handler(request, course_id, usage_id, handler, suffix):
     try:
         with tracker.get_tracker().context(tracking_context_name, tracking_context):
             resp = instance.handle(handler, req, suffix)
+            # Write the state the handler changed before answering, so that a
+            # failure to save it is reported rather than a success
+            flush_pending_writes()
 
     except NoSuchHandlerError:
         log.exception("XBlock %s attempted to access missing handler %r", instance, handler)
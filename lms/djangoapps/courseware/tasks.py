@@ -0,0 +1,19 @@
+"""
+Asynchronous tasks of the courseware app.
+"""
+import dateutil.parser
+from celery.task import task
+
+
+@task(name=u'courseware.tasks.write_student_module_history')
+def write_student_module_history(history_records):
+    """
+    Writes the StudentModule history entries `history_records` (see
+    courseware.history.queue_history_entry) with a single query.
+    """
+    # Import here to avoid circular import.
+    from courseware.models import CompressedStudentModuleHistory
+
+    for record in history_records:
+        record['created'] = dateutil.parser.parse(record['created'])
+    CompressedStudentModuleHistory.write_history(history_records)
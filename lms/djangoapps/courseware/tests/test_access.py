@@ -3,6 +3,7 @@ import pytz
 
 from django.test import TestCase
 from django.core.urlresolvers import reverse
+from django.test.utils import override_settings
 from mock import Mock, patch
 from opaque_keys.edx.locations import SlashSeparatedCourseKey
 
@@ -10,12 +11,14 @@ import courseware.access as access
 from courseware.masquerade import CourseMasquerade
 from courseware.tests.factories import UserFactory, StaffFactory, InstructorFactory
 from courseware.tests.helpers import LoginEnrollmentTestCase
+from request_cache.middleware import RequestCache
+from student.roles import CourseStaffRole
 from student.tests.factories import AnonymousUserFactory, CourseEnrollmentAllowedFactory, CourseEnrollmentFactory
 from xmodule.course_module import (
     CATALOG_VISIBILITY_CATALOG_AND_ABOUT, CATALOG_VISIBILITY_ABOUT,
     CATALOG_VISIBILITY_NONE
 )
-from xmodule.modulestore.tests.factories import CourseFactory
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 
 from util.milestones_helpers import (
@@ -379,3 +382,61 @@ class UserRoleTestCase(TestCase):
             'student',
             access.get_user_role(self.anonymous_user, self.course_key)
         )
+
+
+@override_settings(COURSEWARE_ACCESS_REQUEST_CACHE=True)
+class AccessMemoizationTestCase(ModuleStoreTestCase):
+    """
+    Tests of the access decisions memoized for the duration of a request.
+    """
+    def setUp(self):
+        super(AccessMemoizationTestCase, self).setUp()
+        self.course = CourseFactory.create()
+        self.chapter = ItemFactory.create(parent_location=self.course.location, category='chapter')
+        self.student = UserFactory()
+        self.course_staff = StaffFactory(course_key=self.course.id)
+
+        RequestCache().clear_request_cache()
+        self.addCleanup(RequestCache().clear_request_cache)
+        patcher = patch('courseware.access.get_current_request', return_value=Mock())
+        self.mock_get_current_request = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_roles_looked_up_once(self):
+        with patch('courseware.access._course_access_levels', wraps=access._course_access_levels) as mock_levels:
+            for __ in range(3):
+                self.assertTrue(access.has_access(self.course_staff, 'staff', self.course))
+                self.assertTrue(access.has_access(self.course_staff, 'staff', self.chapter, self.course.id))
+        self.assertEqual(mock_levels.call_count, 1)
+
+    def test_decisions_memoized(self):
+        with patch('courseware.access._has_group_access', return_value=True) as mock_group_access:
+            for __ in range(3):
+                self.assertTrue(access.has_access(self.student, 'load', self.chapter, self.course.id))
+            self.assertEqual(mock_group_access.call_count, 1)
+
+            # Other users and blocks have their own decisions
+            access.has_access(self.course_staff, 'load', self.chapter, self.course.id)
+            access.has_access(self.student, 'load', self.course, self.course.id)
+            self.assertEqual(mock_group_access.call_count, 3)
+
+    def test_not_memoized_outside_of_requests(self):
+        self.mock_get_current_request.return_value = None
+        with patch('courseware.access._has_group_access', return_value=True) as mock_group_access:
+            for __ in range(3):
+                access.has_access(self.student, 'load', self.chapter, self.course.id)
+        self.assertEqual(mock_group_access.call_count, 3)
+
+    def test_role_changes(self):
+        self.assertFalse(access.has_access(self.student, 'staff', self.course))
+        CourseStaffRole(self.course.id).add_users(self.student)
+        self.assertTrue(access.has_access(self.student, 'staff', self.course))
+        CourseStaffRole(self.course.id).remove_users(self.student)
+        self.assertFalse(access.has_access(self.student, 'staff', self.course))
+
+    def test_masquerade(self):
+        self.assertTrue(access.has_access(self.course_staff, 'staff', self.chapter, self.course.id))
+        self.course_staff.masquerade_settings = {
+            self.course.id: CourseMasquerade(self.course.id, role='student')
+        }
+        self.assertFalse(access.has_access(self.course_staff, 'staff', self.chapter, self.course.id))
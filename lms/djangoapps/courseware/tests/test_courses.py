@@ -13,7 +13,7 @@ from django.test.client import RequestFactory
 from opaque_keys.edx.locations import SlashSeparatedCourseKey
 
 from courseware.courses import (
-    get_course_by_id, get_cms_course_link, course_image_url,
+    get_course_by_id, get_cms_course_link,
     get_course_info_section, get_course_about_section, get_cms_block_link
 )
 from courseware.module_render import get_module_for_descriptor
@@ -28,6 +28,7 @@ from xmodule.modulestore.tests.django_utils import TEST_DATA_MIXED_TOY_MODULESTO
 from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
 from xmodule.tests.xml import factories as xml
 from xmodule.tests.xml import XModuleXmlImportTest
+from openedx.core.lib.courses import course_image_url
 
 
 CMS_BASE_TEST = 'testcms'
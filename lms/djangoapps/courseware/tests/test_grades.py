@@ -5,13 +5,13 @@ from django.http import Http404
 from mock import patch
 from opaque_keys.edx.locations import SlashSeparatedCourseKey
 
-from courseware.grades import grade, iterate_grades_for
+from courseware.grades import grade, iterate_grades_for, PrefetchedScores
 from student.tests.factories import UserFactory
 from xmodule.modulestore.tests.factories import CourseFactory
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 
 
-def _grade_with_errors(student, request, course, keep_raw_scores=False):
+def _grade_with_errors(student, request, course, keep_raw_scores=False, prefetched_scores=None):
     """This fake grade method will throw exceptions for student3 and
     student4, but allow any other students to go through normal grading.
 
@@ -22,7 +22,7 @@ def _grade_with_errors(student, request, course, keep_raw_scores=False):
     if student.username in ['student3', 'student4']:
         raise Exception("I don't like {}".format(student.username))
 
-    return grade(student, request, course, keep_raw_scores=keep_raw_scores)
+    return grade(student, request, course, keep_raw_scores=keep_raw_scores, prefetched_scores=prefetched_scores)
 
 
 class TestGradeIteration(ModuleStoreTestCase):
@@ -72,6 +72,18 @@ class TestGradeIteration(ModuleStoreTestCase):
             self.assertIsNone(gradeset['grade'])
             self.assertEqual(gradeset['percent'], 0.0)
 
+    def test_batched_grades(self):
+        """Grading students in batches gives the same gradesets, without
+        querying the scores of each student separately."""
+        all_gradesets, _ = self._gradesets_and_errors_for(self.course.id, self.students)
+        with patch('courseware.grades.PrefetchedScores', wraps=PrefetchedScores) as mock_prefetch:
+            batched_gradesets, batched_errors = self._gradesets_and_errors_for(
+                self.course.id, self.students, batch_size=2
+            )
+        self.assertEqual(mock_prefetch.call_count, 3)
+        self.assertEqual(len(batched_errors), 0)
+        self.assertEqual(batched_gradesets, all_gradesets)
+
     @patch('courseware.grades.grade', _grade_with_errors)
     def test_grading_exception(self):
         """Test that we correctly capture exception messages that bubble up from
@@ -105,7 +117,7 @@ class TestGradeIteration(ModuleStoreTestCase):
         self.assertTrue(all_gradesets[student5])
 
     ################################# Helpers #################################
-    def _gradesets_and_errors_for(self, course_id, students):
+    def _gradesets_and_errors_for(self, course_id, students, batch_size=None):
         """Simple helper method to iterate through student grades and give us
         two dictionaries -- one that has all students and their respective
         gradesets, and one that has only students that could not be graded and
@@ -113,7 +125,7 @@ class TestGradeIteration(ModuleStoreTestCase):
         students_to_gradesets = {}
         students_to_errors = {}
 
-        for student, gradeset, err_msg in iterate_grades_for(course_id, students):
+        for student, gradeset, err_msg in iterate_grades_for(course_id, students, batch_size=batch_size):
             students_to_gradesets[student] = gradeset
             if err_msg:
                 students_to_errors[student] = err_msg
@@ -0,0 +1,123 @@
+"""
+Tests of the asynchronous, compressed StudentModule history.
+"""
+import json
+from datetime import datetime, timedelta
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.utils.timezone import UTC
+
+from courseware.history import (
+    discard_queued_history, queue_history_until_sent, send_queued_history, write_queued_history
+)
+from courseware.models import CompressedStudentModuleHistory, StudentModuleHistory
+from courseware.tests.factories import StudentModuleFactory
+from request_cache.middleware import RequestCache
+
+
+@override_settings(STUDENT_MODULE_HISTORY_ASYNC=True, STUDENT_MODULE_HISTORY_KEYFRAME_INTERVAL=3)
+class CompressedHistoryTestCase(TestCase):
+    """
+    Tests of the history written by the courseware.tasks.write_student_module_history task.
+    """
+    def setUp(self):
+        super(CompressedHistoryTestCase, self).setUp()
+        self.addCleanup(RequestCache().clear_request_cache)
+        self.student_module = StudentModuleFactory(state=json.dumps({'attempts': 0, 'seed': 1}))
+        self.states = [{'attempts': 0, 'seed': 1}]
+
+    def _save_states(self, count):
+        """
+        Saves `count` new states of the StudentModule.
+        """
+        for __ in range(count):
+            state = dict(self.states[-1], attempts=self.states[-1]['attempts'] + 1)
+            if state['attempts'] == 2:
+                del state['seed']
+            self.student_module.state = json.dumps(state)
+            self.student_module.save()
+            self.states.append(state)
+
+    def test_history(self):
+        self._save_states(4)
+        entries = CompressedStudentModuleHistory.objects.order_by('id')
+        self.assertEqual([entry.is_keyframe for entry in entries], [True, False, False, True, False])
+        self.assertFalse(StudentModuleHistory.objects.exists())
+
+        history = StudentModuleHistory.get_history(self.student_module)
+        self.assertEqual([json.loads(entry.state) for entry in reversed(history)], self.states)
+
+    def test_queued_in_request(self):
+        queue_history_until_sent()
+        self._save_states(2)
+        self.assertFalse(CompressedStudentModuleHistory.objects.exists())
+
+        send_queued_history()
+        self.assertEqual(CompressedStudentModuleHistory.objects.count(), 3)
+        self.assertEqual(
+            [json.loads(entry.state) for entry in reversed(StudentModuleHistory.get_history(self.student_module))],
+            self.states
+        )
+
+    def test_discarded_in_failed_request(self):
+        queue_history_until_sent()
+        self._save_states(2)
+        discard_queued_history()
+        send_queued_history()
+        self.assertEqual(CompressedStudentModuleHistory.objects.count(), 1)
+
+    def test_written_now_in_request(self):
+        queue_history_until_sent()
+        self._save_states(1)
+        write_queued_history(self.student_module)
+        self.assertEqual(CompressedStudentModuleHistory.objects.count(), 2)
+
+        send_queued_history()
+        self.assertEqual(CompressedStudentModuleHistory.objects.count(), 2)
+
+    def test_batches_out_of_order(self):
+        now = datetime.now(UTC())
+        records = []
+        for attempts in range(1, 5):
+            self.states.append({'attempts': attempts})
+            records.append({
+                'student_module_id': self.student_module.id,
+                'created': now + timedelta(minutes=attempts),
+                'state': json.dumps(self.states[-1]),
+                'grade': None,
+                'max_grade': None,
+            })
+        # The task of the later changes runs first
+        CompressedStudentModuleHistory.write_history(records[2:])
+        CompressedStudentModuleHistory.write_history(records[:2])
+
+        self.assertEqual(
+            [json.loads(entry.state) for entry in reversed(StudentModuleHistory.get_history(self.student_module))],
+            self.states
+        )
+
+        # Pruning the entries of the earlier changes keeps the states of the later ones
+        CompressedStudentModuleHistory.prune(now + timedelta(minutes=3), [self.student_module.id])
+        self.assertEqual(
+            [json.loads(entry.state) for entry in reversed(StudentModuleHistory.get_history(self.student_module))],
+            self.states[3:]
+        )
+
+    def test_prune(self):
+        self._save_states(4)
+        now = datetime.now(UTC())
+        for entry, days in zip(CompressedStudentModuleHistory.objects.order_by('id'), [10, 10, 10, 10, 0]):
+            entry.created = now - timedelta(days=days)
+            entry.save()
+
+        call_command('prune_student_module_history', days=5)
+        entries = list(CompressedStudentModuleHistory.objects.all())
+        self.assertEqual(len(entries), 1)
+        # The remaining entry holds the whole state
+        self.assertTrue(entries[0].is_keyframe)
+        self.assertEqual(
+            [json.loads(entry.state) for entry in StudentModuleHistory.get_history(self.student_module)],
+            [self.states[-1]]
+        )
@@ -4,11 +4,12 @@ Tests for courseware middleware
 
 from django.core.urlresolvers import reverse
 from django.test.client import RequestFactory
-from django.http import Http404
+from django.http import Http404, HttpResponse
 from mock import patch
+from xblock.exceptions import KeyValueMultiSaveError
 
 import courseware.courses as courses
-from courseware.middleware import RedirectUnenrolledMiddleware
+from courseware.middleware import FieldDataCacheFlushMiddleware, RedirectUnenrolledMiddleware
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 from xmodule.modulestore.tests.factories import CourseFactory
 
@@ -50,3 +51,10 @@ class CoursewareMiddlewareTestCase(ModuleStoreTestCase):
             request, Http404()
         )
         self.assertIsNone(response)
+
+    @patch('courseware.middleware.flush_deferred_writes', side_effect=KeyValueMultiSaveError([]))
+    def test_flush_error(self, _mock_flush):
+        """A failure to write the student state replaces the response by an error"""
+        request = RequestFactory().get("dummy_url")
+        response = FieldDataCacheFlushMiddleware().process_response(request, HttpResponse())
+        self.assertEqual(response.status_code, 500)
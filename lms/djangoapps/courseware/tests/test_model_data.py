@@ -7,7 +7,8 @@ from functools import partial
 
 from courseware.model_data import DjangoKeyValueStore
 from courseware.model_data import InvalidScopeError, FieldDataCache
-from courseware.models import StudentModule
+from courseware.model_data import defer_writes_until_flush, discard_deferred_writes, flush_deferred_writes
+from courseware.models import StudentModule, StudentModuleHistory
 from courseware.models import XModuleStudentInfoField, XModuleStudentPrefsField
 
 from student.tests.factories import UserFactory
@@ -20,6 +21,7 @@ from xblock.exceptions import KeyValueMultiSaveError
 from xblock.core import XBlock
 from django.test import TestCase
 from django.db import DatabaseError
+from request_cache.middleware import RequestCache
 
 
 def mock_field(scope, name):
@@ -208,6 +210,152 @@ class TestStudentModuleStorage(OtherUserFailureTestMixin, TestCase):
         self.assertEquals(len(exception_context.exception.saved_field_names), 0)
 
 
+    def test_state_decoded_once(self):
+        "Test that the state of a StudentModule is only decoded once, however many fields are read"
+        with patch('courseware.model_data.json.loads', side_effect=json.loads) as mock_loads:
+            for __ in range(3):
+                self.assertTrue(self.kvs.has(user_state_key('a_field')))
+                self.assertEquals('b_value', self.kvs.get(user_state_key('b_field')))
+            self.kvs.set(user_state_key('a_field'), 'new_value')
+            self.assertEquals('new_value', self.kvs.get(user_state_key('a_field')))
+        self.assertEquals(mock_loads.call_count, 1)
+
+    def test_set_copies_value(self):
+        "Test that changing a value after it was set doesn't change the state"
+        value = {'answers': [1]}
+        self.kvs.set(user_state_key('a_field'), value)
+        value['answers'].append(2)
+        self.assertEquals({'answers': [1]}, self.kvs.get(user_state_key('a_field')))
+
+
+class TestDeferredWrites(TestCase):
+    """Tests for deferring the writes of user_state to the end of the request"""
+    def setUp(self):
+        super(TestDeferredWrites, self).setUp()
+        student_module = StudentModuleFactory(state=json.dumps({'a_field': 'a_value'}))
+        self.user = student_module.student
+        self.assertEqual(self.user.id, 1)   # check our assumption hard-coded in the key functions above.
+
+        defer_writes_until_flush()
+        self.addCleanup(RequestCache().clear_request_cache)
+        self.field_data_cache = FieldDataCache(
+            [mock_descriptor([mock_field(Scope.user_state, 'a_field')])],
+            course_id,
+            self.user
+        )
+        self.kvs = DjangoKeyValueStore(self.field_data_cache)
+
+    def test_writes_coalesced(self):
+        "Test that a StudentModule changed many times is written once, when the writes are flushed"
+        with self.assertNumQueries(0):
+            self.kvs.set(user_state_key('a_field'), 'new_value')
+            self.kvs.set_many({user_state_key('b_field'): 'b_value', user_state_key('c_field'): 'c_value'})
+            self.kvs.delete(user_state_key('c_field'))
+        self.assertEquals({'a_field': 'a_value'}, json.loads(StudentModule.objects.get().state))
+
+        # The StudentModule, and its history
+        with self.assertNumQueries(2):
+            flush_deferred_writes()
+        self.assertEquals(
+            {'a_field': 'new_value', 'b_field': 'b_value'},
+            json.loads(StudentModule.objects.get().state)
+        )
+
+        # Writes are no longer deferred
+        with self.assertNumQueries(2):
+            self.kvs.set(user_state_key('a_field'), 'newer_value')
+
+    def test_new_student_modules_bulk_created(self):
+        "Test that the new StudentModules of a request are created together"
+        other_key = partial(DjangoKeyValueStore.Key, Scope.user_state, 1)
+        for name in ('first', 'second'):
+            self.kvs.set(other_key(location(name), 'a_field'), name)
+
+        # One query creates the StudentModules, and another fetches their ids, before writing the history
+        with self.assertNumQueries(4):
+            flush_deferred_writes()
+        for name in ('first', 'second'):
+            student_module = StudentModule.objects.get(module_state_key=location(name))
+            self.assertEquals({'a_field': name}, json.loads(student_module.state))
+            self.assertEquals(student_module.pk, self.field_data_cache.find(other_key(location(name), 'a_field')).pk)
+            self.assertEquals(1, StudentModuleHistory.objects.filter(student_module=student_module).count())
+
+    def test_discarded_writes(self):
+        "Test that the writes pending when a request fails are dropped"
+        self.kvs.set(user_state_key('a_field'), 'new_value')
+        with self.assertNumQueries(0):
+            discard_deferred_writes()
+            flush_deferred_writes()
+        self.assertEquals({'a_field': 'a_value'}, json.loads(StudentModule.objects.get().state))
+
+    def test_caches_share_rows(self):
+        "Test that the caches of a request read each other's pending changes, instead of overwriting them"
+        self.kvs.set(user_state_key('a_field'), 'new_value')
+        other_kvs = DjangoKeyValueStore(FieldDataCache(
+            [mock_descriptor([mock_field(Scope.user_state, 'a_field')])],
+            course_id,
+            self.user
+        ))
+        self.assertEquals('new_value', other_kvs.get(user_state_key('a_field')))
+        other_kvs.set(user_state_key('b_field'), 'b_value')
+
+        flush_deferred_writes()
+        self.assertEquals(
+            {'a_field': 'new_value', 'b_field': 'b_value'},
+            json.loads(StudentModule.objects.get().state)
+        )
+
+    def test_shared_rows_written_once(self):
+        "Test that a StudentModule changed through two caches of a request is written, with its history, once"
+        other_kvs = DjangoKeyValueStore(FieldDataCache(
+            [mock_descriptor([mock_field(Scope.user_state, 'a_field')])],
+            course_id,
+            self.user
+        ))
+        self.kvs.set(user_state_key('a_field'), 'new_value')
+        other_kvs.set(user_state_key('b_field'), 'b_value')
+        history_count = StudentModuleHistory.objects.count()
+
+        # The StudentModule, and its history
+        with self.assertNumQueries(2):
+            flush_deferred_writes()
+        self.assertEquals(
+            {'a_field': 'new_value', 'b_field': 'b_value'},
+            json.loads(StudentModule.objects.get().state)
+        )
+        self.assertEquals(history_count + 1, StudentModuleHistory.objects.count())
+
+    def test_flush_errors_raised(self):
+        "Test that the writes which fail when the writes are flushed are raised"
+        self.kvs.set(user_state_key('a_field'), 'new_value')
+        with patch('django.db.models.Model.save', side_effect=DatabaseError):
+            with self.assertRaises(KeyValueMultiSaveError):
+                flush_deferred_writes()
+        self.assertEquals({'a_field': 'a_value'}, json.loads(StudentModule.objects.get().state))
+
+    def test_locked_rows_written_immediately(self):
+        "Test that the StudentModules locked for update are not deferred"
+        field_data_cache = FieldDataCache(
+            [mock_descriptor([mock_field(Scope.user_state, 'a_field')])],
+            course_id,
+            self.user,
+            select_for_update=True,
+        )
+        DjangoKeyValueStore(field_data_cache).set(user_state_key('a_field'), 'new_value')
+        self.assertEquals({'a_field': 'new_value'}, json.loads(StudentModule.objects.get().state))
+
+    def test_pending_writes_flushed_before_locking(self):
+        "Test that the rows locked for update are read with the changes not yet written"
+        self.kvs.set(user_state_key('b_field'), 'b_value')
+        field_data_cache = FieldDataCache(
+            [mock_descriptor([mock_field(Scope.user_state, 'a_field')])],
+            course_id,
+            self.user,
+            select_for_update=True,
+        )
+        self.assertEquals('b_value', DjangoKeyValueStore(field_data_cache).get(user_state_key('b_field')))
+
+
 class TestMissingStudentModule(TestCase):
     def setUp(self):
         super(TestMissingStudentModule, self).setUp()
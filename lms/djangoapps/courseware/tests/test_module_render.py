@@ -26,7 +26,7 @@ from xblock.fragment import Fragment
 
 from capa.tests.response_xml_factory import OptionResponseXMLFactory
 from courseware import module_render as render
-from courseware.courses import get_course_with_access, course_image_url, get_course_info_section
+from courseware.courses import get_course_with_access, get_course_info_section
 from courseware.model_data import FieldDataCache
 from courseware.module_render import hash_resource, get_module_for_descriptor
 from courseware.models import StudentModule
@@ -45,6 +45,7 @@ from xmodule.modulestore.django import modulestore
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 from xmodule.modulestore.tests.factories import ItemFactory, CourseFactory, check_mongo_calls
 from xmodule.x_module import XModuleDescriptor, XModule, STUDENT_VIEW, CombinedSystem
+from openedx.core.lib.courses import course_image_url
 
 TEST_DATA_DIR = settings.COMMON_TEST_DATA_ROOT
 
@@ -1502,3 +1503,61 @@ class TestFilteredChildren(ModuleStoreTestCase):
         Used to assert that sets of children are equivalent.
         """
         self.assertEquals(set(child_usage_ids), set(child.scope_ids.usage_id for child in block.get_children()))
+
+
+class TestModuleSystemBindings(ModuleStoreTestCase):
+    """
+    Micro-benchmark of the objects created to bind each block to a user: only
+    the parts of the module system which depend on the block should be.
+    """
+    # The constructors and functions of the parts shared by all the blocks
+    SHARED = ('KvsFieldData', 'ModuleI18nService', 'CourseBetaTesterRole', 'anonymous_id_for_user', 'reverse')
+
+    def setUp(self):
+        super(TestModuleSystemBindings, self).setUp()
+        self.user = GlobalStaffFactory()
+        self.course = CourseFactory.create()
+
+    def _count_calls(self, number_of_children):
+        """
+        Binds a block with `number_of_children` children, and its children, and
+        returns the number of calls to each of the counted constructors.
+        """
+        parent = ItemFactory(category='xblock', parent=self.course)
+        for __ in range(number_of_children):
+            ItemFactory(category='pure', parent=parent)
+        parent = modulestore().get_item(parent.location)
+        field_data_cache = FieldDataCache.cache_for_descriptor_descendents(self.course.id, self.user, parent)
+
+        mocks = {name: Mock(wraps=getattr(render, name)) for name in self.SHARED + ('LmsModuleSystem',)}
+        with patch.multiple('courseware.module_render', **mocks):
+            block = get_module_for_descriptor(
+                self.user, Mock(name='request', user=self.user), parent, field_data_cache, self.course.id
+            )
+            self.assertEqual(len(block.get_children()), number_of_children)
+        return {name: mock.call_count for name, mock in mocks.iteritems()}
+
+    @XBlock.register_temp_plugin(PureXBlockWithChildren, identifier='xblock')
+    @XBlock.register_temp_plugin(PureXBlock, identifier='pure')
+    def test_objects_created_per_block(self):
+        few_calls = self._count_calls(1)
+        many_calls = self._count_calls(11)
+        calls_per_block = {name: (many_calls[name] - few_calls[name]) / 10.0 for name in many_calls}
+
+        # Each block has its own module system...
+        self.assertEqual(calls_per_block['LmsModuleSystem'], 1)
+        # ... built from the parts shared with the other blocks
+        for name in self.SHARED:
+            self.assertEqual(calls_per_block[name], 0, name)
+
+    def test_bindings_kept_by_field_data_cache(self):
+        field_data_cache = FieldDataCache([self.course], self.course.id, self.user)
+        arguments = (self.course.id, Mock(name='track_function'), 'http://xqueue', 'token')
+
+        bindings = render.get_module_system_bindings(self.user, field_data_cache, *arguments)
+        self.assertIs(render.get_module_system_bindings(self.user, field_data_cache, *arguments), bindings)
+        self.assertIsNot(
+            render.get_module_system_bindings(self.user, field_data_cache, *arguments, position='2'), bindings
+        )
+        other_field_data_cache = FieldDataCache([self.course], self.course.id, self.user)
+        self.assertIsNot(render.get_module_system_bindings(self.user, other_field_data_cache, *arguments), bindings)
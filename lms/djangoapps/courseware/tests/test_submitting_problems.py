@@ -4,20 +4,22 @@ Integration tests for submitting problem responses and getting grades.
 """
 import json
 import os
+from datetime import datetime
 from textwrap import dedent
 
 from django.conf import settings
 from django.contrib.auth.models import User
 from django.core.urlresolvers import reverse
 from django.test.client import RequestFactory
-from mock import patch
+from mock import Mock, patch
+from pytz import UTC
 
 from capa.tests.response_xml_factory import (
     OptionResponseXMLFactory, CustomResponseXMLFactory, SchematicResponseXMLFactory,
     CodeResponseXMLFactory,
 )
 from courseware import grades
-from courseware.models import StudentModule
+from courseware.models import StudentModule, StudentSubsectionScore
 from courseware.tests.helpers import LoginEnrollmentTestCase
 from lms.djangoapps.lms_xblock.runtime import quote_slashes
 from student.tests.factories import UserFactory
@@ -25,6 +27,7 @@ from student.models import anonymous_id_for_user
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
 from xmodule.partitions.partitions import Group, UserPartition
+from openedx.core.djangoapps.user_api.models import UserCourseTag
 from openedx.core.djangoapps.user_api.tests.factories import UserCourseTagFactory
 
 
@@ -593,6 +596,120 @@ class TestCourseGrader(TestSubmittingProblems):
         self.assertEqual(self.score_for_hw('homework3'), [1.0, 1.0])
 
 
+@patch.dict('django.conf.settings.FEATURES', {'ENABLE_PERSISTENT_SUBSECTION_GRADES': True})
+class TestPersistentSubsectionGrades(TestCourseGrader):
+    """
+    Run the course grader tests again with persisted subsection scores
+    enabled, and check that the scores are persisted and kept up to date.
+    """
+    def persisted_rows(self):
+        """
+        Return the persisted subsection scores of the test student.
+        """
+        return StudentSubsectionScore.objects.filter(student=self.student_user, course_id=self.course.id)
+
+    def test_untouched_sections_are_not_persisted(self):
+        """Sections the student never interacted with get no persisted scores."""
+        self.basic_setup()
+        self.check_grade_percent(0)
+        self.assertFalse(self.persisted_rows().exists())
+
+    def test_scores_are_persisted(self):
+        """Grading a section the slow way persists its scores."""
+        self.basic_setup()
+        self.submit_question_answer('p1', {'2_1': 'Correct'})
+        self.check_grade_percent(0.33)
+
+        rows = self.persisted_rows()
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0].usage_key.map_into_course(self.course.id), self.homework.location)
+        self.assertEqual(sorted(entry['earned'] for entry in rows[0].score_entries), [0, 0, 1.0])
+
+    def test_grade_from_persisted_scores(self):
+        """Grading a persisted section does not instantiate any modules."""
+        self.basic_setup()
+        self.submit_question_answer('p1', {'2_1': 'Correct'})
+        self.check_grade_percent(0.33)
+
+        # Once persisted, the section doesn't need any of its modules
+        with patch('courseware.grades.get_module_for_descriptor') as mock_get_module:
+            self.check_grade_percent(0.33)
+            self.assertFalse(mock_get_module.called)
+
+    def test_persisted_scores_follow_student_module(self):
+        """Persisted scores are patched when a StudentModule score changes."""
+        self.basic_setup()
+        self.submit_question_answer('p1', {'2_1': 'Correct'})
+        self.check_grade_percent(0.33)
+        self.submit_question_answer('p2', {'2_1': 'Correct'})
+
+        entries = self.persisted_rows()[0].score_entries
+        self.assertEqual(sorted(entry['earned'] for entry in entries), [0, 1.0, 1.0])
+        self.check_grade_percent(0.67)
+
+    def test_stale_content_version_is_ignored(self):
+        """Scores persisted against other content are recomputed."""
+        self.basic_setup()
+        self.submit_question_answer('p1', {'2_1': 'Correct'})
+        self.check_grade_percent(0.33)
+        self.persisted_rows().update(content_version='stale', scores='[]')
+
+        self.check_grade_percent(0.33)
+        self.assertNotEqual(self.persisted_rows()[0].content_version, 'stale')
+
+    def test_deleted_student_module_is_regraded(self):
+        """Deleting a StudentModule (e.g. resetting a student's state) drops the scores persisted from it."""
+        self.basic_setup()
+        self.submit_question_answer('p1', {'2_1': 'Correct'})
+        self.check_grade_percent(0.33)
+        self.assertEqual(sum(self.score_for_hw('homework')), 1.0)
+
+        StudentModule.objects.get(student=self.student_user, module_state_key=self.problem_location('p1')).delete()
+        self.assertFalse(self.persisted_rows().exists())
+        self.assertEqual(sum(self.score_for_hw('homework')), 0)
+        self.check_grade_percent(0)
+
+    def test_content_version_without_subtree_edited_on(self):
+        """Subsections whose subtree edit time is unknown are versioned by their scored blocks."""
+        section = Mock(subtree_edited_on=None)
+        problem = Mock(location=self.course.id.make_usage_key('problem', 'p1'), weight=1, edited_on=None)
+        problem.get_explicitly_set_fields_by_scope.return_value = {'data': '<problem/>'}
+        version = grades.PersistedSubsectionScores.content_version(section, [problem])
+
+        problem.get_explicitly_set_fields_by_scope.return_value = {'data': '<problem>edited</problem>'}
+        edited_version = grades.PersistedSubsectionScores.content_version(section, [problem])
+        self.assertNotEqual(version, edited_version)
+
+        problem.edited_on = datetime(2015, 1, 1, tzinfo=UTC)
+        self.assertNotEqual(edited_version, grades.PersistedSubsectionScores.content_version(section, [problem]))
+
+
+class TestBatchedCourseGrader(TestCourseGrader):
+    """
+    Run the course grader tests again, grading from scores prefetched the way
+    `iterate_grades_for` does it in batched mode.
+    """
+    def get_grade_summary(self):
+        """
+        calls grades.grade for current user and course, with prefetched scores.
+        """
+        fake_request = self.factory.get(
+            reverse('progress', kwargs={'course_id': self.course.id.to_deprecated_string()})
+        )
+        prefetched_scores = grades.PrefetchedScores(self.course.id, [self.student_user])
+
+        return grades.grade(self.student_user, fake_request, self.course, prefetched_scores=prefetched_scores)
+
+    def test_no_student_module_queries(self):
+        """Grading from prefetched scores doesn't look up StudentModules one by one."""
+        self.basic_setup()
+        self.submit_question_answer('p1', {'2_1': 'Correct'})
+
+        with patch('courseware.grades.StudentModule.objects.get') as mock_get:
+            self.check_grade_percent(0.33)
+            self.assertFalse(mock_get.called)
+
+
 class ProblemWithUploadedFilesTest(TestSubmittingProblems):
     """Tests of problems with uploaded files."""
 
@@ -1048,6 +1165,48 @@ class TestAnswerDistributions(TestSubmittingProblems):
             )
 
 
+    def test_counted_in_parts(self):
+        # Counting the answers in parts, as separate workers would, gives
+        # the same distribution
+        self.submit_question_answer('p1', {'2_1': u'Correct'})
+        self.submit_question_answer('p2', {'2_1': u'Incorrect'})
+        self.submit_question_answer('p3', {'2_1': u'Correct'})
+        user2 = UserFactory.create()
+        StudentModule.objects.filter(course_id=self.course.id, student=self.student_user).update(student=user2)
+        self.submit_question_answer('p1', {'2_1': u'Correct'})
+        self.submit_question_answer('p2', {'2_1': u'Correct'})
+
+        id_ranges = grades.answer_distribution_id_ranges(self.course.id, chunk_size=2)
+        self.assertEqual(len(id_ranges), 3)
+        partial_counts = [
+            grades.count_submitted_answers(self.course.id, first_id, last_id, chunk_size=1)
+            for first_id, last_id in id_ranges
+        ]
+        self.assertEqual(
+            grades.name_answer_counts(self.course.id, grades.merge_answer_counts(partial_counts)),
+            grades.answer_distributions(self.course.id),
+        )
+        self.assertEqual(
+            grades.answer_distributions(self.course.id)[('p1', 'p1', '{}_2_1'.format(self.p1_html_id))],
+            {'Correct': 2},
+        )
+
+    def test_only_answers_decoded(self):
+        self.submit_question_answer('p1', {'2_1': u'Correct'})
+        student_module = StudentModule.objects.get(course_id=self.course.id, student=self.student_user)
+        with patch('courseware.grades.json.loads') as mock_loads:
+            grades.answer_distributions(self.course.id)
+        self.assertFalse(mock_loads.called)
+
+        # The rest of the state doesn't need to be valid
+        student_module.state = '{"student_answers": {"%s_2_1": "Correct"}, "seed": ' % self.p1_html_id
+        student_module.save()
+        self.assertEqual(
+            grades.answer_distributions(self.course.id),
+            {('p1', 'p1', '{}_2_1'.format(self.p1_html_id)): {'Correct': 1}},
+        )
+
+
 class TestConditionalContent(TestSubmittingProblems):
     """
     Check that conditional content works correctly with grading.
@@ -1250,3 +1409,22 @@ class TestConditionalContent(TestSubmittingProblems):
         homework_1_score = 1.0 / 2
         homework_2_score = 1.0 / 1
         self.check_grade_percent(round((homework_1_score + homework_2_score) / 2, 2))
+
+
+@patch.dict('django.conf.settings.FEATURES', {'ENABLE_PERSISTENT_SUBSECTION_GRADES': True})
+class TestPersistentConditionalContent(TestConditionalContent):
+    """
+    Run the conditional content tests again with persisted subsection scores
+    enabled, and check that the content selected for a student isn't graded
+    from scores computed over another selection.
+    """
+    def test_group_change_is_regraded(self):
+        """Moving the student to another group grades the section over the problems of that group."""
+        self.split_different_problems_setup(self.user_partition_group_0)
+        self.submit_question_answer('H2P1_GROUP0', {'2_1': 'Correct'})
+        self.assertEqual(self.earned_hw_scores(), [1.0, 1.0])
+
+        UserCourseTag.objects.filter(user=self.student_user, course_id=self.course.id).update(
+            value=str(self.user_partition_group_1)
+        )
+        self.assertEqual(self.earned_hw_scores(), [1.0, 0.0])
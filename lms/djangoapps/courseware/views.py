@@ -33,12 +33,13 @@ from markupsafe import escape
 from courseware import grades
 from courseware.access import has_access, _adjust_start_date_for_beta_testers
 from courseware.courses import (
-    get_courses, get_course,
+    get_courses, get_course, get_courses_page,
     get_studio_url, get_course_with_access,
     sort_by_announcement,
     sort_by_start_date,
 )
 from courseware.masquerade import setup_masquerade
+from courseware.history import write_queued_history
 from courseware.model_data import FieldDataCache
 from .module_render import toc_for_course, get_module_for_descriptor, get_module
 from .entrance_exams import (
@@ -114,10 +115,11 @@ def user_groups(user):
 
 
 @ensure_csrf_cookie
-@cache_if_anonymous()
+@cache_if_anonymous('page')
 def courses(request):
     """
-    Render "find courses" page.  The course selection work is done in courseware.courses.
+    Render a page (given by the "page" GET parameter) of the "find courses" page.
+    The course selection work is done in courseware.courses.
     """
     courses = get_courses(request.user, request.META.get('HTTP_HOST'))
 
@@ -127,7 +129,11 @@ def courses(request):
     else:
         courses = sort_by_announcement(courses)
 
-    return render_to_response("courseware/courses.html", {'courses': courses})
+    courses_page = get_courses_page(courses, request.GET.get('page'))
+    return render_to_response(
+        "courseware/courses.html",
+        {'courses': courses_page.object_list, 'courses_page': courses_page}
+    )
 
 
 def render_accordion(request, course, chapter, section, field_data_cache):
@@ -1151,16 +1157,14 @@ def submission_history(request, course_id, student_username, location):
             username=student_username,
             location=location
         )))
-    history_entries = StudentModuleHistory.objects.filter(
-        student_module=student_module
-    ).order_by('-id')
+    history_entries = StudentModuleHistory.get_history(student_module)
 
     # If no history records exist, let's force a save to get history started.
     if not history_entries:
         student_module.save()
-        history_entries = StudentModuleHistory.objects.filter(
-            student_module=student_module
-        ).order_by('-id')
+        # The asynchronous history is otherwise only written at the end of the request
+        write_queued_history(student_module)
+        history_entries = StudentModuleHistory.get_history(student_module)
 
     context = {
         'history_entries': history_entries,
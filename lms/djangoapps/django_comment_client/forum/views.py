@@ -173,10 +173,13 @@ def inline_discussion(request, course_key, discussion_id):
 
     course = get_course_with_access(request.user, 'load_forum', course_key)
     cc_user = cc.User.from_django_user(request.user)
-    user_info = cc_user.to_dict()
 
     try:
-        threads, query_params = get_threads(request, course, discussion_id, per_page=INLINE_THREADS_PER_PAGE)
+        # get_threads uses the database, so it has to be called first, in this thread
+        (threads, query_params), user_info = cc.utils.perform_concurrently(
+            lambda: get_threads(request, course, discussion_id, per_page=INLINE_THREADS_PER_PAGE),
+            cc_user.to_dict,
+        )
     except ValueError:
         return HttpResponseBadRequest("Invalid group_id")
 
@@ -210,10 +213,14 @@ def forum_form_discussion(request, course_key):
     course_settings = make_course_settings(course, request.user)
 
     user = cc.User.from_django_user(request.user)
-    user_info = user.to_dict()
 
     try:
-        unsafethreads, query_params = get_threads(request, course)   # This might process a search query
+        # get_threads uses the database (and might process a search query), so it has
+        # to be called first, in this thread
+        (unsafethreads, query_params), user_info = cc.utils.perform_concurrently(
+            lambda: get_threads(request, course),
+            user.to_dict,
+        )
         is_staff = cached_has_permission(request.user, 'openclose_thread', course.id)
         threads = [utils.prepare_content(thread, course_key, is_staff) for thread in unsafethreads]
     except cc.utils.CommentClientMaintenanceError:
@@ -276,7 +283,6 @@ def single_thread(request, course_key, discussion_id, thread_id):
     course = get_course_with_access(request.user, 'load_forum', course_key)
     course_settings = make_course_settings(course, request.user)
     cc_user = cc.User.from_django_user(request.user)
-    user_info = cc_user.to_dict()
     is_moderator = cached_has_permission(request.user, "see_all_cohorts", course_key)
 
     # Verify that the student has access to this thread if belongs to a discussion module
@@ -286,12 +292,16 @@ def single_thread(request, course_key, discussion_id, thread_id):
     # Currently, the front end always loads responses via AJAX, even for this
     # page; it would be a nice optimization to avoid that extra round trip to
     # the comments service.
+    thread = cc.Thread.find(thread_id)
     try:
-        thread = cc.Thread.find(thread_id).retrieve(
-            recursive=request.is_ajax(),
-            user_id=request.user.id,
-            response_skip=request.GET.get("resp_skip"),
-            response_limit=request.GET.get("resp_limit")
+        user_info, __ = cc.utils.perform_concurrently(
+            cc_user.to_dict,
+            lambda: thread.retrieve(
+                recursive=request.is_ajax(),
+                user_id=request.user.id,
+                response_skip=request.GET.get("resp_skip"),
+                response_limit=request.GET.get("resp_limit")
+            ),
         )
     except cc.utils.CommentClientRequestError as e:
         if e.status_code == 404:
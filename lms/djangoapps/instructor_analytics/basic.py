@@ -4,6 +4,8 @@ Student and course analytics.
 Serve miscellaneous course and student data
 """
 import json
+from itertools import chain
+
 from shoppingcart.models import (
     PaidCourseRegistration, CouponRedemption, CourseRegCodeItem,
     RegistrationCodeRedemption, CourseRegistrationCodeInvoiceItem
@@ -23,6 +25,9 @@ PROFILE_FEATURES = ('name', 'language', 'location', 'year_of_birth', 'gender',
 ORDER_ITEM_FEATURES = ('list_price', 'unit_cost', 'status')
 ORDER_FEATURES = ('purchase_time',)
 
+# The number of students read at a time by enrolled_students_features_chunks
+ENROLLED_STUDENTS_CHUNK_SIZE = 5000
+
 SALE_FEATURES = ('total_amount', 'company_name', 'company_contact_name', 'company_contact_email', 'recipient_name',
                  'recipient_email', 'customer_reference_number', 'internal_reference')
 
@@ -159,7 +164,30 @@ def enrolled_students_features(course_key, features):
         {'username': 'username3', 'first_name': 'firstname3'}
     ]
     """
+    return list(chain.from_iterable(enrolled_students_features_chunks(course_key, features)))
+
+
+def enrolled_students_features_chunks(course_key, features, chunk_size=ENROLLED_STUDENTS_CHUNK_SIZE):
+    """
+    Yield the student features of enrolled_students_features, as lists of
+    up to `chunk_size` dictionaries, ordered by username.
+
+    Each chunk is read from the database when it is needed, with one query
+    (two if 'cohort' is in `features`), so that only one chunk of students
+    is in memory at a time.
+    """
     include_cohort_column = 'cohort' in features
+    student_features = [x for x in STUDENT_FEATURES if x in features]
+    profile_features = [x for x in PROFILE_FEATURES if x in features]
+
+    # For data extractions on the 'meta' field
+    # the feature name should be in the format of 'meta.foo' where
+    # 'foo' is the keyname in the meta dictionary
+    meta_features = []
+    for feature in features:
+        if 'meta.' in feature:
+            meta_key = feature.split('.')[1]
+            meta_features.append((feature, meta_key))
 
     students = User.objects.filter(
         courseenrollment__course_id=course_key,
@@ -169,20 +197,8 @@ def enrolled_students_features(course_key, features):
     if include_cohort_column:
         students = students.prefetch_related('course_groups')
 
-    def extract_student(student, features):
+    def extract_student(student):
         """ convert student to dictionary """
-        student_features = [x for x in STUDENT_FEATURES if x in features]
-        profile_features = [x for x in PROFILE_FEATURES if x in features]
-
-        # For data extractions on the 'meta' field
-        # the feature name should be in the format of 'meta.foo' where
-        # 'foo' is the keyname in the meta dictionary
-        meta_features = []
-        for feature in features:
-            if 'meta.' in feature:
-                meta_key = feature.split('.')[1]
-                meta_features.append((feature, meta_key))
-
         student_dict = dict((feature, getattr(student, feature))
                             for feature in student_features)
         profile = student.profile
@@ -192,9 +208,10 @@ def enrolled_students_features(course_key, features):
             student_dict.update(profile_dict)
 
             # now featch the requested meta fields
-            meta_dict = json.loads(profile.meta) if profile.meta else {}
-            for meta_feature, meta_key in meta_features:
-                student_dict[meta_feature] = meta_dict.get(meta_key)
+            if meta_features:
+                meta_dict = json.loads(profile.meta) if profile.meta else {}
+                for meta_feature, meta_key in meta_features:
+                    student_dict[meta_feature] = meta_dict.get(meta_key)
 
         if include_cohort_column:
             # Note that we use student.course_groups.all() here instead of
@@ -206,7 +223,13 @@ def enrolled_students_features(course_key, features):
             )
         return student_dict
 
-    return [extract_student(student, features) for student in students]
+    # Usernames are unique, so each chunk starts after the last username of the previous one
+    chunk = list(students[:chunk_size])
+    while chunk:
+        yield [extract_student(student) for student in chunk]
+        if len(chunk) < chunk_size:
+            return
+        chunk = list(students.filter(username__gt=chunk[-1].username)[:chunk_size])
 
 
 def coupon_codes_features(features, coupons_list):
@@ -15,6 +15,7 @@ from shoppingcart.models import (
 from course_modes.models import CourseMode
 from instructor_analytics.basic import (
     sale_record_features, sale_order_record_features, enrolled_students_features, course_registration_features,
+    enrolled_students_features_chunks,
     coupon_codes_features, AVAILABLE_FEATURES, STUDENT_FEATURES, PROFILE_FEATURES
 )
 from openedx.core.djangoapps.course_groups.tests.helpers import CohortFactory
@@ -109,6 +110,29 @@ class TestAnalyticsBasic(ModuleStoreTestCase):
             else:
                 self.assertEqual(report['cohort'], '[unassigned]')
 
+    def test_enrolled_students_features_chunks(self):
+        query_features = ('username', 'email')
+        chunks = enrolled_students_features_chunks(self.course_key, query_features, chunk_size=7)
+        # Each chunk is read with a single query, when it is needed
+        chunk_lengths = []
+        for __ in xrange(5):
+            with self.assertNumQueries(1):
+                chunk_lengths.append(len(next(chunks)))
+        with self.assertNumQueries(0):
+            self.assertEqual(list(chunks), [])
+        self.assertEqual(chunk_lengths, [7, 7, 7, 7, 2])
+
+        self.assertEqual(
+            [report for chunk in enrolled_students_features_chunks(self.course_key, query_features, chunk_size=7)
+             for report in chunk],
+            enrolled_students_features(self.course_key, query_features),
+        )
+
+    def test_meta_decoded_only_when_requested(self):
+        with patch('instructor_analytics.basic.json.loads') as mock_loads:
+            enrolled_students_features(self.course_key, ('username', 'name'))
+        self.assertFalse(mock_loads.called)
+
     def test_available_features(self):
         self.assertEqual(len(AVAILABLE_FEATURES), len(STUDENT_FEATURES + PROFILE_FEATURES))
         self.assertEqual(set(AVAILABLE_FEATURES), set(STUDENT_FEATURES + PROFILE_FEATURES))
@@ -19,6 +19,7 @@ import csv
 import json
 import hashlib
 import os.path
+import tempfile
 import urllib
 
 from boto.s3.connection import S3Connection
@@ -193,21 +194,32 @@ class InstructorTask(models.Model):
 class ReportStore(object):
     """
     Simple abstraction layer that can fetch and store CSV files for reports
-    download. Should probably refactor later to create a ReportFile object that
-    can simply be appended to for the sake of memory efficiency, rather than
-    passing in the whole dataset. Doing that for now just because it's simpler.
+    download.
+
+    `store_rows` accepts any iterable of rows, and consumes it one row at a
+    time: reports can be produced by a generator without ever holding all of
+    their rows in memory.
     """
+    # Name of the directory, under the configured ROOT_PATH, in which
+    # intermediate files (such as the pieces of a report that is generated by
+    # several subtasks) are kept. Files stored there are never returned by
+    # `links_for` on a regular store.
+    PARTIALS_DIR = "partials"
+
     @classmethod
-    def from_config(cls):
+    def from_config(cls, partials=False):
         """
         Return one of the ReportStore subclasses depending on django
         configuration. Look at subclasses for expected configuration.
+
+        If `partials` is True, the returned store reads and writes the
+        intermediate report files instead of the downloadable ones.
         """
         storage_type = settings.GRADES_DOWNLOAD.get("STORAGE_TYPE")
         if storage_type.lower() == "s3":
-            return S3ReportStore.from_config()
+            return S3ReportStore.from_config(partials)
         elif storage_type.lower() == "localfs":
-            return LocalFSReportStore.from_config()
+            return LocalFSReportStore.from_config(partials)
 
     def _get_utf8_encoded_rows(self, rows):
         """
@@ -218,6 +230,14 @@ class ReportStore(object):
         for row in rows:
             yield [unicode(item).encode('utf-8') for item in row]
 
+    def _get_utf8_decoded_rows(self, rows):
+        """
+        Inverse of `_get_utf8_encoded_rows`: given `rows` read from a CSV
+        file, yield them with their utf-8 strings decoded to unicode.
+        """
+        for row in rows:
+            yield [item.decode('utf-8') for item in row]
+
 
 class S3ReportStore(ReportStore):
     """
@@ -242,7 +262,7 @@ class S3ReportStore(ReportStore):
         self.bucket = conn.get_bucket(bucket_name)
 
     @classmethod
-    def from_config(cls):
+    def from_config(cls, partials=False):
         """
         The expected configuration for an `S3ReportStore` is to have a
         `GRADES_DOWNLOAD` dict in settings with the following fields::
@@ -256,10 +276,10 @@ class S3ReportStore(ReportStore):
         Since S3 access relies on boto, you must also define `AWS_ACCESS_KEY_ID`
         and `AWS_SECRET_ACCESS_KEY` in settings.
         """
-        return cls(
-            settings.GRADES_DOWNLOAD['BUCKET'],
-            settings.GRADES_DOWNLOAD['ROOT_PATH']
-        )
+        root_path = settings.GRADES_DOWNLOAD['ROOT_PATH']
+        if partials:
+            root_path = "{}/{}".format(root_path, cls.PARTIALS_DIR)
+        return cls(settings.GRADES_DOWNLOAD['BUCKET'], root_path)
 
     def key_for(self, course_id, filename):
         """Return the S3 key we would use to store and retrieve the data for the
@@ -307,20 +327,48 @@ class S3ReportStore(ReportStore):
 
     def store_rows(self, course_id, filename, rows):
         """
-        Given a `course_id`, `filename`, and `rows` (each row is an iterable of
-        strings), create a buffer that is a gzip'd csv file, and then `store()`
-        that buffer.
+        Given a `course_id`, `filename`, and `rows` (an iterable of rows, each
+        of which is an iterable of strings), write a gzip'd csv file to S3.
+
+        The compressed output is uploaded in parts as it is produced (see
+        `S3MultipartWriter`), so `rows` can be arbitrarily large.
 
         Even though we store it in gzip format, browsers will transparently
         download and decompress it. Filenames should end in `.csv`, not `.gz`.
         """
-        output_buffer = StringIO()
-        gzip_file = GzipFile(fileobj=output_buffer, mode="wb")
-        csvwriter = csv.writer(gzip_file)
-        csvwriter.writerows(self._get_utf8_encoded_rows(rows))
-        gzip_file.close()
+        writer = S3MultipartWriter(
+            self.key_for(course_id, filename),
+            headers={
+                "Content-Encoding": "gzip",
+                "Content-Type": "text/csv",
+            }
+        )
+        try:
+            gzip_file = GzipFile(fileobj=writer, mode="wb")
+            csvwriter = csv.writer(gzip_file)
+            csvwriter.writerows(self._get_utf8_encoded_rows(rows))
+            gzip_file.close()
+        except Exception:
+            writer.cancel()
+            raise
+
+        writer.close()
+
+    def read_rows(self, course_id, filename):
+        """
+        Yield the rows of a CSV file previously written by `store_rows`, as
+        lists of unicode strings.
+        """
+        key = self.key_for(course_id, filename)
+        gzip_file = GzipFile(fileobj=StringIO(key.get_contents_as_string()), mode="rb")
+        for row in self._get_utf8_decoded_rows(csv.reader(gzip_file)):
+            yield row
 
-        self.store(course_id, filename, output_buffer)
+    def delete(self, course_id, filename):
+        """
+        Delete the file named `filename` for the given `course_id`.
+        """
+        self.key_for(course_id, filename).delete()
 
     def links_for(self, course_id):
         """
@@ -334,6 +382,75 @@ class S3ReportStore(ReportStore):
         ]
 
 
+class S3MultipartWriter(object):
+    """
+    Write-only file-like object that uploads everything written to it to an
+    S3 `key`, in parts of `part_size` bytes, so that no more than one part is
+    ever held in memory. Content that never fills up a whole part is uploaded
+    with a single regular PUT instead.
+
+    Nothing is visible in S3 until `close()` is called; call `cancel()`
+    instead to abandon the upload.
+    """
+    # S3 requires every part of a multipart upload but the last one to be at
+    # least 5MB.
+    MIN_PART_SIZE = 5 * 1024 * 1024
+
+    def __init__(self, key, headers, part_size=MIN_PART_SIZE):
+        self.key = key
+        self.headers = headers
+        self.part_size = part_size
+        self.buffer = StringIO()
+        self.multipart_upload = None
+        self.num_parts = 0
+
+    def write(self, data):
+        """
+        Buffer `data`, uploading the buffer as a part once it is large enough.
+        """
+        self.buffer.write(data)
+        if self.buffer.tell() >= self.part_size:
+            self._upload_part()
+
+    def flush(self):
+        """
+        Parts are only uploaded once they are large enough, so this does nothing.
+        """
+        pass
+
+    def _upload_part(self):
+        """
+        Upload the current buffer as the next part of the multipart upload.
+        """
+        if self.multipart_upload is None:
+            self.multipart_upload = self.key.bucket.initiate_multipart_upload(self.key.key, headers=self.headers)
+        self.num_parts += 1
+        self.buffer.seek(0)
+        self.multipart_upload.upload_part_from_file(self.buffer, self.num_parts)
+        self.buffer = StringIO()
+
+    def close(self):
+        """
+        Upload whatever is left in the buffer and complete the upload.
+        """
+        if self.multipart_upload is None:
+            data = self.buffer.getvalue()
+            headers = dict(self.headers)
+            headers["Content-Length"] = len(data)
+            self.key.set_contents_from_string(data, headers=headers)
+        else:
+            if self.buffer.tell():
+                self._upload_part()
+            self.multipart_upload.complete_upload()
+
+    def cancel(self):
+        """
+        Abandon the upload, discarding any parts uploaded so far.
+        """
+        if self.multipart_upload is not None:
+            self.multipart_upload.cancel_upload()
+
+
 class LocalFSReportStore(ReportStore):
     """
     LocalFS implementation of a ReportStore. This is meant for debugging
@@ -354,7 +471,7 @@ class LocalFSReportStore(ReportStore):
             os.makedirs(root_path)
 
     @classmethod
-    def from_config(cls):
+    def from_config(cls, partials=False):
         """
         Generate an instance of this object from Django settings. It assumes
         that there is a dict in settings named GRADES_DOWNLOAD and that it has
@@ -365,7 +482,10 @@ class LocalFSReportStore(ReportStore):
             STORAGE_TYPE : "localfs"
             ROOT_PATH : /tmp/edx/report-downloads/
         """
-        return cls(settings.GRADES_DOWNLOAD['ROOT_PATH'])
+        root_path = settings.GRADES_DOWNLOAD['ROOT_PATH']
+        if partials:
+            root_path = os.path.join(root_path, cls.PARTIALS_DIR)
+        return cls(root_path)
 
     def path_to(self, course_id, filename):
         """Return the full path to a given file for a given course."""
@@ -388,14 +508,44 @@ class LocalFSReportStore(ReportStore):
 
     def store_rows(self, course_id, filename, rows):
         """
-        Given a course_id, filename, and rows (each row is an iterable of strings),
-        write this data out.
+        Given a course_id, filename, and rows (an iterable of rows, each of
+        which is an iterable of strings), write this data out.
+
+        Rows are spooled to a hidden temporary file next to the destination,
+        which is then renamed into place, so a partially written report is
+        never visible.
+        """
+        full_path = self.path_to(course_id, filename)
+        directory = os.path.dirname(full_path)
+        if not os.path.exists(directory):
+            os.mkdir(directory)
+
+        temp_file = tempfile.NamedTemporaryFile(dir=directory, prefix=".", suffix=".tmp", delete=False)
+        try:
+            with temp_file:
+                csvwriter = csv.writer(temp_file)
+                csvwriter.writerows(self._get_utf8_encoded_rows(rows))
+            os.rename(temp_file.name, full_path)
+        except Exception:
+            os.remove(temp_file.name)
+            raise
+
+    def read_rows(self, course_id, filename):
+        """
+        Yield the rows of a CSV file previously written by `store_rows`, as
+        lists of unicode strings.
         """
-        output_buffer = StringIO()
-        csvwriter = csv.writer(output_buffer)
-        csvwriter.writerows(self._get_utf8_encoded_rows(rows))
+        with open(self.path_to(course_id, filename), "rb") as f:
+            for row in self._get_utf8_decoded_rows(csv.reader(f)):
+                yield row
 
-        self.store(course_id, filename, output_buffer)
+    def delete(self, course_id, filename):
+        """
+        Delete the file named `filename` for the given `course_id`.
+        """
+        full_path = self.path_to(course_id, filename)
+        if os.path.exists(full_path):
+            os.remove(full_path)
 
     def links_for(self, course_id):
         """
@@ -408,7 +558,11 @@ class LocalFSReportStore(ReportStore):
         course_dir = self.path_to(course_id, '')
         if not os.path.exists(course_dir):
             return []
-        files = [(filename, os.path.join(course_dir, filename)) for filename in os.listdir(course_dir)]
+        files = [
+            (filename, os.path.join(course_dir, filename))
+            for filename in os.listdir(course_dir)
+            if not filename.startswith(".")
+        ]
         files.sort(key=lambda (filename, full_path): os.path.getmtime(full_path), reverse=True)
 
         return [
@@ -27,6 +27,8 @@ from django.utils.translation import ugettext_noop
 
 from celery import task
 from bulk_email.tasks import perform_delegate_email_batches
+from instructor_task.models import InstructorTask
+from instructor_task.subtasks import SubtaskStatus, check_subtask_is_valid, update_subtask_status
 from instructor_task.tasks_helper import (
     run_main_task,
     BaseInstructorTask,
@@ -35,6 +37,8 @@ from instructor_task.tasks_helper import (
     reset_attempts_module_state,
     delete_problem_module_state,
     upload_grades_csv,
+    grade_report_subtask,
+    merge_grade_report_if_complete,
     upload_students_csv,
     cohort_students_and_upload
 )
@@ -155,6 +159,38 @@ def calculate_grades_csv(entry_id, xmodule_instance_args):
     return run_main_task(entry_id, task_fn, action_name)
 
 
+@task(routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY)  # pylint: disable=not-callable
+def calculate_grades_csv_subtask(entry_id, shard_index, student_ids, report_timestamp, subtask_status_dict):
+    """
+    Grade one shard of the students of a grade report split up by `calculate_grades_csv`.
+
+    `entry_id` is the id of the parent InstructorTask, `shard_index` the
+    position of this shard in the report, `student_ids` the ids of the
+    students to grade, and `report_timestamp` the timestamp used to name the
+    final report. `subtask_status_dict` is the initial SubtaskStatus of this
+    subtask, as a dict.
+
+    The last subtask to finish merges the shards into the final report.
+    """
+    subtask_status = SubtaskStatus.from_dict(subtask_status_dict)
+    current_task_id = subtask_status.task_id
+    TASK_LOG.info(
+        u"Preparing to grade %d students as subtask %s (shard %d) of instructor task %d",
+        len(student_ids), current_task_id, shard_index, entry_id
+    )
+
+    # Raises if this subtask is unknown to the InstructorTask, or was already run.
+    check_subtask_is_valid(entry_id, current_task_id, subtask_status)
+
+    course_id = InstructorTask.objects.get(pk=entry_id).course_id
+    subtask_status = grade_report_subtask(entry_id, course_id, shard_index, student_ids, subtask_status)
+    # The InstructorTask only succeeds once the report is merged
+    update_subtask_status(entry_id, current_task_id, subtask_status, complete_parent=False)
+    merge_grade_report_if_complete(entry_id, report_timestamp)
+
+    return subtask_status.to_dict()
+
+
 @task(base=BaseInstructorTask, routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY)  # pylint: disable=not-callable
 def calculate_students_features_csv(entry_id, xmodule_instance_args):
     """
@@ -4,14 +4,18 @@ running state of a course.
 
 """
 import json
+import traceback
 from datetime import datetime
+from itertools import chain, count
 from time import time
 import unicodecsv
 import logging
 
 from celery import Task, current_task
-from celery.states import SUCCESS, FAILURE
+from celery.states import SUCCESS, FAILURE, READY_STATES
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.files.storage import DefaultStorage
 from django.db import transaction, reset_queries
 import dogstats_wrapper as dog_stats_api
@@ -27,9 +31,10 @@ from courseware.grades import iterate_grades_for
 from courseware.models import StudentModule
 from courseware.model_data import FieldDataCache
 from courseware.module_render import get_module_for_descriptor_internal
-from instructor_analytics.basic import enrolled_students_features
+from instructor_analytics.basic import enrolled_students_features_chunks
 from instructor_analytics.csvs import format_dictlist
 from instructor_task.models import ReportStore, InstructorTask, PROGRESS
+from instructor_task.subtasks import queue_subtasks_for_query
 from lms.djangoapps.lms_xblock.runtime import LmsPartitionService
 from openedx.core.djangoapps.course_groups.cohorts import get_cohort
 from openedx.core.djangoapps.course_groups.models import CourseUserGroup
@@ -49,6 +54,9 @@ UPDATE_STATUS_SUCCEEDED = 'succeeded'
 UPDATE_STATUS_FAILED = 'failed'
 UPDATE_STATUS_SKIPPED = 'skipped'
 
+# Lock expiration for merging the pieces of a grade report computed by subtasks.
+GRADE_REPORT_MERGE_LOCK_EXPIRE = 60 * 60  # Lock expires in 1 hour
+
 
 class BaseInstructorTask(Task):
     """
@@ -549,14 +557,82 @@ def upload_csv_to_report_store(rows, csv_name, course_id, timestamp):
     )
 
 
+class GradeReportRowBuilder(object):
+    """
+    Builds the rows of a grade report for a course, one student at a time.
+
+    The columns of the report (beyond the student identifiers and overall
+    grade) are the section labels of the first gradeset seen, followed by the
+    cohort and experiment group columns, if the course has any.
+    """
+    def __init__(self, course_id):
+        self.course_id = course_id
+        course = get_course_by_id(course_id)
+        self.course_is_cohorted = is_course_cohorted(course.id)
+        self.cohorts_header = ['Cohort Name'] if self.course_is_cohorted else []
+
+        self.experiment_partitions = get_split_user_partitions(course.user_partitions)
+        self.group_configs_header = [
+            u'Experiment Group ({})'.format(partition.name) for partition in self.experiment_partitions
+        ]
+        self.section_labels = None
+
+    def header_row(self, gradeset):
+        """
+        Return the header row of the report, using the section labels of
+        `gradeset` for the grade columns.
+        """
+        self.section_labels = [section['label'] for section in gradeset[u'section_breakdown']]
+        return (
+            ["id", "email", "username", "grade"] + self.section_labels +
+            self.cohorts_header + self.group_configs_header
+        )
+
+    def row(self, student, gradeset):
+        """
+        Return the report row for `student`, who was successfully graded with `gradeset`.
+        """
+        percents = {
+            section['label']: section.get('percent', 0.0)
+            for section in gradeset[u'section_breakdown']
+            if 'label' in section
+        }
+
+        cohorts_group_name = []
+        if self.course_is_cohorted:
+            group = get_cohort(student, self.course_id, assign=False)
+            cohorts_group_name.append(group.name if group else '')
+
+        group_configs_group_names = []
+        for partition in self.experiment_partitions:
+            group = LmsPartitionService(student, self.course_id).get_group(partition, assign=False)
+            group_configs_group_names.append(group.name if group else '')
+
+        # Not everybody has the same gradable items. If the item is not
+        # found in the user's gradeset, just assume it's a 0. The aggregated
+        # grades for their sections and overall course will be calculated
+        # without regard for the item they didn't have access to, so it's
+        # possible for a student to have a 0.0 show up in their row but
+        # still have 100% for the course.
+        row_percents = [percents.get(label, 0.0) for label in self.section_labels]
+        return (
+            [student.id, student.email, student.username, gradeset['percent']] +
+            row_percents + cohorts_group_name + group_configs_group_names
+        )
+
+
 def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input, action_name):
     """
     For a given `course_id`, generate a grades CSV file for all students that
     are enrolled, and store using a `ReportStore`. Once created, the files can
     be accessed by instantiating another `ReportStore` (via
-    `ReportStore.from_config()`) and calling `link_for()` on it. Writes are
-    buffered, so we'll never write part of a CSV file to S3 -- i.e. any files
-    that are visible in ReportStore will be complete ones.
+    `ReportStore.from_config()`) and calling `link_for()` on it. Rows are
+    streamed to the `ReportStore` as students are graded, but only complete
+    files are ever visible in it.
+
+    If `settings.GRADES_DOWNLOAD_STUDENTS_PER_TASK` is set and the course has
+    more enrolled students than that, grading is instead split between
+    subtasks of that many students each (see `queue_grade_report_subtasks`).
 
     As we start to add more CSV downloads, it will probably be worthwhile to
     make a more general CSVDoc class instead of building out the rows like we
@@ -566,6 +642,11 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
     start_date = datetime.now(UTC)
     status_interval = 100
     enrolled_students = CourseEnrollment.users_enrolled_in(course_id)
+
+    students_per_task = settings.GRADES_DOWNLOAD_STUDENTS_PER_TASK
+    if _entry_id is not None and students_per_task and enrolled_students.count() > students_per_task:
+        return queue_grade_report_subtasks(_entry_id, course_id, action_name, start_date, students_per_task)
+
     task_progress = TaskProgress(action_name, enrolled_students.count(), start_time)
 
     fmt = u'Task: {task_id}, InstructorTask ID: {entry_id}, Course: {course_id}, Input: {task_input}'
@@ -577,21 +658,14 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
     )
     TASK_LOG.info(u'%s, Task type: %s, Starting task execution', task_info_string, action_name)
 
-    course = get_course_by_id(course_id)
-    course_is_cohorted = is_course_cohorted(course.id)
-    cohorts_header = ['Cohort Name'] if course_is_cohorted else []
+    row_builder = GradeReportRowBuilder(course_id)
 
-    experiment_partitions = get_split_user_partitions(course.user_partitions)
-    group_configs_header = [u'Experiment Group ({})'.format(partition.name) for partition in experiment_partitions]
-
-    # Loop over all our students and build our CSV lists in memory
-    header = None
-    rows = []
+    # Grade rows are generated lazily while they are being uploaded, so that
+    # only the (hopefully few) error rows are ever held in memory.
     err_rows = [["id", "username", "error_msg"]]
     current_step = {'step': 'Calculating Grades'}
 
     total_enrolled_students = enrolled_students.count()
-    student_counter = 0
     TASK_LOG.info(
         u'%s, Task type: %s, Current step: %s, Starting grade calculation for total students: %s',
         task_info_string,
@@ -599,82 +673,59 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
         current_step,
         total_enrolled_students
     )
-    for student, gradeset, err_msg in iterate_grades_for(course_id, enrolled_students):
-        # Periodically update task status (this is a cache write)
-        if task_progress.attempted % status_interval == 0:
-            task_progress.update_task_state(extra_meta=current_step)
-        task_progress.attempted += 1
 
-        # Now add a log entry after certain intervals to get a hint that task is in progress
-        student_counter += 1
-        if student_counter % 1000 == 0:
-            TASK_LOG.info(
-                u'%s, Task type: %s, Current step: %s, Grade calculation in-progress for students: %s/%s',
-                task_info_string,
-                action_name,
-                current_step,
-                student_counter,
-                total_enrolled_students
-            )
-
-        if gradeset:
-            # We were able to successfully grade this student for this course.
-            task_progress.succeeded += 1
-            if not header:
-                header = [section['label'] for section in gradeset[u'section_breakdown']]
-                rows.append(
-                    ["id", "email", "username", "grade"] + header + cohorts_header + group_configs_header
+    def grade_rows():
+        """
+        Grade each enrolled student, yielding the grade report rows (header
+        first) and collecting error rows into `err_rows` as we go.
+        """
+        student_counter = 0
+        batch_size = settings.GRADES_DOWNLOAD_BATCH_SIZE
+        for student, gradeset, err_msg in iterate_grades_for(course_id, enrolled_students, batch_size=batch_size):
+            # Periodically update task status (this is a cache write)
+            if task_progress.attempted % status_interval == 0:
+                task_progress.update_task_state(extra_meta=current_step)
+            task_progress.attempted += 1
+
+            # Now add a log entry after certain intervals to get a hint that task is in progress
+            student_counter += 1
+            if student_counter % 1000 == 0:
+                TASK_LOG.info(
+                    u'%s, Task type: %s, Current step: %s, Grade calculation in-progress for students: %s/%s',
+                    task_info_string,
+                    action_name,
+                    current_step,
+                    student_counter,
+                    total_enrolled_students
                 )
 
-            percents = {
-                section['label']: section.get('percent', 0.0)
-                for section in gradeset[u'section_breakdown']
-                if 'label' in section
-            }
-
-            cohorts_group_name = []
-            if course_is_cohorted:
-                group = get_cohort(student, course_id, assign=False)
-                cohorts_group_name.append(group.name if group else '')
-
-            group_configs_group_names = []
-            for partition in experiment_partitions:
-                group = LmsPartitionService(student, course_id).get_group(partition, assign=False)
-                group_configs_group_names.append(group.name if group else '')
-
-            # Not everybody has the same gradable items. If the item is not
-            # found in the user's gradeset, just assume it's a 0. The aggregated
-            # grades for their sections and overall course will be calculated
-            # without regard for the item they didn't have access to, so it's
-            # possible for a student to have a 0.0 show up in their row but
-            # still have 100% for the course.
-            row_percents = [percents.get(label, 0.0) for label in header]
-            rows.append(
-                [student.id, student.email, student.username, gradeset['percent']] +
-                row_percents + cohorts_group_name + group_configs_group_names
-            )
-        else:
-            # An empty gradeset means we failed to grade a student.
-            task_progress.failed += 1
-            err_rows.append([student.id, student.username, err_msg])
+            if gradeset:
+                # We were able to successfully grade this student for this course.
+                task_progress.succeeded += 1
+                if task_progress.succeeded == 1:
+                    yield row_builder.header_row(gradeset)
+                yield row_builder.row(student, gradeset)
+            else:
+                # An empty gradeset means we failed to grade a student.
+                task_progress.failed += 1
+                err_rows.append([student.id, student.username, err_msg])
 
-    TASK_LOG.info(
-        u'%s, Task type: %s, Current step: %s, Grade calculation completed for students: %s/%s',
-        task_info_string,
-        action_name,
-        current_step,
-        student_counter,
-        total_enrolled_students
-    )
+        TASK_LOG.info(
+            u'%s, Task type: %s, Current step: %s, Grade calculation completed for students: %s/%s',
+            task_info_string,
+            action_name,
+            current_step,
+            student_counter,
+            total_enrolled_students
+        )
+
+    # Grade students while streaming their rows to the report store
+    upload_csv_to_report_store(grade_rows(), 'grade_report', course_id, start_date)
 
-    # By this point, we've got the rows we're going to stuff into our CSV files.
     current_step = {'step': 'Uploading CSVs'}
     task_progress.update_task_state(extra_meta=current_step)
     TASK_LOG.info(u'%s, Task type: %s, Current step: %s', task_info_string, action_name, current_step)
 
-    # Perform the actual upload
-    upload_csv_to_report_store(rows, 'grade_report', course_id, start_date)
-
     # If there are any error rows (don't count the header), write them out as well
     if len(err_rows) > 1:
         upload_csv_to_report_store(err_rows, 'grade_report_err', course_id, start_date)
@@ -684,6 +735,217 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
     return task_progress.update_task_state(extra_meta=current_step)
 
 
+def _grade_report_partial_name(entry_id, csv_name, shard_index):
+    """
+    Return the name of the partial CSV that holds the `csv_name` rows of the
+    `shard_index`-th subtask of the grade report for InstructorTask `entry_id`.
+    """
+    return u"{csv_name}_{entry_id}_part_{shard_index:05d}.csv".format(
+        csv_name=csv_name,
+        entry_id=entry_id,
+        shard_index=shard_index,
+    )
+
+
+def queue_grade_report_subtasks(entry_id, course_id, action_name, start_date, students_per_task):
+    """
+    Split the grading of the students enrolled in `course_id` between subtasks
+    of at most `students_per_task` students each, and queue them.
+
+    Each subtask grades its students and stores its rows as partial CSVs in
+    the partials `ReportStore`; the last one to finish merges them into the
+    final report (see `merge_grade_report_partials`).
+
+    Returns the task progress, as stored in the InstructorTask object.
+    """
+    # Imported here since the subtask module itself depends on this one.
+    from instructor_task.tasks import calculate_grades_csv_subtask
+
+    entry = InstructorTask.objects.get(pk=entry_id)
+
+    # If the subtasks have already been queued (this happens when the parent
+    # task is requeued by Celery), don't queue a second set of them.
+    if len(entry.subtasks) > 0 and len(entry.task_output) > 0:
+        TASK_LOG.warning(u"Task %s has already queued its grade report subtasks", entry.task_id)
+        return json.loads(entry.task_output)
+
+    report_timestamp = start_date.strftime("%Y-%m-%d-%H%M")
+    shard_indexes = count()
+
+    def _create_grade_report_subtask(student_list, initial_subtask_status):
+        """Creates a subtask to grade the students in `student_list`."""
+        return calculate_grades_csv_subtask.subtask(
+            (
+                entry_id,
+                next(shard_indexes),
+                [student['pk'] for student in student_list],
+                report_timestamp,
+                initial_subtask_status.to_dict(),
+            ),
+            task_id=initial_subtask_status.task_id,
+            routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY,
+        )
+
+    return queue_subtasks_for_query(
+        entry,
+        action_name,
+        _create_grade_report_subtask,
+        [CourseEnrollment.users_enrolled_in(course_id).order_by('pk')],
+        [],
+        students_per_task,
+    )
+
+
+def grade_report_subtask(entry_id, course_id, shard_index, student_ids, subtask_status):
+    """
+    Grade the students with ids `student_ids`, and store their grade report
+    rows (and error rows, if any) as the `shard_index`-th partial CSVs of the
+    grade report for InstructorTask `entry_id`.
+
+    Returns the updated `subtask_status`.
+    """
+    rows = []
+    err_rows = [["id", "username", "error_msg"]]
+    attempted_ids = set()
+    try:
+        row_builder = GradeReportRowBuilder(course_id)
+        students = User.objects.filter(pk__in=student_ids).order_by('pk')
+        batch_size = settings.GRADES_DOWNLOAD_BATCH_SIZE
+        for student, gradeset, err_msg in iterate_grades_for(course_id, students, batch_size=batch_size):
+            attempted_ids.add(student.id)
+            if gradeset:
+                if not rows:
+                    rows.append(row_builder.header_row(gradeset))
+                rows.append(row_builder.row(student, gradeset))
+                subtask_status.increment(succeeded=1)
+            else:
+                err_rows.append([student.id, student.username, err_msg])
+                subtask_status.increment(failed=1)
+    except Exception as exc:  # pylint: disable=broad-except
+        # Report the students this subtask didn't get to as failed, rather
+        # than silently leaving them out of the merged report.
+        TASK_LOG.exception(u"Grade report subtask %s of InstructorTask %s failed", subtask_status.task_id, entry_id)
+        remaining_ids = [student_id for student_id in student_ids if student_id not in attempted_ids]
+        err_rows.extend([student_id, '', unicode(exc)] for student_id in remaining_ids)
+        subtask_status.increment(failed=len(remaining_ids), state=FAILURE)
+    else:
+        subtask_status.increment(state=SUCCESS)
+
+    report_store = ReportStore.from_config(partials=True)
+    report_store.store_rows(course_id, _grade_report_partial_name(entry_id, 'grade_report', shard_index), rows)
+    report_store.store_rows(course_id, _grade_report_partial_name(entry_id, 'grade_report_err', shard_index), err_rows)
+    return subtask_status
+
+
+def merge_grade_report_if_complete(entry_id, report_timestamp):
+    """
+    Merge the grade report for InstructorTask `entry_id` if all of its
+    subtasks are done, then mark the InstructorTask as succeeded, or as
+    failed (with the error) if the merge failed. Only one of the subtasks
+    gets to do the merge.
+    """
+    entry = InstructorTask.objects.get(pk=entry_id)
+    subtask_dict = json.loads(entry.subtasks)
+    if subtask_dict['succeeded'] + subtask_dict['failed'] < subtask_dict['total']:
+        return
+
+    # cache.add fails if the key already exists
+    lock_key = "grade-report-merge-{}".format(entry_id)
+    if not cache.add(lock_key, 'true', GRADE_REPORT_MERGE_LOCK_EXPIRE):
+        return
+
+    try:
+        # Another subtask may have merged the report before this one took the lock
+        entry = InstructorTask.objects.select_for_update().get(pk=entry_id)
+        if entry.task_state in READY_STATES:
+            return
+
+        TASK_LOG.info(u"InstructorTask %s: merging %s grade report partials", entry_id, subtask_dict['total'])
+        try:
+            merge_grade_report_partials(entry_id, entry.course_id, report_timestamp, subtask_dict['total'])
+        except Exception as exc:  # pylint: disable=broad-except
+            TASK_LOG.exception(u"InstructorTask %s: failed to merge the grade report partials", entry_id)
+            entry.task_output = InstructorTask.create_output_for_failure(exc, traceback.format_exc())
+            entry.task_state = FAILURE
+        else:
+            entry.task_state = SUCCESS
+        entry.save_now()
+    finally:
+        cache.delete(lock_key)
+
+
+def _merged_partial_rows(report_store, course_id, partial_names, header):
+    """
+    Yield `header` followed by the data rows of each of the partial CSVs
+    `partial_names`. Each partial that has rows starts with its own header;
+    its columns are reordered to match `header`.
+    """
+    yield header
+    for partial_name in partial_names:
+        partial_rows = report_store.read_rows(course_id, partial_name)
+        partial_header = next(partial_rows, None)
+        if partial_header is None:
+            continue
+        if partial_header == header:
+            for row in partial_rows:
+                yield row
+        else:
+            positions = {column: position for position, column in enumerate(partial_header)}
+            for row in partial_rows:
+                yield [row[positions[column]] if column in positions else 0.0 for column in header]
+
+
+def merge_grade_report_partials(entry_id, course_id, report_timestamp, num_shards):
+    """
+    Merge the partial CSVs stored by the `num_shards` subtasks of the grade
+    report for InstructorTask `entry_id` into the final grade report (and
+    error report, if any student could not be graded), then delete them.
+
+    The partials are deleted even if the merge fails, e.g. because one of
+    them is missing.
+    """
+    partials_store = ReportStore.from_config(partials=True)
+    timestamp = datetime.strptime(report_timestamp, "%Y-%m-%d-%H%M")
+    partial_names = {
+        csv_name: [_grade_report_partial_name(entry_id, csv_name, index) for index in xrange(num_shards)]
+        for csv_name in ('grade_report', 'grade_report_err')
+    }
+
+    try:
+        for csv_name in ('grade_report', 'grade_report_err'):
+            header = None
+            for partial_name in partial_names[csv_name]:
+                header = next(partials_store.read_rows(course_id, partial_name), None)
+                if header:
+                    break
+
+            merged_rows = _merged_partial_rows(partials_store, course_id, partial_names[csv_name], header)
+            if csv_name == 'grade_report':
+                upload_csv_to_report_store(merged_rows if header else [], csv_name, course_id, timestamp)
+            else:
+                # As with a report generated by a single task, the error report is
+                # only uploaded if at least one student could not be graded.
+                merged_rows = list(merged_rows)
+                if len(merged_rows) > 1:
+                    upload_csv_to_report_store(merged_rows, csv_name, course_id, timestamp)
+    finally:
+        for names in partial_names.itervalues():
+            for partial_name in names:
+                partials_store.delete(course_id, partial_name)
+
+
+def _counted_rows(rows, task_progress, header_rows=0):
+    """
+    Yield `rows`, counting every row after the first `header_rows` ones as
+    attempted and succeeded in `task_progress`.
+    """
+    for index, row in enumerate(rows):
+        if index >= header_rows:
+            task_progress.attempted += 1
+            task_progress.succeeded += 1
+        yield row
+
+
 def upload_students_csv(_xmodule_instance_args, _entry_id, course_id, task_input, action_name):
     """
     For a given `course_id`, generate a CSV file containing profile
@@ -696,21 +958,24 @@ def upload_students_csv(_xmodule_instance_args, _entry_id, course_id, task_input
     current_step = {'step': 'Calculating Profile Info'}
     task_progress.update_task_state(extra_meta=current_step)
 
-    # compute the student features table and format it
+    # compute the student features table and format it, a chunk of students at a time
     query_features = task_input.get('features')
-    student_data = enrolled_students_features(course_id, query_features)
-    header, rows = format_dictlist(student_data, query_features)
-
-    task_progress.attempted = task_progress.succeeded = len(rows)
-    task_progress.skipped = task_progress.total - task_progress.attempted
-
-    rows.insert(0, header)
+    rows = chain.from_iterable(
+        format_dictlist(student_data, query_features)[1]
+        for student_data in enrolled_students_features_chunks(course_id, query_features)
+    )
 
     current_step = {'step': 'Uploading CSV'}
     task_progress.update_task_state(extra_meta=current_step)
 
-    # Perform the upload
-    upload_csv_to_report_store(rows, 'student_profile_info', course_id, start_date)
+    # Perform the upload, counting rows as they are written
+    upload_csv_to_report_store(
+        _counted_rows(chain([query_features], rows), task_progress, header_rows=1),
+        'student_profile_info',
+        course_id,
+        start_date
+    )
+    task_progress.skipped = task_progress.total - task_progress.attempted
 
     return task_progress.update_task_state(extra_meta=current_step)
 
@@ -4,11 +4,12 @@ Tests for instructor_task/models.py.
 
 from cStringIO import StringIO
 import mock
+import os
 import time
 from datetime import datetime
 from unittest import TestCase
 
-from instructor_task.models import LocalFSReportStore, S3ReportStore
+from instructor_task.models import LocalFSReportStore, S3MultipartWriter, S3ReportStore
 from instructor_task.tests.test_base import TestReportMixin
 from opaque_keys.edx.locator import CourseLocator
 
@@ -93,6 +94,29 @@ class LocalFSReportStoreTestCase(ReportStoreTestMixin, TestReportMixin, TestCase
         """ Create and return a LocalFSReportStore. """
         return LocalFSReportStore.from_config()
 
+    def test_store_rows_from_generator(self):
+        report_store = self.create_report_store()
+        rows = ([unicode(i), u'caf\xe9'] for i in xrange(3))
+        report_store.store_rows(self.course_id, 'report.csv', rows)
+
+        self.assertEqual(
+            list(report_store.read_rows(self.course_id, 'report.csv')),
+            [[u'0', u'caf\xe9'], [u'1', u'caf\xe9'], [u'2', u'caf\xe9']]
+        )
+
+    def test_store_rows_failure_leaves_no_file(self):
+        report_store = self.create_report_store()
+
+        def failing_rows():
+            """ Yield a row, then blow up. """
+            yield [u'a', u'b']
+            raise ValueError()
+
+        with self.assertRaises(ValueError):
+            report_store.store_rows(self.course_id, 'report.csv', failing_rows())
+        self.assertEqual(report_store.links_for(self.course_id), [])
+        self.assertEqual(os.listdir(os.path.dirname(report_store.path_to(self.course_id, 'report.csv'))), [])
+
 
 @mock.patch('instructor_task.models.S3Connection', new=MockS3Connection)
 @mock.patch('instructor_task.models.Key', new=MockKey)
@@ -105,3 +129,42 @@ class S3ReportStoreTestCase(ReportStoreTestMixin, TestReportMixin, TestCase):
     def create_report_store(self):
         """ Create and return a S3ReportStore. """
         return S3ReportStore.from_config()
+
+
+class S3MultipartWriterTestCase(TestCase):
+    """
+    Test the S3MultipartWriter used to stream reports to S3.
+    """
+    def setUp(self):
+        self.key = mock.Mock()
+        self.multipart_upload = self.key.bucket.initiate_multipart_upload.return_value
+        self.uploaded_parts = []
+        self.multipart_upload.upload_part_from_file.side_effect = (
+            lambda part, num: self.uploaded_parts.append((num, part.read()))
+        )
+        self.writer = S3MultipartWriter(self.key, headers={'Content-Type': 'text/csv'}, part_size=10)
+
+    def test_small_content_uses_single_put(self):
+        self.writer.write('abc')
+        self.writer.close()
+
+        self.key.set_contents_from_string.assert_called_once_with(
+            'abc', headers={'Content-Type': 'text/csv', 'Content-Length': 3}
+        )
+        self.assertFalse(self.key.bucket.initiate_multipart_upload.called)
+
+    def test_large_content_is_uploaded_in_parts(self):
+        for _ in xrange(5):
+            self.writer.write('x' * 4)
+        self.writer.close()
+
+        self.assertEqual(self.uploaded_parts, [(1, 'x' * 12), (2, 'x' * 8)])
+        self.multipart_upload.complete_upload.assert_called_once_with()
+        self.assertFalse(self.key.set_contents_from_string.called)
+
+    def test_cancel(self):
+        self.writer.write('x' * 10)
+        self.writer.cancel()
+
+        self.multipart_upload.cancel_upload.assert_called_once_with()
+        self.assertFalse(self.multipart_upload.complete_upload.called)
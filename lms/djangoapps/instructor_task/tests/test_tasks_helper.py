@@ -7,6 +7,9 @@ Tests that CSV grade report generation works with unicode emails.
 
 """
 import ddt
+import json
+from celery.states import SUCCESS, FAILURE
+from django.core.cache import cache
 from mock import Mock, patch
 import tempfile
 import unicodecsv
@@ -20,8 +23,17 @@ from openedx.core.djangoapps.course_groups.models import CourseUserGroupPartitio
 from openedx.core.djangoapps.course_groups.tests.helpers import CohortFactory
 import openedx.core.djangoapps.user_api.course_tag.api as course_tag_api
 from openedx.core.djangoapps.user_api.partition_schemes import RandomUserPartitionScheme
-from instructor_task.models import ReportStore
-from instructor_task.tasks_helper import cohort_students_and_upload, upload_grades_csv, upload_students_csv
+from instructor_task.models import InstructorTask, ReportStore, PROGRESS
+from instructor_task.subtasks import SubtaskStatus
+from instructor_task.tasks_helper import (
+    cohort_students_and_upload,
+    grade_report_subtask,
+    merge_grade_report_if_complete,
+    merge_grade_report_partials,
+    upload_grades_csv,
+    upload_students_csv,
+)
+from instructor_task.tests.factories import InstructorTaskFactory
 from instructor_task.tests.test_base import InstructorTaskCourseTestCase, TestReportMixin
 
 
@@ -258,6 +270,118 @@ class TestInstructorGradeReport(TestReportMixin, InstructorTaskCourseTestCase):
         self.assertDictContainsSubset({'attempted': 1, 'succeeded': 1, 'failed': 0}, result)
 
 
+class TestGradeReportSubtasks(TestReportMixin, InstructorTaskCourseTestCase):
+    """
+    Tests that grade reports split between subtasks are merged correctly.
+    """
+    ENTRY_ID = 42
+    TIMESTAMP = '2015-01-01-0000'
+
+    def setUp(self):
+        super(TestGradeReportSubtasks, self).setUp()
+        self.course = CourseFactory.create()
+        self.students = [self.create_student('student{}'.format(index)) for index in range(3)]
+
+    def _run_subtasks(self, shards):
+        """
+        Run one grade report subtask per list of students in `shards`, and
+        return their final statuses.
+        """
+        return [
+            grade_report_subtask(
+                self.ENTRY_ID, self.course.id, index, [student.id for student in shard], SubtaskStatus.create(index)
+            )
+            for index, shard in enumerate(shards)
+        ]
+
+    def test_single_task_below_threshold(self):
+        """Courses with few students are graded by a single task."""
+        with self.settings(GRADES_DOWNLOAD_STUDENTS_PER_TASK=10):
+            with patch('instructor_task.tasks_helper.queue_grade_report_subtasks') as mock_queue:
+                with patch('instructor_task.tasks_helper._get_current_task'):
+                    result = upload_grades_csv(None, self.ENTRY_ID, self.course.id, None, 'graded')
+        self.assertFalse(mock_queue.called)
+        self.assertDictContainsSubset({'attempted': 3, 'succeeded': 3, 'failed': 0}, result)
+
+    def test_subtasks_above_threshold(self):
+        """Courses with more students than GRADES_DOWNLOAD_STUDENTS_PER_TASK are split between subtasks."""
+        with self.settings(GRADES_DOWNLOAD_STUDENTS_PER_TASK=2):
+            with patch('instructor_task.tasks_helper.queue_grade_report_subtasks') as mock_queue:
+                upload_grades_csv(None, self.ENTRY_ID, self.course.id, None, 'graded')
+        self.assertTrue(mock_queue.called)
+        self.assertEqual(mock_queue.call_args[0][0], self.ENTRY_ID)
+
+    def test_merged_report(self):
+        """The rows of every subtask end up in a single report."""
+        statuses = self._run_subtasks([self.students[:2], self.students[2:]])
+        self.assertEqual([status.succeeded for status in statuses], [2, 1])
+
+        merge_grade_report_partials(self.ENTRY_ID, self.course.id, self.TIMESTAMP, len(statuses))
+
+        report_store = ReportStore.from_config()
+        links = report_store.links_for(self.course.id)
+        self.assertEqual(len(links), 1)
+        self.assertIn('grade_report_2015-01-01-0000', links[0][0])
+        with open(report_store.path_to(self.course.id, links[0][0])) as csv_file:
+            csv_rows = list(unicodecsv.DictReader(csv_file))
+        self.assertEqual([row['username'] for row in csv_rows], [student.username for student in self.students])
+
+        # The partial files are gone once they have been merged
+        partials_store = ReportStore.from_config(partials=True)
+        self.assertEqual(partials_store.links_for(self.course.id), [])
+
+    @patch('instructor_task.tasks_helper.iterate_grades_for')
+    def test_failed_subtask(self, mock_iterate_grades_for):
+        """Students of a subtask that failed are listed in the error report."""
+        mock_iterate_grades_for.side_effect = Exception('Broken course')
+        statuses = self._run_subtasks([self.students])
+        self.assertEqual(statuses[0].failed, len(self.students))
+
+        merge_grade_report_partials(self.ENTRY_ID, self.course.id, self.TIMESTAMP, len(statuses))
+
+        report_store = ReportStore.from_config()
+        self.assertTrue(any('grade_report_err' in item[0] for item in report_store.links_for(self.course.id)))
+
+    def _create_entry(self, num_subtasks):
+        """
+        Create the InstructorTask of a grade report whose `num_subtasks` subtasks are all done.
+        """
+        return InstructorTaskFactory.create(
+            course_id=self.course.id,
+            task_type='grade_course',
+            task_state=PROGRESS,
+            subtasks=json.dumps({'total': num_subtasks, 'succeeded': num_subtasks, 'failed': 0, 'retried': 0}),
+        )
+
+    def test_merged_when_complete(self):
+        """The InstructorTask only succeeds once the last subtask merged the report."""
+        entry = self._create_entry(2)
+        self._run_subtasks([self.students[:2], self.students[2:]])
+
+        merge_grade_report_if_complete(entry.id, self.TIMESTAMP)
+        self.assertEqual(InstructorTask.objects.get(pk=entry.id).task_state, SUCCESS)
+        self.assertEqual(len(ReportStore.from_config().links_for(self.course.id)), 1)
+        self.assertIsNone(cache.get("grade-report-merge-{}".format(entry.id)))
+
+        # A subtask finishing late doesn't merge the report again
+        with patch('instructor_task.tasks_helper.merge_grade_report_partials') as mock_merge:
+            merge_grade_report_if_complete(entry.id, self.TIMESTAMP)
+        self.assertFalse(mock_merge.called)
+
+    def test_failed_merge(self):
+        """A merge which fails is recorded on the InstructorTask, and doesn't leave partials or the lock behind."""
+        entry = self._create_entry(2)
+        # The partials of the second subtask are missing
+        self._run_subtasks([self.students[:2]])
+
+        merge_grade_report_if_complete(entry.id, self.TIMESTAMP)
+        entry = InstructorTask.objects.get(pk=entry.id)
+        self.assertEqual(entry.task_state, FAILURE)
+        self.assertIn('exception', json.loads(entry.task_output))
+        self.assertEqual(ReportStore.from_config(partials=True).links_for(self.course.id), [])
+        self.assertIsNone(cache.get("grade-report-merge-{}".format(entry.id)))
+
+
 @ddt.ddt
 class TestStudentReport(TestReportMixin, InstructorTaskCourseTestCase):
     """
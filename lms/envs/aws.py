@@ -203,6 +203,13 @@ BULK_EMAIL_MAX_RETRIES = ENV_TOKENS.get('BULK_EMAIL_MAX_RETRIES', BULK_EMAIL_MAX
 BULK_EMAIL_INFINITE_RETRY_CAP = ENV_TOKENS.get('BULK_EMAIL_INFINITE_RETRY_CAP', BULK_EMAIL_INFINITE_RETRY_CAP)
 BULK_EMAIL_LOG_SENT_EMAILS = ENV_TOKENS.get('BULK_EMAIL_LOG_SENT_EMAILS', BULK_EMAIL_LOG_SENT_EMAILS)
 BULK_EMAIL_RETRY_DELAY_BETWEEN_SENDS = ENV_TOKENS.get('BULK_EMAIL_RETRY_DELAY_BETWEEN_SENDS', BULK_EMAIL_RETRY_DELAY_BETWEEN_SENDS)
+BULK_EMAIL_SEND_CONCURRENCY = ENV_TOKENS.get('BULK_EMAIL_SEND_CONCURRENCY', BULK_EMAIL_SEND_CONCURRENCY)
+BULK_EMAIL_DOMAIN_THROTTLE_MIN_DELAY = ENV_TOKENS.get(
+    'BULK_EMAIL_DOMAIN_THROTTLE_MIN_DELAY', BULK_EMAIL_DOMAIN_THROTTLE_MIN_DELAY
+)
+BULK_EMAIL_DOMAIN_THROTTLE_MAX_DELAY = ENV_TOKENS.get(
+    'BULK_EMAIL_DOMAIN_THROTTLE_MAX_DELAY', BULK_EMAIL_DOMAIN_THROTTLE_MAX_DELAY
+)
 # We want Bulk Email running on the high-priority queue, so we define the
 # routing key that points to it.  At the moment, the name is the same.
 # We have to reset the value here, since we have changed the value of the queue name.
@@ -247,9 +254,21 @@ LOGGING = get_logger_config(LOG_DIR,
 COURSE_LISTINGS = ENV_TOKENS.get('COURSE_LISTINGS', {})
 SUBDOMAIN_BRANDING = ENV_TOKENS.get('SUBDOMAIN_BRANDING', {})
 VIRTUAL_UNIVERSITIES = ENV_TOKENS.get('VIRTUAL_UNIVERSITIES', [])
+COURSE_CATALOG_PAGE_SIZE = ENV_TOKENS.get('COURSE_CATALOG_PAGE_SIZE', COURSE_CATALOG_PAGE_SIZE)
 META_UNIVERSITIES = ENV_TOKENS.get('META_UNIVERSITIES', {})
 COMMENTS_SERVICE_URL = ENV_TOKENS.get("COMMENTS_SERVICE_URL", '')
 COMMENTS_SERVICE_KEY = ENV_TOKENS.get("COMMENTS_SERVICE_KEY", '')
+COMMENTS_SERVICE_CACHE_TIMEOUT = ENV_TOKENS.get("COMMENTS_SERVICE_CACHE_TIMEOUT", COMMENTS_SERVICE_CACHE_TIMEOUT)
+COMMENTS_SERVICE_FAN_OUT_THREADS = ENV_TOKENS.get("COMMENTS_SERVICE_FAN_OUT_THREADS", COMMENTS_SERVICE_FAN_OUT_THREADS)
+COURSEWARE_ACCESS_REQUEST_CACHE = ENV_TOKENS.get('COURSEWARE_ACCESS_REQUEST_CACHE', COURSEWARE_ACCESS_REQUEST_CACHE)
+STUDENT_MODULE_HISTORY_ASYNC = ENV_TOKENS.get('STUDENT_MODULE_HISTORY_ASYNC', STUDENT_MODULE_HISTORY_ASYNC)
+STUDENT_MODULE_HISTORY_KEYFRAME_INTERVAL = ENV_TOKENS.get(
+    'STUDENT_MODULE_HISTORY_KEYFRAME_INTERVAL', STUDENT_MODULE_HISTORY_KEYFRAME_INTERVAL
+)
+STUDENT_MODULE_HISTORY_RETENTION_DAYS = ENV_TOKENS.get(
+    'STUDENT_MODULE_HISTORY_RETENTION_DAYS', STUDENT_MODULE_HISTORY_RETENTION_DAYS
+)
+COURSE_ACCESS_ROLES_CACHE_TIMEOUT = ENV_TOKENS.get('COURSE_ACCESS_ROLES_CACHE_TIMEOUT', COURSE_ACCESS_ROLES_CACHE_TIMEOUT)
 CERT_QUEUE = ENV_TOKENS.get("CERT_QUEUE", 'test-pull')
 ZENDESK_URL = ENV_TOKENS.get("ZENDESK_URL")
 FEEDBACK_SUBMISSION_EMAIL = ENV_TOKENS.get("FEEDBACK_SUBMISSION_EMAIL")
@@ -268,6 +287,9 @@ for name, value in ENV_TOKENS.get("CODE_JAIL", {}).items():
         CODE_JAIL[name] = value
 
 COURSES_WITH_UNSAFE_CODE = ENV_TOKENS.get("COURSES_WITH_UNSAFE_CODE", [])
+CODE_JAIL_POOL_SIZE = ENV_TOKENS.get("CODE_JAIL_POOL_SIZE", CODE_JAIL_POOL_SIZE)
+CODE_JAIL_POOL_MAX_JOBS = ENV_TOKENS.get("CODE_JAIL_POOL_MAX_JOBS", CODE_JAIL_POOL_MAX_JOBS)
+CODE_JAIL_RESULT_CACHE_SIZE = ENV_TOKENS.get("CODE_JAIL_RESULT_CACHE_SIZE", CODE_JAIL_RESULT_CACHE_SIZE)
 
 ASSET_IGNORE_REGEX = ENV_TOKENS.get('ASSET_IGNORE_REGEX', ASSET_IGNORE_REGEX)
 
@@ -391,7 +413,16 @@ XQUEUE_INTERFACE = AUTH_TOKENS['XQUEUE_INTERFACE']
 # use the one from common.py
 MODULESTORE = convert_module_store_setting_if_needed(AUTH_TOKENS.get('MODULESTORE', MODULESTORE))
 CONTENTSTORE = AUTH_TOKENS.get('CONTENTSTORE', CONTENTSTORE)
+CONTENTSERVER_CACHE_MAX_ASSET_SIZE = ENV_TOKENS.get(
+    'CONTENTSERVER_CACHE_MAX_ASSET_SIZE', CONTENTSERVER_CACHE_MAX_ASSET_SIZE
+)
+CONTENTSERVER_DISK_CACHE_DIR = ENV_TOKENS.get('CONTENTSERVER_DISK_CACHE_DIR', CONTENTSERVER_DISK_CACHE_DIR)
+CONTENTSERVER_DISK_CACHE_MAX_SIZE = ENV_TOKENS.get(
+    'CONTENTSERVER_DISK_CACHE_MAX_SIZE', CONTENTSERVER_DISK_CACHE_MAX_SIZE
+)
+STATIC_REPLACE_CACHE_SIZE = ENV_TOKENS.get('STATIC_REPLACE_CACHE_SIZE', STATIC_REPLACE_CACHE_SIZE)
 DOC_STORE_CONFIG = AUTH_TOKENS.get('DOC_STORE_CONFIG', DOC_STORE_CONFIG)
+SPLIT_DOCUMENT_CACHE_MAX_SIZE = ENV_TOKENS.get('SPLIT_DOCUMENT_CACHE_MAX_SIZE', SPLIT_DOCUMENT_CACHE_MAX_SIZE)
 MONGODB_LOG = AUTH_TOKENS.get('MONGODB_LOG', {})
 
 OPEN_ENDED_GRADING_INTERFACE = AUTH_TOKENS.get('OPEN_ENDED_GRADING_INTERFACE',
@@ -464,6 +495,10 @@ VERIFY_STUDENT = AUTH_TOKENS.get("VERIFY_STUDENT", VERIFY_STUDENT)
 GRADES_DOWNLOAD_ROUTING_KEY = HIGH_MEM_QUEUE
 
 GRADES_DOWNLOAD = ENV_TOKENS.get("GRADES_DOWNLOAD", GRADES_DOWNLOAD)
+GRADES_DOWNLOAD_STUDENTS_PER_TASK = ENV_TOKENS.get(
+    "GRADES_DOWNLOAD_STUDENTS_PER_TASK", GRADES_DOWNLOAD_STUDENTS_PER_TASK
+)
+GRADES_DOWNLOAD_BATCH_SIZE = ENV_TOKENS.get("GRADES_DOWNLOAD_BATCH_SIZE", GRADES_DOWNLOAD_BATCH_SIZE)
 
 ##### ORA2 ######
 # Prefix for uploads of example-based assessment AI classifiers
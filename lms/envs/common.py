@@ -59,6 +59,39 @@ DISCUSSION_SETTINGS = {
     'MAX_COMMENT_DEPTH': 2,
 }
 
+# Seconds for which the responses of the comments service to the requests of
+# a user which are safe to cache (e.g. user info and thread lists) are cached.
+# Requests of the user which change anything invalidate them.
+COMMENTS_SERVICE_CACHE_TIMEOUT = 5
+
+# Number of threads (per process) making the independent requests a forum
+# view needs to the comments service concurrently.  With 0, they are made
+# one after the other.
+COMMENTS_SERVICE_FAN_OUT_THREADS = 4
+
+# Write the history of the StudentModules of problems compressed, in a celery
+# task, rather than as a copy of the state in each request which changes it
+# (see courseware.history).
+STUDENT_MODULE_HISTORY_ASYNC = False
+
+# With STUDENT_MODULE_HISTORY_ASYNC, the full state of a StudentModule is stored
+# once every this many history entries, and the entries in between only store
+# the fields which changed.
+STUDENT_MODULE_HISTORY_KEYFRAME_INTERVAL = 10
+
+# Number of days the StudentModule history is kept for, by the
+# prune_student_module_history command.  With None, it is kept forever.
+STUDENT_MODULE_HISTORY_RETENTION_DAYS = None
+
+# Memoize the decisions of courseware.access.has_access, and the roles and
+# group assignments they depend on, for the rest of each request.
+COURSEWARE_ACCESS_REQUEST_CACHE = True
+
+# Number of seconds the course access roles of a user are shared between
+# requests in the cache.  They are removed from it whenever they change.
+# With 0, they are looked up in the database in each request.
+COURSE_ACCESS_ROLES_CACHE_TIMEOUT = 0
+
 
 # Features
 FEATURES = {
@@ -365,6 +398,10 @@ FEATURES = {
     # Certificates Web/HTML Views
     'CERTIFICATES_HTML_VIEW': False,
 
+    # Persist per-subsection scores so that grading doesn't have to load
+    # every module of a course (see courseware.models.StudentSubsectionScore)
+    'ENABLE_PERSISTENT_SUBSECTION_GRADES': False,
+
     # Social Media Sharing on Student Dashboard
     'DASHBOARD_SHARE_SETTINGS': {
         'FACEBOOK_SHARING': False,
@@ -629,6 +666,10 @@ COURSE_LISTINGS = {}
 SUBDOMAIN_BRANDING = {}
 VIRTUAL_UNIVERSITIES = []
 
+######################## course catalog ###########################
+# The number of courses listed on each page of the "find courses" page, and on the main page
+COURSE_CATALOG_PAGE_SIZE = 60
+
 ############# XBlock Configuration ##########
 
 # Import after sys.path fixup
@@ -694,6 +735,29 @@ MODULESTORE = {
     }
 }
 
+# Maximum size, in bytes, of the process-wide cache of split modulestore
+# structures and definitions (which never change once written). 0 disables the
+# cache. Adding a 'split_documents' entry to CACHES adds a tier shared between
+# processes.
+SPLIT_DOCUMENT_CACHE_MAX_SIZE = 64 * 1024 * 1024
+
+############################ Course asset serving ##############################
+
+# Assets smaller than this many bytes are cached in memcached by the
+# StaticContentServer middleware.
+CONTENTSERVER_CACHE_MAX_ASSET_SIZE = 1024 * 1024
+
+# Directory of the local disk cache of larger assets (whose metadata then goes to
+# memcached), shared by the processes of a server. None disables the disk cache.
+CONTENTSERVER_DISK_CACHE_DIR = None
+
+# Maximum total size, in bytes, of the disk cache of assets.
+CONTENTSERVER_DISK_CACHE_MAX_SIZE = 10 * 1024 * 1024 * 1024
+
+# Number of resolved static urls that static_replace keeps in each process.
+# 0 disables this cache.
+STATIC_REPLACE_CACHE_SIZE = 10000
+
 #################### Python sandbox ############################################
 
 CODE_JAIL = {
@@ -709,6 +773,18 @@ CODE_JAIL = {
     },
 }
 
+# Number of long-lived sandbox processes which run the jailed code of capa
+# problems for each LMS process (see capa.safe_exec.pool).  With 0, a new
+# sandbox is started for each execution.
+CODE_JAIL_POOL_SIZE = 0
+
+# Number of executions after which a sandbox process is replaced.
+CODE_JAIL_POOL_MAX_JOBS = 100
+
+# Number of results of jailed code that each process keeps in memory, in
+# front of the cache.
+CODE_JAIL_RESULT_CACHE_SIZE = 1000
+
 # Some courses are allowed to run unsafe code. This is a list of regexes, one
 # of them must match the course id for that course to run unsafe code.
 #
@@ -1046,7 +1122,11 @@ MIDDLEWARE_CLASSES = (
     # Detects user-requested locale from 'accept-language' header in http request
     'django.middleware.locale.LocaleMiddleware',
 
+    # Sends the StudentModule history recorded by the request, after its transaction
+    'courseware.middleware.StudentModuleHistoryMiddleware',
     'django.middleware.transaction.TransactionMiddleware',
+    # Writes the student state changed by the request, inside its transaction
+    'courseware.middleware.FieldDataCacheFlushMiddleware',
     # 'debug_toolbar.middleware.DebugToolbarMiddleware',
 
     'django_comment_client.utils.ViewNameMiddleware',
@@ -1516,6 +1596,18 @@ BULK_EMAIL_LOG_SENT_EMAILS = False
 # parallel, and what the SES rate is.
 BULK_EMAIL_RETRY_DELAY_BETWEEN_SENDS = 0.02
 
+# Number of connections over which each bulk email subtask sends its messages
+# in parallel.  The connections are kept open for the whole subtask.
+BULK_EMAIL_SEND_CONCURRENCY = 1
+
+# When a recipient domain refuses messages because they are being sent too
+# quickly, the delay between the messages sent to that domain is doubled,
+# starting at BULK_EMAIL_DOMAIN_THROTTLE_MIN_DELAY, up to
+# BULK_EMAIL_DOMAIN_THROTTLE_MAX_DELAY seconds.  It decreases again as the
+# domain accepts messages.  Set the maximum delay to 0 to disable throttling.
+BULK_EMAIL_DOMAIN_THROTTLE_MIN_DELAY = 0.1
+BULK_EMAIL_DOMAIN_THROTTLE_MAX_DELAY = 10
+
 ############################# Email Opt In ####################################
 
 # Minimum age for organization-wide email opt in
@@ -1579,6 +1671,8 @@ INSTALLED_APPS = (
     'dashboard',
     'instructor',
     'instructor_task',
+    # The counters of the Metrics tab, which follow the StudentModules whether or not the tab is enabled
+    'class_dashboard',
     'open_ended_grading',
     'psychometrics',
     'licenses',
@@ -1682,6 +1776,7 @@ INSTALLED_APPS = (
     'lms.djangoapps.lms_xblock',
 
     'openedx.core.djangoapps.content.course_structures',
+    'openedx.core.djangoapps.content.course_overviews',
     'course_structure_api',
 
     # CORS and cross-domain CSRF
@@ -1803,8 +1898,6 @@ VERIFY_STUDENT = {
 
 ### This enables the Metrics tab for the Instructor dashboard ###########
 FEATURES['CLASS_DASHBOARD'] = False
-if FEATURES.get('CLASS_DASHBOARD'):
-    INSTALLED_APPS += ('class_dashboard',)
 
 ######################## CAS authentication ###########################
 
@@ -1861,6 +1954,15 @@ GRADES_DOWNLOAD = {
     'ROOT_PATH': '/tmp/edx-s3/grades',
 }
 
+# Maximum number of students graded by each subtask of a grade report. Grade
+# reports for courses with more students than this are split between
+# subtasks. If None, every grade report is computed by a single task.
+GRADES_DOWNLOAD_STUDENTS_PER_TASK = None
+
+# Number of students whose scores are prefetched together when computing a
+# grade report. If None, the scores of each student are queried separately.
+GRADES_DOWNLOAD_BATCH_SIZE = None
+
 
 #### PASSWORD POLICY SETTINGS #####
 PASSWORD_MIN_LENGTH = 8
@@ -156,6 +156,30 @@ update_module_store_settings(
     },
 )
 
+# Many tests count the queries made to the modulestore, so don't cache any
+# split documents between tests.
+SPLIT_DOCUMENT_CACHE_MAX_SIZE = 0
+
+# Courses with the same ids are created with different modulestores in
+# different tests, so don't cache how their static urls are resolved.
+STATIC_REPLACE_CACHE_SIZE = 0
+
+# Many tests make sending bulk email fail with throttling errors, so don't
+# slow down the messages sent to the domains of the test users.
+BULK_EMAIL_DOMAIN_THROTTLE_MAX_DELAY = 0
+
+# Tests check the exact requests made to the comments service, in order, so
+# don't cache its responses or make the requests concurrently.
+COMMENTS_SERVICE_CACHE_TIMEOUT = 0
+COMMENTS_SERVICE_FAN_OUT_THREADS = 0
+
+# Tests change roles and course settings between access checks made in the
+# same "request", so don't memoize the access decisions.
+COURSEWARE_ACCESS_REQUEST_CACHE = False
+
+# Keep the results of jailed code run by one test from the others.
+CODE_JAIL_RESULT_CACHE_SIZE = 0
+
 CONTENTSTORE = {
     'ENGINE': 'xmodule.contentstore.mongo.MongoContentStore',
     'DOC_STORE_CONFIG': {
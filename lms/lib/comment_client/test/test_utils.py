@@ -0,0 +1,128 @@
+"""
+Tests of the requests made to the comments service.
+"""
+import threading
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.utils.translation import get_language, override as override_language
+from mock import Mock, patch
+
+from lms.lib.comment_client import utils
+from lms.lib.comment_client.utils import CommentClientRequestError, perform_concurrently, perform_request
+
+
+def make_response(data):
+    """
+    Returns a mock successful response of the comments service, with the JSON `data`.
+    """
+    return Mock(status_code=200, text='{}', json=Mock(return_value=data))
+
+
+@patch('lms.lib.comment_client.utils.requests.Session.request')
+class PerformRequestTestCase(TestCase):
+    """
+    Tests of perform_request.
+    """
+    def setUp(self):
+        super(PerformRequestTestCase, self).setUp()
+        cache.clear()
+        self.user = Mock(id=1)
+        self.user.is_authenticated.return_value = True
+        patcher = patch('lms.lib.comment_client.utils.get_current_user', return_value=self.user)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_session_is_reused(self, mock_request):
+        mock_request.return_value = make_response({})
+        sessions = []
+        for __ in range(2):
+            perform_request('get', 'http://localhost:4567/api/v1/users/1')
+            sessions.append(utils._get_session())  # pylint: disable=protected-access
+        self.assertIs(sessions[0], sessions[1])
+        self.assertEqual(mock_request.call_count, 2)
+
+    @override_settings(COMMENTS_SERVICE_CACHE_TIMEOUT=10)
+    def test_cached_get(self, mock_request):
+        mock_request.return_value = make_response({'username': 'test'})
+        url = 'http://localhost:4567/api/v1/users/1'
+
+        for __ in range(2):
+            self.assertEqual(perform_request('get', url, {'course_id': 'a/b/c'}, cacheable=True), {'username': 'test'})
+        self.assertEqual(mock_request.call_count, 1)
+
+        # Different parameters are different requests...
+        perform_request('get', url, {'course_id': 'd/e/f'}, cacheable=True)
+        self.assertEqual(mock_request.call_count, 2)
+        # ... and requests which aren't cacheable are always made.
+        perform_request('get', url, {'course_id': 'a/b/c'})
+        self.assertEqual(mock_request.call_count, 3)
+
+        # Responses are cached for each user
+        self.user.id = 2
+        perform_request('get', url, {'course_id': 'a/b/c'}, cacheable=True)
+        self.assertEqual(mock_request.call_count, 4)
+
+    @override_settings(COMMENTS_SERVICE_CACHE_TIMEOUT=10)
+    def test_writes_invalidate_cache(self, mock_request):
+        mock_request.return_value = make_response({})
+        url = 'http://localhost:4567/api/v1/threads'
+        perform_request('get', url, {'course_id': 'a/b/c'}, cacheable=True)
+        perform_request('post', url, {'body': 'new thread'})
+        perform_request('get', url, {'course_id': 'a/b/c'}, cacheable=True)
+        self.assertEqual(mock_request.call_count, 3)
+
+        # Failed requests may have changed something too
+        mock_request.return_value = Mock(status_code=400, text='error')
+        with self.assertRaises(CommentClientRequestError):
+            perform_request('put', url, {'body': 'changed thread'})
+        mock_request.return_value = make_response({})
+        perform_request('get', url, {'course_id': 'a/b/c'}, cacheable=True)
+        self.assertEqual(mock_request.call_count, 5)
+
+    @override_settings(COMMENTS_SERVICE_CACHE_TIMEOUT=10)
+    def test_no_cache_outside_of_requests(self, mock_request):
+        mock_request.return_value = make_response({})
+        with patch('lms.lib.comment_client.utils.get_current_user', return_value=None):
+            for __ in range(2):
+                perform_request('get', 'http://localhost:4567/api/v1/users/1', cacheable=True)
+        self.assertEqual(mock_request.call_count, 2)
+
+
+class PerformConcurrentlyTestCase(TestCase):
+    """
+    Tests of perform_concurrently.
+    """
+    def call_info(self):
+        """
+        Returns the thread and language this was called in.
+        """
+        return threading.current_thread(), get_language()
+
+    @override_settings(COMMENTS_SERVICE_FAN_OUT_THREADS=2)
+    def test_concurrent_calls(self):
+        with override_language('eo'):
+            results = perform_concurrently(self.call_info, self.call_info, self.call_info)
+
+        self.assertEqual(results[0], (threading.current_thread(), 'eo'))
+        for thread, language in results[1:]:
+            self.assertIsNot(thread, threading.current_thread())
+            self.assertEqual(language, 'eo')
+
+    @override_settings(COMMENTS_SERVICE_FAN_OUT_THREADS=2)
+    def test_error(self):
+        def fail():
+            """Fails like a request to the comments service."""
+            raise CommentClientRequestError('Not found', 404)
+
+        calls = Mock(side_effect=self.call_info)
+        with self.assertRaises(CommentClientRequestError):
+            perform_concurrently(calls, fail, calls)
+        # The other calls are still made
+        self.assertEqual(calls.call_count, 2)
+
+    @override_settings(COMMENTS_SERVICE_FAN_OUT_THREADS=0)
+    def test_sequential_calls(self):
+        results = perform_concurrently(self.call_info, self.call_info)
+        self.assertEqual([thread for thread, __ in results], [threading.current_thread()] * 2)
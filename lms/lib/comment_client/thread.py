@@ -1,7 +1,7 @@
 import logging
 
 from eventtracking import tracker
-from .utils import merge_dict, strip_blank, strip_none, extract, perform_request
+from .utils import merge_dict, strip_blank, strip_none, extract, perform_request, invalidate_cached_responses
 from .utils import CommentClientRequestError
 import models
 import settings
@@ -58,7 +58,8 @@ class Thread(models.Model):
             params,
             metric_tags=[u'course_id:{}'.format(query_params['course_id'])],
             metric_action='thread.search',
-            paged_results=True
+            paged_results=True,
+            cacheable=True,
         )
         if query_params.get('text'):
             search_query = query_params['text']
@@ -134,6 +135,9 @@ class Thread(models.Model):
             metric_tags=self._metric_tags
         )
         self._update_from_response(response)
+        if request_params.get('mark_as_read'):
+            # The thread is now read by the user, so user info and thread lists cached for them are outdated
+            invalidate_cached_responses()
 
     def flagAbuse(self, user, voteable):
         if voteable.type == 'thread':
@@ -1,14 +1,36 @@
 from contextlib import contextmanager
 import dogstats_wrapper as dog_stats_api
+import hashlib
 import logging
+import os
 import requests
+import sys
+import threading
+from crum import get_current_user
 from django.conf import settings
+from django.core.cache import cache
+from django.utils import translation
+from multiprocessing.pool import ThreadPool
 from time import time
 from uuid import uuid4
 from django.utils.translation import get_language
 
 log = logging.getLogger(__name__)
 
+# Seconds to wait for the result of a call made by perform_concurrently in another thread.
+FAN_OUT_TIMEOUT = 60
+
+# Seconds for which the generation of the cached responses of a user is kept.
+# It must be much longer than COMMENTS_SERVICE_CACHE_TIMEOUT.
+CACHE_GENERATION_TIMEOUT = 24 * 60 * 60
+
+# The keep-alive session and the cache scope of each thread.
+_thread_locals = threading.local()
+
+_fan_out_pool = None
+_fan_out_pool_pid = None
+_fan_out_pool_lock = threading.Lock()
+
 
 def strip_none(dic):
     return dict([(k, v) for k, v in dic.iteritems() if v is not None])
@@ -50,8 +72,139 @@ def request_timer(request_id, method, url, tags=None):
     )
 
 
+def _get_session():
+    """
+    Returns the requests session of this thread, which keeps its connections
+    to the comments service alive between requests.  Processes get their own
+    sessions after a fork, since they can't share connections.
+    """
+    if getattr(_thread_locals, 'session_pid', None) != os.getpid():
+        _thread_locals.session = requests.Session()
+        _thread_locals.session_pid = os.getpid()
+    return _thread_locals.session
+
+
+def _cache_scope():
+    """
+    Returns what the responses cached in this thread are scoped to: the id of
+    the user making the current request, or None if responses aren't cached
+    (outside of requests, or if the cache is disabled).
+    """
+    if not getattr(settings, 'COMMENTS_SERVICE_CACHE_TIMEOUT', 0):
+        return None
+    scope = getattr(_thread_locals, 'cache_scope', None)
+    if scope is None:
+        user = get_current_user()
+        if user is not None and user.is_authenticated():
+            scope = user.id
+    return scope
+
+
+def _generation_cache_key(scope):
+    """
+    Returns the cache key of the generation of the responses cached for `scope`.
+    """
+    return u'comment_client.generation.{}'.format(scope)
+
+
+def _response_cache_key(scope, url, params):
+    """
+    Returns the cache key of the response to a GET request of `url` with `params`.
+    """
+    request = repr((url, sorted(params.items()), get_language()))
+    return u'comment_client.response.{}.{}'.format(scope, hashlib.md5(request).hexdigest())
+
+
+def invalidate_cached_responses():
+    """
+    Invalidates the responses cached for the current user, after a request
+    which may have changed them.
+    """
+    scope = _cache_scope()
+    if scope is None:
+        return
+    key = _generation_cache_key(scope)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, CACHE_GENERATION_TIMEOUT)
+
+
+def _get_fan_out_pool():
+    """
+    Returns the pool of threads of this process which make the calls of perform_concurrently.
+    """
+    global _fan_out_pool, _fan_out_pool_pid  # pylint: disable=global-statement
+    with _fan_out_pool_lock:
+        if _fan_out_pool_pid != os.getpid():
+            _fan_out_pool = ThreadPool(settings.COMMENTS_SERVICE_FAN_OUT_THREADS)
+            _fan_out_pool_pid = os.getpid()
+    return _fan_out_pool
+
+
+def _call_in_fan_out_thread(call, language, cache_scope):
+    """
+    Calls `call` in a thread of the fan-out pool, with the language and cache
+    scope of the thread which called perform_concurrently.
+    """
+    if language:
+        translation.activate(language)
+    _thread_locals.cache_scope = cache_scope
+    try:
+        return call()
+    finally:
+        _thread_locals.cache_scope = None
+        translation.deactivate()
+
+
+def perform_concurrently(*calls):
+    """
+    Calls the functions `calls`, which make independent requests to the
+    comments service, concurrently, and returns their results in order.
+
+    The first function is called in the calling thread, and the others in a
+    pool of COMMENTS_SERVICE_FAN_OUT_THREADS threads, so they must only make
+    requests to the comments service (and e.g. not use the database, or emit
+    tracking events).  If functions raise errors, the error of the first one
+    is raised once all of them have returned.
+    """
+    if not getattr(settings, 'COMMENTS_SERVICE_FAN_OUT_THREADS', 0) or len(calls) < 2:
+        return [call() for call in calls]
+
+    pool = _get_fan_out_pool()
+    language = get_language()
+    cache_scope = _cache_scope()
+    async_results = [
+        pool.apply_async(_call_in_fan_out_thread, (call, language, cache_scope))
+        for call in calls[1:]
+    ]
+
+    results = []
+    first_error = None
+    try:
+        results.append(calls[0]())
+    except Exception:  # pylint: disable=broad-except
+        first_error = sys.exc_info()
+    for async_result in async_results:
+        try:
+            results.append(async_result.get(FAN_OUT_TIMEOUT))
+        except Exception:  # pylint: disable=broad-except
+            first_error = first_error or sys.exc_info()
+
+    if first_error is not None:
+        raise first_error[0], first_error[1], first_error[2]
+    return results
+
+
 def perform_request(method, url, data_or_params=None, raw=False,
-                    metric_action=None, metric_tags=None, paged_results=False):
+                    metric_action=None, metric_tags=None, paged_results=False, cacheable=False):
+    """
+    Makes a request to the comments service, and returns its response.
+
+    The responses to GET requests which are `cacheable` are cached for the user
+    making them for COMMENTS_SERVICE_CACHE_TIMEOUT seconds, until the user makes
+    a request which isn't a GET.
+    """
 
     if metric_tags is None:
         metric_tags = []
@@ -69,21 +222,36 @@ def perform_request(method, url, data_or_params=None, raw=False,
     request_id = uuid4()
     request_id_dict = {'request_id': request_id}
 
+    cache_scope = _cache_scope()
+    response_cache_key = None
+    if method == 'get' and cacheable and not raw and cache_scope is not None:
+        generation_cache_key = _generation_cache_key(cache_scope)
+        response_cache_key = _response_cache_key(cache_scope, url, data_or_params)
+        cached = cache.get_many([generation_cache_key, response_cache_key])
+        generation = cached.get(generation_cache_key, 0)
+        if cached.get(response_cache_key, (None, None))[0] == generation:
+            dog_stats_api.increment('comment_client.request.cache_hit', tags=metric_tags)
+            return cached[response_cache_key][1]
+
     if method in ['post', 'put', 'patch']:
         data = data_or_params
         params = request_id_dict
     else:
         data = None
         params = merge_dict(data_or_params, request_id_dict)
-    with request_timer(request_id, method, url, metric_tags):
-        response = requests.request(
-            method,
-            url,
-            data=data,
-            params=params,
-            headers=headers,
-            timeout=5
-        )
+    try:
+        with request_timer(request_id, method, url, metric_tags):
+            response = _get_session().request(
+                method,
+                url,
+                data=data,
+                params=params,
+                headers=headers,
+                timeout=5
+            )
+    finally:
+        if method != 'get':
+            invalidate_cached_responses()
 
     metric_tags.append(u'status_code:{}'.format(response.status_code))
     if response.status_code > 200:
@@ -129,6 +297,8 @@ def perform_request(method, url, data_or_params=None, raw=False,
                     value=data.get('num_pages', 1),
                     tags=metric_tags
                 )
+            if response_cache_key is not None:
+                cache.set(response_cache_key, (generation, data), settings.COMMENTS_SERVICE_CACHE_TIMEOUT)
             return data
 
 
@@ -30,6 +30,8 @@ def run():
 
     add_mimetypes()
 
+    configure_safe_exec()
+
     if settings.FEATURES.get('USE_CUSTOM_THEME', False):
         enable_theme()
 
@@ -65,6 +67,20 @@ def add_mimetypes():
     mimetypes.add_type('application/font-woff', '.woff')
 
 
+def configure_safe_exec():
+    """
+    Configure the sandbox processes and the result cache used by capa
+    problems to run their code.
+    """
+    from capa.safe_exec import configure
+
+    configure(
+        pool_size=settings.CODE_JAIL_POOL_SIZE,
+        pool_max_jobs=settings.CODE_JAIL_POOL_MAX_JOBS,
+        result_cache_size=settings.CODE_JAIL_RESULT_CACHE_SIZE,
+    )
+
+
 def enable_theme():
     """
     Enable the settings for a custom theme, whose files should be stored
@@ -0,0 +1,54 @@
+import logging
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+from opaque_keys.edx.keys import CourseKey
+from xmodule.modulestore.django import modulestore
+
+from openedx.core.djangoapps.content.course_overviews.models import CourseOverview
+
+
+log = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    args = '<course_id course_id ...>'
+    help = 'Generates and stores the overview of one or more courses.'
+
+    option_list = BaseCommand.option_list + (
+        make_option('--all',
+                    action='store_true',
+                    default=False,
+                    help='Generate overviews for all courses.'),
+        make_option('--missing',
+                    action='store_true',
+                    default=False,
+                    help='Generate overviews for the courses which have none.'),
+    )
+
+    def handle(self, *args, **options):
+
+        if options['missing']:
+            log.info('Generating the missing course overviews.')
+            CourseOverview.create_missing()
+            return
+
+        if options['all']:
+            course_keys = modulestore().get_course_keys()
+        else:
+            course_keys = [CourseKey.from_string(arg) for arg in args]
+
+        if not course_keys:
+            log.fatal('No courses specified.')
+            return
+
+        log.info('Generating course overviews for %d courses.', len(course_keys))
+
+        for course_key in course_keys:
+            try:
+                CourseOverview.update_from_modulestore(course_key)
+            except Exception as ex:  # pylint: disable=broad-except
+                log.exception('An error occurred while generating the course overview of %s: %s',
+                              unicode(course_key), ex.message)
+
+        log.info('Finished generating course overviews.')
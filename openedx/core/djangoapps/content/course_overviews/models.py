@@ -0,0 +1,354 @@
+"""
+Declaration of the CourseOverview model, a denormalized copy of the course
+fields displayed in the course catalog and on the student dashboard.
+"""
+import json
+import logging
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.db import IntegrityError, models
+from django.utils.translation import ugettext
+from model_utils.models import TimeStampedModel
+
+from static_replace import replace_static_urls
+from util.date_utils import strftime_localized
+from xmodule import course_metadata_utils
+from xmodule.course_module import CourseDescriptor
+from xmodule.modulestore import ModuleStoreEnum
+from xmodule.modulestore.django import modulestore
+from xmodule.modulestore.exceptions import ItemNotFoundError
+from xmodule_django.models import CourseKeyField
+
+from openedx.core.lib import courses
+
+
+log = logging.getLogger(__name__)
+
+# The XML courses whose overviews were refreshed by this process. XML courses
+# are never published, but only change when the process restarts.
+_REFRESHED_XML_COURSES = set()
+
+# The cache key of the version of a course changed by each publish, so that an
+# overview built while the course is published is not saved
+PUBLISHED_VERSION_CACHE_KEY = u'course_overviews.published_version.{}'
+
+# The cache key marking a course which failed to load, and how long it is not
+# loaded again unless it is published
+FAILED_COURSE_CACHE_KEY = u'course_overviews.failed.{}'
+FAILED_COURSE_CACHE_TIMEOUT = 60 * 60
+
+
+class CourseOverview(TimeStampedModel):
+    """
+    The fields of a course which are needed to list it in the course catalog
+    and on the student dashboard, so that these pages can be rendered (and
+    filtered in SQL) without loading every course from the modulestore.
+
+    The overview of a course is removed each time the course is published or
+    deleted (see signals.py), and created again from the modulestore by a task
+    queued on publish, or else the next time it is looked up. XML courses,
+    which are never published, have their overviews refreshed the first time
+    each process looks them up. The generate_course_overview command creates
+    the overviews which are missing, e.g. of the courses published before
+    overviews existed, which the catalog does not list otherwise.
+
+    It duck-types the parts of CourseDescriptor these pages use, including
+    the ones courseware.access needs to check access to a course.
+    """
+    # Course identification
+    id = CourseKeyField(db_index=True, primary_key=True, max_length=255)  # pylint: disable=invalid-name
+    org = models.CharField(max_length=255, db_index=True)
+    display_name = models.TextField(null=True)
+    display_name_with_default = models.TextField()
+    display_number_with_default = models.TextField()
+    display_org_with_default = models.TextField()
+
+    # Start/end dates
+    start = models.DateTimeField(null=True)
+    end = models.DateTimeField(null=True)
+    advertised_start = models.TextField(null=True)
+    announcement = models.DateTimeField(null=True)
+    is_new = models.NullBooleanField()
+
+    # Enrollment and visibility
+    enrollment_start = models.DateTimeField(null=True)
+    enrollment_end = models.DateTimeField(null=True)
+    enrollment_domain = models.TextField(null=True)
+    invitation_only = models.BooleanField(default=False)
+    ispublic = models.NullBooleanField()
+    catalog_visibility = models.TextField(null=True)
+    visible_to_staff_only = models.BooleanField(default=False)
+    days_early_for_beta = models.FloatField(null=True)
+    mobile_available = models.BooleanField(default=False)
+    _pre_requisite_courses_json = models.TextField(default='[]')
+
+    # Catalog content
+    course_image_url = models.TextField()
+    short_description = models.TextField(null=True)
+
+    # Certification
+    cert_name_short = models.TextField()
+    cert_name_long = models.TextField()
+    certificates_display_behavior = models.TextField(null=True)
+    certificates_show_before_end = models.BooleanField(default=False)
+    lowest_passing_grade = models.FloatField(null=True)
+    end_of_course_survey_url = models.TextField(null=True)
+
+    # The course itself is the only block of a course overview, so that it
+    # never has group access restrictions or tags (see courseware.access).
+    user_partitions = []
+    _class_tags = frozenset()
+
+    def __unicode__(self):
+        return unicode(self.id)
+
+    @classmethod
+    def _create_from_course(cls, course):
+        """
+        Returns a (not saved) CourseOverview of `course`, a CourseDescriptor.
+        """
+        try:
+            short_description = modulestore().get_item(
+                course.id.make_usage_key('about', 'short_description')
+            ).data
+        except ItemNotFoundError:
+            short_description = None
+        if short_description:
+            short_description = replace_static_urls(
+                short_description,
+                getattr(course, 'data_dir', None),
+                course_id=course.id,
+                static_asset_path=course.static_asset_path,
+            )
+
+        return cls(
+            id=course.id,
+            org=course.location.org,
+            display_name=course.display_name,
+            display_name_with_default=course.display_name_with_default,
+            display_number_with_default=course.display_number_with_default,
+            display_org_with_default=course.display_org_with_default,
+
+            start=course.start,
+            end=course.end,
+            advertised_start=course.advertised_start,
+            announcement=course.announcement,
+            is_new=course.is_new,
+
+            enrollment_start=course.enrollment_start,
+            enrollment_end=course.enrollment_end,
+            enrollment_domain=course.enrollment_domain,
+            invitation_only=course.invitation_only,
+            ispublic=course.ispublic,
+            catalog_visibility=course.catalog_visibility,
+            visible_to_staff_only=course.visible_to_staff_only,
+            days_early_for_beta=course.days_early_for_beta,
+            mobile_available=course.mobile_available,
+            _pre_requisite_courses_json=json.dumps(course.pre_requisite_courses),
+
+            course_image_url=courses.course_image_url(course),
+            short_description=short_description,
+
+            cert_name_short=course.cert_name_short,
+            cert_name_long=course.cert_name_long,
+            certificates_display_behavior=course.certificates_display_behavior,
+            certificates_show_before_end=course.certificates_show_before_end,
+            lowest_passing_grade=course.lowest_passing_grade,
+            end_of_course_survey_url=course.end_of_course_survey_url,
+        )
+
+    @classmethod
+    def update_from_modulestore(cls, course_key):
+        """
+        Creates or replaces the CourseOverview of the course with `course_key`
+        from the modulestore, and returns it.
+
+        Returns None (after removing any CourseOverview) if there is no such
+        course, or it cannot be loaded. A course which cannot be loaded is not
+        loaded again by get_from_ids for FAILED_COURSE_CACHE_TIMEOUT seconds,
+        or until it is published.
+
+        The overview is not saved if the course is published while it is built,
+        since it may have been built from the course before the publish.
+        """
+        store = modulestore()
+        if store.get_modulestore_type(course_key) == ModuleStoreEnum.Type.xml:
+            _REFRESHED_XML_COURSES.add(course_key)
+        published_version = cache.get(PUBLISHED_VERSION_CACHE_KEY.format(course_key))
+        with store.branch_setting(ModuleStoreEnum.Branch.published_only, course_key):
+            course = store.get_course(course_key)
+            if not isinstance(course, CourseDescriptor):
+                if course is not None:
+                    log.error(u"Cannot create the overview of course %s, which failed to load", course_key)
+                    cache.set(FAILED_COURSE_CACHE_KEY.format(course_key), True, FAILED_COURSE_CACHE_TIMEOUT)
+                cls.objects.filter(id=course_key).delete()
+                return None
+
+            overview = cls._create_from_course(course)
+        if cache.get(PUBLISHED_VERSION_CACHE_KEY.format(course_key)) != published_version:
+            # The overview of the published course is created by the task queued on publish
+            return overview
+        try:
+            overview.save()
+        except IntegrityError:
+            # Another process stored the overview of this course at the same time
+            pass
+        return overview
+
+    @classmethod
+    def course_published(cls, course_key):
+        """
+        Removes the overview of the course with `course_key`, which was just
+        published, and lets it be loaded again if it failed to load.
+        """
+        cache.set(PUBLISHED_VERSION_CACHE_KEY.format(course_key), uuid4().hex)
+        cache.delete(FAILED_COURSE_CACHE_KEY.format(course_key))
+        cls.objects.filter(id=course_key).delete()
+
+    @classmethod
+    def get_from_id(cls, course_key):
+        """
+        Returns the CourseOverview of the course with `course_key`, or None
+        if there is no such course (see get_from_ids).
+        """
+        return cls.get_from_ids([course_key]).get(course_key)
+
+    @classmethod
+    def get_from_ids(cls, course_keys):
+        """
+        Returns a dict of the CourseOverviews of the courses with
+        `course_keys`, by course key, with a single query.
+
+        The overviews of courses which have none yet, and of XML courses this
+        process did not refresh yet, are created from the modulestore; courses
+        which don't exist, or cannot be loaded, are left out.
+        """
+        overviews = {overview.id: overview for overview in cls.objects.filter(id__in=course_keys)}
+        failed_keys = cache.get_many([
+            FAILED_COURSE_CACHE_KEY.format(course_key) for course_key in course_keys if course_key not in overviews
+        ])
+        for course_key in course_keys:
+            if FAILED_COURSE_CACHE_KEY.format(course_key) in failed_keys:
+                continue
+            if course_key not in overviews or cls._is_unrefreshed_xml_course(course_key):
+                overview = cls.update_from_modulestore(course_key)
+                if overview is None:
+                    overviews.pop(course_key, None)
+                else:
+                    overviews[course_key] = overview
+        return overviews
+
+    @classmethod
+    def create_missing(cls, org=None):
+        """
+        Creates the overviews of the courses in the modulestore (of `org`, if
+        given) which have none, e.g. because they were published before
+        overviews existed, and refreshes those of XML courses as get_from_ids
+        does. This lists every course key, so it is not meant to be called
+        while handling a request (see the generate_course_overview command).
+
+        The modulestore only lists the course keys, so that no course which
+        already has an up to date overview is loaded.
+        """
+        existing_ids = set(unicode(course_id) for course_id in cls.objects.values_list('id', flat=True))
+        cls.get_from_ids([
+            course_key for course_key in modulestore().get_course_keys(org=org)
+            if unicode(course_key) not in existing_ids or cls._is_unrefreshed_xml_course(course_key)
+        ])
+
+    @staticmethod
+    def _is_unrefreshed_xml_course(course_key):
+        """
+        Returns whether `course_key` is an XML course whose overview this process did not refresh yet.
+        """
+        return (
+            course_key not in _REFRESHED_XML_COURSES and
+            modulestore().get_modulestore_type(course_key) == ModuleStoreEnum.Type.xml
+        )
+
+    @property
+    def location(self):
+        """
+        The usage key of the course block.
+        """
+        # Old mongo courses name their course block after the run
+        return self.id.make_usage_key('course', self.id.run if self.id.deprecated else 'course')
+
+    @property
+    def number(self):
+        """
+        The course number, as in CourseDescriptor.
+        """
+        return self.id.course
+
+    @property
+    def pre_requisite_courses(self):
+        """
+        The ids of the courses which must be completed before this one.
+        """
+        return json.loads(self._pre_requisite_courses_json)
+
+    def has_started(self):
+        """
+        Returns whether the course has started.
+        """
+        return course_metadata_utils.has_course_started(self.start)
+
+    def has_ended(self):
+        """
+        Returns whether the course has ended.
+        """
+        return course_metadata_utils.has_course_ended(self.end)
+
+    def may_certify(self):
+        """
+        Returns whether it is acceptable to show the student a certificate download link.
+        """
+        return course_metadata_utils.may_certify_for_course(
+            self.certificates_display_behavior, self.certificates_show_before_end, self.has_ended()
+        )
+
+    def start_datetime_text(self, format_string="SHORT_DATE"):
+        """
+        Returns the desired text corresponding the course's start date and
+        time in UTC, as CourseDescriptor.start_datetime_text does.
+        """
+        return course_metadata_utils.course_start_datetime_text(
+            self.start, self.advertised_start, format_string, ugettext, strftime_localized
+        )
+
+    @property
+    def start_date_is_still_default(self):
+        """
+        Checks if the start date of the course is still the default one.
+        """
+        return course_metadata_utils.course_start_date_is_default(self.start, self.advertised_start)
+
+    def end_datetime_text(self, format_string="SHORT_DATE"):
+        """
+        Returns the end date or date and time of the course, as
+        CourseDescriptor.end_datetime_text does.
+        """
+        return course_metadata_utils.course_end_datetime_text(self.end, format_string, strftime_localized)
+
+    @property
+    def is_newish(self):
+        """
+        Returns whether the course has been flagged as new, or is new according to its dates.
+        """
+        return course_metadata_utils.course_is_newish(
+            self.is_new, self.start, self.advertised_start, self.announcement
+        )
+
+    @property
+    def sorting_score(self):
+        """
+        Returns a number that can be used to sort courses according to how "new" they are.
+        """
+        return course_metadata_utils.course_sorting_score(self.start, self.advertised_start, self.announcement)
+
+
+# Signals must be imported in a file that is automatically loaded at app startup (e.g. models.py). We import them
+# at the end of this file to avoid circular dependencies.
+import signals  # pylint: disable=unused-import
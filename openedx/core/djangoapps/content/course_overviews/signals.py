@@ -0,0 +1,33 @@
+"""
+Signal handlers keeping the course overviews up to date with the modulestore.
+"""
+from django.dispatch.dispatcher import receiver
+
+from xmodule.modulestore.django import SignalHandler
+
+
+@receiver(SignalHandler.course_published)
+def listen_for_course_publish(sender, course_key, **kwargs):  # pylint: disable=unused-argument
+    """
+    Replaces the overview of a course which was just published: the outdated
+    overview is removed, and the refresh of the overview is queued.
+    """
+    from .models import CourseOverview
+    # Import tasks here to avoid a circular import.
+    from .tasks import update_course_overview
+
+    CourseOverview.course_published(course_key)
+
+    # Note: The countdown=0 kwarg ensures the task does not access the course
+    # before the signal emitter has finished all operations.
+    update_course_overview.apply_async([unicode(course_key)], countdown=0)
+
+
+@receiver(SignalHandler.course_deleted)
+def listen_for_course_delete(sender, course_key, **kwargs):  # pylint: disable=unused-argument
+    """
+    Removes the overview of a course which was just deleted.
+    """
+    from .models import CourseOverview
+
+    CourseOverview.objects.filter(id=course_key).delete()
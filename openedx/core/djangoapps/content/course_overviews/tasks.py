@@ -0,0 +1,20 @@
+"""
+Asynchronous tasks of the course overviews.
+"""
+from celery.task import task
+from opaque_keys.edx.keys import CourseKey
+
+
+@task(name=u'openedx.core.djangoapps.content.course_overviews.tasks.update_course_overview')
+def update_course_overview(course_key):
+    """
+    Refreshes the overview (in the database) of the specified course from the modulestore.
+    """
+    # Import here to avoid circular import.
+    from .models import CourseOverview
+
+    # Callers pass the course key as a Unicode string, since CourseLocator is not JSON-serializable.
+    if not isinstance(course_key, basestring):
+        raise ValueError('course_key must be a string. {} is not acceptable.'.format(type(course_key)))
+
+    CourseOverview.update_from_modulestore(CourseKey.from_string(course_key))
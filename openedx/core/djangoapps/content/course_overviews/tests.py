@@ -0,0 +1,158 @@
+import datetime
+
+import ddt
+import mock
+from django.core.cache import cache
+from django.utils.timezone import UTC
+from opaque_keys.edx.locations import SlashSeparatedCourseKey
+from opaque_keys.edx.locator import CourseLocator
+
+from xmodule.modulestore import ModuleStoreEnum
+from xmodule.modulestore.django import modulestore
+from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase, TEST_DATA_MIXED_TOY_MODULESTORE
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
+from openedx.core.djangoapps.content.course_overviews import models
+from openedx.core.djangoapps.content.course_overviews.models import CourseOverview
+
+
+@ddt.ddt
+class CourseOverviewTests(ModuleStoreTestCase):
+    def setUp(self, **kwargs):
+        super(CourseOverviewTests, self).setUp()
+        cache.clear()
+        self.start = datetime.datetime(2013, 1, 1, tzinfo=UTC())
+        self.end = datetime.datetime(2030, 1, 1, tzinfo=UTC())
+
+    def _create_course(self, store_type, **kwargs):
+        """
+        Creates a course with an about page, which has no overview yet.
+        """
+        course = CourseFactory.create(
+            default_store=store_type,
+            display_name='Overview Course',
+            start=self.start,
+            end=self.end,
+            advertised_start='Spring 2013',
+            pre_requisite_courses=['edX/pre/requisite'],
+            **kwargs
+        )
+        ItemFactory.create(
+            parent=course, category='about', display_name='short_description',
+            data='A course <img src="/static/overview.png">',
+        )
+        CourseOverview.objects.all().delete()
+        return modulestore().get_course(course.id)
+
+    @ddt.data(ModuleStoreEnum.Type.mongo, ModuleStoreEnum.Type.split)
+    def test_overview_matches_course(self, store_type):
+        course = self._create_course(store_type)
+        overview = CourseOverview.get_from_id(course.id)
+
+        for attribute in ('id', 'number', 'display_name', 'display_name_with_default',
+                          'display_number_with_default', 'display_org_with_default', 'start', 'end',
+                          'advertised_start', 'catalog_visibility', 'pre_requisite_courses', 'is_newish',
+                          'sorting_score', 'start_date_is_still_default', 'lowest_passing_grade'):
+            self.assertEqual(getattr(overview, attribute), getattr(course, attribute), attribute)
+        for method in ('has_started', 'has_ended', 'may_certify', 'start_datetime_text', 'end_datetime_text'):
+            self.assertEqual(getattr(overview, method)(), getattr(course, method)(), method)
+        self.assertIn('A course', overview.short_description)
+        self.assertNotIn('/static/overview.png', overview.short_description)
+
+        # The overview was stored, and is read back with a single query
+        with self.assertNumQueries(1):
+            self.assertEqual(CourseOverview.get_from_id(course.id).display_name, 'Overview Course')
+
+    @ddt.data(ModuleStoreEnum.Type.mongo, ModuleStoreEnum.Type.split)
+    def test_refreshed_on_publish(self, store_type):
+        course = self._create_course(store_type)
+        CourseOverview.get_from_id(course.id)
+
+        course.display_name = 'Renamed Course'
+        self.store.update_item(course, ModuleStoreEnum.UserID.test)
+        # The overview is refreshed by the task queued on publish, not by the next lookup
+        self.assertEqual(CourseOverview.objects.get(id=course.id).display_name, 'Renamed Course')
+
+    def test_not_saved_if_published_while_built(self):
+        course = self._create_course(ModuleStoreEnum.Type.split)
+        create_from_course = CourseOverview._create_from_course  # pylint: disable=protected-access
+
+        def publish_while_built(course):
+            """ Publishes the course while its overview is built """
+            CourseOverview.course_published(course.id)
+            return create_from_course(course)
+
+        with mock.patch.object(CourseOverview, '_create_from_course', side_effect=publish_while_built):
+            self.assertEqual(CourseOverview.get_from_id(course.id).display_name, 'Overview Course')
+        self.assertFalse(CourseOverview.objects.filter(id=course.id).exists())
+
+    def test_failed_course_not_reloaded(self):
+        course = self._create_course(ModuleStoreEnum.Type.split)
+        with mock.patch(
+            'xmodule.modulestore.mixed.MixedModuleStore.get_course', return_value=mock.Mock()
+        ) as mock_get_course:
+            self.assertIsNone(CourseOverview.get_from_id(course.id))
+            self.assertIsNone(CourseOverview.get_from_id(course.id))
+        self.assertEqual(mock_get_course.call_count, 1)
+
+        # Publishing the course lets it be loaded again
+        CourseOverview.course_published(course.id)
+        self.assertEqual(CourseOverview.get_from_id(course.id).display_name, 'Overview Course')
+
+    @ddt.data(ModuleStoreEnum.Type.mongo, ModuleStoreEnum.Type.split)
+    def test_removed_on_delete(self, store_type):
+        course = self._create_course(store_type)
+        CourseOverview.get_from_id(course.id)
+
+        self.store.delete_course(course.id, ModuleStoreEnum.UserID.test)
+        self.assertFalse(CourseOverview.objects.filter(id=course.id).exists())
+        self.assertIsNone(CourseOverview.get_from_id(course.id))
+
+    def test_get_from_ids(self):
+        courses = [self._create_course(ModuleStoreEnum.Type.split, run=run) for run in ('1', '2')]
+        missing_key = CourseLocator('edX', 'missing', 'course')
+        CourseOverview.get_from_id(courses[0].id)
+
+        overviews = CourseOverview.get_from_ids([course.id for course in courses] + [missing_key])
+        self.assertEqual(set(overviews), set(course.id for course in courses))
+        self.assertEqual(CourseOverview.objects.count(), 2)
+
+    @ddt.data(ModuleStoreEnum.Type.mongo, ModuleStoreEnum.Type.split)
+    def test_create_missing(self, store_type):
+        courses = [self._create_course(store_type, org=org) for org in ('FirstOrg', 'SecondOrg')]
+        CourseOverview.create_missing(org='FirstOrg')
+        self.assertEqual(list(CourseOverview.objects.values_list('org', flat=True)), ['FirstOrg'])
+
+        CourseOverview.create_missing()
+        self.assertEqual(CourseOverview.objects.count(), 2)
+
+        # The courses which have an overview are not loaded again
+        with mock.patch.object(CourseOverview, 'update_from_modulestore') as mock_update:
+            CourseOverview.create_missing()
+        self.assertFalse(mock_update.called)
+        self.assertEqual(set(CourseOverview.get_from_ids([course.id for course in courses])),
+                         set(course.id for course in courses))
+
+
+class XmlCourseOverviewTests(ModuleStoreTestCase):
+    """
+    Tests of the overviews of XML courses, which are never published.
+    """
+    MODULESTORE = TEST_DATA_MIXED_TOY_MODULESTORE
+
+    toy_course_key = SlashSeparatedCourseKey('edX', 'toy', '2012_Fall')
+
+    def setUp(self):
+        super(XmlCourseOverviewTests, self).setUp()
+        models._REFRESHED_XML_COURSES.clear()  # pylint: disable=protected-access
+
+    def test_refreshed_once_per_process(self):
+        CourseOverview.objects.create(
+            id=self.toy_course_key, org='edX', display_name='Stale', display_name_with_default='Stale',
+            display_number_with_default='toy', display_org_with_default='edX', course_image_url='',
+            cert_name_short='', cert_name_long='',
+        )
+        CourseOverview.create_missing()
+        self.assertEqual(CourseOverview.objects.get(id=self.toy_course_key).display_name, 'Toy Course')
+
+        CourseOverview.objects.filter(id=self.toy_course_key).update(display_name='Stale')
+        self.assertEqual(CourseOverview.get_from_id(self.toy_course_key).display_name, 'Stale')
@@ -1,6 +1,7 @@
 import json
 import logging
 
+from django.db import models
 from model_utils.models import TimeStampedModel
 
 from util.models import CompressedTextField
@@ -20,6 +21,10 @@ class CourseStructure(TimeStampedModel):
     # we'd have to be careful about caching.
     structure_json = CompressedTextField(verbose_name='Structure JSON', blank=True, null=True)
 
+    # The version of the course structure the JSON was generated from (for split courses), or a hash of the JSON,
+    # so that it is only rewritten when the course structure changes.
+    version = models.CharField(max_length=255, blank=True, null=True)
+
     @property
     def structure(self):
         if self.structure_json:
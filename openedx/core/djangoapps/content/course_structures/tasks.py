@@ -1,17 +1,190 @@
+import hashlib
 import json
 import logging
 
+from bson.son import SON
 from celery.task import task
 from opaque_keys.edx.keys import CourseKey
+from opaque_keys.edx.locations import Location
+from xblock.core import XBlock
+from xblock.plugin import PluginMissingError
+from xmodule.modulestore import ModuleStoreEnum, prefer_xmodules
 from xmodule.modulestore.django import modulestore
+from xmodule.modulestore.exceptions import ItemNotFoundError
+from xmodule.modulestore.inheritance import InheritanceMixin
+from xmodule.modulestore.mongo.base import MongoRevisionKey, as_published
 
 
 log = logging.getLogger('edx.celery.task')
 
 
+# The fields of each block stored in the course structure, with the value used for blocks which don't have them
+STRUCTURE_FIELDS = (('display_name', None), ('graded', False), ('format', None))
+
+
 def _generate_course_structure(course_key):
     """
     Generates a course structure dictionary for the specified course.
+
+    The blocks of split and old mongo courses are read straight from the
+    modulestore's documents, without instantiating them; the blocks of other
+    courses are loaded from the modulestore.
+    """
+    store = modulestore()
+    if hasattr(store, '_get_modulestore_for_courselike'):
+        store = store._get_modulestore_for_courselike(course_key)  # pylint: disable=protected-access
+
+    store_type = store.get_modulestore_type(course_key)
+    if store_type == ModuleStoreEnum.Type.split:
+        root, records = _read_split_records(store, course_key)
+    elif store_type == ModuleStoreEnum.Type.mongo:
+        root, records = _read_mongo_records(store, course_key)
+    else:
+        return _generate_course_structure_from_xblocks(course_key)
+    return _generate_structure_from_records(store, root, records)
+
+
+def _get_course_version(course_key):
+    """
+    Returns the version of the structure of the specified course, if its
+    modulestore versions it (i.e. split), or None.
+    """
+    store = modulestore()
+    if hasattr(store, '_get_modulestore_for_courselike'):
+        store = store._get_modulestore_for_courselike(course_key)  # pylint: disable=protected-access
+    if store.get_modulestore_type(course_key) != ModuleStoreEnum.Type.split:
+        return None
+
+    course_key = store._map_revision_to_branch(course_key)  # pylint: disable=protected-access
+    index = store.get_course_index(course_key)
+    if index is None or course_key.branch not in index['versions']:
+        return None
+    return unicode(index['versions'][course_key.branch])
+
+
+def _read_split_records(store, course_key):
+    """
+    Returns the usage key of the root of the specified split course, and
+    a dict of the (block_type, settings, children) records of its blocks,
+    by usage key, read from its structure document.
+    """
+    course_entry = store._lookup_course(store._map_revision_to_branch(course_key))  # pylint: disable=protected-access
+    course_key = course_key.for_branch(None).version_agnostic()
+
+    def usage_key(block_key):
+        """ Returns the usage key of the block with `block_key`. """
+        return unicode(course_key.make_usage_key(block_key.type, block_key.id))
+
+    records = {}
+    for block_key, block_data in course_entry.structure['blocks'].iteritems():
+        # Values inherited from a library are stored as the block's defaults
+        block_settings = dict(block_data.defaults or {})
+        block_settings.update(block_data.fields)
+        children = [usage_key(child) for child in block_settings.pop('children', [])]
+        records[usage_key(block_key)] = (block_key.type, block_settings, children)
+    return usage_key(course_entry.structure['root']), records
+
+
+def _read_mongo_records(store, course_key):
+    """
+    Returns the usage key of the root of the specified old mongo course, and
+    a dict of the (block_type, settings, children) records of its blocks,
+    by usage key, read with a single query.
+    """
+    query = SON([
+        ('_id.tag', 'i4x'),
+        ('_id.org', course_key.org),
+        ('_id.course', course_key.course),
+    ])
+    # if we're only dealing in the published branch, then only get published blocks
+    draft_preferred = store.get_branch_setting() != ModuleStoreEnum.Branch.published_only
+    if not draft_preferred:
+        query['_id.revision'] = None
+    # we just want the location, children, and the metadata stored in the structure
+    record_filter = {'_id': 1, 'definition.children': 1}
+    for field_name in set(field_name for field_name, __ in STRUCTURE_FIELDS) | set(InheritanceMixin.fields):
+        record_filter['metadata.{0}'.format(field_name)] = 1
+
+    records = {}
+    for result in store.collection.find(query, record_filter):
+        location = Location._from_deprecated_son(result['_id'], course_key.run)  # pylint: disable=protected-access
+        location_url = unicode(as_published(location))
+        if location_url in records and location.revision != MongoRevisionKey.draft:
+            # the draft of this block was already found, and is the one to use
+            continue
+        records[location_url] = (
+            location.category,
+            result.get('metadata', {}),
+            result.get('definition', {}).get('children', []),
+        )
+    return unicode(course_key.make_usage_key('course', course_key.run)), records
+
+
+def _generate_structure_from_records(store, root, records):
+    """
+    Generates a course structure dictionary from the `records` of the
+    blocks of a course (see _read_split_records), starting at `root`.
+
+    The values of the fields a block doesn't set are inherited from its
+    parent, for inheritable fields, or the defaults of its class.
+    """
+    inheritable_fields = set(InheritanceMixin.fields)
+    block_classes = {}
+
+    def field_defaults(block_type):
+        """ Returns the default values of the structure fields of the blocks of `block_type`. """
+        if block_type not in block_classes:
+            try:
+                block_class = store.mixologist.mix(XBlock.load_class(block_type, select=prefer_xmodules))
+            except PluginMissingError:
+                block_class = None
+            block_classes[block_type] = dict(
+                (attr, getattr(getattr(block_class, attr, None), 'default', default))
+                for attr, default in STRUCTURE_FIELDS
+            )
+        return block_classes[block_type]
+
+    if root not in records:
+        raise ItemNotFoundError(root)
+
+    blocks_stack = [(root, {})]
+    blocks_dict = {}
+    while blocks_stack:
+        key, inherited = blocks_stack.pop()
+        if key in blocks_dict:
+            continue
+        block_type, block_settings, children = records[key]
+        children = [child for child in children if child in records]
+        block = {
+            "usage_key": key,
+            "block_type": block_type,
+            "children": children,
+        }
+        for attr, default in STRUCTURE_FIELDS:
+            if attr in block_settings:
+                block[attr] = block_settings[attr]
+            elif attr in inherited:
+                block[attr] = inherited[attr]
+            else:
+                block[attr] = field_defaults(block_type)[attr]
+        blocks_dict[key] = block
+
+        # Add this blocks children to the stack so that we can traverse them as well.
+        children_inherited = dict(inherited)
+        children_inherited.update(
+            (field_name, value) for field_name, value in block_settings.iteritems() if field_name in inheritable_fields
+        )
+        blocks_stack.extend((child, children_inherited) for child in children)
+    return {
+        "root": root,
+        "blocks": blocks_dict
+    }
+
+
+def _generate_course_structure_from_xblocks(course_key):
+    """
+    Generates a course structure dictionary for the specified course, from
+    its blocks loaded from the modulestore.
     """
     course = modulestore().get_course(course_key, depth=None)
     blocks_stack = [course]
@@ -28,8 +201,7 @@ def _generate_course_structure(course_key):
         }
 
         # Retrieve these attributes separately so that we can fail gracefully if the block doesn't have the attribute.
-        attrs = (('graded', False), ('format', None))
-        for attr, default in attrs:
+        for attr, default in STRUCTURE_FIELDS[1:]:
             if hasattr(curr_block, attr):
                 block[attr] = getattr(curr_block, attr, default)
             else:
@@ -62,18 +234,26 @@ def update_course_structure(course_key):
     course_key = CourseKey.from_string(course_key)
 
     try:
+        # The structure of a versioned course is only generated when its version changed
+        version = _get_course_version(course_key)
+        if version is not None and CourseStructure.objects.filter(course_id=course_key, version=version).exists():
+            return
         structure = _generate_course_structure(course_key)
     except Exception as ex:
         log.exception('An error occurred while generating course structure: %s', ex.message)
         raise
 
     structure_json = json.dumps(structure)
+    if version is None:
+        # Otherwise, the structure is only rewritten when it changed
+        version = hashlib.sha1(json.dumps(structure, sort_keys=True)).hexdigest()
 
     cs, created = CourseStructure.objects.get_or_create(
         course_id=course_key,
-        defaults={'structure_json': structure_json}
+        defaults={'structure_json': structure_json, 'version': version}
     )
 
-    if not created:
+    if not created and cs.version != version:
         cs.structure_json = structure_json
+        cs.version = version
         cs.save()
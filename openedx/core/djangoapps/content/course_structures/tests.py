@@ -1,6 +1,10 @@
 import json
 
-from xmodule.modulestore.django import SignalHandler
+import ddt
+from mock import patch
+
+from xmodule.modulestore import ModuleStoreEnum
+from xmodule.modulestore.django import SignalHandler, modulestore
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
 from openedx.core.djangoapps.content.course_structures.models import CourseStructure
@@ -18,6 +22,7 @@ class SignalDisconnectTestMixin(object):
         SignalHandler.course_published.disconnect(listen_for_course_publish)
 
 
+@ddt.ddt
 class CourseStructureTaskTests(ModuleStoreTestCase):
     def setUp(self, **kwargs):
         super(CourseStructureTaskTests, self).setUp()
@@ -25,7 +30,19 @@ class CourseStructureTaskTests(ModuleStoreTestCase):
         self.section = ItemFactory.create(parent=self.course, category='chapter', display_name='Test Section')
         CourseStructure.objects.all().delete()
 
-    def test_generate_course_structure(self):
+    @ddt.data(ModuleStoreEnum.Type.mongo, ModuleStoreEnum.Type.split)
+    def test_generate_course_structure(self, store_type):
+        with self.store.default_store(store_type):
+            self.course = CourseFactory.create()
+            section = ItemFactory.create(parent=self.course, category='chapter', display_name='Test Section')
+            subsection = ItemFactory.create(
+                parent=section, category='sequential', metadata={'graded': True, 'format': 'Homework'}
+            )
+            unit = ItemFactory.create(parent=subsection, category='vertical')
+            ItemFactory.create(parent=unit, category='problem')
+            ItemFactory.create(parent=unit, category='html', display_name='Test HTML')
+        self.course = self.store.get_course(self.course.id)
+
         blocks = {}
 
         def add_block(block):
@@ -51,7 +68,9 @@ class CourseStructureTaskTests(ModuleStoreTestCase):
         }
 
         self.maxDiff = None
-        actual = _generate_course_structure(self.course.id)
+        # The blocks are read without being loaded from the modulestore
+        with patch.object(modulestore(), 'get_course', side_effect=AssertionError):
+            actual = _generate_course_structure(self.course.id)
         self.assertDictEqual(actual, expected)
 
     def test_structure_json(self):
@@ -128,3 +147,22 @@ class CourseStructureTaskTests(ModuleStoreTestCase):
         cs = CourseStructure.objects.get(course_id=course_id)
         self.assertEqual(cs.course_id, course_id)
         self.assertEqual(cs.structure, structure)
+
+    @ddt.data(ModuleStoreEnum.Type.mongo, ModuleStoreEnum.Type.split)
+    def test_structure_rewritten_when_changed(self, store_type):
+        with self.store.default_store(store_type):
+            course = CourseFactory.create()
+            ItemFactory.create(parent=course, category='chapter', display_name='Test Section')
+        update_course_structure(unicode(course.id))
+        structure = CourseStructure.objects.get(course_id=course.id)
+
+        # Nothing is written while the course structure doesn't change
+        with patch.object(CourseStructure, 'save') as mock_save:
+            update_course_structure(unicode(course.id))
+        self.assertFalse(mock_save.called)
+
+        ItemFactory.create(parent=course, category='chapter', display_name='Other Section')
+        update_course_structure(unicode(course.id))
+        updated = CourseStructure.objects.get(course_id=course.id)
+        self.assertNotEqual(updated.version, structure.version)
+        self.assertEqual(len(updated.structure['blocks']), 3)